@@ -24,16 +24,491 @@ Example usage:
     
     # Format for platform
     formatted = delegate.format_for_platform(text, "discord")
+    
+    # Stream tokens as they are generated (server mode)
+    for token in delegate.ask_stream("Write a haiku about tests"):
+        print(token, end="", flush=True)
 
 Part of the ludoplex/llamafile fork.
 """
+import os
+import re
+import zlib
+import atexit
+import hashlib
+import socket
+import sqlite3
 import subprocess
 import json
+import queue
 import shutil
+import threading
+import time
+import http.client
 import urllib.request
 import urllib.error
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Union, Dict, Any
+from typing import Optional, Union, Dict, Any, Iterator, List, Tuple
+from urllib.parse import urlsplit
+
+
+# Errors meaning a pooled keep-alive connection was closed by the server
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class _ConnectionPool:
+    """
+    Small thread-safe pool of keep-alive HTTP connections to one server.
+    
+    Connections are reused across requests so each prompt skips the TCP
+    handshake; a connection the server has closed is replaced transparently.
+    """
+    
+    def __init__(self, base_url: str, size: int = 4, timeout: float = 60):
+        self.base_url = base_url
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=size)
+    
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+    
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Get (connection, reused)."""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+    
+    def release(self, conn: http.client.HTTPConnection):
+        """Return a connection whose response has been fully read."""
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    def open(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Send a request and return (connection, response) with the body unread.
+        
+        The caller must read the response and then release() the connection
+        (or close it on error).
+        """
+        conn, reused = self.acquire()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            return conn, conn.getresponse()
+        except _STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+        except Exception:
+            conn.close()
+            raise
+        # The idle connection had been closed server-side; retry once on a fresh one
+        conn = self._connect()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+    
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, bytes]:
+        """Send a request and return (status, body)."""
+        conn, resp = self.open(method, path, body, headers)
+        try:
+            data = resp.read()
+        except Exception:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self.release(conn)
+        return resp.status, data
+    
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "data" / "llm_cache.db"
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of LLM responses.
+    
+    Keys hash (prompt, model, temperature, max_tokens). Entries live in an
+    in-memory LRU backed by an SQLite file, so identical prompts are answered
+    without inference across calls and across processes. Every entry has its
+    own expiry time.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = DEFAULT_CACHE_PATH,
+        max_entries: int = 512,
+        default_ttl: float = 86400.0,
+    ):
+        """
+        Args:
+            path: SQLite file for the on-disk tier (None = memory only).
+            max_entries: Entries kept in the in-memory LRU.
+            default_ttl: Seconds an entry stays valid unless set() gets a ttl.
+        """
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+    
+    @staticmethod
+    def make_key(
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        system: Optional[str] = None,
+    ) -> str:
+        """Cache key for one inference request."""
+        material = json.dumps([prompt, model, round(float(temperature), 4), int(max_tokens)]
+                              + ([system] if system else []))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                    " created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"[llamafile] response cache disk tier disabled: {e}")
+                self.path = None
+        return self._conn
+    
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+            
+            db = self._db()
+            if db is not None:
+                row = db.execute(
+                    "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._remember(key, row[0], row[1])
+                    self._stats["disk_hits"] += 1
+                    return row[0]
+                if row:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            
+            if entry is not None or (db is not None and row):
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+    
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """Store a response for `ttl` seconds (default: default_ttl)."""
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            db = self._db()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, expires_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, value, now, expires_at),
+                )
+            self._stats["stores"] += 1
+    
+    def invalidate(self, key: str):
+        """Drop one entry from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+    
+    def prune(self) -> int:
+        """Delete expired entries from disk; returns the number removed."""
+        with self._lock:
+            now = time.time()
+            for key in [k for k, (_, exp) in self._memory.items() if exp <= now]:
+                del self._memory[key]
+            db = self._db()
+            if db is None:
+                return 0
+            return db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,)).rowcount
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            db = self._db()
+            stats["disk_entries"] = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if db else 0
+            stats["path"] = str(self.path) if self.path else None
+            return stats
+    
+    def close(self):
+        """Close the SQLite connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _free_port(host: str = "127.0.0.1") -> int:
+    """Ask the OS for an unused TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class _ManagedServer:
+    """
+    A llamafile server child process owned by a delegate.
+    
+    Started on first use on a free local port, health-checked before use,
+    restarted if it crashes and stopped after `idle_timeout` seconds without
+    requests, so the model is loaded once instead of per prompt.
+    """
+    
+    def __init__(
+        self,
+        llamafile_path: Path,
+        model_path: Optional[Path] = None,
+        gpu_layers: int = 99,
+        host: str = "127.0.0.1",
+        startup_timeout: float = 120.0,
+        idle_timeout: float = 300.0,
+        extra_args: Optional[List[str]] = None,
+    ):
+        self.llamafile_path = llamafile_path
+        self.model_path = model_path
+        self.gpu_layers = gpu_layers
+        self.host = host
+        self.startup_timeout = startup_timeout
+        self.idle_timeout = idle_timeout
+        self.extra_args = list(extra_args or [])
+        
+        self.port: Optional[int] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.RLock()
+        self._active = 0
+        self._last_used = 0.0
+        self._stop = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+        self._stats = {"starts": 0, "crashes": 0, "idle_shutdowns": 0}
+    
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    def alive(self) -> bool:
+        """Whether the child process is running."""
+        return self._proc is not None and self._proc.poll() is None
+    
+    def command(self, port: int) -> List[str]:
+        """Command line that starts the server on `port`."""
+        cmd = [str(self.llamafile_path), "--server", "--nobrowser"]
+        if self.model_path:
+            cmd.extend(["-m", str(self.model_path)])
+        cmd.extend([
+            "--host", self.host,
+            "--port", str(port),
+            "-ngl", str(self.gpu_layers),
+            *self.extra_args,
+        ])
+        return cmd
+    
+    def healthy(self, timeout: float = 2.0) -> bool:
+        """Whether the server answers /health with 200 (model loaded)."""
+        if self.port is None:
+            return False
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        try:
+            conn.request("GET", "/health")
+            return conn.getresponse().status == 200
+        except (OSError, http.client.HTTPException):
+            return False
+        finally:
+            conn.close()
+    
+    def ensure_running(self) -> str:
+        """
+        Start (or restart) the child if needed and return its base URL.
+        
+        Raises:
+            RuntimeError: If the server did not become healthy in time.
+        """
+        with self._lock:
+            self._last_used = time.monotonic()
+            if self.alive():
+                return self.url
+            if self._proc is not None:
+                # Exited without being stopped by us
+                self._stats["crashes"] += 1
+                print(f"[llamafile] server exited with code {self._proc.returncode}, restarting")
+                self._proc = None
+            self._start()
+            return self.url
+    
+    def _start(self):
+        self.port = _free_port(self.host)
+        self._proc = subprocess.Popen(
+            self.command(self.port),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._stats["starts"] += 1
+        
+        deadline = time.monotonic() + self.startup_timeout
+        while not self.healthy(timeout=1.0):
+            if not self.alive():
+                code = self._proc.returncode
+                self._proc = None
+                raise RuntimeError(f"llamafile server exited during startup (code {code})")
+            if time.monotonic() > deadline:
+                self._terminate()
+                raise RuntimeError(f"llamafile server not healthy after {self.startup_timeout:.0f}s")
+            time.sleep(0.25)
+        
+        self._last_used = time.monotonic()
+        if self._supervisor is None or not self._supervisor.is_alive():
+            self._stop.clear()
+            self._supervisor = threading.Thread(
+                target=self._supervise, name="llamafile-supervisor", daemon=True
+            )
+            self._supervisor.start()
+    
+    @contextmanager
+    def in_use(self):
+        """Mark a request in flight so the idle reaper leaves the server up."""
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._last_used = time.monotonic()
+    
+    def _supervise(self):
+        interval = max(0.05, min(5.0, self.idle_timeout / 4))
+        while not self._stop.wait(interval):
+            with self._lock:
+                if self._proc is None:
+                    return
+                idle = time.monotonic() - self._last_used
+                if self._active == 0 and idle >= self.idle_timeout:
+                    self._stats["idle_shutdowns"] += 1
+                    self._terminate()
+                    return
+                if not self.alive():
+                    # Crashed while in recent use: bring it back before the next request
+                    try:
+                        self.ensure_running()
+                    except (OSError, RuntimeError) as e:
+                        print(f"[llamafile] restart failed: {e}")
+                        return
+    
+    def _terminate(self):
+        proc, self._proc = self._proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    
+    def stop(self):
+        """Stop the child process and the supervisor."""
+        self._stop.set()
+        with self._lock:
+            self._terminate()
+        if self._supervisor and self._supervisor is not threading.current_thread():
+            self._supervisor.join(timeout=2)
+        self._supervisor = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Process state and lifecycle counters."""
+        with self._lock:
+            return {
+                "running": self.alive(),
+                "pid": self._proc.pid if self.alive() else None,
+                "port": self.port,
+                "active_requests": self._active,
+                **self._stats,
+            }
 
 
 class LlamafileDelegate:
@@ -56,6 +531,9 @@ class LlamafileDelegate:
         "platform formatting",
     ]
     
+    # generate() takes a separate system prefix (see ContentGenerateHandler)
+    supports_system_prompt = True
+    
     # Keep these for cloud LLM (Claude, GPT, etc.)
     KEEP_CLOUD = [
         "complex reasoning",
@@ -73,6 +551,10 @@ class LlamafileDelegate:
         gpu_layers: int = 99,
         timeout: int = 60,
         server_url: Optional[str] = None,
+        managed: Optional[bool] = None,
+        idle_timeout: float = 300.0,
+        cache: Union[bool, "ResponseCache", None] = None,
+        slot_affinity: bool = True,
     ):
         """
         Initialize the delegate.
@@ -84,12 +566,127 @@ class LlamafileDelegate:
             timeout: Timeout in seconds for inference (default: 60).
             server_url: URL of running llamafile server (e.g., http://localhost:8081).
                        If provided, uses HTTP API instead of spawning process.
+            managed: Without a server, start and supervise a private llamafile
+                     server child instead of spawning one process per prompt.
+                     Defaults to on unless LLAMAFILE_MANAGED=0 is set.
+            idle_timeout: Seconds without requests before the managed server
+                          is shut down (it restarts on the next prompt).
+            cache: Response cache: a ResponseCache, False to disable, or None
+                   for the default memory + data/llm_cache.db cache (unless
+                   LLAMAFILE_CACHE=0 is set).
+            slot_affinity: Route requests that share a system prefix to the
+                           same server slot so its prompt cache is reused.
         """
         self.server_url = server_url or self._detect_server()
         self.llamafile_path = self._find_llamafile(llamafile_path) if not self.server_url else None
         self.model_path = self._find_model(model_path) if not self.server_url else None
         self.gpu_layers = gpu_layers
         self.timeout = timeout
+        self._pool: Optional[_ConnectionPool] = None
+        self._slots: Optional[int] = None
+        self.slot_affinity = slot_affinity
+        
+        if managed is None:
+            managed = os.environ.get("LLAMAFILE_MANAGED", "1") != "0"
+        self._managed: Optional[_ManagedServer] = None
+        if managed and not self.server_url:
+            self._managed = _ManagedServer(
+                self.llamafile_path, self.model_path, gpu_layers, idle_timeout=idle_timeout
+            )
+            atexit.register(self._managed.stop)
+        
+        if cache is None:
+            cache = os.environ.get("LLAMAFILE_CACHE", "1") != "0"
+        if cache is True:
+            cache = ResponseCache()
+        self.cache: Optional[ResponseCache] = cache or None
+    
+    @property
+    def model_id(self) -> str:
+        """Identifies the model answering prompts (part of the cache key)."""
+        return str(self.model_path or self.llamafile_path or self.server_url)
+    
+    @property
+    def mode(self) -> str:
+        """"server" (external), "managed" (supervised child) or "cli" (process per prompt)."""
+        if self.server_url:
+            return "server"
+        return "managed" if self._managed else "cli"
+    
+    @property
+    def pool(self) -> _ConnectionPool:
+        """Keep-alive connection pool for the server endpoint."""
+        url = self._endpoint()
+        if self._pool is None or self._pool.base_url != url:
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = _ConnectionPool(url, timeout=self.timeout)
+        return self._pool
+    
+    def _endpoint(self) -> Optional[str]:
+        """Base URL to send prompts to, starting the managed server if needed."""
+        if self.server_url:
+            return self.server_url
+        if self._managed is None:
+            return None
+        try:
+            return self._managed.ensure_running()
+        except (OSError, RuntimeError) as e:
+            # e.g. a llamafile build without --server: use one process per prompt
+            print(f"[llamafile] managed server unavailable, using CLI mode: {e}")
+            self._managed.stop()
+            self._managed = None
+            return None
+    
+    @contextmanager
+    def _server_request(self) -> Iterator[Optional[str]]:
+        """Endpoint for one request, keeping a managed server from idling out meanwhile."""
+        url = self._endpoint()
+        if url and self._managed and not self.server_url:
+            with self._managed.in_use():
+                yield url
+        else:
+            yield url
+    
+    def slot_count(self) -> int:
+        """
+        Number of requests the server decodes in parallel (its -np slots).
+        
+        Read once from the server's /props; 1 in CLI mode or if unknown.
+        """
+        if self._slots is None:
+            slots = 1
+            if self._endpoint():
+                try:
+                    status, body = self.pool.request("GET", "/props")
+                    if status == 200:
+                        slots = int(json.loads(body.decode("utf-8")).get("total_slots") or 1)
+                except (OSError, http.client.HTTPException, ValueError, AttributeError):
+                    pass
+            self._slots = max(1, slots)
+        return self._slots
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Response cache counters ({"enabled": False} without a cache)."""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.get_stats()}
+    
+    def get_server_stats(self) -> Dict[str, Any]:
+        """Mode plus managed server state (if any)."""
+        stats: Dict[str, Any] = {"mode": self.mode, "server_url": self.server_url}
+        if self._managed:
+            stats["managed"] = self._managed.get_stats()
+        return stats
+    
+    def close(self):
+        """Stop the managed server (if any) and close pooled connections."""
+        if self._managed:
+            self._managed.stop()
+        if self._pool:
+            self._pool.close()
+        if self.cache:
+            self.cache.close()
     
     def _detect_server(self) -> Optional[str]:
         """Check if llamafile server is running on default port."""
@@ -153,59 +750,202 @@ class LlamafileDelegate:
         
         return None  # Model might be baked into llamafile
     
-    def _build_prompt(self, prompt: str) -> str:
+    def _build_prompt(self, prompt: str, system: Optional[str] = None) -> str:
         """Wrap prompt in Qwen chat template."""
-        return f"<|im_start|>user\n{prompt}<|im_end|>\n<|im_start|>assistant\n"
+        prefix = f"<|im_start|>system\n{system}<|im_end|>\n" if system else ""
+        return f"{prefix}<|im_start|>user\n{prompt}<|im_end|>\n<|im_start|>assistant\n"
+    
+    def _cache_key(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        cache: Optional[bool],
+        system: Optional[str] = None,
+    ) -> Optional[str]:
+        """Cache key if this call should be cached, else None.
+        
+        Calls cache by default only when deterministic (temperature 0);
+        cache=True/False forces caching on/off.
+        """
+        if self.cache is None or cache is False:
+            return None
+        if cache is None and temperature != 0:
+            return None
+        return ResponseCache.make_key(prompt, self.model_id, temperature, max_tokens, system)
     
     def _run(
         self,
         prompt: str,
         max_tokens: int = 200,
         temperature: float = 0.7,
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        system: Optional[str] = None,
+    ) -> str:
+        """Run inference via server (HTTP) or CLI (subprocess), consulting the cache."""
+        key = self._cache_key(prompt, max_tokens, temperature, cache, system)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        result = self._infer(prompt, max_tokens, temperature, system)
+        if key is not None and result and not result.startswith("[error"):
+            self.cache.set(key, result, cache_ttl)
+        return result
+    
+    def _infer(
+        self,
+        prompt: str,
+        max_tokens: int = 200,
+        temperature: float = 0.7,
+        system: Optional[str] = None,
     ) -> str:
         """Run inference via server (HTTP) or CLI (subprocess)."""
-        if self.server_url:
-            return self._run_server(prompt, max_tokens, temperature)
-        return self._run_cli(prompt, max_tokens, temperature)
+        with self._server_request() as url:
+            if not url:
+                return self._run_cli(prompt, max_tokens, temperature, system)
+            result = self._run_server(prompt, max_tokens, temperature, system)
+        
+        if (result.startswith("[error: server connection failed")
+                and self._managed and not self._managed.alive()):
+            # The managed server crashed mid-request: restart and retry once
+            with self._server_request() as url:
+                if url:
+                    result = self._run_server(prompt, max_tokens, temperature, system)
+        return result
+    
+    def _slot_for(self, system: Optional[str]) -> Optional[int]:
+        """Server slot to pin a system prefix to, so its KV cache stays warm there."""
+        if not system or not self.slot_affinity:
+            return None
+        slots = self.slot_count()
+        if slots <= 1:
+            return None
+        return zlib.crc32(system.encode("utf-8")) % slots
+    
+    def _chat_payload(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool,
+        system: Optional[str] = None,
+    ) -> bytes:
+        """
+        Request body for the OpenAI-compatible chat endpoint.
+        
+        cache_prompt lets llama.cpp reuse the KV cache for the longest
+        prefix shared with the slot's previous request; requests with the
+        same system prefix are routed to the same slot (id_slot).
+        """
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        payload = {
+            "model": "qwen2.5",
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream,
+            "cache_prompt": True,
+        }
+        slot = self._slot_for(system)
+        if slot is not None:
+            payload["id_slot"] = slot
+        return json.dumps(payload).encode("utf-8")
     
     def _run_server(
         self,
         prompt: str,
         max_tokens: int = 200,
         temperature: float = 0.7,
+        system: Optional[str] = None,
     ) -> str:
         """Run inference via HTTP API (faster, model stays loaded)."""
         try:
-            payload = {
-                "model": "qwen2.5",
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "stream": False,
-            }
-            data = json.dumps(payload).encode("utf-8")
-            req = urllib.request.Request(
-                f"{self.server_url}/v1/chat/completions",
-                data=data,
+            status, body = self.pool.request(
+                "POST",
+                "/v1/chat/completions",
+                body=self._chat_payload(prompt, max_tokens, temperature, stream=False, system=system),
                 headers={"Content-Type": "application/json"},
-                method="POST",
             )
-            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
-                result = json.loads(resp.read().decode("utf-8"))
-                return result["choices"][0]["message"]["content"].strip()
-        except urllib.error.URLError as e:
+            if status >= 400:
+                return f"[error: server returned {status} - {body[:80].decode('utf-8', 'replace')}]"
+            result = json.loads(body.decode("utf-8"))
+            return result["choices"][0]["message"]["content"].strip()
+        except (OSError, http.client.HTTPException) as e:
             return f"[error: server connection failed - {str(e)[:50]}]"
         except Exception as e:
             return f"[error: {str(e)[:100]}]"
     
+    def _stream_server(
+        self,
+        prompt: str,
+        max_tokens: int = 200,
+        temperature: float = 0.7,
+        system: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Stream completion tokens from the server (server-sent events)."""
+        try:
+            conn, resp = self.pool.open(
+                "POST",
+                "/v1/chat/completions",
+                body=self._chat_payload(prompt, max_tokens, temperature, stream=True, system=system),
+                headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+            )
+        except (OSError, http.client.HTTPException) as e:
+            yield f"[error: server connection failed - {str(e)[:50]}]"
+            return
+        
+        finished = False
+        try:
+            if resp.status >= 400:
+                body = resp.read()
+                finished = True
+                yield f"[error: server returned {resp.status} - {body[:80].decode('utf-8', 'replace')}]"
+                return
+            while True:
+                line = resp.readline()
+                if not line:
+                    finished = True
+                    break
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    # Drain the rest so the connection can be reused
+                    resp.read()
+                    finished = True
+                    break
+                try:
+                    chunk = json.loads(data.decode("utf-8"))
+                except ValueError:
+                    continue
+                choices = chunk.get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content")
+                if text:
+                    yield text
+        except (OSError, http.client.HTTPException) as e:
+            yield f"[error: stream interrupted - {str(e)[:50]}]"
+        finally:
+            # Only clean, fully-read connections go back to the pool
+            if finished and not resp.will_close:
+                self.pool.release(conn)
+            else:
+                conn.close()
+    
     def _run_cli(
         self,
         prompt: str,
         max_tokens: int = 200,
         temperature: float = 0.7,
+        system: Optional[str] = None,
     ) -> str:
         """Run inference via CLI (spawns process each time)."""
-        chat_prompt = self._build_prompt(prompt)
+        chat_prompt = self._build_prompt(prompt, system)
         
         cmd = [str(self.llamafile_path)]
         
@@ -250,6 +990,9 @@ class LlamafileDelegate:
         prompt: str,
         max_tokens: int = 200,
         temperature: float = 0.7,
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        system: Optional[str] = None,
     ) -> str:
         """
         Send a simple prompt to the local LLM.
@@ -258,18 +1001,91 @@ class LlamafileDelegate:
             prompt: The prompt to send.
             max_tokens: Maximum tokens to generate (default: 200).
             temperature: Sampling temperature (default: 0.7).
+            cache: Use the response cache. None caches only deterministic
+                   calls (temperature 0); True/False forces it on/off.
+            cache_ttl: Seconds to keep the response (default: cache default).
+            system: Stable system prefix (e.g. an entity's voice block). The
+                    server keeps its evaluated KV cache warm per prefix.
             
         Returns:
             The model's response.
         """
-        return self._run(prompt, max_tokens, temperature)
+        return self._run(prompt, max_tokens, temperature, cache, cache_ttl, system)
+    
+    def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        system: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        AI client interface used by the SOP engine's content_generate steps.
+        
+        Returns:
+            {"content": response, "model": model id}
+        """
+        content = self._run(prompt, max_tokens, temperature, cache, cache_ttl, system)
+        return {"content": content, "model": model or self.model_id}
     
-    def generate_json(self, description: str) -> Dict[str, Any]:
+    def ask_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 200,
+        temperature: float = 0.7,
+        cache: Optional[bool] = None,
+        cache_ttl: Optional[float] = None,
+        system: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Send a prompt and yield the response as it is generated.
+        
+        In server and managed modes tokens arrive as the model produces
+        them; in CLI mode the whole response is yielded once when the
+        process finishes.
+        
+        Args:
+            prompt: The prompt to send.
+            max_tokens: Maximum tokens to generate (default: 200).
+            temperature: Sampling temperature (default: 0.7).
+            cache: As for ask(); a cached response is yielded in one piece.
+            cache_ttl: Seconds to keep the response (default: cache default).
+            system: Stable system prefix (see ask()).
+            
+        Yields:
+            Response text fragments, in order.
+        """
+        key = self._cache_key(prompt, max_tokens, temperature, cache, system)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        parts = []
+        with self._server_request() as url:
+            if url:
+                for text in self._stream_server(prompt, max_tokens, temperature, system):
+                    parts.append(text)
+                    yield text
+            else:
+                parts.append(self._run_cli(prompt, max_tokens, temperature, system))
+                yield parts[0]
+        
+        result = "".join(parts).strip()
+        if key is not None and result and not any(p.startswith("[error") for p in parts):
+            self.cache.set(key, result, cache_ttl)
+    
+    def generate_json(self, description: str, cache: bool = True) -> Dict[str, Any]:
         """
         Generate JSON from a description.
         
         Args:
             description: Natural language description of desired JSON.
+            cache: Reuse a cached response for the same description (default: True).
             
         Returns:
             Parsed JSON as a dict, or {"error": ..., "raw": ...} on failure.
@@ -277,7 +1093,7 @@ class LlamafileDelegate:
         prompt = f"""Generate valid JSON for: {description}
 Output only the JSON, no explanation:"""
         
-        response = self._run(prompt, max_tokens=500, temperature=0.3)
+        response = self._run(prompt, max_tokens=500, temperature=0.3, cache=cache)
         
         try:
             start = response.find('{')
@@ -289,13 +1105,14 @@ Output only the JSON, no explanation:"""
         
         return {"error": "Failed to parse JSON", "raw": response}
     
-    def summarize(self, text: str, max_words: int = 100) -> str:
+    def summarize(self, text: str, max_words: int = 100, cache: Optional[bool] = None) -> str:
         """
         Summarize text.
         
         Args:
             text: Text to summarize.
             max_words: Maximum words in summary (default: 100).
+            cache: Use the response cache (see ask()).
             
         Returns:
             Summary string.
@@ -305,15 +1122,16 @@ Output only the JSON, no explanation:"""
 {text}
 
 Summary:"""
-        return self._run(prompt, max_tokens=max_words * 2)
+        return self._run(prompt, max_tokens=max_words * 2, cache=cache)
     
-    def format_for_platform(self, text: str, platform: str) -> str:
+    def format_for_platform(self, text: str, platform: str, cache: Optional[bool] = None) -> str:
         """
         Reformat text for a specific platform.
         
         Args:
             text: Text to reformat.
             platform: Target platform (discord, whatsapp, telegram, twitter).
+            cache: Use the response cache (see ask()).
             
         Returns:
             Reformatted text.
@@ -327,7 +1145,55 @@ Summary:"""
 Text: {text}
 
 Output only the reformatted text:"""
-        return self._run(prompt, max_tokens=300)
+        return self._run(prompt, max_tokens=300, cache=cache)
+    
+    def format_batch_for_platform(
+        self,
+        texts: List[str],
+        platform: str,
+        cache: Optional[bool] = None,
+    ) -> List[Optional[str]]:
+        """
+        Reformat several texts for one platform in a single request.
+        
+        The texts are numbered in the prompt and the model answers with one
+        <<<n>>> section per text.
+        
+        Args:
+            texts: Texts to reformat.
+            platform: Target platform (discord, whatsapp, telegram, twitter).
+            cache: Use the response cache (see ask()).
+            
+        Returns:
+            Reformatted texts in input order; None where the response had no
+            usable section (callers should fall back to format_for_platform).
+        """
+        if len(texts) == 1:
+            result = self.format_for_platform(texts[0], platform, cache=cache)
+            return [None if result.startswith("[error") else result]
+        
+        numbered = "\n\n".join(f"<<<{i}>>>\n{text}" for i, text in enumerate(texts, 1))
+        prompt = f"""Reformat each of the {len(texts)} texts below for {platform}. Follow platform conventions:
+- Discord: No markdown tables, wrap links in <>
+- WhatsApp: No headers, use *bold* for emphasis
+- Telegram: Markdown OK, keep concise
+- Twitter: Max 280 chars, add hashtags
+
+Answer with exactly {len(texts)} sections in the same order. Start each section
+with the same <<<n>>> marker line as its input text, followed by only the
+reformatted text.
+
+{numbered}"""
+        response = self._run(prompt, max_tokens=min(300 * len(texts), 2048), cache=cache)
+        
+        sections: Dict[int, str] = {}
+        parts = re.split(r"<<<\s*(\d+)\s*>>>", response)
+        for number, body in zip(parts[1::2], parts[2::2]):
+            body = body.strip()
+            if body:
+                # Last one wins: models sometimes echo the input before answering
+                sections[int(number)] = body
+        return [sections.get(i) for i in range(1, len(texts) + 1)]
     
     def extract_data(self, text: str, fields: list) -> Dict[str, Any]:
         """
@@ -435,19 +1301,19 @@ def ask_local(prompt: str, **kwargs) -> str:
     return get_delegate().ask(prompt, **kwargs)
 
 
-def generate_json(description: str) -> Dict[str, Any]:
+def generate_json(description: str, cache: bool = True) -> Dict[str, Any]:
     """Quick access to generate_json()."""
-    return get_delegate().generate_json(description)
+    return get_delegate().generate_json(description, cache=cache)
 
 
-def summarize(text: str, max_words: int = 100) -> str:
+def summarize(text: str, max_words: int = 100, cache: Optional[bool] = None) -> str:
     """Quick access to summarize()."""
-    return get_delegate().summarize(text, max_words)
+    return get_delegate().summarize(text, max_words, cache=cache)
 
 
-def format_for_platform(text: str, platform: str) -> str:
+def format_for_platform(text: str, platform: str, cache: Optional[bool] = None) -> str:
     """Quick access to format_for_platform()."""
-    return get_delegate().format_for_platform(text, platform)
+    return get_delegate().format_for_platform(text, platform, cache=cache)
 
 
 def validate_code(code: str, language: str = "php") -> Dict[str, Any]:
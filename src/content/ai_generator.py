@@ -11,6 +11,7 @@ Integrates with templates.py to provide:
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
@@ -18,7 +19,7 @@ from pathlib import Path
 workspace = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(workspace))
 
-from local_llm import LlamafileDelegate, ask_local, generate_json, format_for_platform
+from local_llm import LlamafileDelegate, ask_local
 from src.content.templates import (
     ContentTemplate,
     get_template,
@@ -36,16 +37,25 @@ class AIContentGenerator:
     Complex reasoning still goes to Claude when needed.
     """
     
-    def __init__(self):
-        """Initialize with local LLM delegate."""
-        self.llm = LlamafileDelegate()
-        self.mode = "server" if self.llm.server_url else "cli"
+    # Longest rendered text packed into a multi-text bulk request
+    BATCH_MAX_CHARS = 600
+    
+    def __init__(self, llm: Optional[LlamafileDelegate] = None):
+        """
+        Initialize with local LLM delegate.
+        
+        Args:
+            llm: Delegate to use (default: auto-detected LlamafileDelegate)
+        """
+        self.llm = llm or LlamafileDelegate()
+        self.mode = self.llm.mode
     
     def generate_variation(
         self,
         template_id: str,
         variables: Dict[str, Any],
         tone: str = "professional",
+        cache: Optional[bool] = None,
     ) -> str:
         """
         Generate a content variation from a template.
@@ -54,6 +64,8 @@ class AIContentGenerator:
             template_id: Template to use
             variables: Variable values
             tone: Desired tone (professional, casual, excited, urgent)
+            cache: Reuse a cached variation for identical input (default: no,
+                variations are meant to differ)
             
         Returns:
             Generated content variation
@@ -71,12 +83,13 @@ Original:
 
 Rewritten:"""
         
-        return self.llm.ask(prompt, max_tokens=300)
+        return self.llm.ask(prompt, max_tokens=300, cache=cache)
     
     def suggest_variables(
         self,
         template_id: str,
         context: str,
+        cache: bool = True,
     ) -> Dict[str, str]:
         """
         Suggest variable values based on context.
@@ -84,6 +97,7 @@ Rewritten:"""
         Args:
             template_id: Template to fill
             context: Context/description to extract values from
+            cache: Reuse a cached extraction for identical input (default: True)
             
         Returns:
             Suggested variable values
@@ -99,7 +113,7 @@ Context: {context}
 
 Output valid JSON with the field names as keys:"""
         
-        result = self.llm.ask(prompt, max_tokens=200, temperature=0.3)
+        result = self.llm.ask(prompt, max_tokens=200, temperature=0.3, cache=cache)
         
         # Try to parse JSON
         import json
@@ -117,6 +131,7 @@ Output valid JSON with the field names as keys:"""
         self,
         content: str,
         platform: str,
+        cache: Optional[bool] = None,
     ) -> str:
         """
         Adapt content for a specific platform.
@@ -124,17 +139,19 @@ Output valid JSON with the field names as keys:"""
         Args:
             content: Original content
             platform: Target platform (twitter, linkedin, discord, etc.)
+            cache: Use the response cache (see LlamafileDelegate.ask)
             
         Returns:
             Platform-adapted content
         """
-        return format_for_platform(content, platform)
+        return self.llm.format_for_platform(content, platform, cache=cache)
     
     def generate_hashtags(
         self,
         content: str,
         entity: str,
         count: int = 5,
+        cache: Optional[bool] = None,
     ) -> List[str]:
         """
         Generate relevant hashtags for content.
@@ -143,6 +160,7 @@ Output valid JSON with the field names as keys:"""
             content: Content to generate hashtags for
             entity: Entity context (mhi, dsaic, computer_store)
             count: Number of hashtags to generate
+            cache: Use the response cache (see LlamafileDelegate.ask)
             
         Returns:
             List of hashtag suggestions
@@ -162,7 +180,7 @@ Post: {content}
 
 Output only the hashtags, one per line, starting with #:"""
         
-        result = self.llm.ask(prompt, max_tokens=100)
+        result = self.llm.ask(prompt, max_tokens=100, cache=cache)
         
         # Parse hashtags
         hashtags = []
@@ -191,7 +209,7 @@ Output only the hashtags, one per line, starting with #:"""
             Content brief with suggested content, hashtags, timing
         """
         # Generate JSON content brief using local LLM
-        result = generate_json(f"content brief for {entity} about {topic} in {category} category")
+        result = self.llm.generate_json(f"content brief for {entity} about {topic} in {category} category")
         
         # Add hashtags
         if "body" in result:
@@ -207,31 +225,93 @@ Output only the hashtags, one per line, starting with #:"""
         template_id: str,
         variable_sets: List[Dict[str, Any]],
         platforms: List[str],
-    ) -> List[Dict[str, str]]:
+        max_workers: Optional[int] = None,
+        batch_size: int = 4,
+        cache: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Generate content for multiple variable sets and platforms.
         
+        Adaptations run concurrently, up to the llamafile server's slot
+        count. Short texts for the same platform are packed `batch_size` to
+        a request; items a packed answer does not cover are retried singly.
+        
         Args:
             template_id: Template to use
             variable_sets: List of variable dictionaries
             platforms: Target platforms
+            max_workers: Concurrent LLM requests (default: server slot count)
+            batch_size: Texts per packed request (1 disables packing)
+            cache: Use the response cache (see LlamafileDelegate.ask)
             
         Returns:
-            List of generated content items
+            One item per (variable set, platform), in input order, with
+            'variables', 'platform', 'content' and 'error' (None on success)
         """
-        results = []
+        results: List[Dict[str, Any]] = []
+        pending: Dict[str, List[int]] = {}
         
         for variables in variable_sets:
-            base_content = render_template(template_id, variables)
+            try:
+                base_content = render_template(template_id, variables)
+                error = None
+            except Exception as e:
+                base_content, error = None, f"Template render failed: {e}"
             
             for platform in platforms:
-                adapted = self.adapt_for_platform(base_content, platform)
                 results.append({
                     "variables": variables,
                     "platform": platform,
-                    "content": adapted,
+                    "content": None,
+                    "error": error,
+                    "_base": base_content,
                 })
+                if error is None:
+                    pending.setdefault(platform, []).append(len(results) - 1)
+        
+        # Group work per platform; only short texts are packed together
+        jobs: List[List[int]] = []
+        for platform, indexes in pending.items():
+            batch: List[int] = []
+            for i in indexes:
+                if batch_size <= 1 or len(results[i]["_base"]) > self.BATCH_MAX_CHARS:
+                    jobs.append([i])
+                    continue
+                batch.append(i)
+                if len(batch) >= batch_size:
+                    jobs.append(batch)
+                    batch = []
+            if batch:
+                jobs.append(batch)
+        
+        def adapt(job: List[int]) -> None:
+            platform = results[job[0]]["platform"]
+            texts = [results[i]["_base"] for i in job]
+            try:
+                adapted = (self.llm.format_batch_for_platform(texts, platform, cache=cache)
+                           if len(job) > 1 else [None])
+                for i, content in zip(job, adapted):
+                    if content is None:
+                        content = self.adapt_for_platform(results[i]["_base"], platform, cache=cache)
+                    if content.startswith("[error"):
+                        results[i]["error"] = content
+                    else:
+                        results[i]["content"] = content
+            except Exception as e:
+                for i in job:
+                    if results[i]["content"] is None:
+                        results[i]["error"] = str(e)
+        
+        workers = max_workers or self.llm.slot_count()
+        if workers <= 1 or len(jobs) <= 1:
+            for job in jobs:
+                adapt(job)
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                list(pool.map(adapt, jobs))
         
+        for item in results:
+            del item["_base"]
         return results
 
 
@@ -4,7 +4,8 @@ Content generator facade - provides simple interface for dashboard.
 Wraps ai_generator.py functionality.
 """
 
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional
 from pathlib import Path
 import sys
 
@@ -17,6 +18,74 @@ from src.content.ai_generator import (
     generate_hashtags as _generate_hashtags,
     generate_content_brief,
 )
+from src.sop.step_types import Entity, get_voice_prefix
+
+
+ENTITY_CONTEXT = {
+    "mighty_house_inc": "B2B IT services, government contracting, EDWOSB small business",
+    "dsaic": "SaaS developer tools, software startup, tech innovation",
+    "computer_store": "PC gaming, repairs, LAN center, Wheatland Wyoming, local community",
+}
+
+PLATFORM_CONSTRAINTS = {
+    "twitter": "Max 280 characters. Be punchy and use hashtags.",
+    "linkedin": "Professional tone. 1-3 paragraphs. Include call to action.",
+    "discord": "Casual/fun tone. Use emoji. No markdown tables.",
+    "facebook": "Engaging and shareable. Can be longer. Ask questions.",
+    "instagram": "Visual-first language. Heavy hashtag use. Emoji welcome.",
+}
+
+
+@lru_cache(maxsize=None)
+def entity_prompt_prefix(entity: str) -> str:
+    """
+    Stable system prefix for an entity: business description plus voice.
+    
+    Identical for every request about the entity, so the llamafile server
+    reuses its prompt cache instead of re-evaluating the tone block.
+    """
+    lines = [f"Business: {ENTITY_CONTEXT.get(entity, entity)}"]
+    try:
+        lines.append(get_voice_prefix(Entity(entity)))
+    except ValueError:
+        pass  # Not a configured entity: business line only
+    return "\n".join(lines)
+
+
+def build_post_prompt(
+    entity: str,
+    topic: str,
+    platform: str,
+    context: Optional[str] = None,
+) -> str:
+    """Build the per-request part of a social media post prompt (see entity_prompt_prefix)."""
+    return f"""Write a social media post for {platform}.
+
+Topic: {topic}
+{f"Additional context: {context}" if context else ""}
+
+Platform rules: {PLATFORM_CONSTRAINTS.get(platform, "Keep it engaging.")}
+
+Output only the post content, no explanation:"""
+
+
+def _finish_post(
+    gen,
+    content: str,
+    entity: str,
+    platform: str,
+    cache: Optional[bool] = None,
+) -> Dict[str, Any]:
+    # Adapt for platform if needed
+    if platform in ["discord", "whatsapp"]:
+        content = gen.adapt_for_platform(content, platform, cache=cache)
+    
+    return {
+        "content": content,
+        "char_count": len(content),
+        "platform": platform,
+        "entity": entity,
+    }
 
 
 def generate_post(
@@ -24,6 +93,7 @@ def generate_post(
     topic: str,
     platform: str,
     context: Optional[str] = None,
+    cache: Optional[bool] = None,
 ) -> Dict[str, Any]:
     """
     Generate a social media post.
@@ -33,49 +103,46 @@ def generate_post(
         topic: Topic/subject of the post
         platform: Target platform (twitter, linkedin, discord, etc.)
         context: Additional context for generation
+        cache: Use the LLM response cache (see LlamafileDelegate.ask)
         
     Returns:
         Dict with 'content', 'char_count', 'platform', 'entity'
     """
     gen = get_generator()
-    
-    # Build prompt
-    entity_context = {
-        "mighty_house_inc": "B2B IT services, government contracting, EDWOSB small business",
-        "dsaic": "SaaS developer tools, software startup, tech innovation",
-        "computer_store": "PC gaming, repairs, LAN center, Wheatland Wyoming, local community",
-    }
-    
-    platform_constraints = {
-        "twitter": "Max 280 characters. Be punchy and use hashtags.",
-        "linkedin": "Professional tone. 1-3 paragraphs. Include call to action.",
-        "discord": "Casual/fun tone. Use emoji. No markdown tables.",
-        "facebook": "Engaging and shareable. Can be longer. Ask questions.",
-        "instagram": "Visual-first language. Heavy hashtag use. Emoji welcome.",
-    }
-    
-    prompt = f"""Write a social media post for {platform}.
-
-Business: {entity_context.get(entity, entity)}
-Topic: {topic}
-{f"Additional context: {context}" if context else ""}
+    prompt = build_post_prompt(entity, topic, platform, context)
+    content = gen.llm.ask(prompt, max_tokens=300, cache=cache, system=entity_prompt_prefix(entity))
+    return _finish_post(gen, content, entity, platform, cache)
 
-Platform rules: {platform_constraints.get(platform, "Keep it engaging.")}
 
-Output only the post content, no explanation:"""
+def stream_post(
+    entity: str,
+    topic: str,
+    platform: str,
+    context: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generate a social media post, yielding text as the model produces it.
     
-    content = gen.llm.ask(prompt, max_tokens=300)
+    Args:
+        entity: Target entity (mighty_house_inc, dsaic, computer_store)
+        topic: Topic/subject of the post
+        platform: Target platform (twitter, linkedin, discord, etc.)
+        context: Additional context for generation
+        
+    Yields:
+        {"type": "token", "text": ...} for each fragment, then
+        {"type": "done", **generate_post result} with the final content
+        (platform adaptation is applied to the final content only)
+    """
+    gen = get_generator()
+    prompt = build_post_prompt(entity, topic, platform, context)
     
-    # Adapt for platform if needed
-    if platform in ["discord", "whatsapp"]:
-        content = gen.adapt_for_platform(content, platform)
+    parts = []
+    for text in gen.llm.ask_stream(prompt, max_tokens=300, system=entity_prompt_prefix(entity)):
+        parts.append(text)
+        yield {"type": "token", "text": text}
     
-    return {
-        "content": content,
-        "char_count": len(content),
-        "platform": platform,
-        "entity": entity,
-    }
+    yield {"type": "done", **_finish_post(gen, "".join(parts).strip(), entity, platform)}
 
 
 def generate_hashtags(entity: str, topic: str, count: int = 5) -> List[str]:
@@ -97,6 +164,7 @@ def generate_content_calendar(
     entity: str,
     days: int = 7,
     posts_per_day: int = 2,
+    cache: bool = True,
 ) -> List[Dict[str, Any]]:
     """
     Generate a content calendar.
@@ -105,6 +173,8 @@ def generate_content_calendar(
         entity: Target entity
         days: Number of days to plan
         posts_per_day: Posts per day
+        cache: Reuse the cached topic list for an unchanged request
+            (default: True; pass False to draw fresh topics)
         
     Returns:
         List of planned content items
@@ -116,7 +186,9 @@ Mix of: announcements, tips, engagement questions, promotions, behind-the-scenes
 
 Output as a numbered list, one topic per line:"""
     
-    topics_response = gen.llm.ask(topics_prompt, max_tokens=500)
+    topics_response = gen.llm.ask(
+        topics_prompt, max_tokens=500, cache=cache, system=entity_prompt_prefix(entity)
+    )
     
     # Parse topics
     topics = []
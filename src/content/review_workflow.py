@@ -9,7 +9,7 @@ import json
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 from pathlib import Path
 from enum import Enum
 
@@ -201,6 +201,51 @@ class ContentReviewWorkflow:
             },
         )
     
+    def stream_ai_draft(
+        self,
+        entity: str,
+        platform: str,
+        topic: str,
+        context: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Create a draft using AI generation, streaming the text as it arrives.
+        
+        Args:
+            entity: Target entity
+            platform: Target platform
+            topic: Topic to generate about
+            context: Additional context
+            
+        Yields:
+            {"type": "token", "text": ...} fragments, then
+            {"type": "done", "draft": ContentDraft} once the draft is saved
+        """
+        from .generator import stream_post, generate_hashtags
+        
+        result: Dict[str, Any] = {}
+        for event in stream_post(entity, topic, platform, context):
+            if event["type"] == "done":
+                result = {k: v for k, v in event.items() if k != "type"}
+            else:
+                yield event
+        
+        hashtags = generate_hashtags(entity, topic, 5)
+        
+        draft = self.create_draft(
+            entity=entity,
+            platform=platform,
+            content=result.get("content", ""),
+            hashtags=hashtags,
+            created_by="ai",
+            metadata={
+                "topic": topic,
+                "context": context,
+                "generation_result": result,
+            },
+        )
+        yield {"type": "done", "draft": draft}
+    
     def submit_for_review(self, draft_id: str) -> ContentDraft:
         """Submit a draft for human review."""
         draft = self.drafts.get(draft_id)
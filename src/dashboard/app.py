@@ -4,11 +4,12 @@ Multi-entity SOP management for MHI, DSAIC, and Computer Store.
 """
 
 from fastapi import FastAPI, Request, HTTPException, Form
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 import yaml
+import json
 import sys
 from typing import Optional
 from datetime import datetime
@@ -16,9 +17,12 @@ from datetime import datetime
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from src.sop.registry import get_definition_registry
+from src.sop.triggers import normalize_endpoint
+
 # Import content generator (uses local LLM)
 try:
-    from src.content.generator import generate_post, generate_hashtags
+    from src.content.generator import generate_post, generate_hashtags, stream_post
     LOCAL_LLM_AVAILABLE = True
 except Exception as e:
     print(f"Local LLM not available: {e}")
@@ -27,12 +31,13 @@ except Exception as e:
 # Import SOP engine
 try:
     from src.sop.engine import EnhancedSOPEngine
+    from src.sop.history import STATUSES, get_execution_history
     _sop_engine = None
     
     def get_sop_engine():
         global _sop_engine
         if _sop_engine is None:
-            _sop_engine = EnhancedSOPEngine()
+            _sop_engine = EnhancedSOPEngine(history=get_execution_history())
             _sop_engine.load_definitions()
         return _sop_engine
     
@@ -44,10 +49,20 @@ except Exception as e:
     def get_sop_engine():
         return None
 
+# Import job queue (durable background SOP runs)
+try:
+    from src.sop.job_queue import get_job_queue, enqueue_sop_run, JobWorkerPool
+    _job_workers = None
+    JOB_QUEUE_AVAILABLE = SOP_ENGINE_AVAILABLE
+except Exception as e:
+    print(f"Job queue not available: {e}")
+    JOB_QUEUE_AVAILABLE = False
+
 # Import Scheduler
 try:
-    from src.sop.scheduler import SOPScheduler, Schedule, ScheduleType
+    from src.sop.scheduler import SOPScheduler, Schedule, ScheduleType, SchedulerDaemon, scheduled_event
     _scheduler = None
+    _scheduler_daemon = None
     
     def get_scheduler():
         global _scheduler
@@ -66,8 +81,12 @@ except Exception as e:
 # Import Zoho CRM integration
 try:
     from src.integrations.zoho.crm_handler import ZohoCRMHandler
-    from src.integrations.zoho.webhooks import ZohoWebhookHandler, setup_webhook_mappings
+    from src.integrations.zoho.dedup import delivery_key, get_webhook_deduplicator
+    from src.integrations.zoho.webhooks import (
+        ZohoWebhookHandler, dispatch_triggered_sops, nothing_dispatched, setup_webhook_mappings,
+    )
     ZOHO_AVAILABLE = True
+    # In-memory deduplication until startup attaches the persistent store
     _zoho_handler = ZohoWebhookHandler()
     setup_webhook_mappings(_zoho_handler)
 except Exception as e:
@@ -113,6 +132,95 @@ app = FastAPI(
 # Mount static files
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+
+@app.on_event("startup")
+async def watch_sop_definitions():
+    """Refresh SOP definitions on file changes (inotify) instead of polling."""
+    get_definition_registry().start_watching()
+
+
+@app.on_event("startup")
+async def open_webhook_deduplicator():
+    """Persist Zoho webhook delivery keys across restarts (data/webhooks.db)."""
+    if ZOHO_AVAILABLE and _zoho_handler:
+        _zoho_handler.deduplicator = get_webhook_deduplicator()
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start worker threads that drain the SOP job queue."""
+    global _job_workers
+    if JOB_QUEUE_AVAILABLE:
+        _job_workers = JobWorkerPool(get_job_queue(), get_sop_engine())
+        _job_workers.start()
+
+
+@app.on_event("startup")
+async def start_approval_sweeper():
+    """Expire approval requests when due and resume their SOPs down the reject path."""
+    engine = get_sop_engine()
+    if not engine:
+        return
+    
+    def resume_expired(approval):
+        event = engine.approval_resume_event(approval, "expired", note=approval.resolution_note)
+        if JOB_QUEUE_AVAILABLE:
+            enqueue_sop_run(get_job_queue(), approval.sop_id, approval.entity, event, engine=engine)
+        else:
+            engine.execute_sop(approval.sop_id, event=event)
+    
+    engine.approval_manager.register_expiry_callback(resume_expired)
+    engine.approval_manager.start_sweeper()
+
+
+@app.on_event("startup")
+async def start_scheduler_daemon():
+    """Run due schedules in the background by queueing them for the job workers."""
+    global _scheduler_daemon
+    if not SCHEDULER_AVAILABLE:
+        return
+    engine = get_sop_engine()
+    sync_trigger_schedules()
+    if not JOB_QUEUE_AVAILABLE:
+        return
+    
+    def dispatch(schedule, event):
+        enqueue_sop_run(get_job_queue(), schedule.sop_id, schedule.entity, event, engine=engine)
+    
+    _scheduler_daemon = SchedulerDaemon(get_scheduler(), dispatch)
+    _scheduler_daemon.start()
+
+
+def sync_trigger_schedules():
+    """Mirror SOP `scheduled` (cron) triggers into the scheduler."""
+    engine = get_sop_engine()
+    if not (SCHEDULER_AVAILABLE and engine):
+        return None
+    counts = get_scheduler().sync_triggers(engine.trigger_index.scheduled)
+    if counts["added"] or counts["removed"]:
+        wake_scheduler_daemon()
+    return counts
+
+
+def wake_scheduler_daemon():
+    """Let the scheduler daemon pick up schedule changes immediately."""
+    if SCHEDULER_AVAILABLE and _scheduler_daemon:
+        _scheduler_daemon.wake()
+
+
+@app.on_event("shutdown")
+async def close_shared_clients():
+    """Stop background workers and close pooled HTTP connections used by async SOP steps."""
+    get_definition_registry().stop_watching()
+    if SCHEDULER_AVAILABLE and _scheduler_daemon:
+        _scheduler_daemon.stop()
+    if JOB_QUEUE_AVAILABLE and _job_workers:
+        _job_workers.stop()
+    if SOP_ENGINE_AVAILABLE:
+        get_sop_engine().approval_manager.stop_sweeper()
+        from src.sop.http_client import close_async_http_client
+        await close_async_http_client()
+
 # Templates
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
@@ -121,50 +229,34 @@ templates = Jinja2Templates(directory=TEMPLATES_DIR)
 # HELPERS
 # =============================================================================
 
-# SOP cache with TTL (Qwen-suggested pattern)
+# Grouped view of the shared definition registry, rebuilt when its generation moves
 _sop_cache = None
-_sop_cache_time = 0
-_SOP_CACHE_TTL = 60  # Reload every 60 seconds max
+_sop_cache_generation = -1
+
+_ENTITY_DIRS = {
+    "mighty-house-inc": "mighty_house_inc",
+    "dsaic": "dsaic",
+    "computer-store": "computer_store",
+    "cross-entity": "cross_entity"
+}
+
 
 def load_sops(force_reload: bool = False) -> dict:
-    """Load all SOPs from the sops directory (cached)."""
-    global _sop_cache, _sop_cache_time
-    import time
+    """Load all SOPs from the sops directory (shared registry, re-parses only changed files)."""
+    global _sop_cache, _sop_cache_generation
     
-    # Return cache if valid
-    now = time.time()
-    if not force_reload and _sop_cache and (now - _sop_cache_time) < _SOP_CACHE_TTL:
+    registry = get_definition_registry()
+    registry.refresh(force=force_reload)
+    if _sop_cache is not None and registry.generation == _sop_cache_generation:
         return _sop_cache
     
-    sops = {
-        "mighty_house_inc": [],
-        "dsaic": [],
-        "computer_store": [],
-        "cross_entity": []
-    }
-    
-    entity_dirs = {
-        "mighty-house-inc": "mighty_house_inc",
-        "dsaic": "dsaic", 
-        "computer-store": "computer_store",
-        "cross-entity": "cross_entity"
-    }
-    
-    for dir_name, entity_key in entity_dirs.items():
-        entity_path = SOPS_DIR / dir_name
-        if entity_path.exists():
-            for sop_file in entity_path.glob("*.yaml"):
-                try:
-                    with open(sop_file, 'r', encoding='utf-8') as f:
-                        sop_data = yaml.safe_load(f)
-                        sop_data['_file'] = sop_file.name
-                        sop_data['_path'] = str(sop_file)
-                        sops[entity_key].append(sop_data)
-                except Exception as e:
-                    print(f"Error loading {sop_file}: {e}")
+    sops = {entity_key: [] for entity_key in _ENTITY_DIRS.values()}
+    by_dir = registry.by_directory()
+    for dir_name, entity_key in _ENTITY_DIRS.items():
+        sops[entity_key] = by_dir.get(dir_name, [])
     
     _sop_cache = sops
-    _sop_cache_time = now
+    _sop_cache_generation = registry.generation
     return sops
 
 
@@ -282,7 +374,7 @@ async def trigger_sop(
     }
     
     try:
-        result = engine.execute_sop(sop_id, event=event_data, dry_run=dry_run)
+        result = await engine.execute_sop_async(sop_id, event=event_data, dry_run=dry_run)
         
         return templates.TemplateResponse("partials/trigger_result.html", {
             "request": request,
@@ -363,44 +455,48 @@ async def content_calendar(request: Request):
 # =============================================================================
 
 @app.get("/history", response_class=HTMLResponse)
-async def execution_history(request: Request):
-    """Execution history view."""
-    # Get history from engine if available
+async def execution_history(
+    request: Request,
+    page: int = 1,
+    entity: str = "",
+    status: str = "",
+    date: str = "",
+):
+    """Execution history view, paged and filtered in the history store."""
+    from datetime import datetime, timedelta
+    
     executions = []
+    total_pages = 1
     if SOP_ENGINE_AVAILABLE:
         engine = get_sop_engine()
-        history = getattr(engine, '_history', [])
-        for i, exec_data in enumerate(reversed(history[-50:])):  # Last 50
-            steps_passed = sum(1 for s in exec_data.get('step_results', []) if s.get('success'))
-            steps_total = len(exec_data.get('step_results', []))
-            
-            # Calculate duration
-            try:
-                from datetime import datetime
-                started = datetime.fromisoformat(exec_data.get('started_at', ''))
-                completed = datetime.fromisoformat(exec_data.get('completed_at', ''))
-                duration_ms = int((completed - started).total_seconds() * 1000)
-            except (ValueError, TypeError, KeyError):
-                duration_ms = 0
-            
+        since = until = None
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d")
+            since, until = day.isoformat(), (day + timedelta(days=1)).isoformat()
+        except ValueError:
+            pass
+        result = engine.history.query(
+            entity=entity or None,
+            status=status if status in STATUSES else None,
+            since=since,
+            until=until,
+            page=page,
+            per_page=50,
+        )
+        total_pages = result["total_pages"]
+        page = result["page"]
+        for row in result["items"]:
             executions.append({
-                'id': i,
-                'sop_id': exec_data.get('sop_id'),
-                'sop_name': exec_data.get('sop_name'),
-                'entity': exec_data.get('entity'),
-                'success': exec_data.get('success'),
-                'dry_run': exec_data.get('dry_run'),
-                'started_at': exec_data.get('started_at', '')[:19].replace('T', ' '),
-                'steps_passed': steps_passed,
-                'steps_total': steps_total,
-                'duration_ms': duration_ms,
+                **row,
+                'started_at': row['started_at'][:19].replace('T', ' '),
             })
     
     return templates.TemplateResponse("execution_history.html", {
         "request": request,
         "executions": executions,
-        "total_pages": 1,
-        "current_page": 1
+        "total_pages": total_pages,
+        "current_page": page,
+        "filters": {"entity": entity, "status": status, "date": date},
     })
 
 
@@ -440,6 +536,24 @@ async def generate_calendar_content(request: Request):
 # CONTENT GENERATION (Local LLM)
 # =============================================================================
 
+def _wants_stream(request: Request) -> bool:
+    """Whether the client asked for a server-sent event stream."""
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _event_stream(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/content", response_class=HTMLResponse)
 async def content_generator_page(request: Request):
     """Content generation page."""
@@ -467,6 +581,9 @@ async def generate_content(
             "content": None
         })
     
+    if _wants_stream(request):
+        return _event_stream(_stream_content(request, entity, topic, platform, context or None))
+    
     try:
         result = generate_post(entity, topic, platform, context if context else None)
         return templates.TemplateResponse("partials/content_result.html", {
@@ -485,6 +602,31 @@ async def generate_content(
         })
 
 
+def _stream_content(request: Request, entity: str, topic: str, platform: str, context: Optional[str]):
+    """Token events, then a "done" event carrying the rendered result partial."""
+    result_template = templates.get_template("partials/content_result.html")
+    try:
+        for event in stream_post(entity, topic, platform, context):
+            if event["type"] == "token":
+                yield _sse("token", {"text": event["text"]})
+                continue
+            html = result_template.render({
+                "request": request,
+                "content": event["content"],
+                "entity": entity,
+                "platform": platform,
+                "char_count": event["char_count"],
+                "error": None
+            })
+            yield _sse("done", {"html": html, "content": event["content"]})
+    except Exception as e:
+        yield _sse("done", {"html": result_template.render({
+            "request": request,
+            "error": str(e),
+            "content": None
+        })})
+
+
 @app.post("/api/content/hashtags")
 async def api_generate_hashtags(entity: str, topic: str, count: int = 5):
     """Generate hashtags using local LLM."""
@@ -495,6 +637,20 @@ async def api_generate_hashtags(entity: str, topic: str, count: int = 5):
     return {"hashtags": hashtags}
 
 
+@app.get("/api/content/llm-stats")
+async def api_llm_stats():
+    """Local LLM mode and response cache hit/miss counters."""
+    if not LOCAL_LLM_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Local LLM not available")
+    
+    try:
+        from src.content.ai_generator import get_generator
+        llm = get_generator().llm
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {**llm.get_server_stats(), "cache": llm.get_cache_stats()}
+
+
 # =============================================================================
 # SOP EDITING
 # =============================================================================
@@ -559,6 +715,7 @@ async def sop_edit_save(
     sop_path = Path(sop['_path'])
     with open(sop_path, 'w', encoding='utf-8') as f:
         f.write(yaml_content)
+    load_sops(force_reload=True)
     
     # Redirect to detail page
     from fastapi.responses import RedirectResponse
@@ -653,6 +810,7 @@ async def sop_new_save(
     
     with open(sop_path, 'w', encoding='utf-8') as f:
         f.write(yaml_content)
+    load_sops(force_reload=True)
     
     # Redirect to detail page
     from fastapi.responses import RedirectResponse
@@ -723,7 +881,8 @@ async def api_create_schedule(
     sop_id: str = Form(...),
     schedule_type: str = Form(...),
     expression: str = Form(...),
-    max_runs: Optional[int] = Form(None)
+    max_runs: Optional[int] = Form(None),
+    timezone: Optional[str] = Form(None)
 ):
     """Create a new schedule."""
     scheduler = get_scheduler()
@@ -737,10 +896,15 @@ async def api_create_schedule(
         entity=entity,
         schedule_type=ScheduleType(schedule_type),
         expression=expression,
-        max_runs=max_runs
+        max_runs=max_runs,
+        timezone=timezone or None
     )
     
-    scheduler.add_schedule(schedule)
+    try:
+        scheduler.add_schedule(schedule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    wake_scheduler_daemon()
     
     # Return the new row HTML for HTMX
     return HTMLResponse(f'''
@@ -777,6 +941,7 @@ async def api_toggle_schedule(schedule_id: str):
         raise HTTPException(status_code=404, detail="Schedule not found")
     
     scheduler.update_schedule(schedule_id, {'enabled': not schedule.enabled})
+    wake_scheduler_daemon()
     schedule = scheduler.get_schedule(schedule_id)  # Refresh
     
     status_class = "bg-green-100 text-green-800" if schedule.enabled else "bg-gray-100 text-gray-500"
@@ -836,7 +1001,10 @@ async def api_run_schedule(schedule_id: str):
     # Execute the SOP
     if engine:
         try:
-            result = engine.execute_sop(schedule.sop_id, schedule.entity, schedule.variables)
+            result = await engine.execute_sop_async(
+                schedule.sop_id,
+                event=scheduled_event(schedule),
+            )
             scheduler.mark_run(schedule_id)
             return HTMLResponse(f'''
                 <div class="mt-4 p-4 bg-green-50 border border-green-200 rounded-lg">
@@ -886,7 +1054,8 @@ async def api_status():
         "status": "running",
         "local_llm": LOCAL_LLM_AVAILABLE,
         "zoho_crm": ZOHO_AVAILABLE,
-        "sops": get_sop_stats()
+        "sops": get_sop_stats(),
+        "job_queue": get_job_queue().get_stats() if JOB_QUEUE_AVAILABLE else None
     }
 
 
@@ -900,46 +1069,126 @@ async def receive_zoho_webhook(request: Request):
     if not ZOHO_AVAILABLE or not _zoho_handler:
         raise HTTPException(status_code=503, detail="Zoho integration not available")
     
+    result = None
     try:
         data = await request.json()
         signature = request.headers.get("X-Zoho-Signature")
         
+        # Match SOP-declared triggers alongside the hand-registered mappings
+        engine = get_sop_engine()
+        if engine:
+            _zoho_handler.trigger_index = engine.trigger_index
+        
         result = _zoho_handler.process_webhook(data, signature)
         
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result.get("error", "Processing failed"))
         
-        # Trigger SOPs if any matched
-        engine = get_sop_engine()
+        # Queue matched SOPs for background workers, or run them inline
+        # when the job queue is unavailable; failures are reported per SOP
         triggered = []
-        if engine and result.get("triggered_sops"):
-            for trigger in result["triggered_sops"]:
-                try:
-                    exec_result = engine.execute_sop(
-                        trigger["sop_id"],
-                        event=trigger["event"]
-                    )
-                    triggered.append({
-                        "sop_id": trigger["sop_id"],
-                        "success": exec_result.get("success", False)
-                    })
-                except Exception as e:
-                    triggered.append({
-                        "sop_id": trigger["sop_id"],
-                        "success": False,
-                        "error": str(e)
-                    })
+        if result.get("triggered_sops"):
+            queue = get_job_queue() if engine and JOB_QUEUE_AVAILABLE else None
+            triggered = await dispatch_triggered_sops(result["triggered_sops"], engine, queue)
+        if nothing_dispatched(triggered):
+            # Let Zoho's retry through the deduplicator
+            _zoho_handler.release(result)
+            raise HTTPException(status_code=500, detail=triggered[0]["error"])
         
         return {
             "status": "ok",
             "event_type": result.get("event_type"),
+            "duplicate": result.get("duplicate", False),
             "sops_triggered": triggered
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        # Nothing was dispatched yet: let Zoho's retry through the deduplicator
+        if result:
+            _zoho_handler.release(result)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/webhooks/{endpoint:path}")
+async def receive_sop_webhook(endpoint: str, request: Request):
+    """
+    Receive a webhook declared by an SOP's `triggers:` (type: webhook).
+    
+    Only triggers whose shared secret the request proves (X-Webhook-Signature
+    or X-Webhook-Secret, see src.sop.triggers) are run. Deliveries are
+    deduplicated like Zoho's, keyed on the X-Webhook-Id header when the
+    sender provides one and on a hash of the payload otherwise.
+    """
+    engine = get_sop_engine()
+    if not engine:
+        raise HTTPException(status_code=503, detail="SOP engine not available")
+    
+    path = f"/webhooks/{endpoint}"
+    registered = engine.trigger_index.endpoint_triggers(path)
+    if not registered:
+        raise HTTPException(status_code=404, detail=f"No SOP triggers for {path}")
+    
+    body = await request.body()
+    signature = request.headers.get("X-Webhook-Signature")
+    secret = request.headers.get("X-Webhook-Secret")
+    verified = {e.sop_id for e in registered if e.verify_webhook(body, signature, secret)}
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid or missing webhook signature")
+    
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {"payload": payload}
+    
+    # Senders retry on timeouts and 5xx; acknowledge a repeat without re-running
+    key = None
+    deduplicator = _zoho_handler.deduplicator if _zoho_handler else None
+    if deduplicator is not None:
+        delivery_id = request.headers.get("X-Webhook-Id")
+        key = delivery_key({
+            "module": "webhook",
+            "record_id": normalize_endpoint(path),
+            "original_event": "post",
+            "raw": {"delivery_id": delivery_id} if delivery_id else payload,
+        })
+        if deduplicator.check_and_record(key):
+            return {"status": "ok", "endpoint": path, "duplicate": True, "sops_triggered": []}
+    
+    event = {
+        "event_type": "webhook",
+        "endpoint": path,
+        "data": payload,
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    triggered = []
+    for entry in engine.trigger_index.match_endpoint(path, payload):
+        if entry.sop_id not in verified:
+            continue
+        try:
+            if JOB_QUEUE_AVAILABLE:
+                job_id = enqueue_sop_run(get_job_queue(), entry.sop_id, entry.entity, event, engine=engine)
+                triggered.append({"sop_id": entry.sop_id, "job_id": job_id, "queued": True})
+            else:
+                result = await engine.execute_sop_async(entry.sop_id, event=event)
+                triggered.append({"sop_id": entry.sop_id, "success": result.get("success", False)})
+        except Exception as e:
+            print(f"SOP dispatch error ({entry.sop_id}): {e}")
+            triggered.append({"sop_id": entry.sop_id, "error": str(e)})
+    
+    if triggered and all("error" in t for t in triggered):
+        # Nothing ran: let the sender's retry through the deduplicator
+        if key:
+            deduplicator.forget(key)
+        raise HTTPException(status_code=500, detail=triggered[0]["error"])
+    
+    return {"status": "ok", "endpoint": path, "duplicate": False, "sops_triggered": triggered}
+
+
 @app.get("/api/zoho/mappings")
 async def get_zoho_mappings():
     """Get Zoho webhook to SOP mappings."""
@@ -953,27 +1202,25 @@ async def get_zoho_mappings():
 
 @app.get("/api/zoho/status")
 async def get_zoho_status():
-    """Check Zoho CRM connection status."""
+    """
+    Zoho CRM connection status.
+    
+    Served from the client pool's last background health check, so polling
+    this never makes a CRM round-trip.
+    """
     if not ZOHO_AVAILABLE:
         return {"available": False, "connected": False, "error": "Zoho integration not loaded"}
     
-    try:
-        from src.integrations.zoho.crm_handler import ZohoCRMHandler
-        with ZohoCRMHandler() as crm:
-            if crm.connected:
-                return {
-                    "available": True,
-                    "connected": True,
-                    "message": "Connected to Zoho CRM"
-                }
-            else:
-                return {
-                    "available": True,
-                    "connected": False,
-                    "error": crm._last_error
-                }
-    except Exception as e:
-        return {"available": True, "connected": False, "error": str(e)}
+    from src.integrations.zoho.cache import get_record_cache
+    from src.integrations.zoho.crm_handler import get_crm_client_pool
+    
+    status = get_crm_client_pool().status()
+    if status["connected"]:
+        status["message"] = "Connected to Zoho CRM"
+    elif status["connected"] is None:
+        status["message"] = "Connection check pending"
+    status["cache"] = get_record_cache().get_stats()
+    return status
 
 
 # =============================================================================
@@ -1023,7 +1270,9 @@ async def api_approve(
         raise HTTPException(status_code=503, detail="SOP engine not available")
     
     engine = get_sop_engine()
-    result = engine.resume_from_approval(approval_id, approved=True, resolved_by=approved_by, note=note)
+    result = await engine.resume_from_approval_async(
+        approval_id, approved=True, resolved_by=approved_by, note=note
+    )
     
     if not result.get("success", False):
         raise HTTPException(status_code=400, detail=result.get("error", "Approval failed"))
@@ -1042,7 +1291,9 @@ async def api_reject(
         raise HTTPException(status_code=503, detail="SOP engine not available")
     
     engine = get_sop_engine()
-    result = engine.resume_from_approval(approval_id, approved=False, resolved_by=rejected_by, note=reason)
+    result = await engine.resume_from_approval_async(
+        approval_id, approved=False, resolved_by=rejected_by, note=reason
+    )
     
     return {"status": "rejected", "approval_id": approval_id}
 
@@ -1085,6 +1336,9 @@ async def api_generate_draft(
     if not REVIEW_WORKFLOW_AVAILABLE:
         return HTMLResponse("<div class='text-red-400'>Review workflow not available</div>")
     
+    if _wants_stream(request):
+        return _event_stream(_stream_draft(entity, platform, topic, context or None))
+    
     try:
         workflow = get_review_workflow()
         draft = workflow.create_ai_draft(
@@ -1094,25 +1348,44 @@ async def api_generate_draft(
             context=context if context else None,
         )
         
-        return HTMLResponse(f'''
-            <div class="p-4 bg-green-900 rounded-lg">
-                <p class="text-green-300 font-bold">✨ Draft Generated</p>
-                <p class="text-sm text-gray-300 mt-2">ID: {draft.id}</p>
-                <div class="mt-3 p-3 bg-gray-800 rounded text-sm text-white whitespace-pre-wrap">{draft.content}</div>
-                <p class="text-xs text-gray-400 mt-2">Hashtags: {" ".join(draft.hashtags)}</p>
-                <div class="mt-3 flex gap-2">
-                    <button hx-post="/api/drafts/{draft.id}/submit"
-                            hx-target="#draftResult"
-                            class="px-3 py-1 bg-blue-600 text-white rounded text-sm">
-                        Submit for Review
-                    </button>
-                </div>
-            </div>
-        ''')
+        return HTMLResponse(_draft_generated_html(draft))
     except Exception as e:
         return HTMLResponse(f"<div class='text-red-400'>Error: {str(e)}</div>")
 
 
+def _draft_generated_html(draft) -> str:
+    """Result card for a freshly generated draft."""
+    return f'''
+        <div class="p-4 bg-green-900 rounded-lg">
+            <p class="text-green-300 font-bold">✨ Draft Generated</p>
+            <p class="text-sm text-gray-300 mt-2">ID: {draft.id}</p>
+            <div class="mt-3 p-3 bg-gray-800 rounded text-sm text-white whitespace-pre-wrap">{draft.content}</div>
+            <p class="text-xs text-gray-400 mt-2">Hashtags: {" ".join(draft.hashtags)}</p>
+            <div class="mt-3 flex gap-2">
+                <button hx-post="/api/drafts/{draft.id}/submit"
+                        hx-target="#draftResult"
+                        class="px-3 py-1 bg-blue-600 text-white rounded text-sm">
+                    Submit for Review
+                </button>
+            </div>
+        </div>
+    '''
+
+
+def _stream_draft(entity: str, platform: str, topic: str, context: Optional[str]):
+    """Token events, then a "done" event carrying the saved draft's result card."""
+    try:
+        workflow = get_review_workflow()
+        for event in workflow.stream_ai_draft(entity=entity, platform=platform, topic=topic, context=context):
+            if event["type"] == "token":
+                yield _sse("token", {"text": event["text"]})
+            else:
+                draft = event["draft"]
+                yield _sse("done", {"html": _draft_generated_html(draft), "draft_id": draft.id})
+    except Exception as e:
+        yield _sse("done", {"html": f"<div class='text-red-400'>Error: {str(e)}</div>"})
+
+
 @app.post("/api/drafts/{draft_id}/submit")
 async def api_submit_draft(draft_id: str):
     """Submit a draft for review."""
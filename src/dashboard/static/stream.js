@@ -0,0 +1,72 @@
+// Progressive generation for forms marked data-stream.
+//
+// The form is posted with "Accept: text/event-stream"; "token" events are
+// appended to a preview in the form's hx-target as they arrive and the final
+// "done" event replaces it with the rendered result. Browsers without
+// streaming fetch fall back to the normal htmx request.
+(function () {
+    if (!window.fetch || !window.ReadableStream || !window.TextDecoder) return;
+
+    function parseEvent(block) {
+        let event = 'message';
+        const data = [];
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+        });
+        return { event, data: data.length ? JSON.parse(data.join('\n')) : {} };
+    }
+
+    async function submitStreaming(form) {
+        const target = document.querySelector(form.getAttribute('hx-target'));
+        const indicator = document.querySelector(form.getAttribute('hx-indicator'));
+        const preview = document.createElement('pre');
+        preview.className = 'whitespace-pre-wrap text-white bg-gray-700 rounded-lg p-4';
+        target.replaceChildren(preview);
+        if (indicator) indicator.classList.add('htmx-request');
+
+        try {
+            const response = await fetch(form.getAttribute('hx-post'), {
+                method: 'POST',
+                headers: { 'Accept': 'text/event-stream' },
+                body: new FormData(form),
+            });
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let split;
+                while ((split = buffer.indexOf('\n\n')) !== -1) {
+                    const { event, data } = parseEvent(buffer.slice(0, split));
+                    buffer = buffer.slice(split + 2);
+                    if (event === 'token') {
+                        preview.textContent += data.text;
+                    } else if (event === 'done') {
+                        target.innerHTML = data.html;
+                        if (window.htmx) htmx.process(target);
+                    }
+                }
+            }
+        } catch (err) {
+            target.innerHTML = '';
+            const message = document.createElement('div');
+            message.className = 'text-red-400';
+            message.textContent = 'Error: ' + err.message;
+            target.appendChild(message);
+        } finally {
+            if (indicator) indicator.classList.remove('htmx-request');
+        }
+    }
+
+    document.querySelectorAll('form[data-stream]').forEach(form => {
+        // Capture phase, so htmx never sees the submit
+        form.addEventListener('submit', event => {
+            event.preventDefault();
+            event.stopImmediatePropagation();
+            submitStreaming(form);
+        }, true);
+    });
+})();
@@ -8,6 +8,7 @@ used for the influencer pipeline and partner promotion.
 
 from .client import MixpostClient
 from .scheduler import SocialScheduler
+from .transport import CircuitOpenError, MixpostAPIError
 
-__all__ = ["MixpostClient", "SocialScheduler"]
+__all__ = ["MixpostClient", "SocialScheduler", "MixpostAPIError", "CircuitOpenError"]
 
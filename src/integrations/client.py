@@ -7,11 +7,14 @@ for the influencer development pipeline.
 """
 
 import os
-import requests
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 
+from .transport import MixpostAPIError, MixpostTransport, error_message
+
 
 @dataclass
 class SocialAccount:
@@ -46,7 +49,13 @@ class MixpostClient:
     def __init__(
         self,
         base_url: Optional[str] = None,
-        api_token: Optional[str] = None
+        api_token: Optional[str] = None,
+        account_cache_ttl: float = 300.0,
+        pool_size: int = 10,
+        timeout: Tuple[float, float] = (5.0, 30.0),
+        max_retries: int = 3,
+        rate_limit: float = 5.0,
+        **transport_options: Any
     ):
         """
         Initialize the Mixpost client.
@@ -54,15 +63,36 @@ class MixpostClient:
         Args:
             base_url: Mixpost instance URL (e.g., https://mixpost.mightyhouseinc.com)
             api_token: API authentication token
+            account_cache_ttl: Seconds to reuse a workspace's account list (0 disables)
+            pool_size: Keep-alive connections to Mixpost
+            timeout: (connect, read) timeouts in seconds
+            max_retries: Retries for idempotent calls and rate-limited requests
+            rate_limit: Requests per second per workspace
+            transport_options: Further MixpostTransport options
+                (backoff_base, burst, failure_threshold, reset_timeout, ...)
         """
         self.base_url = (base_url or os.getenv("MIXPOST_URL", "")).rstrip("/")
         self.api_token = api_token or os.getenv("MIXPOST_API_TOKEN", "")
+        self.account_cache_ttl = account_cache_ttl
+        
+        # workspace_id -> (fetched_at, accounts, provider -> accounts)
+        self._account_cache: Dict[Optional[str], Tuple[float, List[SocialAccount], Dict[str, List[SocialAccount]]]] = {}
+        self._account_lock = threading.Lock()
+        
         
-        self._session = requests.Session()
+        headers = {"Accept": "application/json", "Content-Type": "application/json"}
         if self.api_token:
-            self._session.headers["Authorization"] = f"Bearer {self.api_token}"
-        self._session.headers["Accept"] = "application/json"
-        self._session.headers["Content-Type"] = "application/json"
+            headers["Authorization"] = f"Bearer {self.api_token}"
+        self._transport = MixpostTransport(
+            f"{self.base_url}/api",
+            headers=headers,
+            pool_size=pool_size,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limit=rate_limit,
+            **transport_options
+        )
+        self._session = self._transport.session
     
     def _request(
         self,
@@ -70,18 +100,27 @@ class MixpostClient:
         endpoint: str,
         **kwargs
     ) -> Dict[str, Any]:
-        """Make an authenticated request to Mixpost."""
+        """
+        Make an authenticated request to Mixpost.
+        
+        Raises:
+            MixpostAPIError: On an error response (after retries)
+            CircuitOpenError: While Mixpost is failing and calls are short-circuited
+        """
         if not self.base_url:
             raise RuntimeError("Mixpost URL not configured")
         
-        url = f"{self.base_url}/api/{endpoint}"
-        response = self._session.request(method, url, **kwargs)
+        response = self._transport.request(method, endpoint, **kwargs)
         
         if response.status_code >= 400:
-            raise RuntimeError(f"Mixpost API error: {response.status_code} - {response.text}")
+            raise MixpostAPIError(response.status_code, error_message(response))
         
         return response.json() if response.text else {}
     
+    def get_transport_stats(self) -> Dict[str, Any]:
+        """Retry, throttling and circuit breaker counters."""
+        return self._transport.get_stats()
+    
     # ==================== Workspaces ====================
     
     def get_workspaces(self) -> List[Dict[str, Any]]:
@@ -96,16 +135,90 @@ class MixpostClient:
     
     # ==================== Social Accounts ====================
     
-    def get_accounts(self, workspace_id: Optional[str] = None) -> List[SocialAccount]:
+    def get_accounts(
+        self,
+        workspace_id: Optional[str] = None,
+        refresh: bool = False
+    ) -> List[SocialAccount]:
         """
         Get connected social media accounts.
         
+        Account lists change rarely, so they are cached per workspace for
+        `account_cache_ttl` seconds.
+        
         Args:
             workspace_id: Optional workspace filter
+            refresh: Bypass the cache and re-fetch
             
         Returns:
             List of SocialAccount objects
         """
+        return list(self._cached_accounts(workspace_id, refresh)[0])
+    
+    def get_account_index(
+        self,
+        workspace_id: Optional[str] = None
+    ) -> Dict[str, List[SocialAccount]]:
+        """
+        Get accounts grouped by lower-cased provider name (cached).
+        
+        Args:
+            workspace_id: Optional workspace filter
+            
+        Returns:
+            Dict of provider -> SocialAccount list
+        """
+        return self._cached_accounts(workspace_id)[1]
+    
+    def get_account_ids(
+        self,
+        platforms: List[str],
+        workspace_id: Optional[str] = None
+    ) -> List[str]:
+        """
+        Resolve platform names to account IDs using the cached index.
+        
+        Args:
+            platforms: Provider names (twitter, instagram, etc.)
+            workspace_id: Optional workspace filter
+            
+        Returns:
+            Account IDs, in platform order
+        """
+        index = self.get_account_index(workspace_id)
+        ids = [acc.id for p in platforms for acc in index.get(p.lower(), [])]
+        return list(dict.fromkeys(ids))
+    
+    def invalidate_accounts(self, workspace_id: Optional[str] = None) -> None:
+        """Drop cached accounts for one workspace, or all if None."""
+        with self._account_lock:
+            if workspace_id is None:
+                self._account_cache.clear()
+            else:
+                self._account_cache.pop(workspace_id, None)
+    
+    def _cached_accounts(
+        self,
+        workspace_id: Optional[str],
+        refresh: bool = False
+    ) -> Tuple[List[SocialAccount], Dict[str, List[SocialAccount]]]:
+        """Return (accounts, provider index), fetching when stale."""
+        with self._account_lock:
+            cached = self._account_cache.get(workspace_id)
+            if cached and not refresh and time.monotonic() - cached[0] < self.account_cache_ttl:
+                return cached[1], cached[2]
+        
+        accounts = self._fetch_accounts(workspace_id)
+        index: Dict[str, List[SocialAccount]] = {}
+        for acc in accounts:
+            index.setdefault(acc.provider.lower(), []).append(acc)
+        
+        with self._account_lock:
+            self._account_cache[workspace_id] = (time.monotonic(), accounts, index)
+        return accounts, index
+    
+    def _fetch_accounts(self, workspace_id: Optional[str] = None) -> List[SocialAccount]:
+        """Fetch connected accounts from Mixpost (uncached)."""
         endpoint = "accounts"
         if workspace_id:
             endpoint = f"workspaces/{workspace_id}/accounts"
@@ -137,11 +250,8 @@ class MixpostClient:
         Returns:
             SocialAccount or None
         """
-        accounts = self.get_accounts(workspace_id)
-        for acc in accounts:
-            if acc.provider.lower() == provider.lower():
-                return acc
-        return None
+        accounts = self.get_account_index(workspace_id).get(provider.lower())
+        return accounts[0] if accounts else None
     
     # ==================== Posts ====================
     
@@ -339,20 +449,20 @@ class MixpostClient:
         if workspace_id:
             endpoint = f"workspaces/{workspace_id}/media"
         
+        # Read the file up front: a file object would be at EOF when the
+        # transport retries the POST (after a 429), sending an empty upload
         with open(file_path, "rb") as f:
-            files = {"file": f}
-            # Need to temporarily remove content-type for file upload
-            headers = dict(self._session.headers)
-            del headers["Content-Type"]
-            
-            response = self._session.post(
-                f"{self.base_url}/api/{endpoint}",
-                files=files,
-                headers=headers
-            )
+            files = {"file": (os.path.basename(file_path), f.read())}
+        # Drop the JSON content-type so requests sets the multipart boundary
+        response = self._transport.request(
+            "POST",
+            endpoint,
+            files=files,
+            headers={"Content-Type": None}
+        )
         
         if response.status_code >= 400:
-            raise RuntimeError(f"Media upload failed: {response.text}")
+            raise MixpostAPIError(response.status_code, f"Media upload failed: {error_message(response)}")
         
         result = response.json()
         return result.get("data", {}).get("id", "")
@@ -429,11 +539,7 @@ class MixpostClient:
         formatted_content = content.replace("{handle}", influencer_handle)
         
         # Get account IDs for specified platforms
-        accounts = self.get_accounts(workspace_id)
-        account_ids = [
-            acc.id for acc in accounts
-            if acc.provider.lower() in [p.lower() for p in platforms]
-        ]
+        account_ids = self.get_account_ids(platforms, workspace_id)
         
         if not account_ids:
             raise RuntimeError(f"No accounts found for platforms: {platforms}")
@@ -497,7 +603,7 @@ class MixpostClient:
         """
         try:
             workspaces = self.get_workspaces()
-            accounts = self.get_accounts()
+            accounts = self.get_accounts(refresh=True)
             
             return {
                 "success": True,
@@ -6,7 +6,10 @@ Coordinates between Zoho CRM/Campaigns and Mixpost for
 automated social media posting.
 """
 
-from typing import Any, Dict, List, Optional
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
@@ -30,6 +33,24 @@ class ContentCalendarEntry:
             self.hashtags = []
 
 
+@dataclass
+class SyncResult:
+    """Outcome of syncing one calendar entry to Mixpost."""
+    entry: ContentCalendarEntry
+    status: str  # created, duplicate, past, no_accounts, failed
+    post: Optional[Post] = None
+    error: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "title": self.entry.title,
+            "scheduled_at": self.entry.scheduled_at.isoformat(),
+            "status": self.status,
+            "post_id": self.post.id if self.post else None,
+            "error": self.error,
+        }
+
+
 class SocialScheduler:
     """
     Automated social media scheduler for the multi-entity SOP system.
@@ -55,15 +76,28 @@ class SocialScheduler:
         "youtube": [14, 17, 20],     # 2pm, 5pm, 8pm
     }
     
-    def __init__(self, mixpost_client: Optional[MixpostClient] = None):
+    def __init__(
+        self,
+        mixpost_client: Optional[MixpostClient] = None,
+        max_workers: int = 4,
+        dedup_lookup_limit: int = 200
+    ):
         """
         Initialize the scheduler.
         
         Args:
             mixpost_client: MixpostClient instance
+            max_workers: Concurrent post creations during a calendar sync
+            dedup_lookup_limit: Scheduled Mixpost posts fetched to detect duplicates
         """
         self.mixpost = mixpost_client or MixpostClient()
+        self.max_workers = max_workers
+        self.dedup_lookup_limit = dedup_lookup_limit
         self._calendar: List[ContentCalendarEntry] = []
+        
+        # Post key (content hash @ schedule time) -> Mixpost post ID, for entries already synced
+        self._synced: Dict[str, str] = {}
+        self._synced_lock = threading.Lock()
     
     def set_client(self, mixpost_client: MixpostClient) -> None:
         """Set the Mixpost client."""
@@ -110,7 +144,8 @@ class SocialScheduler:
         """
         Sync content calendar to Mixpost.
         
-        Creates posts in Mixpost for all pending calendar entries.
+        Creates posts in Mixpost for all pending calendar entries that are
+        not already there. Safe to call repeatedly.
         
         Args:
             workspace_id: Optional workspace ID
@@ -118,36 +153,115 @@ class SocialScheduler:
         Returns:
             List of created Post objects
         """
-        created_posts = []
+        return [r.post for r in self.bulk_sync(workspace_id) if r.status == "created"]
+    
+    def bulk_sync(
+        self,
+        workspace_id: Optional[str] = None,
+        entries: Optional[List[ContentCalendarEntry]] = None,
+        max_workers: Optional[int] = None
+    ) -> List[SyncResult]:
+        """
+        Sync calendar entries to Mixpost with deduplication and concurrent creates.
         
-        for entry in self._calendar:
+        Accounts are resolved once from the client's cached provider index.
+        Entries whose content and schedule time match a post already in
+        Mixpost (or synced earlier by this scheduler) are skipped.
+        
+        Args:
+            workspace_id: Optional workspace ID
+            entries: Entries to sync (default: the whole calendar)
+            max_workers: Concurrent creates (default: self.max_workers)
+            
+        Returns:
+            One SyncResult per entry, in input order
+        """
+        entries = list(self._calendar if entries is None else entries)
+        results: List[Optional[SyncResult]] = [None] * len(entries)
+        now = datetime.now()
+        
+        try:
+            self.mixpost.get_account_index(workspace_id)
+        except Exception as e:
+            return [SyncResult(entry, "failed", error=f"Account lookup failed: {e}") for entry in entries]
+        
+        existing = self._existing_post_keys(workspace_id)
+        with self._synced_lock:
+            existing.update(self._synced)
+        
+        to_create = []
+        for i, entry in enumerate(entries):
             # Skip past entries
-            if entry.scheduled_at < datetime.now():
+            if entry.scheduled_at < now:
+                results[i] = SyncResult(entry, "past")
                 continue
             
-            # Combine entity hashtags with entry hashtags
-            all_hashtags = self.ENTITY_HASHTAGS.get(entry.entity, []) + entry.hashtags
-            hashtag_str = " ".join(f"#{tag}" for tag in all_hashtags)
-            
-            full_content = f"{entry.content}\n\n{hashtag_str}"
+            content = self._format_content(entry)
+            key = self.post_key(content, entry.scheduled_at)
+            if key in existing:
+                results[i] = SyncResult(entry, "duplicate")
+                continue
             
-            # Get accounts for specified platforms
-            accounts = self.mixpost.get_accounts(workspace_id)
-            account_ids = [
-                acc.id for acc in accounts
-                if acc.provider.lower() in [p.lower() for p in entry.platforms]
-            ]
+            account_ids = self.mixpost.get_account_ids(entry.platforms, workspace_id)
+            if not account_ids:
+                results[i] = SyncResult(entry, "no_accounts")
+                continue
             
-            if account_ids:
+            existing.add(key)
+            to_create.append((i, entry, content, key, account_ids))
+        
+        def create(item):
+            i, entry, content, key, account_ids = item
+            try:
                 post = self.mixpost.create_post(
-                    content=full_content,
+                    content=content,
                     account_ids=account_ids,
                     schedule_at=entry.scheduled_at,
                     workspace_id=workspace_id
                 )
-                created_posts.append(post)
-        
-        return created_posts
+            except Exception as e:
+                return i, SyncResult(entry, "failed", error=str(e))
+            with self._synced_lock:
+                self._synced[key] = post.id
+            return i, SyncResult(entry, "created", post=post)
+        
+        if to_create:
+            workers = max(1, min(max_workers or self.max_workers, len(to_create)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for i, result in pool.map(create, to_create):
+                    results[i] = result
+        
+        return results
+    
+    def _format_content(self, entry: ContentCalendarEntry) -> str:
+        """Post body: entry content plus entity and entry hashtags."""
+        all_hashtags = self.ENTITY_HASHTAGS.get(entry.entity, []) + entry.hashtags
+        hashtag_str = " ".join(f"#{tag}" for tag in all_hashtags)
+        return f"{entry.content}\n\n{hashtag_str}"
+    
+    @staticmethod
+    def post_key(content: str, scheduled_at: Optional[datetime]) -> str:
+        """Identity of a post for deduplication: content hash and schedule minute."""
+        digest = hashlib.sha256(content.strip().encode("utf-8")).hexdigest()[:16]
+        when = ""
+        if scheduled_at:
+            if scheduled_at.tzinfo is not None:
+                scheduled_at = scheduled_at.astimezone().replace(tzinfo=None)
+            when = scheduled_at.replace(second=0, microsecond=0).isoformat()
+        return f"{digest}@{when}"
+    
+    def _existing_post_keys(self, workspace_id: Optional[str]) -> Set[str]:
+        """Keys of posts already scheduled in Mixpost (empty if the lookup fails)."""
+        try:
+            posts = self.mixpost.get_posts(
+                status="scheduled",
+                limit=self.dedup_lookup_limit,
+                workspace_id=workspace_id
+            )
+        except Exception as e:
+            print(f"Mixpost duplicate lookup failed: {e}")
+            return set()
+        return {self.post_key(p.content, p.scheduled_at) for p in posts}
     
     # ==================== Automated Scheduling ====================
     
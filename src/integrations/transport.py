@@ -0,0 +1,386 @@
+# src/integrations/transport.py
+"""
+Resilient HTTP transport for the Mixpost client.
+
+- Pooled keep-alive connections with explicit connect/read timeouts
+- Retries with jittered exponential backoff: idempotent methods on
+  connection errors, timeouts and 429/5xx; non-idempotent methods only when
+  the request provably was not processed (429, connect timeout)
+- Retry-After and X-RateLimit-* headers honoured
+- Per-workspace token buckets, tightened by the server's rate-limit headers;
+  a server-requested pause is capped at backoff_max, and a caller waiting
+  longer than throttle_timeout for a token gets a retryable 429 error
+  instead of blocking
+- A circuit breaker that fails fast while Mixpost is down or hanging, so SOP
+  workers are not tied up waiting on it
+"""
+
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_WORKSPACE_RE = re.compile(r"^workspaces/([^/]+)")
+
+
+class MixpostAPIError(RuntimeError):
+    """Mixpost returned an error response."""
+
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        self.message = message
+        super().__init__(f"Mixpost API error: {status_code} - {message}")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling Mixpost while the circuit breaker is open."""
+
+
+def error_message(response: requests.Response, limit: int = 200) -> str:
+    """Short error text: the JSON "message" if present, else the truncated body."""
+    try:
+        body = response.json()
+        if isinstance(body, dict) and body.get("message"):
+            return str(body["message"])[:limit]
+    except ValueError:
+        pass
+    text = (response.text or response.reason or "").strip()
+    return text[:limit] + ("..." if len(text) > limit else "")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (delta-seconds or HTTP date) as seconds from now."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Token bucket limiter.
+
+    `rate` tokens are added per second up to `capacity`. The server's
+    rate-limit headers can drain the bucket or block it until a reset time.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting for it if necessary.
+
+        Returns:
+            False if no token became available within `timeout`
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._blocked_until - now,
+                           (1 - self._tokens) / self.rate if self.rate > 0 else 1.0)
+            if deadline is not None:
+                if time.monotonic() + wait > deadline:
+                    return False
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, remaining: Optional[int] = None, reset_after: Optional[float] = None):
+        """Apply server rate-limit state: cap tokens at `remaining`, block until reset if exhausted."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining is not None:
+                self._tokens = min(self._tokens, float(remaining))
+            if reset_after is not None and (remaining is None or remaining <= 0):
+                self._tokens = 0.0
+                self._blocked_until = max(self._blocked_until, now + reset_after)
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `reset_timeout` seconds, when one trial call is allowed.
+    A success closes the circuit; a failed trial re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit allows a trial call."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class MixpostTransport:
+    """
+    Pooled, retrying, rate-limited HTTP transport.
+
+    Usage:
+        transport = MixpostTransport("https://mixpost.example.com/api", headers)
+        response = transport.request("GET", "workspaces/1/accounts")
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        pool_size: int = 10,
+        timeout: Tuple[float, float] = (5.0, 30.0),
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        rate_limit: float = 5.0,
+        burst: int = 10,
+        rate_limit_window: float = 60.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        throttle_timeout: float = 60.0,
+    ):
+        """
+        Args:
+            base_url: API root (requests go to base_url/endpoint)
+            headers: Default headers (auth, accept)
+            pool_size: Keep-alive connections kept per host
+            timeout: (connect, read) timeouts in seconds
+            max_retries: Retries after the first attempt
+            backoff_base: First backoff ceiling in seconds (doubles per retry)
+            backoff_max: Largest backoff ceiling
+            rate_limit: Requests per second per workspace (0 disables throttling)
+            burst: Token bucket capacity
+            rate_limit_window: Window the server's X-RateLimit-Limit applies to
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds before an open circuit allows a trial call
+            throttle_timeout: Longest wait for a rate-limit token before the
+                request fails with a 429 MixpostAPIError
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.rate_limit_window = rate_limit_window
+        self.throttle_timeout = throttle_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers or {})
+
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0, "throttled": 0}
+        self._stats_lock = threading.Lock()
+
+    # ==================== Rate limiting ====================
+
+    def _bucket(self, endpoint: str) -> Optional[TokenBucket]:
+        if self.rate_limit <= 0:
+            return None
+        match = _WORKSPACE_RE.match(endpoint)
+        key = match.group(1) if match else ""
+        with self._buckets_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate_limit, self.burst)
+            return bucket
+
+    def _observe_rate_headers(self, bucket: Optional[TokenBucket], response: requests.Response):
+        if bucket is None:
+            return
+        headers = response.headers
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        remaining = headers.get("X-RateLimit-Remaining")
+        limit = headers.get("X-RateLimit-Limit")
+        reset = headers.get("X-RateLimit-Reset")
+
+        if limit and limit.isdigit() and int(limit) > 0:
+            # Never refill faster than the server allows
+            bucket.rate = min(self.rate_limit, int(limit) / self.rate_limit_window)
+        reset_after = retry_after
+        if reset_after is None and reset and reset.isdigit():
+            reset_after = max(0.0, int(reset) - time.time())
+        if reset_after is not None:
+            # One response must not stall every caller sharing the bucket for long
+            reset_after = min(reset_after, self.backoff_max)
+
+        if remaining is not None and remaining.isdigit():
+            bucket.observe(int(remaining), reset_after)
+        elif response.status_code == 429:
+            bucket.observe(0, reset_after if reset_after is not None else 1.0)
+
+    # ==================== Requests ====================
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def request(self, method: str, endpoint: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a request with throttling, retries and circuit breaking.
+
+        Returns:
+            The final response (may be an error status once retries are spent)
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            MixpostAPIError: 429 if no rate-limit token came free within throttle_timeout
+            requests.RequestException: If the last attempt failed to connect or timed out
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        kwargs.setdefault("timeout", self.timeout)
+        bucket = self._bucket(endpoint)
+
+        attempt = 0
+        while True:
+            # Throttle before asking the breaker, so a half-open trial slot
+            # is never taken by a request that then gives up waiting
+            if bucket is not None and bucket.tokens < 1:
+                self._count("throttled")
+            if bucket is not None and not bucket.acquire(timeout=self.throttle_timeout):
+                raise MixpostAPIError(
+                    429, f"Rate limited; no request slot within {self.throttle_timeout:.0f}s"
+                )
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise CircuitOpenError(
+                    f"Mixpost circuit open; retry in {self.breaker.retry_in():.0f}s"
+                )
+
+            self._count("requests")
+            retry_after = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                self.breaker.record_failure()
+                self._count("failures")
+                # A connect timeout means the request never reached the server
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+            else:
+                self._observe_rate_headers(bucket, response)
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                    self._count("failures")
+                else:
+                    self.breaker.record_success()
+
+                retryable = response.status_code in RETRY_STATUSES and (
+                    idempotent or response.status_code == 429
+                )
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                response.close()
+
+            self._count("retries")
+            time.sleep(self._backoff(attempt, retry_after))
+            attempt += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Transport counters and breaker state."""
+        with self._buckets_lock:
+            buckets = {k or "default": round(b.tokens, 2) for k, b in self._buckets.items()}
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "tokens": buckets,
+        }
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
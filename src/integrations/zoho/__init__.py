@@ -4,7 +4,11 @@ Zoho CRM Integration for SOP Dashboard.
 Wraps the Zoho API system to provide SOP-specific functionality.
 """
 
+from .batching import CRMBatcher
+from .cache import RecordCache, get_record_cache
+from .dedup import WebhookDeduplicator
 from .crm_handler import ZohoCRMHandler, CRMStepHandler
+from .pool import CRMClientPool, get_client_pool
 from .webhooks import ZohoWebhookHandler
 
-__all__ = ['ZohoCRMHandler', 'CRMStepHandler', 'ZohoWebhookHandler']
+__all__ = ['CRMBatcher', 'CRMClientPool', 'get_client_pool', 'RecordCache', 'get_record_cache', 'WebhookDeduplicator', 'ZohoCRMHandler', 'CRMStepHandler', 'ZohoWebhookHandler']
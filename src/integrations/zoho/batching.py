@@ -0,0 +1,237 @@
+"""
+Write batching for Zoho CRM.
+
+Creates and updates issued by concurrent SOP steps are buffered per module
+and flushed as bulk API calls (Zoho accepts up to 100 records per insert or
+update), so a burst of webhook-driven SOPs costs one API call per batch
+instead of one per record.
+
+- A buffer is flushed `window` seconds after its first record arrives, or
+  immediately once it holds `max_batch` records
+- Each submitted record gets a Future resolved with its own result,
+  demultiplexed from the bulk response
+- Updates to the same record within a window are merged into one write
+  (later field values win); every caller receives the merged write's result
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+# Zoho's per-request record limit for insert/update
+MAX_BATCH = 100
+
+
+class _Buffer:
+    """Pending writes for one (operation, module, trigger_workflows) key."""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        # Creates: one entry per record. Updates: one entry per record_id.
+        self.entries: List[Dict[str, Any]] = []
+        self.by_record: Dict[str, Dict[str, Any]] = {}
+
+
+class CRMBatcher:
+    """
+    Buffers CRM writes and flushes them as bulk calls.
+
+    Wraps a ZohoCRMHandler; flushes go through its create_records and
+    update_records bulk methods, so connection handling and result shapes
+    match the single-record calls.
+    """
+
+    def __init__(self, crm, window: float = 0.1, max_batch: int = MAX_BATCH):
+        """
+        Initialize the batcher.
+
+        Args:
+            crm: ZohoCRMHandler performing the bulk calls
+            window: Seconds a buffer waits for more records before flushing
+            max_batch: Records per bulk call (capped at Zoho's limit of 100)
+        """
+        self.crm = crm
+        self.window = window
+        self.max_batch = max(1, min(max_batch, MAX_BATCH))
+
+        self._buffers: Dict[Tuple[str, str, bool], _Buffer] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "submitted": 0,
+            "merged": 0,
+            "batches": 0,
+            "records_written": 0,
+            "failed_batches": 0,
+        }
+
+    # ==================== Submission ====================
+
+    def submit_create(
+        self,
+        module: str,
+        data: Dict[str, Any],
+        trigger_workflows: bool = True
+    ) -> Future:
+        """
+        Queue a record for creation.
+
+        Returns:
+            Future resolving to the create_record-style result
+        """
+        future: Future = Future()
+        entry = {"data": dict(data), "futures": [future]}
+        self._enqueue(("create", module, trigger_workflows), entry)
+        return future
+
+    def submit_update(
+        self,
+        module: str,
+        record_id: str,
+        data: Dict[str, Any],
+        trigger_workflows: bool = True
+    ) -> Future:
+        """
+        Queue field updates for a record.
+
+        Updates to a record already waiting in the buffer are merged into it.
+
+        Returns:
+            Future resolving to the update_record-style result
+        """
+        future: Future = Future()
+        entry = {"record_id": str(record_id), "data": dict(data), "futures": [future]}
+        self._enqueue(("update", module, trigger_workflows), entry)
+        return future
+
+    def create_record(
+        self,
+        module: str,
+        data: Dict[str, Any],
+        trigger_workflows: bool = True
+    ) -> Dict[str, Any]:
+        """Queue a create and wait for its result."""
+        return self.submit_create(module, data, trigger_workflows).result()
+
+    def update_record(
+        self,
+        module: str,
+        record_id: str,
+        data: Dict[str, Any],
+        trigger_workflows: bool = True
+    ) -> Dict[str, Any]:
+        """Queue an update and wait for its result."""
+        return self.submit_update(module, record_id, data, trigger_workflows).result()
+
+    def _enqueue(self, key: Tuple[str, str, bool], entry: Dict[str, Any]):
+        full = None
+        with self._lock:
+            self._ensure_worker()
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = _Buffer(time.monotonic() + self.window)
+                self._wake.notify()
+            self._stats["submitted"] += 1
+            pending = buffer.by_record.get(entry.get("record_id"))
+            if pending is not None:
+                pending["data"].update(entry["data"])
+                pending["futures"].extend(entry["futures"])
+                self._stats["merged"] += 1
+                return
+            buffer.entries.append(entry)
+            if "record_id" in entry:
+                buffer.by_record[entry["record_id"]] = entry
+            if len(buffer.entries) >= self.max_batch:
+                full = self._buffers.pop(key)
+        # Full buffers are written by the submitting thread, not the timer
+        if full is not None:
+            self._write(key, full)
+
+    # ==================== Flushing ====================
+
+    def flush(self):
+        """Write every buffered record now."""
+        with self._lock:
+            ready = list(self._buffers.items())
+            self._buffers.clear()
+        for key, buffer in ready:
+            self._write(key, buffer)
+
+    def close(self, timeout: float = 5.0):
+        """Flush pending writes and stop the timer thread."""
+        with self._lock:
+            self._stop = True
+            self._wake.notify()
+            thread = self._thread
+            self._thread = None
+        if thread:
+            thread.join(timeout)
+        self.flush()
+
+    def _ensure_worker(self):
+        # Called with the lock held
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._loop, name="crm-batcher", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if self._stop:
+                    return
+                now = time.monotonic()
+                due = [key for key, buffer in self._buffers.items() if buffer.deadline <= now]
+                ready = [(key, self._buffers.pop(key)) for key in due]
+                if not ready:
+                    deadlines = [buffer.deadline for buffer in self._buffers.values()]
+                    self._wake.wait(min(deadlines) - now if deadlines else None)
+                    continue
+            for key, buffer in ready:
+                self._write(key, buffer)
+
+    def _write(self, key: Tuple[str, str, bool], buffer: _Buffer):
+        operation, module, trigger_workflows = key
+        entries = buffer.entries
+        try:
+            if operation == "create":
+                results = self.crm.create_records(
+                    module, [entry["data"] for entry in entries], trigger_workflows
+                )
+            else:
+                results = self.crm.update_records(
+                    module,
+                    [{**entry["data"], "id": entry["record_id"]} for entry in entries],
+                    trigger_workflows,
+                )
+        except Exception as e:
+            results = [{"success": False, "error": str(e)}] * len(entries)
+        if len(results) < len(entries):
+            missing = {"success": False, "error": "No result returned for record"}
+            results = list(results) + [missing] * (len(entries) - len(results))
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["records_written"] += len(entries)
+            if not any(result.get("success") for result in results):
+                self._stats["failed_batches"] += 1
+
+        for entry, result in zip(entries, results):
+            for future in entry["futures"]:
+                future.set_result(dict(result))
+
+    # ==================== Stats ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Submission, merge and batch counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = sum(len(b.entries) for b in self._buffers.values())
+        # API calls avoided by batching and merging
+        stats["calls_saved"] = stats["submitted"] - stats["pending"] - stats["batches"]
+        stats["window"] = self.window
+        stats["max_batch"] = self.max_batch
+        return stats
@@ -0,0 +1,174 @@
+"""
+Read-through cache for Zoho CRM lookups.
+
+search_records and get_record results are kept in a TTL + LRU cache keyed
+on (operation, module, criteria, fields), so consecutive steps and
+concurrent SOPs looking up the same record share one API call.
+
+Invalidation:
+- Our own creates/updates drop the written record's get_record entries and
+  every cached search in its module (a write can change which records a
+  search matches)
+- ZohoWebhookHandler does the same for each incoming record event, which
+  covers edits made outside the SOP engine
+- Each module has a generation counter; a lookup that started before an
+  invalidation does not store its (possibly stale) result
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+CacheKey = Tuple[Hashable, ...]
+
+
+class RecordCache:
+    """
+    Thread-safe TTL + LRU cache for CRM lookup results.
+
+    Values are deep-copied on the way in and out, so callers may mutate
+    what they get back.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds an entry stays fresh (0 disables caching)
+            max_entries: Entries kept before the least recently used is evicted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._by_module: Dict[str, Set[CacheKey]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def search_key(module: str, criteria: str, limit: int) -> CacheKey:
+        return ("search", module, criteria, limit)
+
+    @staticmethod
+    def record_key(module: str, record_id: str, fields=None) -> CacheKey:
+        return ("get", module, str(record_id), tuple(fields) if fields else None)
+
+    # ==================== Lookups ====================
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Return a fresh cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def generation(self, module: str) -> int:
+        """Current invalidation generation for a module (pass to put)."""
+        with self._lock:
+            return self._generations.get(module, 0)
+
+    def put(self, key: CacheKey, value: Any, generation: Optional[int] = None):
+        """
+        Store a lookup result.
+
+        Args:
+            key: Key from search_key/record_key
+            value: Result to cache
+            generation: Module generation read before the lookup started; the
+                value is discarded if the module was invalidated since
+        """
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        module = key[1]
+        value = copy.deepcopy(value)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(module, 0):
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._by_module.setdefault(module, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+
+    # ==================== Invalidation ====================
+
+    def invalidate(self, module: str, record_id: Optional[str] = None) -> int:
+        """
+        Drop entries affected by a write to a module.
+
+        Args:
+            module: CRM module written to
+            record_id: Record written; None drops every entry for the module
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            self._generations[module] = self._generations.get(module, 0) + 1
+            keys = set(self._by_module.get(module, ()))
+            if record_id is not None:
+                record_id = str(record_id)
+                keys = {k for k in keys if k[0] == "search" or k[2] == record_id}
+            for key in keys:
+                self._drop(key)
+            self._stats["invalidations"] += 1
+            return len(keys)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            for module in self._by_module:
+                self._generations[module] = self._generations.get(module, 0) + 1
+            self._entries.clear()
+            self._by_module.clear()
+
+    def _drop(self, key: CacheKey):
+        # Called with the lock held
+        self._entries.pop(key, None)
+        keys = self._by_module.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_module[key[1]]
+
+    # ==================== Stats ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["ttl"] = self.ttl
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+# Global instance
+_record_cache: Optional[RecordCache] = None
+
+
+def get_record_cache() -> RecordCache:
+    """Get or create the process-wide CRM lookup cache."""
+    global _record_cache
+    if _record_cache is None:
+        _record_cache = RecordCache()
+    return _record_cache
@@ -7,13 +7,21 @@ Provides step handlers for CRM operations within SOPs:
 - Search/lookup records
 - Deal stage changes
 - Workflow triggers
+- Bulk writes, with concurrent creates/updates batched per module
+- Cached lookups, invalidated by our own writes and by webhooks
+- A shared, background-maintained client (see CRMClientPool)
 """
 
+import asyncio
 import sys
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
+from .batching import CRMBatcher, MAX_BATCH
+from .cache import RecordCache, get_record_cache
+from .pool import CRMClientPool, get_client_pool
+
 # Add Zoho API system to path
 ZOHO_API_PATH = Path(r"C:\zoho-console-api-module-system")
 if ZOHO_API_PATH.exists():
@@ -30,15 +38,44 @@ else:
     ZOHO_AVAILABLE = False
 
 
+def get_crm_client_pool() -> CRMClientPool:
+    """Process-wide client pool, building CRMClients when Zoho is installed."""
+    return get_client_pool(CRMClient if ZOHO_AVAILABLE else None)
+
+
 class ZohoCRMHandler:
     """
     High-level handler for Zoho CRM operations in SOP context.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        batch_window: Optional[float] = None,
+        max_batch: int = MAX_BATCH,
+        cache: Optional[RecordCache] = None,
+        pool: Optional[CRMClientPool] = None
+    ):
+        """
+        Initialize the handler.
+        
+        Args:
+            batch_window: When set, create_record/update_record calls are
+                buffered for up to this many seconds and written in bulk
+                (see CRMBatcher). None writes every record immediately.
+            max_batch: Records per bulk write (Zoho allows at most 100)
+            cache: Lookup cache for search_records/get_record (default: the
+                process-wide cache shared with the webhook handler)
+            pool: Client pool to take the CRM client from (default: the
+                process-wide pool)
+        """
         self._client: Optional[CRMClient] = None
         self._connected = False
         self._last_error: Optional[str] = None
+        self.cache = cache or get_record_cache()
+        self.pool = pool or get_crm_client_pool()
+        self.batcher: Optional[CRMBatcher] = None
+        if batch_window is not None:
+            self.batcher = CRMBatcher(self, window=batch_window, max_batch=max_batch)
     
     @property
     def available(self) -> bool:
@@ -51,25 +88,26 @@ class ZohoCRMHandler:
         return self._connected
     
     def connect(self) -> bool:
-        """Establish connection to Zoho CRM."""
-        if not ZOHO_AVAILABLE:
+        """
+        Attach to the pool's shared CRM client.
+        
+        No round-trip is made: the pool health-checks the connection in the
+        background, and this fails only if its last check did.
+        """
+        if not self.pool.available:
             self._last_error = "Zoho API system not available"
             return False
         
-        try:
-            self._client = CRMClient()
-            result = self._client.test_crm_connection()
-            self._connected = result.get("success", False)
-            if not self._connected:
-                self._last_error = result.get("error", "Unknown error")
-            return self._connected
-        except Exception as e:
-            self._last_error = str(e)
-            self._connected = False
-            return False
+        self._client = self.pool.get_client()
+        self._connected = self._client is not None
+        if not self._connected:
+            self._last_error = self.pool.status().get("error") or "CRM client unavailable"
+        return self._connected
     
     def disconnect(self):
-        """Close connection."""
+        """Detach from the shared client (it stays open for other handlers)."""
+        if self.batcher:
+            self.batcher.close()
         if self._client:
             self._client = None
         self._connected = False
@@ -102,12 +140,15 @@ class ZohoCRMHandler:
         """
         if not self._connected:
             return {"success": False, "error": "Not connected to CRM"}
+        if self.batcher:
+            return self.batcher.create_record(module, data, trigger_workflows)
         
         try:
             triggers = ["workflow", "blueprint"] if trigger_workflows else []
             result = self._client.create_record(module, data, trigger=triggers)
             
             if result.get("status") == "success":
+                self.cache.invalidate(module)
                 return {
                     "success": True,
                     "record_id": result.get("details", {}).get("id"),
@@ -144,12 +185,15 @@ class ZohoCRMHandler:
         """
         if not self._connected:
             return {"success": False, "error": "Not connected to CRM"}
+        if self.batcher:
+            return self.batcher.update_record(module, record_id, data, trigger_workflows)
         
         try:
             triggers = ["workflow", "blueprint"] if trigger_workflows else []
             result = self._client.update_record(module, record_id, data, trigger=triggers)
             
             if result.get("status") == "success":
+                self.cache.invalidate(module, record_id)
                 return {
                     "success": True,
                     "record_id": record_id,
@@ -164,20 +208,150 @@ class ZohoCRMHandler:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    # ==================== Bulk Operations ====================
+    
+    def create_records(
+        self,
+        module: str,
+        records: List[Dict[str, Any]],
+        trigger_workflows: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Create records in bulk, MAX_BATCH per API call.
+        
+        Uses the client's multi-record insert when it has one and falls back
+        to one call per record otherwise.
+        
+        Returns:
+            One create_record-style result per input record, in order
+        """
+        return self._bulk_write("create", module, records, trigger_workflows)
+    
+    def update_records(
+        self,
+        module: str,
+        records: List[Dict[str, Any]],
+        trigger_workflows: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Update records in bulk, MAX_BATCH per API call.
+        
+        Args:
+            module: CRM module
+            records: Field updates, each including the record's "id"
+            trigger_workflows: Whether to trigger Zoho workflows
+        
+        Returns:
+            One update_record-style result per input record, in order
+        """
+        return self._bulk_write("update", module, records, trigger_workflows)
+    
+    def _bulk_write(
+        self,
+        operation: str,
+        module: str,
+        records: List[Dict[str, Any]],
+        trigger_workflows: bool
+    ) -> List[Dict[str, Any]]:
+        if not self._connected:
+            return [{"success": False, "error": "Not connected to CRM"}] * len(records)
+        
+        triggers = ["workflow", "blueprint"] if trigger_workflows else []
+        bulk_call = getattr(self._client, f"{operation}_records", None)
+        results = []
+        for start in range(0, len(records), MAX_BATCH):
+            chunk = records[start:start + MAX_BATCH]
+            try:
+                if bulk_call:
+                    response = bulk_call(module, chunk, trigger=triggers)
+                    if isinstance(response, dict):
+                        response = response.get("data", [])
+                else:
+                    response = [self._single_write(operation, module, record, triggers)
+                                for record in chunk]
+            except Exception as e:
+                results.extend({"success": False, "error": str(e)} for _ in chunk)
+                continue
+            for index, record in enumerate(chunk):
+                item = response[index] if index < len(response) else {}
+                results.append(self._record_result(operation, module, record, item))
+        
+        written = [r["record_id"] for r in results if r.get("success")]
+        if written and operation == "create":
+            self.cache.invalidate(module)
+        elif written:
+            for record_id in written:
+                self.cache.invalidate(module, record_id)
+        return results
+    
+    def _single_write(
+        self,
+        operation: str,
+        module: str,
+        record: Dict[str, Any],
+        triggers: List[str]
+    ) -> Dict[str, Any]:
+        try:
+            if operation == "create":
+                return self._client.create_record(module, record, trigger=triggers)
+            data = {k: v for k, v in record.items() if k != "id"}
+            return self._client.update_record(module, record["id"], data, trigger=triggers)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    @staticmethod
+    def _record_result(
+        operation: str,
+        module: str,
+        record: Dict[str, Any],
+        item: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Convert one entry of a Zoho bulk response to a single-call result."""
+        if item.get("status") != "success":
+            default = "Creation failed" if operation == "create" else "Update failed"
+            return {
+                "success": False,
+                "error": item.get("message", default),
+                "code": item.get("code")
+            }
+        if operation == "create":
+            return {
+                "success": True,
+                "record_id": item.get("details", {}).get("id"),
+                "module": module,
+                "message": f"Created {module} record"
+            }
+        return {
+            "success": True,
+            "record_id": record.get("id"),
+            "module": module,
+            "message": f"Updated {module} record"
+        }
+    
     def get_record(
         self,
         module: str,
         record_id: str,
-        fields: Optional[List[str]] = None
+        fields: Optional[List[str]] = None,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
-        """Get a specific record."""
+        """Get a specific record (served from the lookup cache when fresh)."""
         if not self._connected:
             return {"success": False, "error": "Not connected to CRM"}
         
+        key = RecordCache.record_key(module, record_id, fields)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
         try:
+            generation = self.cache.generation(module)
             record = self._client.get_record(module, record_id, fields)
             if record:
-                return {"success": True, "record": record}
+                result = {"success": True, "record": record}
+                self.cache.put(key, result, generation)
+                return result
             else:
                 return {"success": False, "error": "Record not found"}
         except Exception as e:
@@ -187,7 +361,8 @@ class ZohoCRMHandler:
         self,
         module: str,
         criteria: str,
-        limit: int = 10
+        limit: int = 10,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Search for records.
@@ -196,6 +371,7 @@ class ZohoCRMHandler:
             module: CRM module
             criteria: Zoho search criteria (e.g., "(Email:equals:test@example.com)")
             limit: Max records to return
+            use_cache: Serve a fresh cached result for the same search
             
         Returns:
             Result with records list
@@ -203,13 +379,22 @@ class ZohoCRMHandler:
         if not self._connected:
             return {"success": False, "error": "Not connected to CRM"}
         
+        key = RecordCache.search_key(module, criteria, limit)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
         try:
+            generation = self.cache.generation(module)
             records = self._client.search_records(module, criteria, per_page=limit)
-            return {
+            result = {
                 "success": True,
                 "records": records,
                 "count": len(records)
             }
+            self.cache.put(key, result, generation)
+            return result
         except Exception as e:
             return {"success": False, "error": str(e)}
     
@@ -353,10 +538,17 @@ class CRMStepHandler:
     - crm_update: Update a record
     - crm_search: Search for records
     - crm_deal_stage: Update deal stage
+    
+    Creates and updates from concurrent workflows are batched into bulk
+    writes (see CRMBatcher) unless batch_window is None.
     """
     
-    def __init__(self, crm_handler: Optional[ZohoCRMHandler] = None):
-        self.crm = crm_handler or ZohoCRMHandler()
+    def __init__(
+        self,
+        crm_handler: Optional[ZohoCRMHandler] = None,
+        batch_window: Optional[float] = 0.1
+    ):
+        self.crm = crm_handler or ZohoCRMHandler(batch_window=batch_window)
         self._connected = False
     
     def ensure_connected(self) -> bool:
@@ -406,6 +598,20 @@ class CRMStepHandler:
         
         return handler(config, context)
     
+    async def handle_step_async(
+        self,
+        step_type: str,
+        config: Dict[str, Any],
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Async variant of handle_step.
+        
+        The Zoho CRM client is synchronous, so the call runs in a worker
+        thread to keep the event loop free.
+        """
+        return await asyncio.to_thread(self.handle_step, step_type, config, context)
+    
     def _substitute_vars(
         self,
         config: Dict[str, Any],
@@ -474,7 +680,7 @@ class CRMStepHandler:
         limit = config.get("limit", 10)
         store_as = config.get("store_as", "search_results")
         
-        result = self.crm.search_records(module, criteria, limit)
+        result = self.crm.search_records(module, criteria, limit, use_cache=config.get("cache", True))
         
         # Store results in context
         if result.get("success"):
@@ -525,13 +731,13 @@ if __name__ == "__main__":
     
     if ZOHO_AVAILABLE:
         with ZohoCRMHandler() as crm:
-            if crm.connected:
+            if crm.connected and crm.pool.check_health():
                 print("✓ Connected to Zoho CRM")
                 
                 # Test search
                 result = crm.search_records("Leads", "(Lead_Source:equals:Web)", limit=5)
                 print(f"Search result: {result.get('count', 0)} leads found")
             else:
-                print(f"✗ Connection failed: {crm._last_error}")
+                print(f"✗ Connection failed: {crm._last_error or crm.pool.status()['error']}")
     else:
         print("Zoho API system not found at expected path")
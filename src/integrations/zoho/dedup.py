@@ -0,0 +1,194 @@
+"""
+Webhook idempotency for Zoho CRM.
+
+Zoho redelivers webhooks it considers failed, and every delivery used to
+re-run the matched SOPs (social posts, CRM writes). Each delivery is keyed
+on (module, record_id, operation, version), where version is the record's
+Modified_Time when present and a hash of the payload otherwise. A key seen
+within the window is a duplicate.
+
+Storage:
+- An in-memory LRU with a TTL answers most checks
+- An optional SQLite tier (WAL) remembers keys across restarts and across
+  processes sharing the database file
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_keys (
+    key TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_keys_seen ON webhook_keys (seen_at);
+"""
+
+
+def delivery_key(event: Dict[str, Any]) -> str:
+    """
+    Idempotency key for a parsed webhook event (see ZohoWebhookHandler.parse_webhook).
+
+    Args:
+        event: Parsed event with module, record_id, original_event, record and raw
+
+    Returns:
+        "module:record_id:operation:version" string
+    """
+    record = event.get("record") or {}
+    modified = record.get("Modified_Time")
+    if modified:
+        version = f"m:{modified}"
+    else:
+        payload = json.dumps(event.get("raw", record), sort_keys=True, default=str)
+        version = "h:" + hashlib.sha256(payload.encode()).hexdigest()[:32]
+    return f"{event.get('module')}:{event.get('record_id')}:{event.get('original_event')}:{version}"
+
+
+class WebhookDeduplicator:
+    """
+    Time-windowed record of webhook deliveries already processed.
+
+    Thread-safe; check_and_record is atomic, so concurrent redeliveries of
+    the same event dispatch at most once.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 24 * 3600,
+        max_entries: int = 10_000,
+        db_path: Optional[Union[Path, str]] = None,
+        prune_every: int = 1000,
+    ):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            ttl: Seconds a delivery key is remembered
+            max_entries: Keys kept in memory (least recently seen evicted first)
+            db_path: Optional SQLite database for a persistent tier
+            prune_every: Inserts between deletions of expired SQLite rows
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+
+        # key -> seen_at (epoch seconds)
+        self._memory: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts_since_prune = 0
+        self._stats = {"checked": 0, "duplicates": 0, "memory_hits": 0, "db_hits": 0}
+
+        self.db_path = None
+        self._conn = None
+        if db_path is not None:
+            self.db_path = Path(db_path)
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.db_path),
+                check_same_thread=False,
+                isolation_level=None,  # Autocommit; each check is one statement
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database connection, if any."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ==================== Checks ====================
+
+    def check_and_record(self, key: str) -> bool:
+        """
+        Record a delivery key.
+
+        Returns:
+            True if the key was already seen within the window (a duplicate)
+        """
+        now = time.time()
+        cutoff = now - self.ttl
+        with self._lock:
+            self._stats["checked"] += 1
+
+            seen_at = self._memory.get(key)
+            if seen_at is not None and seen_at > cutoff:
+                self._memory.move_to_end(key)
+                self._stats["duplicates"] += 1
+                self._stats["memory_hits"] += 1
+                return True
+
+            if self._conn is not None and not self._insert(key, now, cutoff):
+                self._remember(key, now)
+                self._stats["duplicates"] += 1
+                self._stats["db_hits"] += 1
+                return True
+
+            self._remember(key, now)
+            return False
+
+    def forget(self, key: str):
+        """Drop a key so a redelivery is processed again (e.g. after a failed dispatch)."""
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM webhook_keys WHERE key = ?", (key,))
+
+    def _remember(self, key: str, now: float):
+        # Called with the lock held
+        self._memory[key] = now
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _insert(self, key: str, now: float, cutoff: float) -> bool:
+        # Called with the lock held. False if a live row already exists;
+        # an expired row is taken over.
+        inserted = self._conn.execute(
+            "INSERT INTO webhook_keys (key, seen_at) VALUES (?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET seen_at = excluded.seen_at"
+            " WHERE webhook_keys.seen_at <= ?",
+            (key, now, cutoff),
+        ).rowcount > 0
+        if inserted:
+            self._inserts_since_prune += 1
+            if self._inserts_since_prune >= self.prune_every:
+                self._inserts_since_prune = 0
+                self._conn.execute("DELETE FROM webhook_keys WHERE seen_at <= ?", (cutoff,))
+        return inserted
+
+    # ==================== Stats ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Check/duplicate counters and the duplicate rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        checked = stats["checked"]
+        stats["duplicate_rate"] = round(stats["duplicates"] / checked, 4) if checked else 0.0
+        stats["ttl"] = self.ttl
+        stats["persistent"] = self.db_path is not None
+        return stats
+
+
+# Global instance
+_deduplicator: Optional[WebhookDeduplicator] = None
+
+
+def get_webhook_deduplicator() -> WebhookDeduplicator:
+    """Get or create the process-wide persistent deduplicator (data/webhooks.db)."""
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = WebhookDeduplicator(
+            db_path=Path(__file__).parent.parent.parent.parent / "data" / "webhooks.db"
+        )
+    return _deduplicator
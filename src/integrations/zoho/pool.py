@@ -0,0 +1,308 @@
+"""
+Process-wide Zoho CRM client pool.
+
+Every ZohoCRMHandler used to build its own CRMClient and run
+test_crm_connection() (a full API round-trip) on connect, and the dashboard
+status endpoint did the same on every poll. The pool instead keeps one
+shared client per process, so its HTTP session and OAuth token are reused,
+and moves the round-trips to a background thread:
+
+- Health checks run every `health_interval` seconds (sooner while
+  unhealthy); callers read the last known state from status()
+- OAuth access tokens are refreshed `refresh_margin` seconds before they
+  expire, when the client exposes its token expiry and a refresh method;
+  failed refreshes are retried with exponential backoff
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# Zoho access tokens are valid for one hour
+DEFAULT_TOKEN_LIFETIME = 3600.0
+
+# Upper bound on the delay between failed token refreshes
+MAX_REFRESH_BACKOFF = 600.0
+
+
+def _find_hook(client, *names: str):
+    """First attribute found on the client or its auth helper."""
+    for owner in (client, getattr(client, "auth", None)):
+        if owner is None:
+            continue
+        for name in names:
+            hook = getattr(owner, name, None)
+            if hook is not None:
+                return hook
+    return None
+
+
+class CRMClientPool:
+    """
+    Shares one CRM client and its connection state across the process.
+
+    Thread-safe. The background thread starts with the first client
+    request or status() call.
+    """
+
+    def __init__(
+        self,
+        client_factory: Optional[Callable[[], Any]] = None,
+        health_interval: float = 60.0,
+        retry_interval: float = 15.0,
+        refresh_margin: float = 300.0,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            client_factory: Builds the CRM client (None when the Zoho API
+                system is not installed)
+            health_interval: Seconds between health checks while healthy
+            retry_interval: Seconds between health checks while unhealthy,
+                and before the first retry of a failed token refresh
+            refresh_margin: Refresh the OAuth token this long before expiry
+        """
+        self.client_factory = client_factory
+        self.health_interval = health_interval
+        self.retry_interval = retry_interval
+        self.refresh_margin = refresh_margin
+
+        self._client = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._token_expires_at: Optional[float] = None
+        self._refresh_failures = 0
+        self._refresh_retry_at = 0.0  # Epoch seconds; backoff after failed refreshes
+        self._next_check = 0.0
+        self._state: Dict[str, Any] = {
+            "connected": None,  # Unknown until the first check
+            "checked_at": None,
+            "latency_ms": None,
+            "error": None,
+        }
+        self._stats = {
+            "checks": 0,
+            "failed_checks": 0,
+            "token_refreshes": 0,
+            "failed_refreshes": 0,
+            "clients_created": 0,
+        }
+
+    @property
+    def available(self) -> bool:
+        return self.client_factory is not None
+
+    # ==================== Client Access ====================
+
+    def get_client(self):
+        """
+        Return the shared client, creating it on first use.
+
+        Never performs a network round-trip; returns None if the client
+        cannot be built or the last health check failed.
+        """
+        if not self.available:
+            return None
+        self.start()
+        with self._lock:
+            if self._client is None:
+                try:
+                    self._client = self.client_factory()
+                    self._stats["clients_created"] += 1
+                except Exception as e:
+                    self._set_state(False, str(e))
+                    return None
+                self._token_expires_at = self._read_token_expiry(self._client)
+            if self._state["connected"] is False:
+                return None
+            return self._client
+
+    def mark_unhealthy(self, error: str):
+        """Record a failure seen by a caller and schedule a prompt recheck."""
+        with self._lock:
+            self._set_state(False, error)
+            self._next_check = min(self._next_check, time.monotonic() + self.retry_interval)
+        self._wake.set()
+
+    def status(self) -> Dict[str, Any]:
+        """Last known connection state (no network round-trip)."""
+        if not self.available:
+            return {"available": False, "connected": False,
+                    "error": "Zoho API system not available"}
+        self.start()
+        with self._lock:
+            expires_at = self._token_expires_at
+            status = {"available": True, **self._state, **self._stats}
+        status["token_expires_in"] = (
+            round(expires_at - time.time()) if expires_at is not None else None
+        )
+        return status
+
+    # ==================== Background Maintenance ====================
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self):
+        """Start the maintenance thread."""
+        if self.running or not self.available:
+            return
+        with self._lock:
+            if self.running:
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._loop, name="crm-client-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the maintenance thread."""
+        self._stop = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop:
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"CRM client pool error: {e}")
+            self._wake.wait(max(self._seconds_until_due(), 0.1))
+            self._wake.clear()
+
+    def _seconds_until_due(self) -> float:
+        with self._lock:
+            due = self._next_check - time.monotonic()
+            if self._token_expires_at is not None:
+                refresh_at = max(self._token_expires_at - self.refresh_margin, self._refresh_retry_at)
+                due = min(due, refresh_at - time.time())
+            return due
+
+    def maintain(self):
+        """Refresh the token and run a health check if either is due."""
+        with self._lock:
+            client = self._client
+            expires_at = self._token_expires_at
+            check_due = time.monotonic() >= self._next_check
+            refresh_allowed = time.time() >= self._refresh_retry_at
+        if client is None:
+            try:
+                client = self.client_factory()
+            except Exception as e:
+                with self._lock:
+                    self._set_state(False, str(e))
+                    self._next_check = time.monotonic() + self.retry_interval
+                return
+            with self._lock:
+                self._client = client
+                self._stats["clients_created"] += 1
+                self._token_expires_at = expires_at = self._read_token_expiry(client)
+
+        token_due = expires_at is not None and expires_at - time.time() <= self.refresh_margin
+        if token_due and refresh_allowed:
+            self.refresh_token()
+        if check_due:
+            self.check_health()
+
+    def refresh_token(self) -> bool:
+        """Refresh the shared client's OAuth access token now."""
+        with self._lock:
+            client = self._client
+        refresh = _find_hook(client, "refresh_access_token", "refresh_token") if client else None
+        if not callable(refresh):
+            return False
+        try:
+            refresh()
+        except Exception as e:
+            with self._lock:
+                self._stats["failed_refreshes"] += 1
+                self._set_state(False, f"Token refresh failed: {e}")
+                self._back_off_refresh()
+            return False
+        with self._lock:
+            self._stats["token_refreshes"] += 1
+            self._token_expires_at = expires_at = self._read_token_expiry(client)
+            if expires_at is not None and expires_at - time.time() <= self.refresh_margin:
+                # The client still reports a token that is due; don't spin on it
+                self._back_off_refresh()
+            else:
+                self._refresh_failures = 0
+                self._refresh_retry_at = 0.0
+        return True
+
+    def _back_off_refresh(self):
+        # Called with the lock held
+        delay = min(self.retry_interval * 2 ** self._refresh_failures, MAX_REFRESH_BACKOFF)
+        self._refresh_failures += 1
+        self._refresh_retry_at = time.time() + delay
+
+    def check_health(self) -> bool:
+        """Run test_crm_connection() now and record the result."""
+        with self._lock:
+            client = self._client
+        if client is None:
+            return False
+        started = time.perf_counter()
+        try:
+            result = client.test_crm_connection()
+            connected = bool(result.get("success", False))
+            error = None if connected else result.get("error", "Unknown error")
+        except Exception as e:
+            connected, error = False, str(e)
+        with self._lock:
+            self._stats["checks"] += 1
+            if not connected:
+                self._stats["failed_checks"] += 1
+            self._set_state(connected, error)
+            self._state["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            interval = self.health_interval if connected else self.retry_interval
+            self._next_check = time.monotonic() + interval
+        return connected
+
+    def _set_state(self, connected: bool, error: Optional[str]):
+        # Called with the lock held
+        self._state["connected"] = connected
+        self._state["error"] = error
+        self._state["checked_at"] = datetime.now().isoformat()
+
+    @staticmethod
+    def _read_token_expiry(client) -> Optional[float]:
+        """Token expiry as an epoch timestamp, if the client exposes one."""
+        expiry = _find_hook(client, "token_expires_at", "expires_at")
+        if callable(expiry):
+            try:
+                expiry = expiry()
+            except Exception:
+                return None
+        if isinstance(expiry, datetime):
+            return expiry.timestamp()
+        if isinstance(expiry, (int, float)):
+            return float(expiry)
+        # No expiry exposed, but a refresh hook exists: assume a standard token
+        if callable(_find_hook(client, "refresh_access_token", "refresh_token")):
+            return time.time() + DEFAULT_TOKEN_LIFETIME
+        return None
+
+
+# Global instance
+_client_pool: Optional[CRMClientPool] = None
+
+
+def get_client_pool(client_factory: Optional[Callable[[], Any]] = None) -> CRMClientPool:
+    """
+    Get or create the process-wide client pool.
+
+    Args:
+        client_factory: Used when the pool is first created
+    """
+    global _client_pool
+    if _client_pool is None:
+        _client_pool = CRMClientPool(client_factory)
+    return _client_pool
@@ -6,13 +6,24 @@ Receives webhooks from Zoho CRM and triggers corresponding SOPs:
 - Deal stage changes
 - Field value changes
 - Scheduled workflow triggers
+
+Redelivered webhooks are acknowledged without re-running SOPs (see
+WebhookDeduplicator).
 """
 
-from typing import Dict, Any, Optional, List, Callable
+from typing import Dict, Any, Optional, List, Callable, Tuple, Union
+from collections import ChainMap, OrderedDict
 from datetime import datetime
 import hashlib
 import hmac
 import json
+import threading
+
+from ...sop.conditions import (
+    Condition, ConditionError, compile_condition, compile_field_conditions,
+)
+from .cache import RecordCache, get_record_cache
+from .dedup import WebhookDeduplicator, delivery_key
 
 
 class ZohoWebhookHandler:
@@ -22,6 +33,13 @@ class ZohoWebhookHandler:
     Maps webhook events to SOP triggers.
     """
     
+    # Payload keys Zoho workflow webhooks can be configured to send with
+    # the list of fields an edit changed
+    CHANGED_FIELD_KEYS = ("changed_fields", "modified_fields")
+    
+    # Records whose watched field values are remembered for change detection
+    FIELD_CACHE_SIZE = 10_000
+    
     # Standard Zoho webhook event types
     EVENT_TYPES = {
         "module.create": "record_created",
@@ -33,15 +51,33 @@ class ZohoWebhookHandler:
         "lead.convert": "lead_converted",
     }
     
-    def __init__(self, webhook_secret: Optional[str] = None):
+    def __init__(
+        self,
+        webhook_secret: Optional[str] = None,
+        trigger_index=None,
+        record_cache: Optional[RecordCache] = None,
+        deduplicator: Optional[WebhookDeduplicator] = None
+    ):
         """
         Initialize webhook handler.
         
         Args:
             webhook_secret: Secret for validating webhook signatures
+            trigger_index: Optional TriggerIndex compiled from SOP definitions;
+                matched in addition to the hand-registered mappings
+            record_cache: CRM lookup cache to invalidate on record events
+                (default: the process-wide cache)
+            deduplicator: Store of deliveries already processed (default:
+                in-memory only; pass one with a db_path to persist)
         """
         self.webhook_secret = webhook_secret
+        self.trigger_index = trigger_index
+        self.record_cache = record_cache or get_record_cache()
+        self.deduplicator = deduplicator or WebhookDeduplicator()
         self._callbacks: Dict[str, List[Callable]] = {}
+        # (module, record_id) -> last seen values of fields with field triggers
+        self._field_values: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._field_lock = threading.Lock()
         self._sop_mappings: Dict[str, List[Dict[str, Any]]] = {}
     
     def register_callback(self, event_type: str, callback: Callable):
@@ -61,7 +97,7 @@ class ZohoWebhookHandler:
         event_type: str,
         sop_id: str,
         entity: str,
-        conditions: Optional[Dict[str, Any]] = None
+        conditions: Optional[Union[Dict[str, Any], str]] = None
     ):
         """
         Map a webhook event to an SOP trigger.
@@ -70,15 +106,27 @@ class ZohoWebhookHandler:
             event_type: Webhook event type
             sop_id: SOP to trigger
             entity: Entity the SOP belongs to
-            conditions: Optional conditions for triggering
+            conditions: Optional conditions for triggering - either a
+                {field: value | {"op": ..., "value": ...}} dict or a
+                condition expression string (see src/sop/conditions.py)
+            
+        Raises:
+            ConditionError: If the conditions are malformed
         """
         if event_type not in self._sop_mappings:
             self._sop_mappings[event_type] = []
         
+        # Compile once at registration instead of on every webhook
+        if isinstance(conditions, str):
+            compiled = compile_condition(conditions)
+        else:
+            compiled = compile_field_conditions(conditions) if conditions else None
+        
         self._sop_mappings[event_type].append({
             "sop_id": sop_id,
             "entity": entity,
-            "conditions": conditions or {}
+            "conditions": conditions or {},
+            "compiled": compiled,
         })
     
     def validate_signature(
@@ -167,6 +215,24 @@ class ZohoWebhookHandler:
         event = self.parse_webhook(data)
         event_type = event["event_type"]
         
+        # Zoho retries deliveries; acknowledge repeats without dispatching
+        key = delivery_key(event)
+        if self.deduplicator.check_and_record(key):
+            return {
+                "success": True,
+                "duplicate": True,
+                "delivery_key": key,
+                "event_type": event_type,
+                "module": event["module"],
+                "record_id": event["record_id"],
+                "callbacks_run": 0,
+                "triggered_sops": []
+            }
+        
+        # The record changed in Zoho; drop cached lookups that may include it
+        if event["record_id"]:
+            self.record_cache.invalidate(event["module"], event["record_id"])
+        
         # Execute callbacks
         callbacks_run = 0
         for callback in self._callbacks.get(event_type, []):
@@ -179,15 +245,34 @@ class ZohoWebhookHandler:
         # Find matching SOP triggers
         triggered_sops = []
         for mapping in self._sop_mappings.get(event_type, []):
-            if self._check_conditions(event, mapping.get("conditions", {})):
+            if self._check_conditions(event, mapping.get("compiled")):
                 triggered_sops.append({
                     "sop_id": mapping["sop_id"],
                     "entity": mapping["entity"],
                     "event": event
                 })
         
+        # SOPs whose own `triggers:` match this event
+        if self.trigger_index is not None:
+            changed = self._changed_fields(event)
+            event["changed_fields"] = changed
+            seen = {t["sop_id"] for t in triggered_sops}
+            for event_name in dict.fromkeys([event["original_event"], event_type]):
+                for entry in self.trigger_index.match_record_event(
+                    event["module"], event_name, event["record"], fields=changed, event=event
+                ):
+                    if entry.sop_id not in seen:
+                        seen.add(entry.sop_id)
+                        triggered_sops.append({
+                            "sop_id": entry.sop_id,
+                            "entity": entry.entity,
+                            "event": event
+                        })
+        
         return {
             "success": True,
+            "duplicate": False,
+            "delivery_key": key,
             "event_type": event_type,
             "module": event["module"],
             "record_id": event["record_id"],
@@ -195,17 +280,61 @@ class ZohoWebhookHandler:
             "triggered_sops": triggered_sops
         }
     
+    def _changed_fields(self, event: Dict[str, Any]) -> List[str]:
+        """
+        Fields an event changed, for field_update triggers.
+        
+        Uses the changed-field list when the payload carries one; otherwise
+        compares watched fields with the values seen in earlier events for
+        the same record. A field seen for the first time does not count as
+        changed, so an edit that leaves it alone never fires its trigger.
+        """
+        raw = event.get("raw") or {}
+        explicit = next((raw[k] for k in self.CHANGED_FIELD_KEYS if isinstance(raw.get(k), list)), None)
+        if not event.get("record_id"):
+            return list(explicit or [])
+        
+        record = event.get("record") or {}
+        watched = self.trigger_index.watched_fields(event["module"]) if self.trigger_index else []
+        current = {f: record[f] for f in watched if f in record}
+        key = (event["module"].lower(), str(event["record_id"]))
+        with self._field_lock:
+            previous = self._field_values.pop(key, {})
+            changed = [f for f, value in current.items() if f in previous and previous[f] != value]
+            self._field_values[key] = {**previous, **current}
+            while len(self._field_values) > self.FIELD_CACHE_SIZE:
+                self._field_values.popitem(last=False)
+        return list(explicit) if explicit is not None else changed
+    
+    def release(self, result: Dict[str, Any]):
+        """
+        Forget a processed delivery so Zoho's retry is dispatched again.
+        
+        Call when dispatching the SOPs triggered by `result` failed;
+        otherwise the retry would be acknowledged as a duplicate and the
+        event lost.
+        
+        Args:
+            result: Return value of process_webhook
+        """
+        key = result.get("delivery_key")
+        if key and not result.get("duplicate"):
+            self.deduplicator.forget(key)
+    
     def _check_conditions(
         self,
         event: Dict[str, Any],
-        conditions: Dict[str, Any]
+        conditions: Optional[Union[Condition, Dict[str, Any], str]]
     ) -> bool:
         """
         Check if event matches trigger conditions.
         
+        Fields resolve against the record first, then the parsed event
+        (so "module" or "user" can be matched too).
+        
         Args:
             event: Parsed event data
-            conditions: Conditions to check
+            conditions: Compiled condition, or raw conditions to compile
             
         Returns:
             True if all conditions match
@@ -213,30 +342,17 @@ class ZohoWebhookHandler:
         if not conditions:
             return True
         
-        record = event.get("record", {})
-        
-        for field, expected in conditions.items():
-            actual = record.get(field)
-            
-            if isinstance(expected, dict):
-                # Complex condition
-                op = expected.get("op", "equals")
-                value = expected.get("value")
-                
-                if op == "equals" and actual != value:
-                    return False
-                elif op == "not_equals" and actual == value:
-                    return False
-                elif op == "contains" and value not in str(actual):
-                    return False
-                elif op == "in" and actual not in value:
-                    return False
-            else:
-                # Simple equality
-                if actual != expected:
-                    return False
+        if not isinstance(conditions, Condition):
+            try:
+                if isinstance(conditions, str):
+                    conditions = compile_condition(conditions)
+                else:
+                    conditions = compile_field_conditions(conditions)
+            except ConditionError as e:
+                print(f"Invalid webhook condition: {e}")
+                return False
         
-        return True
+        return conditions(ChainMap(event.get("record") or {}, event))
     
     def get_mappings_summary(self) -> Dict[str, Any]:
         """Get summary of configured SOP mappings."""
@@ -249,10 +365,61 @@ class ZohoWebhookHandler:
                     for m in mappings
                 ]
                 for event, mappings in self._sop_mappings.items()
-            }
+            },
+            "trigger_index": self.trigger_index.get_summary() if self.trigger_index is not None else None,
+            "deduplication": self.deduplicator.get_stats()
         }
 
 
+async def dispatch_triggered_sops(
+    triggered_sops: List[Dict[str, Any]],
+    sop_engine=None,
+    job_queue=None
+) -> List[Dict[str, Any]]:
+    """
+    Queue or run the SOPs matched by process_webhook, one at a time.
+    
+    A failure is recorded against its SOP and does not stop the others,
+    so SOPs already dispatched are never dispatched again by a retry.
+    
+    Args:
+        triggered_sops: result["triggered_sops"] from process_webhook
+        sop_engine: Engine that runs SOPs inline (or looks up retry policies)
+        job_queue: Optional JobQueue; when set, SOPs are queued instead of run
+        
+    Returns:
+        One entry per SOP: {"sop_id", "job_id", "queued"} when queued,
+        {"sop_id", "success"} when run inline, {"sop_id", "error"} on failure
+    """
+    dispatched = []
+    for trigger in triggered_sops:
+        try:
+            if job_queue is not None:
+                from src.sop.job_queue import enqueue_sop_run
+                job_id = enqueue_sop_run(
+                    job_queue,
+                    trigger["sop_id"],
+                    trigger["entity"],
+                    trigger["event"],
+                    engine=sop_engine
+                )
+                dispatched.append({"sop_id": trigger["sop_id"], "job_id": job_id, "queued": True})
+            elif sop_engine is not None:
+                run = await sop_engine.execute_sop_async(trigger["sop_id"], event=trigger["event"])
+                dispatched.append({"sop_id": trigger["sop_id"], "success": run.get("success", False)})
+            else:
+                raise RuntimeError("SOP engine not available")
+        except Exception as e:
+            print(f"SOP dispatch error ({trigger['sop_id']}): {e}")
+            dispatched.append({"sop_id": trigger["sop_id"], "error": str(e)})
+    return dispatched
+
+
+def nothing_dispatched(dispatched: List[Dict[str, Any]]) -> bool:
+    """True if SOPs were matched but every dispatch failed."""
+    return bool(dispatched) and all("error" in entry for entry in dispatched)
+
+
 class ZohoWebhookRouter:
     """
     FastAPI router for Zoho webhooks.
@@ -264,10 +431,19 @@ class ZohoWebhookRouter:
     def __init__(
         self,
         handler: ZohoWebhookHandler,
-        sop_engine = None
+        sop_engine = None,
+        job_queue = None
     ):
+        """
+        Args:
+            handler: Webhook handler with SOP mappings
+            sop_engine: Engine used to run triggered SOPs
+            job_queue: Optional JobQueue; when set, triggered SOPs are queued
+                and run by background workers instead of inline
+        """
         self.handler = handler
         self.sop_engine = sop_engine
+        self.job_queue = job_queue
         self._setup_router()
     
     def _setup_router(self):
@@ -280,6 +456,7 @@ class ZohoWebhookRouter:
         @self.router.post("/zoho")
         async def receive_webhook(request: Request):
             """Receive Zoho webhook."""
+            result = None
             try:
                 data = await request.json()
                 signature = request.headers.get("X-Zoho-Signature")
@@ -289,25 +466,32 @@ class ZohoWebhookRouter:
                 if not result["success"]:
                     raise HTTPException(status_code=400, detail=result["error"])
                 
-                # Trigger SOPs if engine is available
-                if self.sop_engine and result.get("triggered_sops"):
-                    for trigger in result["triggered_sops"]:
-                        try:
-                            self.sop_engine.execute_sop(
-                                trigger["sop_id"],
-                                trigger["entity"],
-                                event=trigger["event"]
-                            )
-                        except Exception as e:
-                            print(f"SOP trigger error: {e}")
+                # Queue SOPs for background workers if a queue is configured,
+                # otherwise trigger them inline if an engine is available
+                dispatched = []
+                if result.get("triggered_sops") and (self.job_queue or self.sop_engine):
+                    dispatched = await dispatch_triggered_sops(
+                        result["triggered_sops"], self.sop_engine, self.job_queue
+                    )
+                if nothing_dispatched(dispatched):
+                    # Let Zoho's retry through the deduplicator
+                    self.handler.release(result)
+                    raise HTTPException(status_code=500, detail=dispatched[0]["error"])
                 
                 return JSONResponse({
                     "status": "ok",
                     "processed": True,
-                    "sops_triggered": len(result.get("triggered_sops", []))
+                    "duplicate": result.get("duplicate", False),
+                    "sops_triggered": dispatched,
+                    "job_ids": [entry["job_id"] for entry in dispatched if "job_id" in entry]
                 })
                 
+            except HTTPException:
+                raise
             except Exception as e:
+                # Nothing was dispatched yet: let Zoho's retry through the deduplicator
+                if result:
+                    self.handler.release(result)
                 raise HTTPException(status_code=500, detail=str(e))
         
         @self.router.get("/zoho/mappings")
@@ -3,11 +3,14 @@
 Approval workflow system for SOP steps that require human approval.
 """
 
+import heapq
 import json
+import sqlite3
+import threading
 import uuid
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 from enum import Enum
 
@@ -82,35 +85,221 @@ class ApprovalRequest:
         )
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS approvals (
+    id TEXT PRIMARY KEY,
+    sop_id TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT,
+    resolved_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_approvals_status ON approvals (status);
+CREATE INDEX IF NOT EXISTS idx_approvals_entity ON approvals (entity, status);
+CREATE INDEX IF NOT EXISTS idx_approvals_sop ON approvals (sop_id);
+CREATE INDEX IF NOT EXISTS idx_approvals_resolved ON approvals (resolved_at);
+
+CREATE TABLE IF NOT EXISTS approvals_archive (
+    id TEXT PRIMARY KEY,
+    sop_id TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT,
+    resolved_at TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMNS = "id, sop_id, entity, status, created_at, expires_at, resolved_at, data"
+
+
 class ApprovalManager:
     """
     Manages approval requests for SOP steps.
+    
+    Requests are stored in SQLite, one row per request, so create/resolve
+    only touch the affected row. Pending requests are also cached in memory;
+    resolved history is read from the database on demand and moved to an
+    archive table once it is older than the retention window.
+    
+    Deadlines are kept in a min-heap on expires_at. A background sweeper
+    (start_sweeper) sleeps until the earliest deadline, expires due requests
+    and notifies registered expiry callbacks.
     """
     
-    def __init__(self, storage_path: Optional[Path] = None):
-        self.storage_path = storage_path or Path(__file__).parent.parent.parent / "data" / "approvals.json"
-        self.requests: Dict[str, ApprovalRequest] = {}
+    # Resolutions between automatic retention passes
+    RETENTION_CHECK_EVERY = 500
+    
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        legacy_path: Optional[Path] = None,
+        retention_days: Optional[int] = 90,
+    ):
+        """
+        Initialize the approval manager.
+        
+        Args:
+            db_path: SQLite database path (default: data/approvals.db)
+            legacy_path: JSON file from older versions, imported once (default: data/approvals.json)
+            retention_days: Archive resolved requests older than this; None keeps everything
+        """
+        data_dir = Path(__file__).parent.parent.parent / "data"
+        self.db_path = db_path or data_dir / "approvals.db"
+        self.legacy_path = legacy_path or data_dir / "approvals.json"
+        self.retention_days = retention_days
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        
+        self._pending: Dict[str, ApprovalRequest] = {}
+        self._resolved_since_retention = 0
+        
+        # Min-heap of (expires_at, request_id); resolved entries are skipped lazily
+        self._expiry_heap: List[Tuple[datetime, str]] = []
+        self._expiry_callbacks: List[Callable[[ApprovalRequest], None]] = []
+        self._wakeup = threading.Condition(self._lock)
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = False
+        
+        self._migrate_json()
         self._load()
+        self.apply_retention()
     
-    def _load(self):
-        """Load existing requests from storage."""
-        if self.storage_path.exists():
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+    
+    # ==================== Storage ====================
+    
+    def _migrate_json(self):
+        """Import requests from the legacy JSON file (once)."""
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_migrated'"
+            ).fetchone()
+            if done or not self.legacy_path.exists():
+                return
+            
             try:
-                data = json.loads(self.storage_path.read_text())
-                for req_data in data.get("requests", []):
-                    req = ApprovalRequest.from_dict(req_data)
-                    self.requests[req.id] = req
+                data = json.loads(self.legacy_path.read_text())
+                rows = [
+                    self._to_row(ApprovalRequest.from_dict(r))
+                    for r in data.get("requests", [])
+                ]
             except Exception as e:
-                print(f"Warning: Could not load approvals: {e}")
-    
-    def _save(self):
-        """Persist requests to storage."""
-        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
-        data = {
-            "requests": [r.to_dict() for r in self.requests.values()],
-            "updated_at": datetime.now().isoformat(),
-        }
-        self.storage_path.write_text(json.dumps(data, indent=2))
+                print(f"Warning: Could not migrate approvals: {e}")
+                return
+            
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO approvals ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)",
+                    (datetime.now().isoformat(),),
+                )
+            if rows:
+                print(f"Migrated {len(rows)} approval requests from {self.legacy_path}")
+    
+    def _load(self):
+        """Load pending requests into memory."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM approvals WHERE status = ?",
+                (ApprovalStatus.PENDING.value,),
+            ).fetchall()
+        for row in rows:
+            req = ApprovalRequest.from_dict(json.loads(row["data"]))
+            self._pending[req.id] = req
+            if req.expires_at:
+                self._expiry_heap.append((req.expires_at, req.id))
+        heapq.heapify(self._expiry_heap)
+    
+    @staticmethod
+    def _to_row(request: ApprovalRequest) -> tuple:
+        data = request.to_dict()
+        return (
+            request.id,
+            request.sop_id,
+            request.entity,
+            request.status.value,
+            data["created_at"],
+            data["expires_at"],
+            data["resolved_at"],
+            json.dumps(data),
+        )
+    
+    def _save(self, request: ApprovalRequest):
+        """Insert or update a single request row."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO approvals ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._to_row(request),
+            )
+    
+    def _resolved(self, request: ApprovalRequest):
+        """Persist a resolved request and drop it from the pending cache."""
+        with self._lock:
+            self._save(request)
+            self._pending.pop(request.id, None)
+            # Heap entries are removed lazily; compact once they dominate
+            if len(self._expiry_heap) > 2 * len(self._pending) + 64:
+                self._expiry_heap = [
+                    (at, rid) for at, rid in self._expiry_heap if rid in self._pending
+                ]
+                heapq.heapify(self._expiry_heap)
+            self._resolved_since_retention += 1
+            if self._resolved_since_retention >= self.RETENTION_CHECK_EVERY:
+                self.apply_retention()
+    
+    def _fetch(self, where: str, params: tuple) -> List[ApprovalRequest]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM approvals WHERE {where} ORDER BY created_at", params
+            ).fetchall()
+        return [ApprovalRequest.from_dict(json.loads(r["data"])) for r in rows]
+    
+    def apply_retention(self) -> int:
+        """
+        Move resolved requests older than the retention window to the archive table.
+        
+        Returns:
+            Number of requests archived
+        """
+        self._resolved_since_retention = 0
+        if self.retention_days is None:
+            return 0
+        
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO approvals_archive ({_COLUMNS})"
+                f" SELECT {_COLUMNS} FROM approvals WHERE status != ? AND resolved_at < ?",
+                (ApprovalStatus.PENDING.value, cutoff),
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM approvals WHERE status != ? AND resolved_at < ?",
+                (ApprovalStatus.PENDING.value, cutoff),
+            )
+        return cursor.rowcount
+    
+    # ==================== Requests ====================
     
     def create_request(
         self,
@@ -154,13 +343,28 @@ class ApprovalManager:
         )
         
         if expires_in_hours:
-            from datetime import timedelta
             request.expires_at = datetime.now() + timedelta(hours=expires_in_hours)
         
-        self.requests[request.id] = request
-        self._save()
+        with self._lock:
+            self._save(request)
+            self._pending[request.id] = request
+            if request.expires_at:
+                heapq.heappush(self._expiry_heap, (request.expires_at, request.id))
+                # Wake the sweeper if this is now the earliest deadline
+                if self._expiry_heap[0][1] == request.id:
+                    self._wakeup.notify_all()
         return request
     
+    def _get_pending_request(self, request_id: str) -> ApprovalRequest:
+        request = self._pending.get(request_id)
+        if request:
+            return request
+        
+        existing = self.get_request(request_id)
+        if not existing:
+            raise ValueError(f"Request {request_id} not found")
+        raise ValueError(f"Request {request_id} is not pending (status: {existing.status.value})")
+    
     def approve(
         self,
         request_id: str,
@@ -168,19 +372,15 @@ class ApprovalManager:
         note: str = "",
     ) -> ApprovalRequest:
         """Approve a request."""
-        request = self.requests.get(request_id)
-        if not request:
-            raise ValueError(f"Request {request_id} not found")
-        
-        if request.status != ApprovalStatus.PENDING:
-            raise ValueError(f"Request {request_id} is not pending (status: {request.status.value})")
-        
-        request.status = ApprovalStatus.APPROVED
-        request.resolved_at = datetime.now()
-        request.resolved_by = approved_by
-        request.resolution_note = note
-        
-        self._save()
+        with self._lock:
+            request = self._get_pending_request(request_id)
+            
+            request.status = ApprovalStatus.APPROVED
+            request.resolved_at = datetime.now()
+            request.resolved_by = approved_by
+            request.resolution_note = note
+            
+            self._resolved(request)
         return request
     
     def reject(
@@ -190,75 +390,169 @@ class ApprovalManager:
         reason: str = "",
     ) -> ApprovalRequest:
         """Reject a request."""
-        request = self.requests.get(request_id)
-        if not request:
-            raise ValueError(f"Request {request_id} not found")
-        
-        if request.status != ApprovalStatus.PENDING:
-            raise ValueError(f"Request {request_id} is not pending (status: {request.status.value})")
-        
-        request.status = ApprovalStatus.REJECTED
-        request.resolved_at = datetime.now()
-        request.resolved_by = rejected_by
-        request.resolution_note = reason
-        
-        self._save()
+        with self._lock:
+            request = self._get_pending_request(request_id)
+            
+            request.status = ApprovalStatus.REJECTED
+            request.resolved_at = datetime.now()
+            request.resolved_by = rejected_by
+            request.resolution_note = reason
+            
+            self._resolved(request)
         return request
     
     def cancel(self, request_id: str) -> ApprovalRequest:
         """Cancel a pending request."""
-        request = self.requests.get(request_id)
-        if not request:
-            raise ValueError(f"Request {request_id} not found")
-        
-        request.status = ApprovalStatus.CANCELLED
-        request.resolved_at = datetime.now()
-        
-        self._save()
+        with self._lock:
+            request = self._pending.get(request_id) or self.get_request(request_id)
+            if not request:
+                raise ValueError(f"Request {request_id} not found")
+            
+            request.status = ApprovalStatus.CANCELLED
+            request.resolved_at = datetime.now()
+            
+            self._resolved(request)
         return request
     
     def get_pending(self, entity: Optional[str] = None) -> List[ApprovalRequest]:
-        """Get all pending approval requests."""
-        pending = [
-            r for r in self.requests.values()
-            if r.status == ApprovalStatus.PENDING
-        ]
-        
-        if entity:
-            pending = [r for r in pending if r.entity == entity]
+        """
+        Get all pending approval requests.
         
-        # Check for expirations
+        Read-only: requests past their deadline are left out but only marked
+        expired by expire_due() / the sweeper.
+        """
         now = datetime.now()
-        for req in pending:
-            if req.expires_at and req.expires_at < now:
-                req.status = ApprovalStatus.EXPIRED
-                req.resolved_at = now
+        with self._lock:
+            pending = list(self._pending.values())
         
-        self._save()
+        return [
+            r for r in pending
+            if (not entity or r.entity == entity)
+            and not (r.expires_at and r.expires_at <= now)
+        ]
+    
+    # ==================== Expiry ====================
+    
+    def register_expiry_callback(self, callback: Callable[[ApprovalRequest], None]):
+        """
+        Register a callback for expired requests.
+        
+        Args:
+            callback: Called with each ApprovalRequest after it expires
+        """
+        self._expiry_callbacks.append(callback)
+    
+    def next_expiry(self) -> Optional[datetime]:
+        """Earliest deadline among pending requests."""
+        with self._lock:
+            self._drop_stale_heap_entries()
+            return self._expiry_heap[0][0] if self._expiry_heap else None
+    
+    def _drop_stale_heap_entries(self):
+        heap = self._expiry_heap
+        while heap:
+            at, rid = heap[0]
+            request = self._pending.get(rid)
+            if request and request.expires_at == at:
+                return
+            heapq.heappop(heap)
+    
+    def expire_due(self, now: Optional[datetime] = None) -> List[ApprovalRequest]:
+        """
+        Expire every pending request whose deadline has passed.
+        
+        Args:
+            now: Reference time (default: now)
+            
+        Returns:
+            Requests that were expired
+        """
+        now = now or datetime.now()
+        expired = []
+        with self._lock:
+            while True:
+                self._drop_stale_heap_entries()
+                if not self._expiry_heap or self._expiry_heap[0][0] > now:
+                    break
+                _, rid = heapq.heappop(self._expiry_heap)
+                request = self._pending[rid]
+                request.status = ApprovalStatus.EXPIRED
+                request.resolved_at = now
+                request.resolution_note = "Approval expired"
+                self._resolved(request)
+                expired.append(request)
         
-        return [r for r in pending if r.status == ApprovalStatus.PENDING]
+        # Callbacks run outside the lock so they may call back into the manager
+        for request in expired:
+            for callback in self._expiry_callbacks:
+                try:
+                    callback(request)
+                except Exception as e:
+                    print(f"Expiry callback error: {e}")
+        return expired
+    
+    def start_sweeper(self):
+        """Start the background thread that expires requests when they are due."""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._stop_sweeper = False
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, name="approval-expiry-sweeper", daemon=True
+        )
+        self._sweeper.start()
+    
+    def stop_sweeper(self, timeout: float = 5.0):
+        """Stop the background sweeper."""
+        with self._lock:
+            self._stop_sweeper = True
+            self._wakeup.notify_all()
+        if self._sweeper:
+            self._sweeper.join(timeout)
+        self._sweeper = None
+    
+    def _sweep_loop(self):
+        while True:
+            with self._lock:
+                if self._stop_sweeper:
+                    return
+                deadline = self.next_expiry()
+                if deadline is None or deadline > datetime.now():
+                    timeout = None if deadline is None else (deadline - datetime.now()).total_seconds()
+                    self._wakeup.wait(timeout)
+                    continue
+            try:
+                self.expire_due()
+            except Exception as e:
+                print(f"Approval sweeper error: {e}")
     
     def get_request(self, request_id: str) -> Optional[ApprovalRequest]:
         """Get a specific request."""
-        return self.requests.get(request_id)
+        if request_id in self._pending:
+            return self._pending[request_id]
+        found = self._fetch("id = ?", (request_id,))
+        return found[0] if found else None
     
     def get_by_sop(self, sop_id: str) -> List[ApprovalRequest]:
         """Get all requests for a specific SOP."""
-        return [r for r in self.requests.values() if r.sop_id == sop_id]
+        return self._fetch("sop_id = ?", (sop_id,))
     
     def get_stats(self) -> Dict[str, Any]:
         """Get approval statistics."""
-        by_status = {}
-        by_entity = {}
-        
-        for req in self.requests.values():
-            status = req.status.value
-            by_status[status] = by_status.get(status, 0) + 1
-            by_entity[req.entity] = by_entity.get(req.entity, 0) + 1
+        with self._lock:
+            by_status = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM approvals GROUP BY status"
+            ).fetchall())
+            by_entity = dict(self._conn.execute(
+                "SELECT entity, COUNT(*) FROM approvals GROUP BY entity"
+            ).fetchall())
+            archived = self._conn.execute(
+                "SELECT COUNT(*) FROM approvals_archive"
+            ).fetchone()[0]
         
         return {
-            "total": len(self.requests),
+            "total": sum(by_status.values()),
             "pending": len(self.get_pending()),
+            "archived": archived,
             "by_status": by_status,
             "by_entity": by_entity,
         }
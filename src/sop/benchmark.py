@@ -0,0 +1,505 @@
+# src/sop/benchmark.py
+"""
+Throughput/latency benchmark for EnhancedSOPEngine.
+
+Synthetic SOP definitions (step count, step-type mix, conditions, loop
+sizes) run against stubbed MixPost, CRM and LLM clients with a configurable
+latency, so engine changes (parallelism, async, condition compilation) can
+be compared on numbers rather than impressions.
+
+Measured per scenario:
+- steps/sec and executions/sec
+- p50/p99 per-step engine overhead (wall time minus stub latency)
+- peak traced memory per execution
+- history growth (entries and retained bytes per execution)
+
+Usage:
+    python -m src.sop.benchmark --out bench.json
+    python -m src.sop.benchmark --quick --latency-ms 5
+    python -m src.sop.benchmark --out new.json --compare bench.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import math
+import platform as _platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add parent to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from .engine import EnhancedSOPEngine
+
+ENTITY = "dsaic"
+SERVICES = ["Tutoring", "Certification", "Workshops", "Consulting"]
+
+
+# =============================================================================
+# STUB CLIENTS
+# =============================================================================
+
+class _LatencyStub:
+    """Base for stub clients: sleeps `latency_ms` per call and counts it."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        self._record()
+
+    async def _wait_async(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        self._record()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.busy = 0.0
+
+    def _record(self):
+        with self._lock:
+            self.calls += 1
+            self.busy += self.latency
+
+
+class StubMixpostClient(_LatencyStub):
+    """Stands in for MixpostClient.create_post."""
+
+    def create_post(self, post_data: Dict[str, Any]) -> Dict[str, Any]:
+        self._wait()
+        return {"id": f"bench-{self.calls}", "status": "scheduled"}
+
+
+class StubAIClient(_LatencyStub):
+    """Stands in for the LLM client (sync and async generate)."""
+
+    supports_system_prompt = True
+
+    def generate(self, prompt: str, **kwargs: Any) -> Dict[str, Any]:
+        self._wait()
+        return {"content": f"Generated post for: {prompt[:40]}", "model": "stub"}
+
+    async def generate_async(self, prompt: str, **kwargs: Any) -> Dict[str, Any]:
+        await self._wait_async()
+        return {"content": f"Generated post for: {prompt[:40]}", "model": "stub"}
+
+
+class StubCRMHandler(_LatencyStub):
+    """Stands in for CRMStepHandler (handle_step / handle_step_async)."""
+
+    def handle_step(
+        self,
+        step_type: str,
+        config: Dict[str, Any],
+        context: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        self._wait()
+        return {"success": True, "record_id": f"crm-{self.calls}", "module": config.get("module")}
+
+    async def handle_step_async(
+        self,
+        step_type: str,
+        config: Dict[str, Any],
+        context: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        await self._wait_async()
+        return {"success": True, "record_id": f"crm-{self.calls}", "module": config.get("module")}
+
+
+# =============================================================================
+# SYNTHETIC DEFINITIONS
+# =============================================================================
+
+@dataclass
+class Scenario:
+    """One benchmark configuration."""
+    name: str
+    steps: int = 10
+    step_types: List[str] = field(default_factory=lambda: ["transform", "condition"])
+    condition_ratio: float = 0.0
+    loop_size: int = 0
+    parallel: bool = False
+    use_async: bool = False
+    executions: int = 200
+    latency_ms: float = 0.0
+    dry_run: bool = False
+
+
+def _step_config(step_type: str, index: int, loop_size: int) -> Dict[str, Any]:
+    """Config for one synthetic step of the given type."""
+    if step_type == "social_post":
+        return {"content": "Enrollment open for {{service}} at {{location}}",
+                "platforms": ["twitter"], "hashtags": ["#DSAIC"]}
+    if step_type == "content_generate":
+        return {"type": "social_post", "prompt_template": "Announce {{service}} in {{location}}",
+                "output_variable": f"post_{index}"}
+    if step_type in ("crm_create", "crm_update"):
+        return {"module": "Leads", "data": {"Last_Name": "{{name}}", "Service": "{{service}}"}}
+    if step_type == "condition":
+        return {"expression": "Amount >= 500 AND Selected_Services contains 'Tutoring'",
+                "on_true": f"step_{index + 1}"}
+    if step_type == "loop":
+        return {"items": list(range(loop_size)), "item_variable": "item",
+                "steps": [{"id": "inner", "name": "Inner", "type": "transform",
+                           "config": {"operations": [{"field": "doubled", "expression": "item * 2"}]}}]}
+    if step_type == "transform":
+        return {"operations": [
+            {"field": f"value_{index}", "expression": "Amount * 1.1 + (Status == 'Open' ? 5 : 0)"},
+        ]}
+    if step_type == "schedule_content":
+        return {"content": "Weekly update", "platforms": ["facebook"]}
+    return {"index": index}
+
+
+def build_definition(scenario: Scenario) -> Dict[str, Any]:
+    """
+    Build a synthetic SOP definition for a scenario.
+
+    Step types cycle through `scenario.step_types`; every step after the
+    first depends on its predecessor except every third one, so parallel
+    mode has some independent work. A `condition_ratio` share of steps
+    carries a step-level `condition`, alternating true and false.
+    """
+    types = list(scenario.step_types)
+    if scenario.loop_size and "loop" not in types:
+        types.append("loop")
+    guard_every = round(1 / scenario.condition_ratio) if scenario.condition_ratio > 0 else 0
+
+    steps = []
+    for i in range(scenario.steps):
+        step_type = types[i % len(types)]
+        step = {
+            "id": f"step_{i}",
+            "name": f"Step {i} ({step_type})",
+            "type": step_type,
+            "config": _step_config(step_type, i, scenario.loop_size),
+            "on_failure": "continue",
+        }
+        if i and i % 3:
+            step["depends_on"] = [f"step_{i - 1}"]
+        if guard_every and i % guard_every == 0:
+            step["condition"] = ("Amount > 100" if (i // guard_every) % 2 == 0
+                                 else "Status == 'Closed'")
+        steps.append(step)
+
+    return {
+        "sop_id": f"bench_{scenario.name}",
+        "name": f"Benchmark {scenario.name}",
+        "entity": ENTITY,
+        "trigger": {"type": "event", "event": "bench.run"},
+        "config": {"parallel": scenario.parallel},
+        "steps": steps,
+    }
+
+
+def build_event(index: int) -> Dict[str, Any]:
+    """Synthetic trigger event; varies per execution so nothing is trivially cached."""
+    return {
+        "event_type": "bench.run",
+        "data": {
+            "name": f"Lead {index}",
+            "service": SERVICES[index % len(SERVICES)],
+            "location": "Downtown",
+            "Amount": 250 + (index % 10) * 100,
+            "Status": "Open",
+            "Selected_Services": SERVICES[: 1 + index % len(SERVICES)],
+        },
+    }
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def make_engine(latency_ms: float = 0.0, max_workers: int = 4) -> EnhancedSOPEngine:
+    """Engine wired to latency stubs instead of MixPost, CRM and the LLM."""
+    engine = EnhancedSOPEngine(
+        mixpost_client=StubMixpostClient(latency_ms),
+        ai_client=StubAIClient(latency_ms),
+        max_workers=max_workers,
+    )
+    if engine.crm_handler is not None:
+        engine.crm_handler = StubCRMHandler(latency_ms)
+    return engine
+
+
+def _stubs(engine: EnhancedSOPEngine) -> List[_LatencyStub]:
+    candidates = [engine.mixpost_client, engine.ai_client, engine.crm_handler]
+    return [c for c in candidates if isinstance(c, _LatencyStub)]
+
+
+def _stub_busy(engine: EnhancedSOPEngine) -> float:
+    return sum(stub.busy for stub in _stubs(engine))
+
+
+def _execute(engine: EnhancedSOPEngine, scenario: Scenario, sop_id: str, index: int) -> Dict:
+    event = build_event(index)
+    if scenario.use_async:
+        return asyncio.run(engine.execute_sop_async(sop_id, event, dry_run=scenario.dry_run))
+    return engine.execute_sop(sop_id, event, dry_run=scenario.dry_run)
+
+
+def run_scenario(scenario: Scenario, warmup: int = 5, memory_samples: int = 20) -> Dict[str, Any]:
+    """
+    Run one scenario and return its metrics.
+
+    Timing runs without tracemalloc; memory is measured afterwards on a
+    fresh engine so tracing overhead does not skew the timings.
+
+    Per-step overhead is the execution's wall time minus the stub latency
+    it waited on, divided by the steps it executed. With parallel steps the
+    stub waits overlap, so overhead is only reported for sequential runs.
+    """
+    definition = build_definition(scenario)
+    sop_id = definition["sop_id"]
+
+    engine = make_engine(scenario.latency_ms)
+    engine._compile_conditions(definition)
+    engine._definitions[sop_id] = definition
+
+    for i in range(warmup):
+        _execute(engine, scenario, sop_id, i)
+    engine.history.clear()
+    for stub in _stubs(engine):
+        stub.reset()
+
+    walls: List[float] = []
+    overheads: List[float] = []
+    steps_executed = 0
+    failures = 0
+    gc.collect()
+    started = time.perf_counter()
+    for i in range(scenario.executions):
+        busy_before = _stub_busy(engine)
+        t0 = time.perf_counter()
+        result = _execute(engine, scenario, sop_id, i)
+        wall = time.perf_counter() - t0
+        count = len(result.get("step_results", []))
+        steps_executed += count
+        failures += not result.get("success", False)
+        walls.append(wall)
+        if count and not scenario.parallel:
+            busy = _stub_busy(engine) - busy_before
+            overheads.append(max(0.0, wall - busy) / count)
+    elapsed = time.perf_counter() - started
+
+    metrics = {
+        "scenario": asdict(scenario),
+        "executions": scenario.executions,
+        "failures": failures,
+        "steps_executed": steps_executed,
+        "elapsed_s": round(elapsed, 4),
+        "executions_per_sec": round(scenario.executions / elapsed, 2) if elapsed else 0.0,
+        "steps_per_sec": round(steps_executed / elapsed, 2) if elapsed else 0.0,
+        "execution_ms": {
+            "p50": round(percentile(walls, 50) * 1000, 3),
+            "p99": round(percentile(walls, 99) * 1000, 3),
+            "max": round(max(walls, default=0.0) * 1000, 3),
+        },
+        "step_overhead_us": None,
+        "stub_calls": sum(stub.calls for stub in _stubs(engine)),
+        "history_entries": engine.history.count(),
+    }
+    if overheads:
+        metrics["step_overhead_us"] = {
+            "p50": round(percentile(overheads, 50) * 1e6, 2),
+            "p99": round(percentile(overheads, 99) * 1e6, 2),
+        }
+    metrics.update(measure_memory(scenario, definition, memory_samples))
+    return metrics
+
+
+def measure_memory(scenario: Scenario, definition: Dict[str, Any], samples: int) -> Dict[str, Any]:
+    """Peak traced bytes per execution and bytes retained by execution history."""
+    engine = make_engine(0.0)
+    sop_id = definition["sop_id"]
+    engine._compile_conditions(definition)
+    engine._definitions[sop_id] = definition
+    probe = Scenario(**{**asdict(scenario), "latency_ms": 0.0})
+    _execute(engine, probe, sop_id, 0)
+    engine.history.clear()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        peaks = []
+        for i in range(samples):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            _execute(engine, probe, sop_id, i)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    history = engine.history.count()
+    return {
+        "memory_per_execution_bytes": {
+            "p50": int(percentile(peaks, 50)),
+            "max": int(max(peaks, default=0)),
+        },
+        "history_growth": {
+            "executions": samples,
+            "entries": history,
+            "retained_bytes": retained - baseline,
+            "bytes_per_execution": int((retained - baseline) / samples) if samples else 0,
+        },
+    }
+
+
+# =============================================================================
+# SUITE
+# =============================================================================
+
+MIXED_TYPES = ["content_generate", "social_post", "crm_create", "condition", "transform"]
+
+
+def default_scenarios(executions: int = 200, latency_ms: float = 0.0) -> List[Scenario]:
+    """The standard scenario matrix."""
+    base = dict(executions=executions, latency_ms=latency_ms)
+    return [
+        Scenario("engine_only_10", steps=10, **base),
+        Scenario("engine_only_50", steps=50, **base),
+        Scenario("conditions_50pct", steps=20, condition_ratio=0.5, **base),
+        Scenario("loop_10x", steps=10, loop_size=10, **base),
+        Scenario("loop_100x", steps=10, loop_size=100, **base),
+        Scenario("mixed_sequential", steps=20, step_types=MIXED_TYPES, **base),
+        Scenario("mixed_parallel", steps=20, step_types=MIXED_TYPES, parallel=True, **base),
+        Scenario("mixed_async", steps=20, step_types=MIXED_TYPES, use_async=True, **base),
+        Scenario("mixed_async_parallel", steps=20, step_types=MIXED_TYPES,
+                 use_async=True, parallel=True, **base),
+        Scenario("dry_run_50", steps=50, step_types=MIXED_TYPES, dry_run=True, **base),
+    ]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(scenarios: List[Scenario], progress: bool = False) -> Dict[str, Any]:
+    """
+    Run scenarios and return a JSON-serializable report.
+
+    Args:
+        scenarios: Scenarios to run, in order
+        progress: Print one line per scenario as it finishes
+
+    Returns:
+        Dict with run metadata and per-scenario metrics keyed by name
+    """
+    results = {}
+    for scenario in scenarios:
+        metrics = run_scenario(scenario)
+        results[scenario.name] = metrics
+        if progress:
+            overhead = metrics["step_overhead_us"]
+            print(f"{scenario.name:24} {metrics['steps_per_sec']:>12.1f} steps/s  "
+                  f"exec p50 {metrics['execution_ms']['p50']:>8.3f} ms  "
+                  f"step overhead p50 {overhead['p50'] if overhead else '-':>8} us  "
+                  f"mem {metrics['memory_per_execution_bytes']['p50']:>8} B")
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": _platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Relative change of key metrics between two reports.
+
+    Returns:
+        {scenario: {metric: percent change}} for scenarios present in both
+    """
+    def pick(metrics: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        overhead = metrics.get("step_overhead_us") or {}
+        return {
+            "steps_per_sec": metrics.get("steps_per_sec"),
+            "execution_p50_ms": metrics.get("execution_ms", {}).get("p50"),
+            "execution_p99_ms": metrics.get("execution_ms", {}).get("p99"),
+            "step_overhead_p50_us": overhead.get("p50"),
+            "memory_p50_bytes": metrics.get("memory_per_execution_bytes", {}).get("p50"),
+            "history_bytes_per_execution": metrics.get("history_growth", {}).get("bytes_per_execution"),
+        }
+
+    changes = {}
+    for name, metrics in current.get("results", {}).items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        new_values, old_values = pick(metrics), pick(old)
+        changes[name] = {
+            key: round((new_values[key] - old_values[key]) / old_values[key] * 100, 1)
+            for key in new_values
+            if new_values[key] is not None and old_values[key]
+        }
+    return changes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the SOP engine")
+    parser.add_argument("--out", type=Path, help="Write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON report to diff against")
+    parser.add_argument("--executions", type=int, default=200, help="Executions per scenario")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stub client latency")
+    parser.add_argument("--quick", action="store_true", help="20 executions per scenario")
+    parser.add_argument("--only", nargs="*", help="Scenario names to run")
+    args = parser.parse_args(argv)
+
+    scenarios = default_scenarios(20 if args.quick else args.executions, args.latency_ms)
+    if args.only:
+        scenarios = [s for s in scenarios if s.name in args.only]
+
+    report = run_suite(scenarios, progress=True)
+    if args.compare:
+        report["comparison"] = compare(report, json.loads(args.compare.read_text()))
+        for name, changes in report["comparison"].items():
+            summary = ", ".join(f"{k} {v:+.1f}%" for k, v in changes.items())
+            print(f"{name:24} {summary}")
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
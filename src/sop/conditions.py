@@ -0,0 +1,488 @@
+# src/sop/conditions.py
+"""
+Compiled condition expressions shared by the SOP engine and webhook routing.
+
+Conditions are parsed once into a tree of closures and cached by source
+text (field-conditions dicts by their contents), so evaluating one is a
+handful of Python calls.
+
+Syntax:
+    Severity == 'High' AND Assigned_To == null
+    Time_To_SLA_Hours <= (SLA_Hours * 0.25) AND Status != 'Resolved'
+    NOT (Stage in ['Closed Won', 'Closed Lost'])
+    Selected_Services contains 'Tutoring' OR Customer_Phone exists
+    By_Category.snacks.length > 0
+
+- Boolean: AND / OR / NOT (any case), parentheses
+- Comparison: == (or =), !=, >, >=, <, <=, in, not in, contains, exists, not exists
+- Arithmetic: + - * / and unary minus
+- Literals: 'text', "text", numbers, true, false, null, [lists]
+- Fields: dotted paths into nested dicts/lists; `.length` gives len()
+
+Comparisons are lenient about types, since CRM and webhook payloads often
+carry numbers and booleans as strings: "5" == 5 and "true" == true.
+Ordering comparisons against missing or non-numeric values are false.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Set, Tuple
+
+
+class ConditionError(ValueError):
+    """Raised when a condition expression cannot be parsed."""
+
+
+class _Missing:
+    """Sentinel for absent fields (distinct from an explicit None)."""
+
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<op>==|!=|>=|<=|=|>|<|\+|-|\*|/|\(|\)|\[|\]|,)
+      | (?P<name>[A-Za-z_][\w]*(?:\.[\w]+)*)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {"and", "or", "not", "in", "contains", "exists", "true", "false", "null", "none"}
+
+Evaluator = Callable[[Mapping[str, Any]], Any]
+
+
+# ==================== Value helpers ====================
+
+def resolve_path(context: Mapping[str, Any], path: str) -> Any:
+    """Resolve a dotted field path; returns MISSING if any segment is absent."""
+    current: Any = context
+    for part in path.split("."):
+        if isinstance(current, Mapping):
+            current = current.get(part, MISSING)
+        elif part == "length" and hasattr(current, "__len__"):
+            current = len(current)
+        elif isinstance(current, (list, tuple)) and part.isdigit():
+            index = int(part)
+            current = current[index] if index < len(current) else MISSING
+        else:
+            return MISSING
+        if current is MISSING:
+            return MISSING
+    return current
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None or value is MISSING:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_bool(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    return None
+
+
+def loose_equals(a: Any, b: Any) -> bool:
+    """Equality that tolerates numbers/booleans encoded as strings."""
+    if a is MISSING:
+        a = None
+    if b is MISSING:
+        b = None
+    if a is None or b is None:
+        return a is None and b is None
+    if isinstance(a, bool) or isinstance(b, bool):
+        ba, bb = _to_bool(a), _to_bool(b)
+        return ba is not None and ba == bb
+    na, nb = _to_number(a), _to_number(b)
+    if na is not None and nb is not None:
+        return na == nb
+    if isinstance(a, (list, dict)) or isinstance(b, (list, dict)):
+        return a == b
+    return str(a) == str(b)
+
+
+def _ordered(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(a: Any, b: Any) -> bool:
+        na, nb = _to_number(a), _to_number(b)
+        if na is not None and nb is not None:
+            return op(na, nb)
+        if isinstance(a, str) and isinstance(b, str):
+            return op(a, b)
+        return False
+    return compare
+
+
+def _contains(container: Any, item: Any) -> bool:
+    if container is None or container is MISSING:
+        return False
+    if isinstance(container, (list, tuple, set)):
+        return any(loose_equals(x, item) for x in container)
+    if isinstance(container, Mapping):
+        return item in container
+    return str(item) in str(container)
+
+
+def _exists(value: Any) -> bool:
+    return value is not MISSING and value is not None and value != ""
+
+
+def _arith(op: str) -> Callable[[Any, Any], Any]:
+    def apply(a: Any, b: Any) -> Any:
+        na, nb = _to_number(a), _to_number(b)
+        if na is None or nb is None:
+            if op == "+" and isinstance(a, str) and isinstance(b, str):
+                return a + b
+            return None
+        if op == "+":
+            return na + nb
+        if op == "-":
+            return na - nb
+        if op == "*":
+            return na * nb
+        return na / nb if nb else None
+    return apply
+
+
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": loose_equals,
+    "=": loose_equals,
+    "!=": lambda a, b: not loose_equals(a, b),
+    ">": _ordered(lambda a, b: a > b),
+    ">=": _ordered(lambda a, b: a >= b),
+    "<": _ordered(lambda a, b: a < b),
+    "<=": _ordered(lambda a, b: a <= b),
+    "in": lambda a, b: _contains(b, a),
+    "not in": lambda a, b: not _contains(b, a),
+    "contains": _contains,
+}
+
+
+# ==================== Parser ====================
+
+def _tokenize(
+    text: str,
+    pattern: re.Pattern = _TOKEN,
+    keywords: Set[str] = _KEYWORDS,
+) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = pattern.match(text, pos)
+        if not match or match.end() == pos:
+            raise ConditionError(f"Unexpected character at {pos} in condition: {text!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "name" and value.lower() in keywords:
+            kind, value = "kw", value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive-descent parser producing closures over a context mapping.
+
+    Subclasses extend the grammar through `token_pattern`, `keywords` and
+    `_expression` (the rule used at the top level and inside parentheses).
+    """
+
+    token_pattern = _TOKEN
+    keywords = _KEYWORDS
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text, self.token_pattern, self.keywords)
+        self.pos = 0
+        self.fields: Set[str] = set()
+
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _accept(self, kind: str, value: Optional[str] = None) -> bool:
+        tok_kind, tok_value = self._peek()
+        if tok_kind == kind and (value is None or tok_value == value):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, value: str):
+        if not self._accept(kind, value):
+            raise ConditionError(f"Expected '{value}' in condition: {self.text!r}")
+
+    def parse(self) -> Evaluator:
+        if not self.tokens:
+            raise ConditionError("Empty condition")
+        node = self._expression()
+        if self.pos != len(self.tokens):
+            raise ConditionError(f"Unexpected '{self._peek()[1]}' in condition: {self.text!r}")
+        return node
+
+    def _expression(self) -> Evaluator:
+        return self._or()
+
+    def _or(self) -> Evaluator:
+        terms = [self._and()]
+        while self._accept("kw", "or"):
+            terms.append(self._and())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda ctx: any(t(ctx) for t in terms)
+
+    def _and(self) -> Evaluator:
+        terms = [self._not()]
+        while self._accept("kw", "and"):
+            terms.append(self._not())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda ctx: all(t(ctx) for t in terms)
+
+    def _not(self) -> Evaluator:
+        if self._accept("kw", "not"):
+            inner = self._not()
+            return lambda ctx: not inner(ctx)
+        return self._comparison()
+
+    def _comparison(self) -> Evaluator:
+        left = self._additive()
+
+        if self._accept("kw", "exists"):
+            return lambda ctx: _exists(left(ctx))
+        if self._peek() == ("kw", "not") and self.pos + 1 < len(self.tokens):
+            following = self.tokens[self.pos + 1]
+            if following in (("kw", "exists"), ("kw", "in")):
+                self.pos += 2
+                if following[1] == "exists":
+                    return lambda ctx: not _exists(left(ctx))
+                right = self._additive()
+                return lambda ctx: _COMPARISONS["not in"](left(ctx), right(ctx))
+
+        kind, value = self._peek()
+        if (kind == "op" and value in _COMPARISONS) or (kind == "kw" and value in ("in", "contains")):
+            self.pos += 1
+            compare = _COMPARISONS[value]
+            right = self._additive()
+            return lambda ctx: compare(left(ctx), right(ctx))
+        return left
+
+    def _additive(self) -> Evaluator:
+        node = self._term()
+        while self._peek() in (("op", "+"), ("op", "-")):
+            apply = _arith(self._peek()[1])
+            self.pos += 1
+            left, right = node, self._term()
+            node = (lambda lf, rf, fn: lambda ctx: fn(lf(ctx), rf(ctx)))(left, right, apply)
+        return node
+
+    def _term(self) -> Evaluator:
+        node = self._unary()
+        while self._peek() in (("op", "*"), ("op", "/")):
+            apply = _arith(self._peek()[1])
+            self.pos += 1
+            left, right = node, self._unary()
+            node = (lambda lf, rf, fn: lambda ctx: fn(lf(ctx), rf(ctx)))(left, right, apply)
+        return node
+
+    def _unary(self) -> Evaluator:
+        if self._accept("op", "-"):
+            inner = self._unary()
+            negate = _arith("*")
+            return lambda ctx: negate(inner(ctx), -1)
+        return self._primary()
+
+    def _primary(self) -> Evaluator:
+        kind, value = self._peek()
+        if kind is None:
+            raise ConditionError(f"Unexpected end of condition: {self.text!r}")
+        self.pos += 1
+
+        if kind == "number":
+            number = float(value) if "." in value else int(value)
+            return lambda ctx: number
+        if kind == "string":
+            text = re.sub(r"\\(.)", r"\1", value[1:-1])
+            return lambda ctx: text
+        if kind == "kw" and value in ("true", "false"):
+            flag = value == "true"
+            return lambda ctx: flag
+        if kind == "kw" and value in ("null", "none"):
+            return lambda ctx: None
+        if kind == "name":
+            if self._peek() == ("op", "("):
+                raise ConditionError(f"Function calls are not supported in conditions: {value}()")
+            self.fields.add(value.split(".", 1)[0])
+            return lambda ctx: resolve_path(ctx, value)
+        if kind == "op" and value == "(":
+            node = self._expression()
+            self._expect("op", ")")
+            return node
+        if kind == "op" and value == "[":
+            items: List[Evaluator] = []
+            if not self._accept("op", "]"):
+                items.append(self._additive())
+                while self._accept("op", ","):
+                    items.append(self._additive())
+                self._expect("op", "]")
+            return lambda ctx: [item(ctx) for item in items]
+
+        raise ConditionError(f"Unexpected '{value}' in condition: {self.text!r}")
+
+
+# ==================== Public API ====================
+
+class Condition:
+    """
+    A compiled condition.
+
+    Usage:
+        cond = compile_condition("Severity == 'High' AND Hours_Open > 4")
+        cond({"Severity": "High", "Hours_Open": "6"})  # True
+    """
+
+    __slots__ = ("expression", "fields", "_evaluate")
+
+    def __init__(self, expression: str, evaluate: Evaluator, fields: Set[str]):
+        self.expression = expression
+        self.fields = frozenset(fields)
+        self._evaluate = evaluate
+
+    def __call__(self, context: Mapping[str, Any]) -> bool:
+        """Evaluate against a context; runtime errors count as False."""
+        try:
+            return bool(self._evaluate(context))
+        except Exception:
+            return False
+
+    def __repr__(self) -> str:
+        return f"Condition({self.expression!r})"
+
+
+@lru_cache(maxsize=4096)
+def compile_condition(expression: str) -> Condition:
+    """
+    Compile a condition expression (cached by source text).
+
+    Raises:
+        ConditionError: If the expression is malformed
+    """
+    parser = _Parser(str(expression))
+    return Condition(str(expression), parser.parse(), parser.fields)
+
+
+def compile_field_conditions(conditions: Dict[str, Any]) -> Condition:
+    """
+    Compile webhook-mapping style conditions into a Condition.
+
+    Each key is a field path. The value is either the expected value, or
+    {"op": "equals|not_equals|contains|in|gt|gte|lt|lte|exists", "value": ...}.
+    All entries must match.
+    """
+    ops = {
+        "equals": "==", "not_equals": "!=", "contains": "contains", "in": "in",
+        "gt": ">", "gte": ">=", "lt": "<", "lte": "<=",
+    }
+    checks: List[Callable[[Mapping[str, Any]], bool]] = []
+    for path, expected in (conditions or {}).items():
+        if isinstance(expected, dict):
+            op = expected.get("op", "equals")
+            value = expected.get("value")
+        else:
+            op, value = "equals", expected
+
+        if op == "exists":
+            checks.append(lambda ctx, p=path: _exists(resolve_path(ctx, p)))
+            continue
+        if op not in ops:
+            raise ConditionError(f"Unknown condition op '{op}' for field '{path}'")
+        compare = _COMPARISONS[ops[op]]
+        checks.append(lambda ctx, p=path, c=compare, v=value: c(resolve_path(ctx, p), v))
+
+    description = ", ".join(f"{k}={v!r}" for k, v in (conditions or {}).items())
+    fields = {p.split(".", 1)[0] for p in (conditions or {})}
+    return Condition(description, lambda ctx: all(check(ctx) for check in checks), fields)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable, type-tagged snapshot of a conditions value (TypeError if impossible)."""
+    if isinstance(value, dict):
+        return ("dict", tuple((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    hash(value)
+    return value
+
+
+class _FrozenConditions:
+    """Cache key for a field-conditions dict that carries the dict itself."""
+
+    __slots__ = ("conditions", "key")
+
+    def __init__(self, conditions: Dict[str, Any]):
+        self.conditions = conditions
+        self.key = _freeze(conditions)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, _FrozenConditions) and self.key == other.key
+
+
+@lru_cache(maxsize=1024)
+def _compile_frozen(frozen: _FrozenConditions) -> Condition:
+    return compile_field_conditions(frozen.conditions)
+
+
+def _cached_field_conditions(conditions: Dict[str, Any]) -> Condition:
+    """
+    compile_field_conditions, cached by the dict's contents.
+
+    Dicts holding unhashable leaf values are compiled on every call.
+    """
+    try:
+        frozen = _FrozenConditions(conditions)
+    except TypeError:
+        return compile_field_conditions(conditions)
+    return _compile_frozen(frozen)
+
+
+def evaluate_condition(expression: Any, context: Mapping[str, Any]) -> bool:
+    """
+    Evaluate a condition string or field-conditions dict.
+
+    Both forms are compiled once and cached. Malformed expressions evaluate
+    to False (and are reported once).
+    """
+    if not expression:
+        return True
+    try:
+        if isinstance(expression, dict):
+            return _cached_field_conditions(expression)(context)
+        return compile_condition(str(expression))(context)
+    except ConditionError as e:
+        _report_invalid(str(expression), str(e))
+        return False
+
+
+_reported: Set[str] = set()
+
+
+def _report_invalid(expression: str, error: str):
+    if expression not in _reported:
+        _reported.add(expression)
+        print(f"Invalid condition {expression!r}: {error}")
@@ -0,0 +1,290 @@
+# src/sop/cron.py
+"""
+Cron expression parsing and next-fire-time calculation.
+
+Supports:
+- 5 fields: minute hour day-of-month month day-of-week
+- 6 fields: second minute hour day-of-month month day-of-week
+- `*`, lists (`1,15`), ranges (`1-5`), steps (`*/15`, `10-40/10`)
+- Month and weekday names (JAN-DEC, SUN-SAT), `?` as `*`, 7 as Sunday
+- Macros: @yearly, @annually, @monthly, @weekly, @daily, @midnight, @hourly
+
+Each field is compiled once into an integer bitset. Day-of-month and
+day-of-week follow Vixie cron: if both are restricted, a day matches when
+either does.
+
+Timezones: with a tzinfo, fire times are computed on that zone's wall
+clock. Times skipped by a DST spring-forward fire at the same instant
+shifted past the gap (02:30 -> 03:30); times repeated by a fall-back fire
+once, on the first occurrence.
+"""
+
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import List, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+    ZONEINFO_AVAILABLE = True
+except ImportError:
+    ZoneInfo = None
+    ZONEINFO_AVAILABLE = False
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_MONTH_NAMES = {
+    name: i + 1 for i, name in enumerate(
+        ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+    )
+}
+_DAY_NAMES = {name: i for i, name in enumerate(["SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"])}
+
+# (name, min, max, names)
+_FIELDS = [
+    ("second", 0, 59, {}),
+    ("minute", 0, 59, {}),
+    ("hour", 0, 23, {}),
+    ("day", 1, 31, {}),
+    ("month", 1, 12, _MONTH_NAMES),
+    ("weekday", 0, 7, _DAY_NAMES),
+]
+
+# Give up searching after this many years (e.g. "0 0 30 2 *" never fires)
+MAX_SEARCH_YEARS = 5
+
+
+def get_timezone(name: Optional[str]) -> Optional[tzinfo]:
+    """
+    Resolve an IANA timezone name.
+
+    Returns:
+        tzinfo, or None for local (naive) time
+
+    Raises:
+        ValueError: If the name is unknown or zoneinfo is unavailable
+    """
+    if not name:
+        return None
+    if not ZONEINFO_AVAILABLE:
+        raise ValueError(f"Timezone support not available (requested {name})")
+    try:
+        return ZoneInfo(name)
+    except Exception as e:
+        raise ValueError(f"Unknown timezone '{name}': {e}")
+
+
+def _parse_value(token: str, names: dict, field_name: str) -> int:
+    token = token.upper()
+    if token in names:
+        return names[token]
+    try:
+        return int(token)
+    except ValueError:
+        raise ValueError(f"Invalid {field_name} value '{token}'")
+
+
+def _parse_field(text: str, index: int) -> int:
+    """Compile one cron field into a bitset (bit n set = value n allowed)."""
+    name, low, high, names = _FIELDS[index]
+    mask = 0
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid step in {name} field: '{text}'")
+
+        if part in ("*", "?"):
+            start, end = low, high
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = _parse_value(a, names, name), _parse_value(b, names, name)
+        else:
+            start = _parse_value(part, names, name)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"{name} field out of range: '{text}'")
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+
+    if index == 5 and mask & (1 << 7):
+        # 7 is an alias for Sunday
+        mask = (mask | 1) & ~(1 << 7)
+    return mask
+
+
+def _next_bit(mask: int, start: int) -> Optional[int]:
+    """Smallest set bit >= start, or None."""
+    remaining = mask >> start
+    if not remaining:
+        return None
+    return start + ((remaining & -remaining).bit_length() - 1)
+
+
+def _days_in_month(year: int, month: int) -> int:
+    if month == 12:
+        return 31
+    return (datetime(year, month + 1, 1) - timedelta(days=1)).day
+
+
+class CronExpression:
+    """
+    A compiled cron expression.
+
+    Usage:
+        cron = CronExpression("0 8 * * MON")
+        cron.next_after(datetime.now(ZoneInfo("America/Denver")))
+    """
+
+    def __init__(self, expression: str):
+        """
+        Parse a cron expression.
+
+        Raises:
+            ValueError: If the expression is malformed
+        """
+        self.expression = expression.strip()
+        text = MACROS.get(self.expression.lower(), self.expression)
+        parts = text.split()
+        if len(parts) == 5:
+            parts = ["0"] + parts
+            self.has_seconds = False
+        elif len(parts) == 6:
+            self.has_seconds = True
+        else:
+            raise ValueError(f"Cron expression must have 5 or 6 fields: '{expression}'")
+
+        masks = [_parse_field(p, i) for i, p in enumerate(parts)]
+        self.seconds, self.minutes, self.hours, self.days, self.months, self.weekdays = masks
+        self._day_restricted = parts[3] not in ("*", "?")
+        self._weekday_restricted = parts[5] not in ("*", "?")
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, day: datetime) -> bool:
+        dom = bool(self.days & (1 << day.day))
+        # Python: Monday=0; cron: Sunday=0
+        dow = bool(self.weekdays & (1 << ((day.weekday() + 1) % 7)))
+        if self._day_restricted and self._weekday_restricted:
+            return dom or dow
+        if self._day_restricted:
+            return dom
+        if self._weekday_restricted:
+            return dow
+        return True
+
+    def _next_wall_time(self, start: datetime) -> Optional[datetime]:
+        """Next naive wall-clock time >= start that matches all fields."""
+        t = start.replace(microsecond=0)
+        if t < start:
+            t += timedelta(seconds=1)
+        limit_year = start.year + MAX_SEARCH_YEARS
+
+        while t.year <= limit_year:
+            month = _next_bit(self.months, t.month)
+            if month is None:
+                t = datetime(t.year + 1, 1, 1)
+                continue
+            if month != t.month:
+                t = datetime(t.year, month, 1)
+
+            if not self._day_matches(t):
+                if t.day >= _days_in_month(t.year, t.month):
+                    t = datetime(t.year + (t.month == 12), t.month % 12 + 1, 1)
+                else:
+                    t = datetime(t.year, t.month, t.day + 1)
+                continue
+
+            hour = _next_bit(self.hours, t.hour)
+            if hour is None:
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            if hour != t.hour:
+                t = t.replace(hour=hour, minute=0, second=0)
+
+            minute = _next_bit(self.minutes, t.minute)
+            if minute is None:
+                t = t.replace(minute=0, second=0) + timedelta(hours=1)
+                continue
+            if minute != t.minute:
+                t = t.replace(minute=minute, second=0)
+
+            second = _next_bit(self.seconds, t.second)
+            if second is None:
+                t = t.replace(second=0) + timedelta(minutes=1)
+                continue
+            return t.replace(second=second)
+
+        return None
+
+    def next_after(self, after: datetime, tz: Optional[tzinfo] = None) -> Optional[datetime]:
+        """
+        Next fire time strictly after `after`.
+
+        Args:
+            after: Reference time (naive = local wall clock, or aware)
+            tz: Zone whose wall clock the expression is evaluated in.
+                Defaults to after.tzinfo; naive in, naive out.
+
+        Returns:
+            Next fire time, or None if the expression never fires
+        """
+        tz = tz or after.tzinfo
+        if tz is None:
+            return self._next_wall_time(after + timedelta(seconds=1))
+
+        after = after.astimezone(tz)
+        after_ts = after.timestamp()
+        wall = after.replace(tzinfo=None, fold=0)
+        while True:
+            candidate = self._next_wall_time(wall + timedelta(seconds=1))
+            if candidate is None:
+                return None
+            # fold=0 picks the first occurrence of an ambiguous (fall-back) time
+            aware = candidate.replace(tzinfo=tz, fold=0)
+            # Round-tripping through UTC moves nonexistent (spring-forward) times past the gap
+            aware = aware.astimezone(timezone.utc).astimezone(tz)
+            # Compare instants: same-zone datetime comparison ignores fold/offset
+            if aware.timestamp() > after_ts:
+                return aware
+            wall = candidate
+
+    def fire_times(
+        self,
+        after: datetime,
+        until: datetime,
+        tz: Optional[tzinfo] = None,
+        limit: Optional[int] = None,
+    ) -> List[datetime]:
+        """All fire times in (after, until], up to `limit`."""
+        times = []
+        current = after
+        while limit is None or len(times) < limit:
+            nxt = self.next_after(current, tz)
+            if nxt is None or nxt.timestamp() > until.timestamp():
+                break
+            times.append(nxt)
+            current = nxt
+        return times
+
+
+_cache: dict = {}
+
+
+def parse_cron(expression: str) -> CronExpression:
+    """Parse a cron expression, reusing compiled expressions."""
+    compiled = _cache.get(expression)
+    if compiled is None:
+        compiled = _cache[expression] = CronExpression(expression)
+    return compiled
+
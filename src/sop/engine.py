@@ -4,7 +4,12 @@ Enhanced SOP Engine with social media and cross-entity capabilities.
 Wraps the base Zoho SOP engine with additional step handlers.
 """
 
+import asyncio
+import sqlite3
 import sys
+from collections import ChainMap
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -20,6 +25,15 @@ from .social_handler import (
     StepResult,
 )
 from .approval import get_approval_manager, ApprovalStatus
+from .conditions import (
+    MISSING, ConditionError, compile_condition, evaluate_condition, resolve_path,
+)
+from .transforms import ExpressionError, compile_transform
+from .triggers import TriggerIndex
+from .registry import DefinitionRegistry, get_definition_registry
+from .step_graph import build_dependency_graph, ready_steps
+from .http_client import get_async_http_client
+from .history import ExecutionHistory
 
 # CRM integration
 try:
@@ -41,6 +55,8 @@ class EnhancedSOPEngine:
     - schedule_content: Queue content for later posting
     - delay: Wait for time/condition
     - webhook_send: Send outbound webhooks
+    - loop: Run nested steps for each item of a collection
+    - transform: Compute fields from compiled expressions
     """
     
     def __init__(
@@ -48,6 +64,9 @@ class EnhancedSOPEngine:
         base_engine=None,
         mixpost_client=None,
         ai_client=None,
+        parallel: bool = False,
+        max_workers: int = 4,
+        history: Optional[ExecutionHistory] = None,
     ):
         """
         Initialize the enhanced engine.
@@ -56,10 +75,15 @@ class EnhancedSOPEngine:
             base_engine: Base SOP engine instance (from zoho-console-api-module-system)
             mixpost_client: MixPost API client
             ai_client: AI/LLM client for content generation
+            parallel: Run independent steps concurrently by default
+            max_workers: Worker pool size for parallel step execution
+            history: Execution history store (default: bounded, in-memory)
         """
         self.base_engine = base_engine
         self.mixpost_client = mixpost_client
         self.ai_client = ai_client
+        self.parallel = parallel
+        self.max_workers = max_workers
         
         # Initialize handlers
         self.social_handler = SocialPostHandler(mixpost_client)
@@ -97,54 +121,130 @@ class EnhancedSOPEngine:
                 StepType.CRM_CREATE_TASK: self._handle_crm_step,
             })
         
+        # Native async handlers; any other step runs its sync handler in a thread
+        self._async_handlers = {
+            StepType.SOCIAL_POST: self.social_handler.handle_async,
+            StepType.CONTENT_GENERATE: self.content_handler.handle_async,
+            StepType.WEBHOOK_SEND: self._handle_webhook_send_async,
+        }
+        if self.crm_handler:
+            for crm_type in (
+                StepType.CRM_CREATE, StepType.CRM_UPDATE, StepType.CRM_SEARCH,
+                StepType.CRM_DEAL_STAGE, StepType.CRM_CREATE_TASK,
+            ):
+                self._async_handlers[crm_type] = self._handle_crm_step_async
+        
         # Loaded definitions (local + base)
         self._definitions: Dict[str, Any] = {}
         
+        # Event -> SOP lookup compiled from definition triggers
+        self.trigger_index = TriggerIndex()
+        
+        # Shared parsed definitions; rebuilt here only when its generation moves
+        self._registry: Optional[DefinitionRegistry] = None
+        self._registry_generation = -1
+        
         # Execution history
-        self._history: List[Dict] = []
+        self.history = history or ExecutionHistory(":memory:", max_rows=1000)
     
     def load_definitions(self, path: Optional[Path] = None) -> int:
         """
         Load SOP definitions from workspace and base engine.
         
+        Definitions come from the shared DefinitionRegistry, so files are
+        parsed once per change for the whole process (dashboard included).
+        
         Args:
-            path: Path to SOP definitions directory
+            path: Path to SOP definitions directory (default: shared workspace registry)
             
         Returns:
             Number of definitions loaded
         """
-        import yaml
+        if path is not None:
+            self._registry = DefinitionRegistry(path)
+        elif self._registry is None:
+            self._registry = get_definition_registry()
+        self._registry_generation = -1
+        return self.refresh_definitions()
+    
+    def refresh_definitions(self) -> int:
+        """
+        Pick up changed SOP files; cheap when nothing changed.
         
-        count = 0
-        search_path = path or Path(__file__).parent.parent.parent / "sops"
+        Conditions and the trigger index are rebuilt only when the
+        registry generation has moved since the last sync.
         
-        # Load from all entity directories
-        for entity_dir in search_path.iterdir():
-            if entity_dir.is_dir():
-                for yaml_file in entity_dir.glob("*.yaml"):
-                    if yaml_file.name == "sop-schema.yaml":
-                        continue
-                    try:
-                        with open(yaml_file, "r", encoding="utf-8") as f:
-                            data = yaml.safe_load(f)
-                        if data and "sop_id" in data:
-                            self._definitions[data["sop_id"]] = data
-                            count += 1
-                    except Exception as e:
-                        print(f"Error loading {yaml_file}: {e}")
+        Returns:
+            Number of definitions loaded
+        """
+        if self._registry is None:
+            return len(self._definitions)
+        
+        self._registry.refresh()
+        if self._registry.generation == self._registry_generation:
+            return len(self._definitions)
+        
+        definitions = dict(self._registry.get_definitions())
+        for data in definitions.values():
+            self._compile_conditions(data, data.get("_path"))
         
         # Load from base engine if available
         if self.base_engine:
-            base_count = self.base_engine.load_definitions()
+            self.base_engine.load_definitions()
             for sop_id, defn in self.base_engine._definitions.items():
-                if sop_id not in self._definitions:
-                    self._definitions[sop_id] = defn
-                    count += 1
+                definitions.setdefault(sop_id, defn)
         
+        self._definitions = definitions
+        self._registry_generation = self._registry.generation
+        self.trigger_index = TriggerIndex.build(self._definitions.values())
+        
+        return len(self._definitions)
+    
+    @staticmethod
+    def _compile_conditions(definition: Dict[str, Any], source: Any = None) -> int:
+        """
+        Pre-compile step conditions and transform operations so they are
+        parsed once, at load time.
+        
+        Compiled expressions are cached by source text, so evaluation at
+        run time only looks them up. Malformed expressions are reported here
+        rather than silently failing on every event.
+        
+        Returns:
+            Number of expressions compiled
+        """
+        count = 0
+        for step in definition.get("steps") or []:
+            if not isinstance(step, dict):
+                continue
+            config = step.get("config") or {}
+            expressions = [step.get("condition"), config.get("until_condition")]
+            if step.get("type") == "condition":
+                expressions.append(config.get("expression"))
+            for expression in expressions:
+                if not expression or not isinstance(expression, str):
+                    continue
+                try:
+                    compile_condition(expression)
+                    count += 1
+                except ConditionError as e:
+                    print(f"Invalid condition in {source or definition.get('sop_id')} "
+                          f"step {step.get('id')}: {e}")
+            if step.get("type") == "transform":
+                try:
+                    count += len(compile_transform(config.get("operations") or []).operations)
+                except ExpressionError as e:
+                    print(f"Invalid transform in {source or definition.get('sop_id')} "
+                          f"step {step.get('id')}: {e}")
+            if step.get("type") == "loop" and isinstance(config.get("steps"), list):
+                count += EnhancedSOPEngine._compile_conditions(
+                    {"sop_id": definition.get("sop_id"), "steps": config["steps"]}, source
+                )
         return count
     
     def get_definition(self, sop_id: str) -> Optional[Dict]:
         """Get a specific SOP definition by ID."""
+        self.refresh_definitions()
         return self._definitions.get(sop_id)
     
     def list_definitions(
@@ -162,6 +262,7 @@ class EnhancedSOPEngine:
         Returns:
             List of matching definitions
         """
+        self.refresh_definitions()
         definitions = list(self._definitions.values())
         
         if entity:
@@ -211,19 +312,7 @@ class EnhancedSOPEngine:
         # Check for extended handler
         handler = self._extended_handlers.get(step_type)
         if handler:
-            # Create step object for handler
-            class StepObj:
-                pass
-            step_obj = StepObj()
-            for k, v in step.items():
-                setattr(step_obj, k, v)
-            
-            class SOPObj:
-                pass
-            sop_obj = SOPObj()
-            for k, v in sop.items():
-                setattr(sop_obj, k, v)
-            
+            step_obj, sop_obj = self._as_objects(step, sop)
             return handler(step_obj, event, sop_obj)
         
         # Fall back to base engine
@@ -237,11 +326,53 @@ class EnhancedSOPEngine:
             error=f"No handler for step type: {step_type_str}"
         )
     
+    @staticmethod
+    def _as_objects(step: Dict[str, Any], sop: Dict[str, Any]) -> tuple:
+        """Wrap step and SOP dicts in attribute objects for handlers."""
+        class StepObj:
+            pass
+        step_obj = StepObj()
+        for k, v in step.items():
+            setattr(step_obj, k, v)
+        
+        class SOPObj:
+            pass
+        sop_obj = SOPObj()
+        for k, v in sop.items():
+            setattr(sop_obj, k, v)
+        
+        return step_obj, sop_obj
+    
+    async def execute_step_async(
+        self,
+        step: Dict[str, Any],
+        event: Dict[str, Any],
+        sop: Dict[str, Any],
+    ) -> StepResult:
+        """
+        Execute a single step without blocking the event loop.
+        
+        Steps with a native async handler are awaited directly; every other
+        step (sync handlers, base engine) runs in a worker thread.
+        """
+        try:
+            step_type = StepType(step.get("type", ""))
+        except ValueError:
+            step_type = None
+        
+        handler = self._async_handlers.get(step_type)
+        if handler:
+            step_obj, sop_obj = self._as_objects(step, sop)
+            return await handler(step_obj, event, sop_obj)
+        
+        return await asyncio.to_thread(self.execute_step, step, event, sop)
+    
     def execute_sop(
         self,
         sop_id: str,
         event: Optional[Dict[str, Any]] = None,
         dry_run: bool = False,
+        parallel: Optional[bool] = None,
     ) -> Dict[str, Any]:
         """
         Execute an SOP by ID.
@@ -250,6 +381,8 @@ class EnhancedSOPEngine:
             sop_id: SOP definition ID
             event: Trigger event data (optional)
             dry_run: If True, simulate without side effects
+            parallel: Run independent steps concurrently. Defaults to the
+                SOP's `config.parallel` setting, then the engine default.
             
         Returns:
             Execution result with step results
@@ -263,109 +396,325 @@ class EnhancedSOPEngine:
             }
         
         event = event or {"event_type": "manual", "data": {}}
+        result = self._start_result(sop_id, sop, dry_run, parallel)
+        
+        steps = sop.get("steps", [])
+        if result["parallel"]:
+            try:
+                executed = self._execute_steps_parallel(steps, event, sop, dry_run)
+            except ValueError as e:
+                executed = []
+                result["success"] = False
+                result["error"] = str(e)
+        else:
+            executed = self._execute_steps_sequential(steps, event, sop, dry_run)
+        
+        return self._finish_result(result, executed)
+    
+    async def execute_sop_async(
+        self,
+        sop_id: str,
+        event: Optional[Dict[str, Any]] = None,
+        dry_run: bool = False,
+        parallel: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute an SOP by ID on the running event loop.
+        
+        Same semantics as execute_sop, but steps are awaited so a slow SOP
+        does not block other requests. In parallel mode independent steps
+        run as concurrent tasks, bounded by max_workers.
         
-        result = {
+        Args:
+            sop_id: SOP definition ID
+            event: Trigger event data (optional)
+            dry_run: If True, simulate without side effects
+            parallel: Run independent steps concurrently
+            
+        Returns:
+            Execution result with step results
+        """
+        sop = self.get_definition(sop_id)
+        if not sop:
+            return {
+                "success": False,
+                "error": f"SOP not found: {sop_id}",
+                "sop_id": sop_id,
+            }
+        
+        event = event or {"event_type": "manual", "data": {}}
+        result = self._start_result(sop_id, sop, dry_run, parallel)
+        
+        steps = sop.get("steps", [])
+        if result["parallel"]:
+            try:
+                executed = await self._execute_steps_parallel_async(steps, event, sop, dry_run)
+            except ValueError as e:
+                executed = []
+                result["success"] = False
+                result["error"] = str(e)
+        else:
+            executed = []
+            for step in steps:
+                condition = step.get("condition")
+                if condition and not self._evaluate_condition(condition, event):
+                    continue
+                step_result = await self._run_step_async(step, event, sop, dry_run)
+                executed.append((step, step_result))
+                if not step_result.success and step.get("on_failure", "stop") == "stop":
+                    break
+        
+        return self._finish_result(result, executed)
+    
+    def _start_result(
+        self,
+        sop_id: str,
+        sop: Dict[str, Any],
+        dry_run: bool,
+        parallel: Optional[bool],
+    ) -> Dict[str, Any]:
+        """Create the execution result skeleton for an SOP run."""
+        from datetime import datetime
+        
+        if parallel is None:
+            parallel = (sop.get("config") or {}).get("parallel", self.parallel)
+        
+        return {
             "success": True,
             "sop_id": sop_id,
             "sop_name": sop.get("name", sop_id),
             "entity": sop.get("entity"),
             "dry_run": dry_run,
+            "parallel": bool(parallel),
             "step_results": [],
-            "started_at": None,
+            "started_at": datetime.now().isoformat(),
             "completed_at": None,
         }
-        
-        import time
+    
+    def _finish_result(self, result: Dict[str, Any], executed: List[tuple]) -> Dict[str, Any]:
+        """Record step results, apply on_failure rules, and append to history."""
         from datetime import datetime
         
-        result["started_at"] = datetime.now().isoformat()
+        for step, step_result in executed:
+            result["step_results"].append(self._step_result_to_dict(step_result))
+            
+            # Handle failure - first stopping failure in definition order wins
+            if not step_result.success and result["success"]:
+                on_failure = step.get("on_failure", "stop")
+                if on_failure == "stop":
+                    result["success"] = False
+                    result["error"] = step_result.error
+        
+        result["completed_at"] = datetime.now().isoformat()
+        
+        # Add to history; a history write failure must not fail the run
+        try:
+            self.history.append(result)
+        except sqlite3.Error as e:
+            print(f"Could not record execution history: {e}")
         
-        # Execute each step
-        for step in sop.get("steps", []):
+        return result
+    
+    def _run_step(
+        self,
+        step: Dict[str, Any],
+        event: Dict[str, Any],
+        sop: Dict[str, Any],
+        dry_run: bool,
+    ) -> StepResult:
+        """Run one step, or simulate it in dry-run mode."""
+        if dry_run:
+            return StepResult(
+                step_id=step.get("id", "unknown"),
+                step_name=step.get("name", "Unknown"),
+                success=True,
+                data={"dry_run": True, "type": step.get("type")}
+            )
+        return self._record_output(event, self.execute_step(step, event, sop))
+    
+    async def _run_step_async(
+        self,
+        step: Dict[str, Any],
+        event: Dict[str, Any],
+        sop: Dict[str, Any],
+        dry_run: bool,
+    ) -> StepResult:
+        """Async variant of _run_step."""
+        if dry_run:
+            return self._run_step(step, event, sop, dry_run)
+        return self._record_output(event, await self.execute_step_async(step, event, sop))
+    
+    @staticmethod
+    def _record_output(event: Dict[str, Any], step_result: StepResult) -> StepResult:
+        """Expose a step's data to later steps as event["outputs"][step_id]."""
+        event.setdefault("outputs", {})[step_result.step_id] = step_result.data
+        return step_result
+    
+    @staticmethod
+    def _step_result_to_dict(step_result: StepResult) -> Dict[str, Any]:
+        """Serialize a StepResult for execution results."""
+        return {
+            "step_id": step_result.step_id,
+            "step_name": step_result.step_name,
+            "success": step_result.success,
+            "error": step_result.error,
+            "data": step_result.data,
+            "duration_ms": step_result.duration_ms,
+        }
+    
+    def _execute_steps_sequential(
+        self,
+        steps: List[Dict[str, Any]],
+        event: Dict[str, Any],
+        sop: Dict[str, Any],
+        dry_run: bool,
+    ) -> List[tuple]:
+        """Run steps one after another, stopping at the first stopping failure."""
+        executed = []
+        for step in steps:
             # Check condition
             condition = step.get("condition")
             if condition and not self._evaluate_condition(condition, event):
                 continue
             
-            # Execute step
-            if dry_run:
-                step_result = StepResult(
-                    step_id=step.get("id", "unknown"),
-                    step_name=step.get("name", "Unknown"),
-                    success=True,
-                    data={"dry_run": True, "type": step.get("type")}
-                )
-            else:
-                step_result = self.execute_step(step, event, sop)
-            
-            result["step_results"].append({
-                "step_id": step_result.step_id,
-                "step_name": step_result.step_name,
-                "success": step_result.success,
-                "error": step_result.error,
-                "data": step_result.data,
-                "duration_ms": step_result.duration_ms,
-            })
+            step_result = self._run_step(step, event, sop, dry_run)
+            executed.append((step, step_result))
             
-            # Handle failure
-            if not step_result.success:
-                on_failure = step.get("on_failure", "stop")
-                if on_failure == "stop":
-                    result["success"] = False
-                    result["error"] = step_result.error
+            if not step_result.success and step.get("on_failure", "stop") == "stop":
+                break
+        return executed
+    
+    def _execute_steps_parallel(
+        self,
+        steps: List[Dict[str, Any]],
+        event: Dict[str, Any],
+        sop: Dict[str, Any],
+        dry_run: bool,
+    ) -> List[tuple]:
+        """
+        Run steps as a dependency graph on a bounded worker pool.
+        
+        A step starts once every step it depends on has finished. After a
+        step fails with `on_failure: stop`, no new steps are started; steps
+        already in flight finish and are reported. Results come back in
+        definition order.
+        
+        Raises:
+            ValueError: If the step dependencies are invalid or cyclic
+        """
+        deps = build_dependency_graph(steps)
+        pending = set(range(len(steps)))
+        done = set()
+        results: Dict[int, StepResult] = {}
+        stopped = False
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            running = {}
+            while True:
+                # Schedule everything that is ready; skipped steps may unlock more
+                progressed = True
+                while progressed and not stopped:
+                    progressed = False
+                    for i in ready_steps(deps, done, pending):
+                        pending.discard(i)
+                        condition = steps[i].get("condition")
+                        if condition and not self._evaluate_condition(condition, event):
+                            done.add(i)
+                            progressed = True
+                            continue
+                        future = pool.submit(self._run_step, steps[i], event, sop, dry_run)
+                        running[future] = i
+                
+                if not running:
                     break
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    try:
+                        step_result = future.result()
+                    except Exception as e:
+                        step_result = StepResult(
+                            step_id=steps[i].get("id", "unknown"),
+                            step_name=steps[i].get("name", "Unknown"),
+                            success=False,
+                            error=str(e),
+                        )
+                    results[i] = step_result
+                    done.add(i)
+                    if not step_result.success and steps[i].get("on_failure", "stop") == "stop":
+                        stopped = True
         
-        result["completed_at"] = datetime.now().isoformat()
+        return [(steps[i], results[i]) for i in sorted(results)]
+    
+    async def _execute_steps_parallel_async(
+        self,
+        steps: List[Dict[str, Any]],
+        event: Dict[str, Any],
+        sop: Dict[str, Any],
+        dry_run: bool,
+    ) -> List[tuple]:
+        """
+        Async variant of _execute_steps_parallel using asyncio tasks.
         
-        # Add to history
-        self._history.append(result)
+        Raises:
+            ValueError: If the step dependencies are invalid or cyclic
+        """
+        deps = build_dependency_graph(steps)
+        pending = set(range(len(steps)))
+        done = set()
+        results: Dict[int, StepResult] = {}
+        stopped = False
+        limit = asyncio.Semaphore(max(1, self.max_workers))
         
-        return result
+        async def run(i: int) -> StepResult:
+            async with limit:
+                return await self._run_step_async(steps[i], event, sop, dry_run)
+        
+        running = {}
+        while True:
+            progressed = True
+            while progressed and not stopped:
+                progressed = False
+                for i in ready_steps(deps, done, pending):
+                    pending.discard(i)
+                    condition = steps[i].get("condition")
+                    if condition and not self._evaluate_condition(condition, event):
+                        done.add(i)
+                        progressed = True
+                        continue
+                    running[asyncio.ensure_future(run(i))] = i
+            
+            if not running:
+                break
+            
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                i = running.pop(task)
+                try:
+                    step_result = task.result()
+                except Exception as e:
+                    step_result = StepResult(
+                        step_id=steps[i].get("id", "unknown"),
+                        step_name=steps[i].get("name", "Unknown"),
+                        success=False,
+                        error=str(e),
+                    )
+                results[i] = step_result
+                done.add(i)
+                if not step_result.success and steps[i].get("on_failure", "stop") == "stop":
+                    stopped = True
+        
+        return [(steps[i], results[i]) for i in sorted(results)]
     
-    def _evaluate_condition(self, condition: str, event: Dict[str, Any]) -> bool:
-        """Evaluate a condition string against event data."""
-        # Simple condition evaluation
-        data = event.get("data", {})
+    def _evaluate_condition(self, condition: Any, event: Dict[str, Any]) -> bool:
+        """
+        Evaluate a condition against event data.
         
-        try:
-            # Handle common operators
-            for op in ["==", "!=", ">=", "<=", ">", "<", " contains ", " in "]:
-                if op in condition:
-                    parts = condition.split(op, 1)
-                    if len(parts) == 2:
-                        field = parts[0].strip()
-                        value = parts[1].strip().strip('"').strip("'")
-                        field_value = data.get(field)
-                        
-                        if field_value is None:
-                            return False
-                        
-                        if op == "==":
-                            return str(field_value) == value
-                        elif op == "!=":
-                            return str(field_value) != value
-                        elif op == " contains ":
-                            return value in str(field_value)
-                        elif op == " in ":
-                            return str(field_value) in value
-                        else:
-                            # Numeric comparison
-                            try:
-                                fv = float(field_value)
-                                v = float(value)
-                                if op == ">=":
-                                    return fv >= v
-                                elif op == "<=":
-                                    return fv <= v
-                                elif op == ">":
-                                    return fv > v
-                                elif op == "<":
-                                    return fv < v
-                            except ValueError:
-                                return False
-            return True
-        except Exception:
-            return False
+        Fields resolve against event["data"] first, then top-level event keys.
+        Expressions are compiled once and cached (see conditions.py).
+        """
+        return evaluate_condition(condition, ChainMap(event.get("data") or {}, event))
     
     # Extended step handlers
     
@@ -470,6 +819,54 @@ class EnhancedSOPEngine:
                 error=str(e)
             )
     
+    async def _handle_webhook_send_async(
+        self,
+        step: Any,
+        event: Dict[str, Any],
+        sop: Any,
+    ) -> StepResult:
+        """Async webhook_send using the shared async HTTP client."""
+        client = get_async_http_client()
+        if client is None:
+            return await asyncio.to_thread(self._handle_webhook_send, step, event, sop)
+        
+        config = getattr(step, 'config', {}) or {}
+        
+        url = config.get("url")
+        if not url:
+            return StepResult(
+                step_id=step.id,
+                step_name=step.name,
+                success=False,
+                error="No URL specified for webhook"
+            )
+        
+        try:
+            response = await client.request(
+                method=config.get("method", "POST"),
+                url=url,
+                headers=config.get("headers", {}),
+                json=config.get("body", {}),
+                timeout=config.get("timeout_seconds", 30),
+            )
+            
+            return StepResult(
+                step_id=step.id,
+                step_name=step.name,
+                success=response.status_code < 400,
+                data={
+                    "status_code": response.status_code,
+                    "response_length": len(response.content),
+                }
+            )
+        except Exception as e:
+            return StepResult(
+                step_id=step.id,
+                step_name=step.name,
+                success=False,
+                error=str(e)
+            )
+    
     def _handle_data_sync(
         self,
         step: Any,
@@ -492,14 +889,118 @@ class EnhancedSOPEngine:
         event: Dict[str, Any],
         sop: Any,
     ) -> StepResult:
-        """Handle loop step - iterate over collection."""
+        """
+        Handle loop step - run nested steps once per item of a collection.
+        
+        Config options:
+        - items: Dotted path into the event (data first, then top-level keys,
+          e.g. "records" or "outputs.find_leads.records"), or a literal list
+        - steps: Nested step definitions, run sequentially for each item
+        - item_variable / index_variable: Names the item and its index get
+          in event data (default "item" / "index")
+        - concurrency: Items processed at once (default 1)
+        - chunk_size: Items pulled from the collection per batch (default 100)
+        - max_items: Stop after this many items
+        - on_item_failure: "continue" (default) isolates failed items;
+          "stop" starts no new batch after a failure
+        - max_results: Per-item results and errors kept in the output (default 100)
+        
+        The collection is consumed lazily batch by batch, so generators and
+        other iterators are never materialized. Each item runs against its
+        own copy of the event, so items cannot see each other's outputs.
+        The step succeeds only if every item succeeded.
+        """
         config = getattr(step, 'config', {}) or {}
+        nested = config.get("steps") or []
+        
+        items = config.get("items")
+        if isinstance(items, str):
+            items = resolve_path(ChainMap(event.get("data") or {}, event), items)
+        if items is MISSING or items is None or isinstance(items, (str, bytes, dict)):
+            return StepResult(
+                step_id=step.id,
+                step_name=step.name,
+                success=False,
+                error=f"Loop collection not found or not iterable: {config.get('items')!r}",
+            )
+        
+        item_variable = config.get("item_variable", "item")
+        index_variable = config.get("index_variable", "index")
+        concurrency = max(1, int(config.get("concurrency", 1)))
+        chunk_size = max(1, int(config.get("chunk_size", 100)))
+        max_results = int(config.get("max_results", 100))
+        stop_on_failure = config.get("on_item_failure", "continue") == "stop"
+        sop_dict = dict(vars(sop))
+        
+        iterator = enumerate(iter(items))
+        if config.get("max_items") is not None:
+            iterator = islice(iterator, int(config["max_items"]))
+        
+        def run_item(index: int, item: Any) -> Dict[str, Any]:
+            data = ChainMap({item_variable: item, index_variable: index}, event.get("data") or {})
+            item_event = {
+                **event,
+                "data": data,
+                "outputs": ChainMap({}, event.get("outputs") or {}),
+                "generated": dict(event.get("generated") or {}),
+            }
+            try:
+                executed = self._execute_steps_sequential(nested, item_event, sop_dict, False)
+            except Exception as e:
+                return {"index": index, "success": False, "error": str(e)}
+            failed = next(
+                (r for s, r in executed if not r.success and s.get("on_failure", "stop") == "stop"),
+                None,
+            )
+            return {
+                "index": index,
+                "success": failed is None,
+                "error": failed.error if failed else None,
+                "steps": len(executed),
+                "outputs": dict(item_event["outputs"].maps[0]),
+            }
+        
+        totals = {"total": 0, "succeeded": 0, "failed": 0, "chunks": 0}
+        results: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        pool = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+        try:
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                totals["chunks"] += 1
+                if pool:
+                    outcomes = list(pool.map(lambda pair: run_item(*pair), chunk))
+                else:
+                    outcomes = [run_item(index, item) for index, item in chunk]
+                for outcome in outcomes:
+                    totals["total"] += 1
+                    if outcome["success"]:
+                        totals["succeeded"] += 1
+                    else:
+                        totals["failed"] += 1
+                        if len(errors) < max_results:
+                            errors.append({"index": outcome["index"], "error": outcome["error"]})
+                    if len(results) < max_results:
+                        results.append(outcome)
+                if stop_on_failure and totals["failed"]:
+                    break
+        finally:
+            if pool:
+                pool.shutdown()
         
         return StepResult(
             step_id=step.id,
             step_name=step.name,
-            success=True,
-            data={"message": "Loop step placeholder", "config": config}
+            success=totals["failed"] == 0,
+            error=f"{totals['failed']} of {totals['total']} loop items failed" if totals["failed"] else None,
+            data={
+                **totals,
+                "results": results,
+                "errors": errors,
+                "truncated": totals["total"] > len(results),
+            }
         )
     
     def _handle_transform(
@@ -508,14 +1009,56 @@ class EnhancedSOPEngine:
         event: Dict[str, Any],
         sop: Any,
     ) -> StepResult:
-        """Handle transform step - transform data."""
+        """
+        Handle transform step - compute fields from expressions.
+        
+        Config options:
+        - operations: List of {field, expression}, applied in order (see
+          transforms.py for the expression syntax)
+        - records: Optional path to a collection (resolved like loop items);
+          the operations then score every record in one pass
+        - output: Event data variable for the scored records in batch mode
+          (default "records")
+        
+        Computed fields are written into event data, where later steps'
+        conditions and templates see them.
+        """
         config = getattr(step, 'config', {}) or {}
+        try:
+            transform = compile_transform(config.get("operations") or [])
+        except ExpressionError as e:
+            return StepResult(step_id=step.id, step_name=step.name, success=False, error=str(e))
+        
+        data = event.setdefault("data", {})
+        context = ChainMap(data, event)
+        
+        if config.get("records") is not None:
+            records = config["records"]
+            if isinstance(records, str):
+                records = resolve_path(context, records)
+            if records is MISSING or records is None or isinstance(records, (str, bytes, dict)):
+                return StepResult(
+                    step_id=step.id,
+                    step_name=step.name,
+                    success=False,
+                    error=f"Transform records not found or not iterable: {config.get('records')!r}",
+                )
+            rows, errors = transform.apply_batch(records, context)
+            output = config.get("output", "records")
+            data[output] = rows
+            result_data = {"records": len(rows), "output": output}
+        else:
+            values, errors = transform.apply(data, event)
+            result_data = {"fields": values}
         
+        if errors:
+            result_data["errors"] = errors[:100]
         return StepResult(
             step_id=step.id,
             step_name=step.name,
-            success=True,
-            data={"message": "Transform step placeholder", "config": config}
+            success=not errors,
+            error=f"{len(errors)} transform error(s): {errors[0]}" if errors else None,
+            data=result_data,
         )
     
     def _handle_crm_step(
@@ -533,6 +1076,27 @@ class EnhancedSOPEngine:
                 error="CRM integration not available"
             )
         
+        step_type, config, context = self._crm_step_args(step, event, sop)
+        
+        # Execute CRM operation
+        result = self.crm_handler.handle_step(step_type, config, context)
+        
+        return self._crm_step_result(step, result)
+    
+    async def _handle_crm_step_async(
+        self,
+        step: Any,
+        event: Dict[str, Any],
+        sop: Any,
+    ) -> StepResult:
+        """Async variant of _handle_crm_step."""
+        step_type, config, context = self._crm_step_args(step, event, sop)
+        result = await self.crm_handler.handle_step_async(step_type, config, context)
+        return self._crm_step_result(step, result)
+    
+    @staticmethod
+    def _crm_step_args(step: Any, event: Dict[str, Any], sop: Any) -> tuple:
+        """Build (step_type, config, context) for the CRM step handler."""
         step_type = step.type if hasattr(step, 'type') else 'crm_create'
         config = getattr(step, 'config', {}) or {}
         
@@ -542,10 +1106,11 @@ class EnhancedSOPEngine:
             "event": event,
             "entity": sop.entity if hasattr(sop, 'entity') else None,
         }
-        
-        # Execute CRM operation
-        result = self.crm_handler.handle_step(step_type, config, context)
-        
+        return step_type, config, context
+    
+    @staticmethod
+    def _crm_step_result(step: Any, result: Dict[str, Any]) -> StepResult:
+        """Convert a CRM handler result into a StepResult."""
         return StepResult(
             step_id=step.id if hasattr(step, 'id') else 'unknown',
             step_name=step.name if hasattr(step, 'name') else 'CRM Step',
@@ -595,7 +1160,8 @@ class EnhancedSOPEngine:
                     step_id=step.id,
                     step_name=step.name,
                     success=False,
-                    error=f"Approval rejected: {resolution.get('note', 'No reason given')}"
+                    error=f"Approval {resolution.get('status', 'rejected')}: "
+                          f"{resolution.get('note') or 'No reason given'}"
                 )
         
         # Create approval request
@@ -687,6 +1253,40 @@ class EnhancedSOPEngine:
         Returns:
             Execution result
         """
+        resumed = self._resolve_approval(approval_id, approved, resolved_by, note)
+        if "error" in resumed:
+            return resumed
+        
+        # Re-execute the SOP from the approval step
+        return self.execute_sop(resumed["sop_id"], event=resumed["event"])
+    
+    async def resume_from_approval_async(
+        self,
+        approval_id: str,
+        approved: bool,
+        resolved_by: str,
+        note: str = "",
+    ) -> Dict[str, Any]:
+        """Async variant of resume_from_approval."""
+        resumed = self._resolve_approval(approval_id, approved, resolved_by, note)
+        if "error" in resumed:
+            return resumed
+        
+        return await self.execute_sop_async(resumed["sop_id"], event=resumed["event"])
+    
+    def _resolve_approval(
+        self,
+        approval_id: str,
+        approved: bool,
+        resolved_by: str,
+        note: str,
+    ) -> Dict[str, Any]:
+        """
+        Resolve an approval request and rebuild the event to resume with.
+        
+        Returns:
+            {"sop_id", "event"} to resume, or {"success": False, "error"}
+        """
         # Get the approval request
         request = self.approval_manager.get_request(approval_id)
         if not request:
@@ -701,19 +1301,51 @@ class EnhancedSOPEngine:
         else:
             self.approval_manager.reject(approval_id, resolved_by, note)
         
+        return {
+            "sop_id": request.sop_id,
+            "event": self.approval_resume_event(
+                request, "approved" if approved else "rejected", resolved_by, note
+            ),
+        }
+    
+    @staticmethod
+    def approval_resume_event(
+        request: Any,
+        status: str,
+        resolved_by: Optional[str] = None,
+        note: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Rebuild the event to resume an SOP paused on an approval request.
+        
+        Args:
+            request: The resolved ApprovalRequest
+            status: "approved", "rejected" or "expired"
+            resolved_by: Who resolved the request
+            note: Resolution note
+        """
         # Restore execution state and resume
         execution_state = request.execution_state
         event = execution_state.get("event", {})
         
         # Add resolution info to event
         event["_approval_resolution"] = {
-            "status": "approved" if approved else "rejected",
+            "status": status,
             "resolved_by": resolved_by,
             "note": note,
         }
         event["_step_index"] = execution_state.get("step_index", 0)
+        return event
+    
+    def handle_expired_approval(self, request: Any) -> Dict[str, Any]:
+        """
+        Resume an SOP whose approval request expired.
         
-        # Re-execute the SOP from the approval step
+        The approval step fails with "Approval expired", so the SOP follows
+        the same path as a rejection. Register with
+        ApprovalManager.register_expiry_callback.
+        """
+        event = self.approval_resume_event(request, "expired", note=request.resolution_note)
         return self.execute_sop(request.sop_id, event=event)
     
     def get_pending_approvals(self, entity: Optional[str] = None) -> List[Dict]:
@@ -721,14 +1353,14 @@ class EnhancedSOPEngine:
         return [r.to_dict() for r in self.approval_manager.get_pending(entity)]
     
     def get_history(self, limit: int = 100) -> List[Dict]:
-        """Get recent execution history."""
-        return self._history[-limit:]
+        """Get recent execution history, oldest first."""
+        return self.history.recent(limit)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get engine statistics."""
         return {
             "definitions_loaded": len(self._definitions),
-            "executions": len(self._history),
+            "executions": self.history.count(),
             "by_entity": {
                 entity: len([d for d in self._definitions.values() if d.get("entity") == entity])
                 for entity in ["mighty_house_inc", "dsaic", "computer_store", "cross_entity"]
@@ -0,0 +1,352 @@
+# src/sop/history.py
+"""
+Bounded, persistent SOP execution history.
+
+Every execution result is appended to a local SQLite log (WAL mode) with
+indexes on sop_id, entity, success and started_at, so the dashboard can page
+and filter without holding the whole history in memory. The most recent
+results are also kept in a fixed-size in-memory ring for cheap "latest runs"
+views.
+
+Retention:
+- Rows older than `retention_days` or beyond the newest `max_rows` are
+  pruned every `prune_every` appends (and on open)
+- The database uses incremental auto-vacuum, so pruned pages are returned
+  to the filesystem without a full VACUUM
+"""
+
+import json
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sop_id TEXT NOT NULL,
+    sop_name TEXT,
+    entity TEXT,
+    success INTEGER NOT NULL,
+    dry_run INTEGER NOT NULL DEFAULT 0,
+    parallel INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TEXT NOT NULL,
+    completed_at TEXT,
+    duration_ms INTEGER NOT NULL DEFAULT 0,
+    steps_total INTEGER NOT NULL DEFAULT 0,
+    steps_passed INTEGER NOT NULL DEFAULT 0,
+    step_results TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_executions_started ON executions (started_at);
+CREATE INDEX IF NOT EXISTS idx_executions_sop ON executions (sop_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_executions_entity ON executions (entity, started_at);
+CREATE INDEX IF NOT EXISTS idx_executions_success ON executions (success, started_at);
+"""
+
+# Summary columns, i.e. everything except the step payloads
+_SUMMARY_COLUMNS = (
+    "id, sop_id, sop_name, entity, success, dry_run, parallel, error,"
+    " started_at, completed_at, duration_ms, steps_total, steps_passed"
+)
+
+STATUSES = ("success", "failed", "partial")
+
+
+def _duration_ms(result: Dict[str, Any]) -> int:
+    try:
+        started = datetime.fromisoformat(result["started_at"])
+        completed = datetime.fromisoformat(result["completed_at"])
+    except (KeyError, TypeError, ValueError):
+        return 0
+    return int((completed - started).total_seconds() * 1000)
+
+
+def summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary row for an execution result (no step payloads)."""
+    steps = result.get("step_results") or []
+    return {
+        "id": result.get("id"),
+        "sop_id": result.get("sop_id"),
+        "sop_name": result.get("sop_name"),
+        "entity": result.get("entity"),
+        "success": bool(result.get("success")),
+        "dry_run": bool(result.get("dry_run")),
+        "parallel": bool(result.get("parallel")),
+        "error": result.get("error"),
+        "started_at": result.get("started_at") or "",
+        "completed_at": result.get("completed_at"),
+        "duration_ms": _duration_ms(result),
+        "steps_total": len(steps),
+        "steps_passed": sum(1 for s in steps if s.get("success")),
+    }
+
+
+class ExecutionHistory:
+    """
+    Append-only execution log with an in-memory tail.
+
+    Safe to share between threads; a single connection is guarded by a
+    lock. Pass db_path=":memory:" for a non-persistent log (the engine's
+    default when no store is given).
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Union[Path, str]] = None,
+        tail_size: int = 100,
+        max_rows: int = 100_000,
+        retention_days: Optional[float] = 90,
+        prune_every: int = 1000,
+    ):
+        """
+        Initialize the history store.
+
+        Args:
+            db_path: SQLite database path (default: data/history.db)
+            tail_size: Recent full results kept in memory
+            max_rows: Rows kept on disk (oldest pruned first)
+            retention_days: Age after which rows are pruned (None keeps all)
+            prune_every: Appends between automatic prunes
+        """
+        if db_path is None:
+            db_path = Path(__file__).parent.parent.parent / "data" / "history.db"
+        self.db_path = db_path
+        if db_path != ":memory:":
+            self.db_path = Path(db_path)
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+        self.retention_days = retention_days
+        self.prune_every = prune_every
+
+        self._tail: deque = deque(maxlen=tail_size)
+        self._appends_since_prune = 0
+        self._stats = {"appended": 0, "pruned": 0}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            check_same_thread=False,
+            isolation_level=None,  # Autocommit; appends are single statements
+        )
+        self._conn.row_factory = sqlite3.Row
+        # Must precede table creation to take effect on a new database
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.prune()
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    # ==================== Writes ====================
+
+    def append(self, result: Dict[str, Any]) -> int:
+        """
+        Record an execution result.
+
+        The result dict is given an "id" key matching its row.
+
+        Returns:
+            Execution ID
+        """
+        row = summarize(result)
+        payload = json.dumps(result.get("step_results") or [], default=str)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO executions (sop_id, sop_name, entity, success, dry_run, parallel,"
+                " error, started_at, completed_at, duration_ms, steps_total, steps_passed,"
+                " step_results) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    row["sop_id"] or "unknown", row["sop_name"], row["entity"],
+                    int(row["success"]), int(row["dry_run"]), int(row["parallel"]),
+                    row["error"], row["started_at"], row["completed_at"],
+                    row["duration_ms"], row["steps_total"], row["steps_passed"],
+                    payload,
+                ),
+            )
+            result["id"] = cursor.lastrowid
+            self._tail.append(result)
+            self._stats["appended"] += 1
+            self._appends_since_prune += 1
+            due = self._appends_since_prune >= self.prune_every
+        if due:
+            self.prune()
+        return result["id"]
+
+    def prune(self) -> int:
+        """
+        Apply retention and reclaim freed pages.
+
+        Returns:
+            Number of rows deleted
+        """
+        with self._lock:
+            self._appends_since_prune = 0
+            deleted = 0
+            if self.retention_days is not None:
+                cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+                deleted += self._conn.execute(
+                    "DELETE FROM executions WHERE started_at < ?", (cutoff,)
+                ).rowcount
+            if self.max_rows is not None:
+                deleted += self._conn.execute(
+                    "DELETE FROM executions WHERE id <= ("
+                    " SELECT id FROM executions ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.max_rows,),
+                ).rowcount
+            if deleted:
+                self._stats["pruned"] += deleted
+                self._conn.execute("PRAGMA incremental_vacuum")
+            return deleted
+
+    def compact(self):
+        """Fold the WAL into the main file and release all free pages."""
+        with self._lock:
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def clear(self):
+        """Delete all recorded executions."""
+        with self._lock:
+            self._conn.execute("DELETE FROM executions")
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._tail.clear()
+
+    # ==================== Reads ====================
+
+    def recent(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent full results, oldest first (served from memory when possible)."""
+        with self._lock:
+            tail = list(self._tail)
+        if limit <= len(tail):
+            return tail[len(tail) - limit:] if limit > 0 else []
+        rows = self._select(
+            f"SELECT {_SUMMARY_COLUMNS}, step_results FROM executions ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+        return [self._full(row) for row in reversed(rows)]
+
+    def get(self, execution_id: int) -> Optional[Dict[str, Any]]:
+        """Full result for one execution, including step results."""
+        rows = self._select(
+            f"SELECT {_SUMMARY_COLUMNS}, step_results FROM executions WHERE id = ?",
+            (execution_id,),
+        )
+        return self._full(rows[0]) if rows else None
+
+    def query(
+        self,
+        sop_id: Optional[str] = None,
+        entity: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        Page through execution summaries, newest first.
+
+        Args:
+            sop_id: Filter by SOP
+            entity: Filter by entity
+            status: "success", "failed" or "partial" (succeeded with failed steps)
+            since: ISO timestamp lower bound on started_at (inclusive)
+            until: ISO timestamp upper bound on started_at (exclusive)
+            page: 1-based page number
+            per_page: Page size
+
+        Returns:
+            Dict with items, total, page, per_page and total_pages
+        """
+        clauses, params = [], []
+        if sop_id:
+            clauses.append("sop_id = ?")
+            params.append(sop_id)
+        if entity:
+            clauses.append("entity = ?")
+            params.append(entity)
+        if status == "success":
+            clauses.append("success = 1")
+        elif status == "failed":
+            clauses.append("success = 0")
+        elif status == "partial":
+            clauses.append("success = 1 AND steps_passed < steps_total")
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("started_at < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        per_page = max(1, per_page)
+        page = max(1, page)
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM executions{where}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM executions{where}"
+                " ORDER BY started_at DESC, id DESC LIMIT ? OFFSET ?",
+                [*params, per_page, (page - 1) * per_page],
+            ).fetchall()
+        return {
+            "items": [self._summary(row) for row in rows],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": max(1, -(-total // per_page)),
+        }
+
+    def count(self) -> int:
+        """Number of executions on record."""
+        return self._select("SELECT COUNT(*) AS n FROM executions", ())[0]["n"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Row count, tail size and append/prune counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            tail = len(self._tail)
+        return {
+            **stats,
+            "rows": self.count(),
+            "tail": tail,
+            "max_rows": self.max_rows,
+            "retention_days": self.retention_days,
+        }
+
+    def _select(self, sql: str, params: tuple) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+        summary = {key: row[key] for key in row.keys() if key != "step_results"}
+        for flag in ("success", "dry_run", "parallel"):
+            summary[flag] = bool(summary[flag])
+        return summary
+
+    @classmethod
+    def _full(cls, row: sqlite3.Row) -> Dict[str, Any]:
+        result = cls._summary(row)
+        result["step_results"] = json.loads(row["step_results"]) if row["step_results"] else []
+        return result
+
+
+# Global instance
+_history: Optional[ExecutionHistory] = None
+
+
+def get_execution_history() -> ExecutionHistory:
+    """Get or create the global persistent execution history."""
+    global _history
+    if _history is None:
+        _history = ExecutionHistory()
+    return _history
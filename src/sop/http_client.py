@@ -0,0 +1,63 @@
+# src/sop/http_client.py
+"""
+Shared async HTTP client for SOP step handlers.
+
+One pooled httpx.AsyncClient is reused by every async step (webhook_send,
+async integrations) so concurrent SOP runs share keep-alive connections.
+httpx is optional; callers fall back to thread-offloaded `requests` calls
+when it is not installed.
+"""
+
+import asyncio
+from typing import Optional
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# Connection pool limits for the shared client
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_TIMEOUT = 30.0
+
+_async_client = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_http_client():
+    """
+    Get the shared async HTTP client for the running event loop.
+
+    httpx clients are bound to the loop they were first used on, so a new
+    client is created if the loop changed (e.g. between test runs).
+
+    Returns:
+        httpx.AsyncClient, or None if httpx is not installed
+    """
+    global _async_client, _async_client_loop
+    if not HTTPX_AVAILABLE:
+        return None
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=DEFAULT_TIMEOUT,
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_http_client():
+    """Close the shared client (call on application shutdown)."""
+    global _async_client, _async_client_loop
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
@@ -0,0 +1,596 @@
+# src/sop/job_queue.py
+"""
+Durable background job queue for SOP runs.
+
+Webhook endpoints enqueue SOP runs here and acknowledge immediately; a pool
+of worker threads drains the queue. Jobs live in a local SQLite database in
+WAL mode so they survive restarts.
+
+Supports:
+- Per-entity concurrency limits
+- Retries with exponential backoff
+- Visibility timeouts (jobs held by a crashed worker are re-delivered)
+- Per-claim lease tokens, so a worker that lost its lease cannot complete
+  or fail a job now held by another worker
+- Queue depth and lag metrics
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"  # Out of attempts
+
+
+@dataclass
+class Job:
+    """A queued SOP run."""
+    id: str
+    sop_id: str
+    entity: str
+    event: Dict[str, Any] = field(default_factory=dict)
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    backoff_seconds: Optional[float] = None
+    created_at: float = 0.0
+    available_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    lease_expires_at: Optional[float] = None
+    lease_token: Optional[str] = None
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "sop_id": self.sop_id,
+            "entity": self.entity,
+            "status": self.status.value,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "created_at": self.created_at,
+            "available_at": self.available_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_error": self.last_error,
+        }
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            sop_id=row["sop_id"],
+            entity=row["entity"],
+            event=json.loads(row["event"]) if row["event"] else {},
+            status=JobStatus(row["status"]),
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            backoff_seconds=row["backoff_seconds"],
+            created_at=row["created_at"],
+            available_at=row["available_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            lease_expires_at=row["lease_expires_at"],
+            lease_token=row["lease_token"],
+            last_error=row["last_error"],
+        )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    sop_id TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    event TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    backoff_seconds REAL,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires_at REAL,
+    lease_token TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_entity ON jobs (entity, status);
+"""
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue.
+
+    Safe to share between threads; a single connection is guarded by a lock
+    and claims run inside IMMEDIATE transactions, so several processes can
+    also share one database file.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        retry_backoff: float = 5.0,
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            db_path: SQLite database path (default: data/jobs.db)
+            visibility_timeout: Seconds a claimed job stays invisible before re-delivery
+            max_attempts: Default attempts per job
+            retry_backoff: Base delay in seconds; doubles with each attempt
+        """
+        self.db_path = db_path or Path(__file__).parent.parent.parent / "data" / "jobs.db"
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            check_same_thread=False,
+            isolation_level=None,  # Explicit transactions only
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_token" not in columns:
+            # Databases created before lease tokens
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_token TEXT")
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    # ==================== Producers ====================
+
+    def enqueue(
+        self,
+        sop_id: str,
+        entity: str,
+        event: Optional[Dict[str, Any]] = None,
+        max_attempts: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        delay: float = 0.0,
+    ) -> str:
+        """
+        Add an SOP run to the queue.
+
+        Args:
+            sop_id: SOP to execute
+            entity: Entity the SOP belongs to (used for concurrency limits)
+            event: Trigger event passed to execute_sop
+            max_attempts: Attempts before the job is marked failed
+            backoff_seconds: Base retry delay (default: queue's retry_backoff)
+            delay: Seconds before the job becomes visible
+
+        Returns:
+            Job ID
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, sop_id, entity, event, status, max_attempts,"
+                " backoff_seconds, created_at, available_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id, sop_id, entity or "unknown",
+                    json.dumps(event or {}, default=str),
+                    JobStatus.QUEUED.value,
+                    max_attempts or self.max_attempts,
+                    backoff_seconds,
+                    now, now + delay,
+                ),
+            )
+        return job_id
+
+    # ==================== Consumers ====================
+
+    def claim(
+        self,
+        entity_limits: Optional[Dict[str, int]] = None,
+        default_entity_limit: Optional[int] = None,
+    ) -> Optional[Job]:
+        """
+        Claim the next runnable job.
+
+        A job is runnable when it is queued and due, or when it is running
+        but its lease expired (the worker holding it died). Expired jobs
+        that have used up their attempts are marked failed instead. Jobs
+        for an entity already at its concurrency limit are skipped.
+
+        The returned job carries a new lease_token; pass it to heartbeat,
+        complete and fail.
+
+        Args:
+            entity_limits: Max concurrently running jobs per entity
+            default_entity_limit: Limit for entities not in entity_limits
+
+        Returns:
+            The claimed Job, or None if nothing is runnable
+        """
+        entity_limits = entity_limits or {}
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Dead-letter abandoned jobs that are out of attempts
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, lease_expires_at = NULL,"
+                    " lease_token = NULL, last_error = ? WHERE status = ?"
+                    " AND lease_expires_at < ? AND attempts >= max_attempts",
+                    (JobStatus.FAILED.value, now, "Lease expired on final attempt",
+                     JobStatus.RUNNING.value, now),
+                )
+                running = dict(self._conn.execute(
+                    "SELECT entity, COUNT(*) FROM jobs WHERE status = ?"
+                    " AND lease_expires_at >= ? GROUP BY entity",
+                    (JobStatus.RUNNING.value, now),
+                ).fetchall())
+
+                candidates = self._conn.execute(
+                    "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?)"
+                    " OR (status = ? AND lease_expires_at < ?)"
+                    " ORDER BY available_at LIMIT 100",
+                    (JobStatus.QUEUED.value, now, JobStatus.RUNNING.value, now),
+                ).fetchall()
+
+                claimed = None
+                for row in candidates:
+                    limit = entity_limits.get(row["entity"], default_entity_limit)
+                    if limit is not None and running.get(row["entity"], 0) >= limit:
+                        continue
+                    claimed = row
+                    break
+
+                if claimed is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?,"
+                    " lease_expires_at = ?, lease_token = ? WHERE id = ?",
+                    (JobStatus.RUNNING.value, now, now + self.visibility_timeout,
+                     uuid.uuid4().hex, claimed["id"]),
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE id = ?", (claimed["id"],)
+                ).fetchone()
+                self._conn.execute("COMMIT")
+                return Job.from_row(row)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _lease_clause(lease_token: Optional[str]) -> tuple:
+        """WHERE fragment and params restricting an update to the current lease."""
+        if lease_token is None:
+            return "", ()
+        return " AND lease_token = ?", (lease_token,)
+
+    def heartbeat(self, job_id: str, lease_token: Optional[str] = None) -> bool:
+        """
+        Extend the lease on a running job.
+
+        Returns:
+            False if the job is no longer running under this lease
+        """
+        clause, params = self._lease_clause(lease_token)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = ?{clause}",
+                (time.time() + self.visibility_timeout, job_id, JobStatus.RUNNING.value, *params),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, lease_token: Optional[str] = None) -> bool:
+        """
+        Mark a job as succeeded.
+
+        Args:
+            job_id: Job to complete
+            lease_token: Token from claim(); the update is ignored if the
+                lease has since passed to another worker
+
+        Returns:
+            False if the lease was lost and the job was left untouched
+        """
+        clause, params = self._lease_clause(lease_token)
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_expires_at = NULL,"
+                f" lease_token = NULL, last_error = NULL WHERE id = ?{clause}",
+                (JobStatus.SUCCEEDED.value, time.time(), job_id, *params),
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, error: str, lease_token: Optional[str] = None) -> Optional[JobStatus]:
+        """
+        Record a failed attempt.
+
+        The job is re-queued with exponential backoff until it runs out of
+        attempts, then marked failed.
+
+        Args:
+            job_id: Job that failed
+            error: Error message
+            lease_token: Token from claim(); the failure is ignored if the
+                lease has since passed to another worker
+
+        Returns:
+            The job's new status, or None if the lease was lost
+        """
+        now = time.time()
+        clause, params = self._lease_clause(lease_token)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT attempts, max_attempts, backoff_seconds FROM jobs WHERE id = ?{clause}",
+                (job_id, *params),
+            ).fetchone()
+            if row is None:
+                if lease_token is not None and self._conn.execute(
+                    "SELECT 1 FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone():
+                    return None
+                raise ValueError(f"Job {job_id} not found")
+
+            if row["attempts"] < row["max_attempts"]:
+                base = row["backoff_seconds"]
+                if base is None:
+                    base = self.retry_backoff
+                delay = base * (2 ** (row["attempts"] - 1))
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, available_at = ?, lease_expires_at = NULL,"
+                    " lease_token = NULL, last_error = ? WHERE id = ?",
+                    (JobStatus.QUEUED.value, now + delay, error, job_id),
+                )
+                return JobStatus.QUEUED
+
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_expires_at = NULL,"
+                " lease_token = NULL, last_error = ? WHERE id = ?",
+                (JobStatus.FAILED.value, now, error, job_id),
+            )
+            return JobStatus.FAILED
+
+    # ==================== Queries ====================
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def list_jobs(
+        self,
+        status: Optional[JobStatus] = None,
+        limit: int = 50,
+    ) -> List[Job]:
+        """List recent jobs, newest first."""
+        query = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status.value,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + (limit,)).fetchall()
+        return [Job.from_row(r) for r in rows]
+
+    def purge_finished(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """Delete succeeded/failed jobs older than the cutoff."""
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value, cutoff),
+            )
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Queue depth and lag metrics.
+
+        - depth: jobs waiting to run (queued, including backoff)
+        - ready: queued jobs that are due now
+        - lag_seconds: how long the oldest due job has been waiting
+        """
+        now = time.time()
+        with self._lock:
+            by_status = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall())
+            ready, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(available_at) FROM jobs"
+                " WHERE status = ? AND available_at <= ?",
+                (JobStatus.QUEUED.value, now),
+            ).fetchone()
+            by_entity = dict(self._conn.execute(
+                "SELECT entity, COUNT(*) FROM jobs WHERE status IN (?, ?) GROUP BY entity",
+                (JobStatus.QUEUED.value, JobStatus.RUNNING.value),
+            ).fetchall())
+
+        return {
+            "depth": by_status.get(JobStatus.QUEUED.value, 0),
+            "ready": ready,
+            "running": by_status.get(JobStatus.RUNNING.value, 0),
+            "succeeded": by_status.get(JobStatus.SUCCEEDED.value, 0),
+            "failed": by_status.get(JobStatus.FAILED.value, 0),
+            "lag_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "active_by_entity": by_entity,
+        }
+
+
+class JobWorkerPool:
+    """
+    Worker threads that drain a JobQueue through the SOP engine.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        engine,
+        workers: int = 4,
+        entity_limits: Optional[Dict[str, int]] = None,
+        default_entity_limit: Optional[int] = 2,
+        poll_interval: float = 0.5,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            queue: Queue to drain
+            engine: EnhancedSOPEngine (or anything with execute_sop)
+            workers: Number of worker threads
+            entity_limits: Max concurrent SOP runs per entity
+            default_entity_limit: Limit for entities not listed
+            poll_interval: Seconds to sleep when the queue is empty
+        """
+        self.queue = queue
+        self.engine = engine
+        self.workers = workers
+        self.entity_limits = entity_limits or {}
+        self.default_entity_limit = default_entity_limit
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._in_flight: Dict[str, Optional[str]] = {}  # job_id -> lease_token
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        """Start worker and lease-heartbeat threads."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"sop-job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._threads.append(
+            threading.Thread(target=self._heartbeat_loop, name="sop-job-heartbeat", daemon=True)
+        )
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop workers after their current job finishes."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def run_once(self) -> bool:
+        """Claim and run a single job. Returns False if the queue had nothing runnable."""
+        job = self.queue.claim(self.entity_limits, self.default_entity_limit)
+        if job is None:
+            return False
+        self._run_job(job)
+        return True
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                print(f"Job worker error: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def _heartbeat_loop(self):
+        interval = max(self.queue.visibility_timeout / 3, 0.05)
+        while not self._stop.wait(interval):
+            with self._in_flight_lock:
+                leases = list(self._in_flight.items())
+            for job_id, lease_token in leases:
+                try:
+                    self.queue.heartbeat(job_id, lease_token)
+                except Exception as e:
+                    print(f"Job heartbeat error: {e}")
+
+    def _run_job(self, job: Job):
+        with self._in_flight_lock:
+            self._in_flight[job.id] = job.lease_token
+        try:
+            result = self.engine.execute_sop(job.sop_id, event=job.event)
+            if result.get("success"):
+                self.queue.complete(job.id, job.lease_token)
+            else:
+                self.queue.fail(job.id, result.get("error") or "SOP execution failed", job.lease_token)
+        except Exception as e:
+            self.queue.fail(job.id, str(e), job.lease_token)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(job.id, None)
+
+
+def enqueue_sop_run(
+    queue: JobQueue,
+    sop_id: str,
+    entity: str,
+    event: Optional[Dict[str, Any]] = None,
+    engine=None,
+) -> str:
+    """
+    Enqueue an SOP run, honouring the SOP's config.retry_policy.
+
+    Args:
+        queue: Target queue
+        sop_id: SOP to execute
+        entity: Entity the SOP belongs to
+        event: Trigger event
+        engine: Optional engine used to look up the SOP definition
+
+    Returns:
+        Job ID
+    """
+    policy = {}
+    if engine is not None:
+        definition = engine.get_definition(sop_id) or {}
+        policy = (definition.get("config") or {}).get("retry_policy") or {}
+    return queue.enqueue(
+        sop_id,
+        entity,
+        event,
+        max_attempts=policy.get("max_attempts"),
+        backoff_seconds=policy.get("backoff_seconds"),
+    )
+
+
+# Global instance
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get or create the global job queue."""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
@@ -0,0 +1,281 @@
+# src/sop/registry.py
+"""
+Shared, incrementally refreshed registry of SOP definitions.
+
+The dashboard and the engine both read SOP YAML from sops/<entity-dir>/*.yaml.
+This registry parses each file once and keeps the result; a refresh stats
+every file and re-parses only those whose mtime/size changed *and* whose
+content hash differs, so a reload costs O(changed files).
+
+Each change bumps `generation`, letting consumers rebuild derived state
+(grouped views, trigger indexes) only when something actually changed.
+
+Change detection:
+- inotify (if `inotify_simple` is installed and start_watching() is called):
+  refresh() is a no-op until the watcher reports a change.
+- Otherwise: a stat scan, at most once per `poll_interval` seconds.
+"""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+    LIBYAML_AVAILABLE = True
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+    LIBYAML_AVAILABLE = False
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INotify = None
+    INOTIFY_AVAILABLE = False
+
+DEFAULT_SOPS_DIR = Path(__file__).parent.parent.parent / "sops"
+
+# Files under sops/ that are not SOP definitions
+SKIP_FILES = {"sop-schema.yaml"}
+
+
+def parse_yaml(text: str) -> Any:
+    """Parse YAML with the libyaml-backed loader when available."""
+    return yaml.load(text, Loader=_YamlLoader)
+
+
+@dataclass
+class _FileEntry:
+    mtime_ns: int
+    size: int
+    digest: str
+    data: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+class DefinitionRegistry:
+    """
+    Parsed SOP definitions keyed by file, refreshed incrementally.
+
+    Usage:
+        registry = get_definition_registry()
+        registry.refresh()
+        registry.get_definitions()   # {sop_id: definition}
+        registry.by_directory()      # {"dsaic": [definition, ...], ...}
+    """
+
+    def __init__(self, root: Optional[Path] = None, poll_interval: float = 2.0):
+        """
+        Args:
+            root: Directory containing one sub-directory per entity
+            poll_interval: Minimum seconds between stat scans when not watching
+        """
+        self.root = Path(root or DEFAULT_SOPS_DIR)
+        self.poll_interval = poll_interval
+        self.generation = 0
+
+        self._files: Dict[str, _FileEntry] = {}
+        self._lock = threading.RLock()
+        self._last_scan = 0.0
+        self._scanned = False
+        self._stats = {"scans": 0, "parsed": 0, "unchanged": 0, "removed": 0}
+
+        self._dirty = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ==================== Refresh ====================
+
+    def _discover(self) -> List[Path]:
+        if not self.root.is_dir():
+            return []
+        return [
+            f for d in sorted(self.root.iterdir()) if d.is_dir()
+            for f in sorted(d.glob("*.yaml")) if f.name not in SKIP_FILES
+        ]
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Pick up added, changed and removed definition files.
+
+        Args:
+            force: Scan now and re-hash every file, ignoring mtime and the
+                poll interval (use after writing a file yourself)
+
+        Returns:
+            Number of files whose parsed content changed
+        """
+        with self._lock:
+            if not force and self._scanned:
+                if self.watching:
+                    if not self._dirty.is_set():
+                        return 0
+                elif time.time() - self._last_scan < self.poll_interval:
+                    return 0
+            self._dirty.clear()
+
+            changed = 0
+            seen = set()
+            for path in self._discover():
+                key = str(path)
+                seen.add(key)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entry = self._files.get(key)
+                if (not force and entry and entry.mtime_ns == stat.st_mtime_ns
+                        and entry.size == stat.st_size):
+                    continue
+                if self._load_file(path, stat, entry):
+                    changed += 1
+
+            for key in [k for k in self._files if k not in seen]:
+                del self._files[key]
+                self._stats["removed"] += 1
+                changed += 1
+
+            self._scanned = True
+            self._last_scan = time.time()
+            self._stats["scans"] += 1
+            if changed:
+                self.generation += 1
+            return changed
+
+    def _load_file(self, path: Path, stat, entry: Optional[_FileEntry]) -> bool:
+        """(Re)load one file; returns True if its parsed content changed."""
+        try:
+            raw = path.read_bytes()
+        except OSError as e:
+            print(f"Error loading {path}: {e}")
+            return False
+
+        digest = hashlib.sha1(raw).hexdigest()
+        if entry and entry.digest == digest:
+            # Touched but identical: keep the parsed copy
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            self._stats["unchanged"] += 1
+            return False
+
+        data, error = None, None
+        try:
+            parsed = parse_yaml(raw.decode("utf-8"))
+            if isinstance(parsed, dict):
+                parsed["_file"] = path.name
+                parsed["_path"] = str(path)
+                parsed["_dir"] = path.parent.name
+                data = parsed
+        except Exception as e:
+            error = str(e)
+            print(f"Error loading {path}: {e}")
+
+        self._files[str(path)] = _FileEntry(stat.st_mtime_ns, stat.st_size, digest, data, error)
+        self._stats["parsed"] += 1
+        return True
+
+    # ==================== Access ====================
+
+    def get_definitions(self) -> Dict[str, Dict[str, Any]]:
+        """All SOP definitions keyed by sop_id (shared, do not mutate)."""
+        self.refresh()
+        with self._lock:
+            return {
+                e.data["sop_id"]: e.data
+                for e in self._files.values() if e.data and "sop_id" in e.data
+            }
+
+    def by_directory(self) -> Dict[str, List[Dict[str, Any]]]:
+        """All parsed files (SOPs and pipelines) grouped by directory name (e.g. "computer-store")."""
+        self.refresh()
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for e in self._files.values():
+                if e.data is not None:
+                    grouped.setdefault(e.data["_dir"], []).append(e.data)
+        return grouped
+
+    def get_errors(self) -> Dict[str, str]:
+        """Files that failed to parse, with their errors."""
+        with self._lock:
+            return {k: e.error for k, e in self._files.items() if e.error}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Registry counters."""
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "files": len(self._files),
+                "definitions": sum(1 for e in self._files.values() if e.data and "sop_id" in e.data),
+                "errors": sum(1 for e in self._files.values() if e.error),
+                "watching": self.watching,
+                "libyaml": LIBYAML_AVAILABLE,
+                **self._stats,
+            }
+
+    # ==================== Watching ====================
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def start_watching(self) -> bool:
+        """
+        Watch the definition directories with inotify.
+
+        Returns:
+            True if watching; False if inotify is unavailable (polling is used)
+        """
+        if not INOTIFY_AVAILABLE or self.watching:
+            return self.watching
+        try:
+            inotify = INotify()
+            mask = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.MOVED_FROM
+                    | inotify_flags.CREATE | inotify_flags.DELETE)
+            inotify.add_watch(str(self.root), mask)
+            for d in self.root.iterdir():
+                if d.is_dir():
+                    inotify.add_watch(str(d), mask)
+        except Exception as e:
+            print(f"inotify unavailable, falling back to polling: {e}")
+            return False
+
+        self._stop.clear()
+        self._dirty.set()
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(inotify,), name="sop-registry-watch", daemon=True
+        )
+        self._watcher.start()
+        return True
+
+    def stop_watching(self):
+        """Stop the inotify watcher."""
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=2)
+        self._watcher = None
+
+    def _watch_loop(self, inotify):
+        try:
+            while not self._stop.is_set():
+                if inotify.read(timeout=500):
+                    self._dirty.set()
+        finally:
+            inotify.close()
+
+
+# Global instance
+_registry: Optional[DefinitionRegistry] = None
+
+
+def get_definition_registry() -> DefinitionRegistry:
+    """Get or create the global registry for the workspace sops/ directory."""
+    global _registry
+    if _registry is None:
+        _registry = DefinitionRegistry()
+    return _registry
@@ -3,20 +3,37 @@
 SOP Scheduler - Handles scheduled and recurring SOP triggers.
 
 Supports:
-- Cron expressions
+- Cron expressions (5 or 6 fields, see cron.py)
 - Interval-based scheduling
 - One-time scheduled runs
 - Time window restrictions
+- Per-schedule IANA timezones
+- A background daemon with missed-run catch-up policies
+- CRON schedules mirrored from SOP `scheduled` triggers (sync_triggers)
 """
 
+import hashlib
+import heapq
 import json
+import os
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 import re
 
+from .cron import get_timezone, parse_cron
+
+
+class CatchUpPolicy(Enum):
+    """What to do with runs missed while the scheduler was down."""
+    SKIP = "skip"  # Drop missed runs, wait for the next fire time
+    ONCE = "once"  # Run once for all missed fire times
+    ALL = "all"    # Run every missed fire time (capped)
+
 
 class ScheduleType(Enum):
     """Types of schedules."""
@@ -45,6 +62,8 @@ class Schedule:
     days_of_week: Optional[List[int]] = None  # 0=Mon, 6=Sun
     variables: Dict[str, Any] = field(default_factory=dict)
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    timezone: Optional[str] = None  # IANA name, e.g. "America/Denver"; None = server local time
+    catch_up: Optional[str] = None  # CatchUpPolicy value; None = daemon default
     
     def to_dict(self) -> Dict:
         """Convert to dictionary."""
@@ -67,17 +86,38 @@ class SOPScheduler:
     - Add/remove/update schedules
     - Check which schedules are due
     - Calculate next run times
+    
+    Next run times are indexed in a min-heap of (timestamp, schedule_id), so
+    finding k due schedules costs O(k log n). Superseded heap entries are
+    skipped lazily using _heap_keys.
+    
+    Schedule definitions are snapshotted to the JSON file when they change.
+    Run state (last_run, next_run, run_count) is appended to a small journal
+    next to it and folded into the snapshot every COMPACT_EVERY runs.
     """
     
+    # Journal entries before run state is folded into the JSON snapshot
+    COMPACT_EVERY = 500
+    
+    # ID prefix of schedules owned by sync_triggers
+    TRIGGER_PREFIX = "trigger-"
+    
     def __init__(self, storage_path: Optional[Path] = None):
         """Initialize scheduler with storage path."""
         self.storage_path = storage_path or Path(__file__).parent.parent.parent / "data" / "schedules.json"
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.storage_path.with_suffix(".runs.jsonl")
+        self._lock = threading.RLock()
         self._schedules: Dict[str, Schedule] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._heap_keys: Dict[str, float] = {}
+        self._journal_entries = 0
         self._load()
+        for schedule in self._schedules.values():
+            self._index(schedule)
     
     def _load(self):
-        """Load schedules from storage."""
+        """Load schedules from storage, then replay the run-state journal."""
         if self.storage_path.exists():
             try:
                 with open(self.storage_path, 'r') as f:
@@ -87,45 +127,138 @@ class SOPScheduler:
                         self._schedules[sched.id] = sched
             except Exception as e:
                 print(f"Error loading schedules: {e}")
+        
+        if self.journal_path.exists():
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line after a crash
+                    schedule = self._schedules.get(entry.get('id'))
+                    if schedule:
+                        schedule.last_run = entry['last_run']
+                        schedule.next_run = entry['next_run']
+                        schedule.run_count = entry['run_count']
+                    self._journal_entries += 1
     
     def _save(self):
-        """Save schedules to storage."""
+        """Save schedules to storage and reset the run-state journal."""
         data = {
             'schedules': [s.to_dict() for s in self._schedules.values()],
             'updated_at': datetime.now().isoformat()
         }
-        with open(self.storage_path, 'w') as f:
+        tmp_path = self.storage_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.storage_path)
+        
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self._journal_entries = 0
+    
+    def _journal(self, schedule: Schedule):
+        """Append a schedule's run state to the journal."""
+        entry = {
+            'id': schedule.id,
+            'last_run': schedule.last_run,
+            'next_run': schedule.next_run,
+            'run_count': schedule.run_count,
+        }
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        self._journal_entries += 1
+        if self._journal_entries >= self.COMPACT_EVERY:
+            self._save()
     
     def add_schedule(self, schedule: Schedule) -> str:
         """Add a new schedule."""
-        # Calculate next run
-        schedule.next_run = self._calculate_next_run(schedule)
-        self._schedules[schedule.id] = schedule
-        self._save()
+        with self._lock:
+            # Calculate next run
+            schedule.next_run = self._calculate_next_run(schedule)
+            self._schedules[schedule.id] = schedule
+            self._index(schedule)
+            self._save()
         return schedule.id
     
     def remove_schedule(self, schedule_id: str) -> bool:
         """Remove a schedule."""
-        if schedule_id in self._schedules:
-            del self._schedules[schedule_id]
-            self._save()
-            return True
+        with self._lock:
+            if schedule_id in self._schedules:
+                del self._schedules[schedule_id]
+                self._heap_keys.pop(schedule_id, None)
+                self._save()
+                return True
         return False
     
     def update_schedule(self, schedule_id: str, updates: Dict) -> bool:
         """Update a schedule."""
-        if schedule_id not in self._schedules:
-            return False
+        with self._lock:
+            if schedule_id not in self._schedules:
+                return False
+            
+            schedule = self._schedules[schedule_id]
+            for key, value in updates.items():
+                if hasattr(schedule, key):
+                    setattr(schedule, key, value)
+            
+            schedule.next_run = self._calculate_next_run(schedule)
+            self._index(schedule)
+            self._save()
+        return True
+    
+    @classmethod
+    def trigger_schedule_id(cls, sop_id: str, cron: str) -> str:
+        """Stable schedule ID for an SOP's `scheduled` trigger."""
+        digest = hashlib.sha1(f"{sop_id}\0{cron}".encode()).hexdigest()[:8]
+        return f"{cls.TRIGGER_PREFIX}{sop_id}-{digest}"
+    
+    def sync_triggers(self, entries: List[Any]) -> Dict[str, int]:
+        """
+        Mirror SOP `scheduled` triggers as CRON schedules.
         
-        schedule = self._schedules[schedule_id]
-        for key, value in updates.items():
-            if hasattr(schedule, key):
-                setattr(schedule, key, value)
+        Schedules are keyed by (sop_id, cron), so syncing again keeps their
+        run state; trigger schedules whose trigger was removed are dropped.
         
-        schedule.next_run = self._calculate_next_run(schedule)
-        self._save()
-        return True
+        Args:
+            entries: TriggerEntry objects (TriggerIndex.scheduled)
+            
+        Returns:
+            Counts of added, removed and total trigger schedules
+        """
+        wanted = {self.trigger_schedule_id(e.sop_id, e.key): e for e in entries}
+        added = removed = 0
+        with self._lock:
+            for schedule_id, entry in wanted.items():
+                if schedule_id in self._schedules:
+                    continue
+                schedule = Schedule(
+                    id=schedule_id,
+                    sop_id=entry.sop_id,
+                    entity=entry.entity,
+                    schedule_type=ScheduleType.CRON,
+                    expression=entry.key,
+                    timezone=entry.config.get("timezone"),
+                )
+                try:
+                    schedule.next_run = self._calculate_next_run(schedule)
+                except ValueError as e:
+                    print(f"Invalid cron trigger in {entry.sop_id}: {e}")
+                    continue
+                self._schedules[schedule_id] = schedule
+                self._index(schedule)
+                added += 1
+            
+            for schedule_id in list(self._schedules):
+                if schedule_id.startswith(self.TRIGGER_PREFIX) and schedule_id not in wanted:
+                    del self._schedules[schedule_id]
+                    self._heap_keys.pop(schedule_id, None)
+                    removed += 1
+            
+            if added or removed:
+                self._save()
+            total = sum(1 for sid in self._schedules if sid.startswith(self.TRIGGER_PREFIX))
+        return {"added": added, "removed": removed, "total": total}
     
     def get_schedule(self, schedule_id: str) -> Optional[Schedule]:
         """Get a schedule by ID."""
@@ -138,45 +271,174 @@ class SOPScheduler:
             schedules = [s for s in schedules if s.entity == entity]
         return schedules
     
-    def get_due_schedules(self) -> List[Schedule]:
-        """Get schedules that are due to run now."""
-        now = datetime.now()
-        due = []
+    # ==================== Next-run index ====================
+    
+    @staticmethod
+    def _timestamp(iso: str) -> float:
+        """Epoch seconds for a stored next_run (naive = server local time)."""
+        return datetime.fromisoformat(iso).timestamp()
+    
+    def _index(self, schedule: Schedule):
+        """(Re)index a schedule's next run in the heap."""
+        runnable = (
+            schedule.enabled
+            and schedule.next_run
+            and not (schedule.max_runs and schedule.run_count >= schedule.max_runs)
+        )
+        if not runnable:
+            self._heap_keys.pop(schedule.id, None)
+            return
         
-        for schedule in self._schedules.values():
-            if not schedule.enabled:
-                continue
-            
-            if schedule.max_runs and schedule.run_count >= schedule.max_runs:
-                continue
-            
-            if not schedule.next_run:
-                continue
+        key = self._timestamp(schedule.next_run)
+        if self._heap_keys.get(schedule.id) == key:
+            return
+        self._heap_keys[schedule.id] = key
+        heapq.heappush(self._heap, (key, schedule.id))
+        
+        # Compact once superseded entries dominate
+        if len(self._heap) > 2 * len(self._heap_keys) + 64:
+            self._heap = [(k, sid) for sid, k in self._heap_keys.items()]
+            heapq.heapify(self._heap)
+    
+    def next_due_time(self) -> Optional[float]:
+        """Epoch seconds of the earliest next run, or None."""
+        with self._lock:
+            while self._heap:
+                key, sid = self._heap[0]
+                if self._heap_keys.get(sid) == key:
+                    return key
+                heapq.heappop(self._heap)
+        return None
+    
+    def get_due_schedules(
+        self,
+        now: Optional[datetime] = None,
+        check_windows: bool = True,
+    ) -> List[Schedule]:
+        """
+        Get schedules that are due to run now.
+        
+        Args:
+            now: Reference time (default: now)
+            check_windows: Leave out schedules outside their time_window/days_of_week
+        """
+        now = now or datetime.now()
+        now_ts = now.timestamp()
+        
+        with self._lock:
+            # Pop every due entry, then push the live ones back: O(k log n)
+            popped = []
+            while self._heap and self._heap[0][0] <= now_ts:
+                key, sid = heapq.heappop(self._heap)
+                if self._heap_keys.get(sid) == key:
+                    popped.append((key, sid))
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
             
-            next_run = datetime.fromisoformat(schedule.next_run)
-            if next_run <= now:
-                # Check time window
-                if self._in_time_window(schedule, now):
-                    # Check day of week
-                    if self._on_allowed_day(schedule, now):
-                        due.append(schedule)
+            due = [self._schedules[sid] for _, sid in sorted(popped)]
         
+        if check_windows:
+            due = [s for s in due if self.is_allowed_at(s, now)]
         return due
     
-    def mark_run(self, schedule_id: str, success: bool = True):
-        """Mark a schedule as having run."""
-        if schedule_id not in self._schedules:
-            return
+    def is_allowed_at(self, schedule: Schedule, moment: datetime) -> bool:
+        """Check a schedule's time window and days of week at a given moment."""
+        local = self._local(moment, schedule)
+        return self._in_time_window(schedule, local) and self._on_allowed_day(schedule, local)
+    
+    def missed_fire_times(
+        self,
+        schedule: Schedule,
+        now: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> List[datetime]:
+        """
+        Fire times from the schedule's next_run up to now (oldest first).
+        
+        Args:
+            schedule: Schedule to inspect
+            now: Reference time (default: now)
+            limit: Maximum number of fire times to return
+        """
+        if not schedule.next_run:
+            return []
+        now = now or datetime.now()
+        first = datetime.fromisoformat(schedule.next_run)
+        if first.timestamp() > now.timestamp():
+            return []
         
-        schedule = self._schedules[schedule_id]
-        schedule.last_run = datetime.now().isoformat()
-        schedule.run_count += 1
-        schedule.next_run = self._calculate_next_run(schedule)
-        self._save()
+        times = [first]
+        if schedule.schedule_type == ScheduleType.INTERVAL:
+            interval = self._parse_interval(schedule.expression)
+            while len(times) < limit and (times[-1] + interval).timestamp() <= now.timestamp():
+                times.append(times[-1] + interval)
+        elif schedule.schedule_type in (ScheduleType.CRON, ScheduleType.DAILY, ScheduleType.WEEKLY):
+            cron = parse_cron(self._cron_expression(schedule))
+            times += cron.fire_times(first, now, get_timezone(schedule.timezone), limit - 1)
+        return times[:limit]
     
-    def _calculate_next_run(self, schedule: Schedule) -> Optional[str]:
+    def mark_run(
+        self,
+        schedule_id: str,
+        success: bool = True,
+        runs: int = 1,
+        now: Optional[datetime] = None,
+    ):
+        """
+        Mark a schedule as having run.
+        
+        Args:
+            schedule_id: Schedule that ran
+            success: Whether the run succeeded
+            runs: Number of runs to record (catch-up may dispatch several)
+            now: Time of the run (default: now)
+        """
+        with self._lock:
+            if schedule_id not in self._schedules:
+                return
+            
+            schedule = self._schedules[schedule_id]
+            schedule.last_run = self._now(schedule, now).isoformat()
+            schedule.run_count += runs
+            schedule.next_run = self._calculate_next_run(schedule, now)
+            self._index(schedule)
+            self._journal(schedule)
+    
+    def skip_run(self, schedule_id: str, now: Optional[datetime] = None):
+        """Advance a due schedule to its next future fire time without running it."""
+        with self._lock:
+            if schedule_id not in self._schedules:
+                return
+            
+            schedule = self._schedules[schedule_id]
+            if schedule.schedule_type == ScheduleType.INTERVAL:
+                interval = self._parse_interval(schedule.expression)
+                schedule.next_run = (self._now(schedule, now) + interval).isoformat()
+            elif schedule.schedule_type == ScheduleType.ONCE:
+                schedule.next_run = None
+            else:
+                schedule.next_run = self._calculate_next_run(schedule, now)
+            self._index(schedule)
+            self._journal(schedule)
+    
+    @classmethod
+    def _now(cls, schedule: Schedule, now: Optional[datetime] = None) -> datetime:
+        """Current time (or `now`) in the schedule's timezone (naive local if none)."""
+        if now is not None:
+            return cls._local(now, schedule)
+        return datetime.now(get_timezone(schedule.timezone))
+    
+    @staticmethod
+    def _local(moment: datetime, schedule: Schedule) -> datetime:
+        """Convert a moment to the schedule's wall clock."""
+        tz = get_timezone(schedule.timezone)
+        if tz is None:
+            return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+        return moment.astimezone(tz)
+    
+    def _calculate_next_run(self, schedule: Schedule, now: Optional[datetime] = None) -> Optional[str]:
         """Calculate the next run time for a schedule."""
-        now = datetime.now()
+        now = self._now(schedule, now)
         
         if schedule.schedule_type == ScheduleType.ONCE:
             # One-time run
@@ -192,34 +454,27 @@ class SOPScheduler:
                 return (last + interval).isoformat()
             return (now + interval).isoformat()
         
-        elif schedule.schedule_type == ScheduleType.DAILY:
+        elif schedule.schedule_type in (ScheduleType.CRON, ScheduleType.DAILY, ScheduleType.WEEKLY):
+            next_run = parse_cron(self._cron_expression(schedule)).next_after(now)
+            return next_run.isoformat() if next_run else None
+        
+        return None
+    
+    @staticmethod
+    def _cron_expression(schedule: Schedule) -> str:
+        """Cron equivalent of CRON, DAILY ("HH:MM") and WEEKLY ("MON 09:00") schedules."""
+        if schedule.schedule_type == ScheduleType.DAILY:
             # Daily at specific time
-            target_time = datetime.strptime(schedule.expression, "%H:%M").time()
-            next_run = datetime.combine(now.date(), target_time)
-            if next_run <= now:
-                next_run += timedelta(days=1)
-            return next_run.isoformat()
+            target_time = datetime.strptime(schedule.expression, "%H:%M")
+            return f"{target_time.minute} {target_time.hour} * * *"
         
-        elif schedule.schedule_type == ScheduleType.WEEKLY:
+        if schedule.schedule_type == ScheduleType.WEEKLY:
             # Weekly on specific day at time (e.g., "MON 09:00")
             parts = schedule.expression.split()
-            day_map = {"MON": 0, "TUE": 1, "WED": 2, "THU": 3, "FRI": 4, "SAT": 5, "SUN": 6}
-            target_day = day_map.get(parts[0].upper(), 0)
-            target_time = datetime.strptime(parts[1] if len(parts) > 1 else "09:00", "%H:%M").time()
-            
-            days_ahead = target_day - now.weekday()
-            if days_ahead <= 0:
-                days_ahead += 7
-            
-            next_run = datetime.combine(now.date() + timedelta(days=days_ahead), target_time)
-            return next_run.isoformat()
-        
-        elif schedule.schedule_type == ScheduleType.CRON:
-            # Simplified cron (would need croniter for full support)
-            # For now, just return 1 hour from now as placeholder
-            return (now + timedelta(hours=1)).isoformat()
+            target_time = datetime.strptime(parts[1] if len(parts) > 1 else "09:00", "%H:%M")
+            return f"{target_time.minute} {target_time.hour} * * {parts[0].upper()}"
         
-        return None
+        return schedule.expression
     
     def _parse_interval(self, expression: str) -> timedelta:
         """Parse interval expression like '4h', '30m', '1d'."""
@@ -263,6 +518,161 @@ class SOPScheduler:
         return now.weekday() in schedule.days_of_week
 
 
+def scheduled_event(schedule: Schedule, fire_time: Optional[datetime] = None) -> Dict[str, Any]:
+    """Build the trigger event for a scheduled SOP run."""
+    event = {
+        "event_type": "scheduled",
+        "trigger_source": "scheduler",
+        "entity": schedule.entity,
+        "schedule_id": schedule.id,
+        "data": dict(schedule.variables),
+    }
+    if fire_time:
+        event["scheduled_for"] = fire_time.isoformat()
+    return event
+
+
+class SchedulerDaemon:
+    """
+    Background service that runs due schedules.
+    
+    Sleeps until the earliest next run (or until woken), then hands each due
+    run to `dispatch` - normally a job-queue enqueue, so SOPs execute on the
+    worker pool rather than on the daemon thread.
+    
+    Enforces max_runs, time_window and days_of_week (runs falling outside
+    the window are skipped, not deferred). Runs more than `misfire_grace`
+    seconds late are treated as missed and handled by the catch-up policy.
+    """
+    
+    def __init__(
+        self,
+        scheduler: SOPScheduler,
+        dispatch: Callable[[Schedule, Dict[str, Any]], Any],
+        catch_up: CatchUpPolicy = CatchUpPolicy.ONCE,
+        max_catch_up: int = 10,
+        misfire_grace: float = 60.0,
+        max_sleep: float = 60.0,
+    ):
+        """
+        Initialize the daemon.
+        
+        Args:
+            scheduler: Scheduler holding the schedules
+            dispatch: Called with (schedule, event) for every run
+            catch_up: Default policy for schedules without their own catch_up
+            max_catch_up: Cap on runs dispatched per schedule under CatchUpPolicy.ALL
+            misfire_grace: Seconds a run may be late before it counts as missed
+            max_sleep: Upper bound on a single sleep, in seconds
+        """
+        self.scheduler = scheduler
+        self.dispatch = dispatch
+        self.catch_up = catch_up
+        self.max_catch_up = max_catch_up
+        self.misfire_grace = misfire_grace
+        self.max_sleep = max_sleep
+        
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+    
+    def start(self):
+        """Start the daemon thread."""
+        if self.running:
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._loop, name="sop-scheduler", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the daemon thread."""
+        self._stop = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+    
+    def wake(self):
+        """Re-check schedules now (call after schedules change)."""
+        self._wake.set()
+    
+    def _loop(self):
+        while not self._stop:
+            # Clear before looking at the schedules: a wake() arriving after
+            # this point is either seen by this pass or cuts the wait short
+            self._wake.clear()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Scheduler daemon error: {e}")
+            
+            next_due = self.scheduler.next_due_time()
+            timeout = self.max_sleep
+            if next_due is not None:
+                timeout = min(max(next_due - time.time(), 0.1), self.max_sleep)
+            self._wake.wait(timeout)
+    
+    def tick(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Dispatch every due run.
+        
+        Returns:
+            One record per dispatched run: {"schedule_id", "sop_id", "scheduled_for"}
+        """
+        now = now or datetime.now()
+        dispatched = []
+        
+        for schedule in self.scheduler.get_due_schedules(now, check_windows=False):
+            fire_times = self._runs_to_dispatch(schedule, now)
+            
+            runs = 0
+            for fire_time in fire_times:
+                try:
+                    self.dispatch(schedule, scheduled_event(schedule, fire_time))
+                except Exception as e:
+                    print(f"Schedule dispatch error ({schedule.id}): {e}")
+                    continue
+                runs += 1
+                dispatched.append({
+                    "schedule_id": schedule.id,
+                    "sop_id": schedule.sop_id,
+                    "scheduled_for": fire_time.isoformat(),
+                })
+            
+            if runs:
+                self.scheduler.mark_run(schedule.id, runs=runs, now=now)
+            else:
+                self.scheduler.skip_run(schedule.id, now=now)
+        
+        return dispatched
+    
+    def _runs_to_dispatch(self, schedule: Schedule, now: datetime) -> List[datetime]:
+        """Select which fire times of a due schedule to run."""
+        missed = self.scheduler.missed_fire_times(schedule, now, limit=self.max_catch_up + 1)
+        if not missed:
+            return []
+        
+        late = len(missed) > 1 or now.timestamp() - missed[0].timestamp() > self.misfire_grace
+        if late:
+            policy = CatchUpPolicy(schedule.catch_up) if schedule.catch_up else self.catch_up
+            if policy == CatchUpPolicy.SKIP:
+                missed = []
+            elif policy == CatchUpPolicy.ONCE:
+                missed = missed[-1:]
+            else:
+                missed = missed[:self.max_catch_up]
+        
+        runs = [t for t in missed if self.scheduler.is_allowed_at(schedule, t)]
+        
+        if schedule.max_runs:
+            runs = runs[:max(schedule.max_runs - schedule.run_count, 0)]
+        return runs
+
+
 # Convenience functions
 _scheduler: Optional[SOPScheduler] = None
 
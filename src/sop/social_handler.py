@@ -4,16 +4,17 @@ Social media step handlers for SOP Engine.
 Integrates with MixPost for scheduling and posting.
 """
 
+import asyncio
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 
 from .step_types import (
     Entity, Platform, VoiceProfile,
-    SocialPostConfig, ContentGenerateConfig,
-    get_entity_config, get_platform_config, adapt_content_for_platform,
+    SocialPostConfig, ContentGenerateConfig, ContentType,
+    get_entity_config, get_platform_config, get_voice_prefix, adapt_content_for_platform,
 )
 
 
@@ -65,63 +66,36 @@ class SocialPostHandler:
             StepResult with execution details
         """
         try:
-            config = self._parse_config(step, event, sop)
-            
-            # Validate we have content
-            if not config.content and not config.template:
-                return StepResult(
-                    step_id=step.id,
-                    step_name=step.name,
-                    success=False,
-                    error="No content or template provided"
-                )
-            
-            # Resolve template if needed
-            content = config.content
-            if config.template:
-                content = self._resolve_template(config.template, config.variables)
-            
-            # Add hashtags
-            if config.hashtags:
-                content += "\n\n" + " ".join(config.hashtags)
-            
-            # Create posts for each platform
-            results = []
-            for platform in config.platforms:
-                platform_content = adapt_content_for_platform(
-                    content,
-                    platform,
-                    Entity(sop.entity) if hasattr(sop, 'entity') else None
-                )
-                
-                # Apply platform-specific overrides
-                if platform.value in config.platform_overrides:
-                    overrides = config.platform_overrides[platform.value]
-                    if "content" in overrides:
-                        platform_content = overrides["content"]
-                
-                result = self._post_to_platform(
-                    platform=platform,
-                    content=platform_content,
-                    media=config.media,
-                    schedule_type=config.schedule_type,
-                    scheduled_at=config.scheduled_at,
-                )
-                results.append(result)
-            
-            # Check if all succeeded
-            all_success = all(r.get("success", False) for r in results)
+            config, content, posts = self._prepare_posts(step, event, sop)
+            results = [self._post_to_platform(**post) for post in posts]
+            return self._post_result(step, config, content, results)
             
+        except Exception as e:
             return StepResult(
                 step_id=step.id,
                 step_name=step.name,
-                success=all_success,
-                data={
-                    "platforms": [p.value for p in config.platforms],
-                    "results": results,
-                    "content_length": len(content),
-                }
+                success=False,
+                error=str(e)
             )
+    
+    async def handle_async(
+        self,
+        step: Any,
+        event: Dict[str, Any],
+        sop: Any,
+    ) -> StepResult:
+        """
+        Execute a social_post step without blocking the event loop.
+        
+        Platform posts are issued concurrently; the MixPost client is
+        synchronous, so each call runs in a worker thread.
+        """
+        try:
+            config, content, posts = self._prepare_posts(step, event, sop)
+            results = list(await asyncio.gather(
+                *(asyncio.to_thread(self._post_to_platform, **post) for post in posts)
+            ))
+            return self._post_result(step, config, content, results)
             
         except Exception as e:
             return StepResult(
@@ -131,6 +105,79 @@ class SocialPostHandler:
                 error=str(e)
             )
     
+    def _prepare_posts(
+        self,
+        step: Any,
+        event: Dict[str, Any],
+        sop: Any,
+    ) -> Tuple[SocialPostConfig, str, List[Dict[str, Any]]]:
+        """
+        Resolve the step's content and build one post per platform.
+        
+        Returns:
+            (config, content, keyword arguments for each _post_to_platform call)
+        
+        Raises:
+            ValueError: If the step has no content or template
+        """
+        config = self._parse_config(step, event, sop)
+        
+        # Validate we have content
+        if not config.content and not config.template:
+            raise ValueError("No content or template provided")
+        
+        # Resolve template if needed
+        content = config.content
+        if config.template:
+            content = self._resolve_template(config.template, config.variables)
+        
+        # Add hashtags
+        if config.hashtags:
+            content += "\n\n" + " ".join(config.hashtags)
+        
+        posts = []
+        for platform in config.platforms:
+            platform_content = adapt_content_for_platform(
+                content,
+                platform,
+                Entity(sop.entity) if hasattr(sop, 'entity') else None
+            )
+            
+            # Apply platform-specific overrides
+            if platform.value in config.platform_overrides:
+                overrides = config.platform_overrides[platform.value]
+                if "content" in overrides:
+                    platform_content = overrides["content"]
+            
+            posts.append({
+                "platform": platform,
+                "content": platform_content,
+                "media": config.media,
+                "schedule_type": config.schedule_type,
+                "scheduled_at": config.scheduled_at,
+            })
+        
+        return config, content, posts
+    
+    def _post_result(
+        self,
+        step: Any,
+        config: SocialPostConfig,
+        content: str,
+        results: List[Dict[str, Any]],
+    ) -> StepResult:
+        """StepResult for a set of platform post results."""
+        return StepResult(
+            step_id=step.id,
+            step_name=step.name,
+            success=all(r.get("success", False) for r in results),
+            data={
+                "platforms": [p.value for p in config.platforms],
+                "results": results,
+                "content_length": len(content),
+            }
+        )
+    
     def _parse_config(
         self,
         step: Any,
@@ -312,32 +359,40 @@ class ContentGenerateHandler:
             StepResult with generated content
         """
         try:
-            config = self._parse_config(step, event, sop)
-            
-            # Build the prompt
-            prompt = self._build_prompt(config, event, sop)
-            
-            # Generate content
+            config, system, prompt = self._prepare(step, event, sop)
             if self.ai_client:
-                generated = self._generate_with_ai(prompt, config)
+                generated = self._generate_with_ai(prompt, config, system)
             else:
-                # Stub mode - return placeholder
-                generated = f"[Generated {config.content_type.value} content for: {prompt[:50]}...]"
-            
-            # Store in event context for later steps
-            event.setdefault("generated", {})[config.output_variable] = generated
+                generated = self._stub_content(config, prompt)
+            return self._generated_result(step, event, config, generated)
             
+        except Exception as e:
             return StepResult(
                 step_id=step.id,
                 step_name=step.name,
-                success=True,
-                data={
-                    "content_type": config.content_type.value,
-                    "output_variable": config.output_variable,
-                    "content_length": len(generated),
-                    "content_preview": generated[:200] + "..." if len(generated) > 200 else generated,
-                }
+                success=False,
+                error=str(e)
             )
+    
+    async def handle_async(
+        self,
+        step: Any,
+        event: Dict[str, Any],
+        sop: Any,
+    ) -> StepResult:
+        """
+        Execute a content_generate step without blocking the event loop.
+        
+        Uses the AI client's `generate_async` when it has one, otherwise
+        runs the blocking `generate` call in a worker thread.
+        """
+        try:
+            config, system, prompt = self._prepare(step, event, sop)
+            if self.ai_client:
+                generated = await self._generate_with_ai_async(prompt, config, system)
+            else:
+                generated = self._stub_content(config, prompt)
+            return self._generated_result(step, event, config, generated)
             
         except Exception as e:
             return StepResult(
@@ -347,6 +402,44 @@ class ContentGenerateHandler:
                 error=str(e)
             )
     
+    def _prepare(
+        self,
+        step: Any,
+        event: Dict[str, Any],
+        sop: Any,
+    ) -> Tuple[ContentGenerateConfig, Optional[str], str]:
+        """Parse the step config and build the prompt: stable voice prefix + per-step task."""
+        config = self._parse_config(step, event, sop)
+        system, prompt = self._build_prompt_parts(config, event, sop)
+        return config, system, prompt
+    
+    @staticmethod
+    def _stub_content(config: ContentGenerateConfig, prompt: str) -> str:
+        """Placeholder content used when no AI client is configured."""
+        return f"[Generated {config.content_type.value} content for: {prompt[:50]}...]"
+    
+    def _generated_result(
+        self,
+        step: Any,
+        event: Dict[str, Any],
+        config: ContentGenerateConfig,
+        generated: str,
+    ) -> StepResult:
+        """Store generated content for later steps and build the StepResult."""
+        event.setdefault("generated", {})[config.output_variable] = generated
+        
+        return StepResult(
+            step_id=step.id,
+            step_name=step.name,
+            success=True,
+            data={
+                "content_type": config.content_type.value,
+                "output_variable": config.output_variable,
+                "content_length": len(generated),
+                "content_preview": generated[:200] + "..." if len(generated) > 200 else generated,
+            }
+        )
+    
     def _parse_config(
         self,
         step: Any,
@@ -357,7 +450,7 @@ class ContentGenerateHandler:
         config_data = getattr(step, 'config', {}) or {}
         
         return ContentGenerateConfig(
-            content_type=ContentGenerateConfig(config_data.get("type", "social_post")),
+            content_type=ContentType(config_data.get("type", "social_post")),
             prompt_template=config_data.get("prompt_template", ""),
             variables={**event.get("data", {}), **config_data.get("variables", {})},
             tone=config_data.get("tone", "professional"),
@@ -366,6 +459,9 @@ class ContentGenerateHandler:
             model=config_data.get("model"),
             max_tokens=config_data.get("max_tokens", 500),
             temperature=config_data.get("temperature", 0.7),
+            cache=config_data.get("cache"),
+            cache_ttl=config_data.get("cache_ttl"),
+            voice=VoiceProfile(config_data["voice"]) if config_data.get("voice") else None,
         )
     
     def _build_prompt(
@@ -375,6 +471,22 @@ class ContentGenerateHandler:
         sop: Any,
     ) -> str:
         """Build the AI prompt from template and context."""
+        system, prompt = self._build_prompt_parts(config, event, sop)
+        return f"{system}\n\n{prompt}" if system else prompt
+    
+    def _build_prompt_parts(
+        self,
+        config: ContentGenerateConfig,
+        event: Dict[str, Any],
+        sop: Any,
+    ) -> Tuple[Optional[str], str]:
+        """
+        Build (prefix, task) prompt parts.
+        
+        The prefix is the entity's voice block, identical for every step of
+        that (entity, voice), so the server can reuse its prompt cache; tone,
+        length and the interpolated task follow it.
+        """
         prompt = config.prompt_template
         
         # Interpolate variables
@@ -385,28 +497,65 @@ class ContentGenerateHandler:
         
         # Add entity context
         if hasattr(sop, 'entity'):
-            entity_config = get_entity_config(Entity(sop.entity))
-            tone_guidelines = entity_config.get("tone_guidelines", "")
-            prompt = f"""
-{tone_guidelines}
-
-Tone: {config.tone}
+            prefix = get_voice_prefix(Entity(sop.entity), config.voice)
+            return prefix, f"""Tone: {config.tone}
 Length: {config.length}
 
-Task: {prompt}
-"""
+Task: {prompt.strip()}"""
         
-        return prompt.strip()
+        return None, prompt.strip()
     
-    def _generate_with_ai(self, prompt: str, config: ContentGenerateConfig) -> str:
+    def _generate_options(
+        self,
+        config: ContentGenerateConfig,
+        prompt: str,
+        system: Optional[str],
+    ) -> Dict[str, Any]:
+        """
+        Keyword arguments for the AI client.
+        
+        The voice prefix goes as a separate system prompt to clients that
+        support one; otherwise it is prepended to the prompt. Cache options
+        are passed only when the step sets them.
+        """
+        options: Dict[str, Any] = {
+            "prompt": prompt,
+            "model": config.model,
+            "max_tokens": config.max_tokens,
+            "temperature": config.temperature,
+        }
+        if system and getattr(self.ai_client, "supports_system_prompt", False):
+            options["system"] = system
+        elif system:
+            options["prompt"] = f"{system}\n\n{prompt}"
+        if config.cache is not None:
+            options["cache"] = config.cache
+        if config.cache_ttl is not None:
+            options["cache_ttl"] = config.cache_ttl
+        return options
+    
+    def _generate_with_ai(
+        self,
+        prompt: str,
+        config: ContentGenerateConfig,
+        system: Optional[str] = None,
+    ) -> str:
         """Generate content using AI client."""
-        response = self.ai_client.generate(
-            prompt=prompt,
-            model=config.model,
-            max_tokens=config.max_tokens,
-            temperature=config.temperature,
-        )
+        response = self.ai_client.generate(**self._generate_options(config, prompt, system))
         return response.get("content", "")
+    
+    async def _generate_with_ai_async(
+        self,
+        prompt: str,
+        config: ContentGenerateConfig,
+        system: Optional[str] = None,
+    ) -> str:
+        """Generate content using the AI client without blocking the event loop."""
+        generate_async = getattr(self.ai_client, "generate_async", None)
+        if generate_async is not None:
+            response = await generate_async(**self._generate_options(config, prompt, system))
+            return response.get("content", "")
+        return await asyncio.to_thread(self._generate_with_ai, prompt, config, system)
 
 
 class CrossEntityTriggerHandler:
@@ -0,0 +1,241 @@
+# src/sop/step_graph.py
+"""
+Step dependency graph for parallel SOP execution.
+
+Builds a DAG over an SOP's steps from:
+- Explicit `depends_on` fields (step ID or list of step IDs)
+- Variables each step reads ({{var}} placeholders, condition identifiers)
+- Variables each step writes (output_variable, store_as, transform fields, ...)
+- Step outputs: every step with an id writes `outputs.<id>`, and any
+  `outputs.<id>...` reference (templates, conditions, loop items) reads it
+- Generated content: content_generate writes `generated.<output_variable>`
+
+Steps only gain implicit edges to steps defined *before* them, so the
+graph never reorders writes relative to the YAML definition. Step types
+whose writes are not modeled here (api_call, webhook_send, field_update,
+...) are treated as barriers, since later steps may depend on effects the
+graph cannot see.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Set
+
+# Steps that act as a barrier: everything before must finish first and
+# everything after waits for them.
+BARRIER_STEP_TYPES = {"approval", "delay"}
+
+# Step types whose writes step_writes() fully describes. Any other type is
+# ordered after every earlier step, and every later step waits for it.
+MODELED_STEP_TYPES = {
+    "condition", "content_generate", "crm_create", "crm_search",
+    "cross_entity_trigger", "data_sync", "loop", "schedule_content",
+    "social_post", "transform",
+}
+
+# Variables keyed one level deeper, so references depend on a single entry
+_NAMESPACES = {"outputs", "generated"}
+
+_TEMPLATE_VAR = re.compile(r"\{\{\s*([A-Za-z_][\w.]*)\s*\}\}")
+_IDENTIFIER = re.compile(r"[A-Za-z_][\w.]*")
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+_KEYWORDS = {
+    "and", "or", "not", "in", "contains", "is",
+    "true", "false", "none", "null", "if", "elif", "else",
+}
+
+
+def _root(name: str) -> str:
+    """
+    Return the variable a dotted path depends on.
+
+    For `outputs.<id>...` this is `outputs.<id>` (likewise for `generated`),
+    so a reference depends on the step that produced that entry rather than
+    on the whole namespace.
+    """
+    parts = name.split(".", 2)
+    if parts[0] in _NAMESPACES and len(parts) > 1 and parts[1]:
+        return f"{parts[0]}.{parts[1]}"
+    return parts[0]
+
+
+def output_var(step_id: str) -> str:
+    """Variable written by a step's recorded output (event["outputs"][step_id])."""
+    return f"outputs.{step_id}"
+
+
+def _template_vars(value: Any) -> Set[str]:
+    """Collect {{variable}} references from a nested config value."""
+    found: Set[str] = set()
+    if isinstance(value, str):
+        found.update(_root(m) for m in _TEMPLATE_VAR.findall(value))
+    elif isinstance(value, dict):
+        for v in value.values():
+            found |= _template_vars(v)
+    elif isinstance(value, list):
+        for v in value:
+            found |= _template_vars(v)
+    return found
+
+
+def expression_vars(expression: str) -> Set[str]:
+    """Collect identifiers referenced by a condition/transform expression."""
+    if not expression:
+        return set()
+    stripped = _QUOTED.sub(" ", str(expression))
+    names = set()
+    for token in _IDENTIFIER.findall(stripped):
+        if token.lower() in _KEYWORDS:
+            continue
+        names.add(_root(token))
+    return names
+
+
+def step_reads(step: Dict[str, Any]) -> Set[str]:
+    """Variables a step reads."""
+    config = step.get("config") or {}
+    reads = _template_vars(config)
+    reads |= expression_vars(step.get("condition", ""))
+    if step.get("type") == "condition":
+        reads |= expression_vars(config.get("expression", ""))
+    if step.get("type") == "transform":
+        for op in config.get("operations", []) or []:
+            reads |= expression_vars(op.get("expression", ""))
+        if isinstance(config.get("records"), str):
+            reads.add(_root(config["records"]))
+    if step.get("type") == "loop":
+        if isinstance(config.get("items"), str):
+            reads.add(_root(config["items"]))
+        nested: Set[str] = set()
+        for nested_step in config.get("steps", []) or []:
+            nested |= step_reads(nested_step)
+        # The per-item variables are bound by the loop itself
+        nested -= {config.get("item_variable", "item"), config.get("index_variable", "index")}
+        reads |= nested
+    for name in step.get("inputs", []) or []:
+        reads.add(_root(name))
+    return reads
+
+
+def step_writes(step: Dict[str, Any]) -> Set[str]:
+    """Variables a step writes for later steps."""
+    config = step.get("config") or {}
+    step_type = step.get("type")
+    writes: Set[str] = set()
+
+    if step_type == "content_generate":
+        # ContentGenerateHandler stores the text in event["generated"][output_variable]
+        variable = config.get("output_variable", "generated_content")
+        writes.add(variable)
+        writes.add(f"generated.{variable}")
+    elif step_type == "crm_search":
+        writes.add(config.get("store_as", "search_results"))
+    elif step_type == "crm_create":
+        writes.add(f"crm_{config.get('module', 'Leads').lower()}_id")
+    elif step_type == "transform":
+        for op in config.get("operations", []) or []:
+            if op.get("field"):
+                writes.add(op["field"])
+        if config.get("records") is not None:
+            writes.add(config.get("output", "records"))
+
+    if step.get("id"):
+        writes.add(output_var(step["id"]))
+    for name in step.get("outputs", []) or []:
+        writes.add(_root(name))
+    return writes
+
+
+def is_barrier(step: Dict[str, Any]) -> bool:
+    """True if a step must run alone, after every earlier step."""
+    step_type = step.get("type")
+    if step_type in BARRIER_STEP_TYPES or step.get("parallel") is False:
+        return True
+    if step_type not in MODELED_STEP_TYPES:
+        return True
+    if step_type == "loop":
+        nested = (step.get("config") or {}).get("steps", []) or []
+        return any(is_barrier(nested_step) for nested_step in nested)
+    return False
+
+
+def _conflicts(reads: Set[str], writes: Set[str]) -> bool:
+    """True if any read depends on any write (a bare namespace read covers its entries)."""
+    if reads & writes:
+        return True
+    namespaces = reads & _NAMESPACES
+    return bool(namespaces) and any(w.split(".", 1)[0] in namespaces for w in writes)
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def build_dependency_graph(steps: List[Dict[str, Any]]) -> List[Set[int]]:
+    """
+    Build the dependency graph for a list of steps.
+
+    Args:
+        steps: SOP step definitions, in YAML order
+
+    Returns:
+        For each step index, the set of step indices it must wait for
+
+    Raises:
+        ValueError: If `depends_on` names an unknown step or the graph has a cycle
+    """
+    index_by_id = {step.get("id"): i for i, step in enumerate(steps) if step.get("id")}
+    reads = [step_reads(s) for s in steps]
+    writes = [step_writes(s) for s in steps]
+    deps: List[Set[int]] = [set() for _ in steps]
+
+    last_barrier = None
+    for i, step in enumerate(steps):
+        for dep_id in _as_list(step.get("depends_on")):
+            if dep_id not in index_by_id:
+                raise ValueError(f"Step '{step.get('id')}' depends on unknown step '{dep_id}'")
+            deps[i].add(index_by_id[dep_id])
+
+        if is_barrier(step):
+            deps[i].update(range(i))
+            last_barrier = i
+            continue
+        if last_barrier is not None:
+            deps[i].add(last_barrier)
+
+        for j in range(i):
+            # Read-after-write, write-after-write, write-after-read
+            if (_conflicts(reads[i], writes[j]) or (writes[i] & writes[j])
+                    or _conflicts(reads[j], writes[i])):
+                deps[i].add(j)
+
+    deps = [d - {i} for i, d in enumerate(deps)]
+    _check_acyclic(deps, steps)
+    return deps
+
+
+def _check_acyclic(deps: List[Set[int]], steps: List[Dict[str, Any]]) -> None:
+    """Raise ValueError if the dependency graph contains a cycle."""
+    remaining = {i: set(d) for i, d in enumerate(deps)}
+    ready = [i for i, d in remaining.items() if not d]
+    resolved = 0
+    while ready:
+        node = ready.pop()
+        resolved += 1
+        for i, d in remaining.items():
+            if node in d:
+                d.discard(node)
+                if not d:
+                    ready.append(i)
+    if resolved != len(deps):
+        cyclic = [steps[i].get("id", str(i)) for i, d in remaining.items() if d]
+        raise ValueError(f"Dependency cycle between steps: {', '.join(cyclic)}")
+
+
+def ready_steps(deps: List[Set[int]], done: Iterable[int], pending: Iterable[int]) -> List[int]:
+    """Return pending step indices whose dependencies are all done, in YAML order."""
+    done_set = set(done)
+    return sorted(i for i in pending if deps[i] <= done_set)
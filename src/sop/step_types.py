@@ -4,7 +4,9 @@ Extended step types for SOP Automation App.
 Adds social media, content generation, and cross-entity capabilities.
 """
 
+import textwrap
 from enum import Enum
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -119,6 +121,9 @@ class ContentGenerateConfig:
     model: Optional[str] = None
     max_tokens: int = 500
     temperature: float = 0.7
+    cache: Optional[bool] = None  # None = cache only deterministic (temperature 0) calls
+    cache_ttl: Optional[float] = None
+    voice: Optional[VoiceProfile] = None  # Default: the entity's voice
 
 
 @dataclass
@@ -169,6 +174,7 @@ ENTITY_CONFIGS = {
         },
         "voice": VoiceProfile.MHI_PROFESSIONAL,
         "zoho_prefix": "MHI",
+        "display_name": "Mighty House Inc.",
         "tone_guidelines": """
             Professional and authoritative. Focus on expertise, reliability,
             and government contracting experience. Use industry terminology
@@ -189,6 +195,7 @@ ENTITY_CONFIGS = {
         },
         "voice": VoiceProfile.DSAIC_DEVELOPER,
         "zoho_prefix": "DSAIC",
+        "display_name": "DSAIC",
         "tone_guidelines": """
             Technical but approachable. Developer-friendly language.
             Open source ethos. Focus on innovation, efficiency, and
@@ -210,6 +217,7 @@ ENTITY_CONFIGS = {
         },
         "voice": VoiceProfile.CS_GAMING,
         "zoho_prefix": "CS",
+        "display_name": "Computer Store",
         "tone_guidelines": """
             Enthusiastic and community-focused. Gaming culture aware.
             Local pride (Wheatland, Wyoming). Friendly and helpful.
@@ -296,6 +304,28 @@ def get_entity_config(entity: Entity) -> Dict[str, Any]:
     return ENTITY_CONFIGS.get(entity, {})
 
 
+@lru_cache(maxsize=None)
+def get_voice_prefix(entity: Entity, voice: Optional[VoiceProfile] = None) -> str:
+    """
+    Stable prompt prefix carrying an entity's brand voice.
+    
+    The text is identical for every call with the same (entity, voice), so
+    it can be sent as the system message and its KV cache reused by the
+    llamafile server. Per-request details (tone, length, task) belong
+    after it.
+    """
+    config = get_entity_config(entity)
+    voice = voice or config.get("voice")
+    name = config.get("display_name") or entity.value.replace("_", " ").title()
+    lines = [f"You write content for {name}."]
+    if voice:
+        lines.append(f"Brand voice: {voice.value}")
+    guidelines = textwrap.dedent(config.get("tone_guidelines", "")).strip()
+    if guidelines:
+        lines.extend(["Tone guidelines:", guidelines])
+    return "\n".join(lines)
+
+
 def get_platform_config(platform: Platform) -> Dict[str, Any]:
     """Get configuration for a platform."""
     return PLATFORM_CONFIGS.get(platform, {})
@@ -0,0 +1,501 @@
+# src/sop/transforms.py
+"""
+Compiled value expressions for transform steps.
+
+Builds on the condition grammar (see conditions.py) and compiles each
+expression once into closures, cached by source text. Nothing is passed to
+eval(): only the operators below, whitelisted functions and a few string
+methods can run.
+
+Syntax (in addition to conditions):
+    (100 - Health_Score) * 0.3 + (Days_Since_Login > 14 ? 30 : 0)
+    if Score >= 70: "Critical" elif Score >= 50: "High" else: "Low"
+    "down" in Issue.lower() or "outage" in Issue.lower()
+    stream_data.thumbnail_url.replace('{width}', '440')
+    filter(items, quantity <= reorder_point AND quantity > 0)
+    group_by(items, category)
+    CS-{{date_format(now(), 'YYMMDD')}}-{{sequence(4)}}   (template)
+
+- Ternary `cond ? a : b` and `if/elif/else` chains (may span lines)
+- Functions: see FUNCTIONS; filter/map/group_by evaluate their second
+  argument once per item, with the item's fields in scope (or `item`)
+- String methods: see STRING_METHODS
+- Text containing {{...}} is a template: each placeholder is an expression
+
+A transform applies a list of {field, expression} operations in order, so
+later operations can use earlier results. Batch mode applies them to every
+record of a collection in one pass.
+"""
+
+import itertools
+import re
+import threading
+from collections import ChainMap
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, MutableMapping, Optional, Set, Tuple
+
+from .conditions import (
+    MISSING, ConditionError, Evaluator, _Parser, _to_bool, _to_number, resolve_path,
+)
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<op>==|!=|>=|<=|=|>|<|\+|-|\*|/|\(|\)|\[|\]|,|\?|:|\.)
+      | (?P<name>[A-Za-z_][\w]*(?:\.[\w]+)*)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {
+    "and", "or", "not", "in", "contains", "exists", "true", "false", "null", "none",
+    "if", "elif", "else",
+}
+
+_TEMPLATE = re.compile(r"\{\{(.*?)\}\}", re.DOTALL)
+
+
+class ExpressionError(ConditionError):
+    """Raised when a transform expression cannot be parsed."""
+
+
+# ==================== Value helpers ====================
+
+def truthy(value: Any) -> bool:
+    """Truthiness that treats missing values and "false" strings as false."""
+    if value is MISSING or value is None:
+        return False
+    flag = _to_bool(value)
+    return flag if flag is not None else bool(value)
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """Coerce a datetime, date or ISO string to a datetime (None if impossible)."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+
+_UNITS = {
+    "minute": "minutes", "minutes": "minutes", "hour": "hours", "hours": "hours",
+    "day": "days", "days": "days", "week": "weeks", "weeks": "weeks",
+}
+
+
+def _date_add(value: Any, amount: Any, unit: str = "days") -> Optional[datetime]:
+    when, number = to_datetime(value), _to_number(amount)
+    if when is None or number is None or unit not in _UNITS:
+        return None
+    return when + timedelta(**{_UNITS[unit]: number})
+
+
+def _date_subtract(value: Any, amount: Any, unit: str = "days") -> Optional[datetime]:
+    number = _to_number(amount)
+    return _date_add(value, -number if number is not None else None, unit)
+
+
+def _date_diff(a: Any, b: Any) -> Optional[int]:
+    """Whole days from b to a."""
+    first, second = to_datetime(a), to_datetime(b)
+    if first is None or second is None:
+        return None
+    if (first.tzinfo is None) != (second.tzinfo is None):
+        first, second = first.replace(tzinfo=None), second.replace(tzinfo=None)
+    return (first - second).days
+
+
+_DATE_TOKENS = [("YYYY", "%Y"), ("YY", "%y"), ("MM", "%m"), ("DD", "%d"),
+                ("HH", "%H"), ("mm", "%M"), ("ss", "%S")]
+
+
+def _date_format(value: Any, pattern: str = "YYYY-MM-DD") -> Optional[str]:
+    when = to_datetime(value)
+    if when is None:
+        return None
+    fmt = str(pattern)
+    for token, directive in _DATE_TOKENS:
+        fmt = fmt.replace(token, directive)
+    return when.strftime(fmt)
+
+
+def _weighted_average(values: Any, weights: Any) -> Optional[float]:
+    pairs = [(_to_number(v), _to_number(w)) for v, w in zip(values or [], weights or [])]
+    pairs = [(v, w) for v, w in pairs if v is not None and w is not None]
+    total = sum(w for _, w in pairs)
+    return sum(v * w for v, w in pairs) / total if total else None
+
+
+def _numbers(values: Iterable[Any]) -> List[float]:
+    return [n for n in (_to_number(v) for v in values) if n is not None]
+
+
+def _aggregate(fn: Callable[[List[float]], Any]) -> Callable[..., Any]:
+    def apply(*args: Any) -> Any:
+        values = args[0] if len(args) == 1 and isinstance(args[0], (list, tuple)) else args
+        numbers = _numbers(values)
+        return fn(numbers) if numbers else None
+    return apply
+
+
+_sequence = itertools.count(1)
+_sequence_lock = threading.Lock()
+
+
+def _next_sequence(width: Any = 4) -> str:
+    """Process-wide counter, zero-padded to `width` digits (wraps around)."""
+    digits = int(_to_number(width) or 4)
+    with _sequence_lock:
+        value = next(_sequence)
+    return str(value % 10 ** digits).zfill(digits)
+
+
+def _round(value: Any, digits: Any = 0) -> Optional[float]:
+    number = _to_number(value)
+    if number is None:
+        return None
+    places = int(_to_number(digits) or 0)
+    return round(number, places) if places else round(number)
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "now": datetime.now,
+    "today": lambda: datetime.combine(date.today(), datetime.min.time()),
+    "date_add": _date_add,
+    "date_subtract": _date_subtract,
+    "date_diff": _date_diff,
+    "date_format": _date_format,
+    "weighted_average": _weighted_average,
+    "sum": _aggregate(sum),
+    "min": _aggregate(min),
+    "max": _aggregate(max),
+    "average": _aggregate(lambda n: sum(n) / len(n)),
+    "round": _round,
+    "abs": lambda v: abs(_to_number(v)) if _to_number(v) is not None else None,
+    "len": lambda v: len(v) if hasattr(v, "__len__") else 0,
+    "number": _to_number,
+    "string": lambda v: "" if v is None or v is MISSING else str(v),
+    "coalesce": lambda *args: next((a for a in args if a is not None and a is not MISSING), None),
+    "sequence": _next_sequence,
+}
+
+STRING_METHODS: Dict[str, Callable[..., Any]] = {
+    name: getattr(str, name)
+    for name in ("lower", "upper", "title", "capitalize", "strip", "replace",
+                 "startswith", "endswith", "split")
+}
+
+# Functions whose second argument is evaluated per item of the first
+_ITEM_FUNCTIONS = {"filter", "map", "group_by"}
+
+
+def _item_scope(item: Any, ctx: Mapping[str, Any]) -> Mapping[str, Any]:
+    if isinstance(item, Mapping):
+        return ChainMap({"item": item}, item, ctx)
+    return ChainMap({"item": item}, ctx)
+
+
+def _apply_item_function(name: str, items: Any, per_item: Evaluator, ctx: Mapping[str, Any]) -> Any:
+    if items is MISSING or items is None or isinstance(items, (str, Mapping)):
+        return [] if name != "group_by" else {}
+    if name == "filter":
+        return [item for item in items if truthy(per_item(_item_scope(item, ctx)))]
+    if name == "map":
+        return [per_item(_item_scope(item, ctx)) for item in items]
+    groups: Dict[str, List[Any]] = {}
+    for item in items:
+        key = per_item(_item_scope(item, ctx))
+        groups.setdefault("" if key is None or key is MISSING else str(key), []).append(item)
+    return groups
+
+
+# ==================== Parser ====================
+
+class _ExpressionParser(_Parser):
+    """Condition grammar plus ternaries, if/elif/else, calls and methods."""
+
+    token_pattern = _TOKEN
+    keywords = _KEYWORDS
+
+    def _expression(self) -> Evaluator:
+        if self._accept("kw", "if"):
+            return self._if_chain()
+        return self._ternary()
+
+    def _if_chain(self) -> Evaluator:
+        branches: List[Tuple[Evaluator, Evaluator]] = []
+        while True:
+            test = self._or()
+            self._expect("op", ":")
+            branches.append((test, self._ternary()))
+            if not self._accept("kw", "elif"):
+                break
+        fallback: Optional[Evaluator] = None
+        if self._accept("kw", "else"):
+            self._expect("op", ":")
+            fallback = self._ternary()
+
+        def evaluate(ctx: Mapping[str, Any]) -> Any:
+            for test, value in branches:
+                if truthy(test(ctx)):
+                    return value(ctx)
+            return fallback(ctx) if fallback else None
+        return evaluate
+
+    def _ternary(self) -> Evaluator:
+        test = self._or()
+        if not self._accept("op", "?"):
+            return test
+        when_true = self._ternary()
+        self._expect("op", ":")
+        when_false = self._ternary()
+        return lambda ctx: when_true(ctx) if truthy(test(ctx)) else when_false(ctx)
+
+    def _or(self) -> Evaluator:
+        # Operands are values here, not just booleans: use `truthy`
+        terms = [self._and()]
+        while self._accept("kw", "or"):
+            terms.append(self._and())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda ctx: any(truthy(t(ctx)) for t in terms)
+
+    def _and(self) -> Evaluator:
+        terms = [self._not()]
+        while self._accept("kw", "and"):
+            terms.append(self._not())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda ctx: all(truthy(t(ctx)) for t in terms)
+
+    def _not(self) -> Evaluator:
+        if self._accept("kw", "not"):
+            inner = self._not()
+            return lambda ctx: not truthy(inner(ctx))
+        return self._comparison()
+
+    def _primary(self) -> Evaluator:
+        kind, value = self._peek()
+        if kind == "name" and self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1] == ("op", "("):
+            self.pos += 2
+            node = self._call(value)
+        else:
+            node = super()._primary()
+        while self._accept("op", "."):
+            kind, name = self._peek()
+            if kind != "name":
+                raise ExpressionError(f"Expected a field or method name in expression: {self.text!r}")
+            self.pos += 1
+            path, _, method = name.rpartition(".") if self._peek() == ("op", "(") else (name, "", "")
+            if path:
+                node = (lambda inner, p: lambda ctx: resolve_path({"_": inner(ctx)}, f"_.{p}"))(node, path)
+            if method:
+                self._expect("op", "(")
+                node = self._method(node, method, self._arguments())
+        return node
+
+    def _arguments(self) -> List[Evaluator]:
+        """Comma-separated arguments up to and including the closing parenthesis."""
+        args: List[Evaluator] = []
+        if self._accept("op", ")"):
+            return args
+        args.append(self._expression())
+        while self._accept("op", ","):
+            args.append(self._expression())
+        self._expect("op", ")")
+        return args
+
+    def _call(self, name: str) -> Evaluator:
+        if "." in name:
+            path, method = name.rsplit(".", 1)
+            self.fields.add(path.split(".", 1)[0])
+            return self._method(lambda ctx: resolve_path(ctx, path), method, self._arguments())
+
+        args = self._arguments()
+        if name in _ITEM_FUNCTIONS:
+            if len(args) != 2:
+                raise ExpressionError(f"{name}() takes a collection and a per-item expression")
+            items, per_item = args
+            return lambda ctx: _apply_item_function(name, items(ctx), per_item, ctx)
+
+        function = FUNCTIONS.get(name)
+        if function is None:
+            raise ExpressionError(f"Unknown function in expression: {name}()")
+        return lambda ctx: function(*[arg(ctx) for arg in args])
+
+    def _method(self, target: Evaluator, method: str, args: List[Evaluator]) -> Evaluator:
+        function = STRING_METHODS.get(method)
+        if function is None:
+            raise ExpressionError(f"Method not allowed in expression: .{method}()")
+
+        def call(ctx: Mapping[str, Any]) -> Any:
+            value = target(ctx)
+            if not isinstance(value, str):
+                return None
+            return function(value, *[arg(ctx) for arg in args])
+        return call
+
+
+# ==================== Public API ====================
+
+class Expression:
+    """
+    A compiled transform expression.
+
+    Usage:
+        expr = compile_expression("Score >= 70 ? 'Critical' : 'Low'")
+        expr({"Score": 80})  # 'Critical'
+    """
+
+    __slots__ = ("expression", "fields", "_evaluate")
+
+    def __init__(self, expression: str, evaluate: Evaluator, fields: Set[str]):
+        self.expression = expression
+        self.fields = frozenset(fields)
+        self._evaluate = evaluate
+
+    def __call__(self, context: Mapping[str, Any]) -> Any:
+        """Evaluate against a context; missing fields come back as None."""
+        value = self._evaluate(context)
+        return None if value is MISSING else value
+
+    def __repr__(self) -> str:
+        return f"Expression({self.expression!r})"
+
+
+def _compile(text: str) -> Tuple[Evaluator, Set[str]]:
+    try:
+        parser = _ExpressionParser(text)
+        return parser.parse(), parser.fields
+    except ExpressionError:
+        raise
+    except ConditionError as e:
+        raise ExpressionError(str(e).replace("condition", "expression")) from None
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression: str) -> Expression:
+    """
+    Compile a transform expression (cached by source text).
+
+    Raises:
+        ExpressionError: If the expression is malformed
+    """
+    text = str(expression).strip()
+    if "{{" not in text:
+        evaluate, fields = _compile(text)
+        return Expression(text, evaluate, fields)
+
+    # Template: literal text with {{expression}} placeholders
+    parts: List[Evaluator] = []
+    fields: Set[str] = set()
+    for i, piece in enumerate(_TEMPLATE.split(text)):
+        if i % 2:
+            evaluate, piece_fields = _compile(piece)
+            fields |= piece_fields
+            parts.append(evaluate)
+        elif piece:
+            parts.append(lambda ctx, literal=piece: literal)
+
+    def render(ctx: Mapping[str, Any]) -> str:
+        values = (part(ctx) for part in parts)
+        return "".join("" if v is None or v is MISSING else _plain(v) for v in values)
+    return Expression(text, render, fields)
+
+
+def _plain(value: Any) -> Any:
+    """Storable form of a computed value (datetimes become ISO strings)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class Transform:
+    """
+    An ordered list of compiled {field, expression} operations.
+
+    Usage:
+        transform = compile_transform([{"field": "Total", "expression": "A + B"}])
+        values, errors = transform.apply(record)
+    """
+
+    def __init__(self, operations: List[Tuple[str, Expression]]):
+        self.operations = operations
+
+    def apply(
+        self,
+        target: MutableMapping[str, Any],
+        context: Optional[Mapping[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Evaluate every operation and write its result into `target`.
+
+        Expressions see `target` first, then `context`, so each operation
+        can use the fields computed before it.
+
+        Returns:
+            (computed values by field, error messages)
+        """
+        scope = ChainMap(target, context) if context is not None else target
+        values: Dict[str, Any] = {}
+        errors: List[str] = []
+        for field, expression in self.operations:
+            try:
+                value = _plain(expression(scope))
+            except Exception as e:
+                value = None
+                errors.append(f"{field}: {e}")
+            target[field] = value
+            values[field] = value
+        return values, errors
+
+    def apply_batch(
+        self,
+        records: Iterable[Any],
+        context: Optional[Mapping[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Score every record in one pass.
+
+        Each record is copied and extended with the computed fields; the
+        shared context (e.g. event data) is visible behind the record.
+
+        Returns:
+            (extended records, error messages prefixed with the record index)
+        """
+        rows: List[Dict[str, Any]] = []
+        errors: List[str] = []
+        for index, record in enumerate(records):
+            row = dict(record) if isinstance(record, Mapping) else {"item": record}
+            _, row_errors = self.apply(row, context)
+            errors.extend(f"[{index}] {e}" for e in row_errors)
+            rows.append(row)
+        return rows, errors
+
+
+def compile_transform(operations: List[Dict[str, Any]]) -> Transform:
+    """
+    Compile transform operations ({field, expression} dicts).
+
+    Raises:
+        ExpressionError: If an operation is malformed
+    """
+    compiled = []
+    for op in operations or []:
+        if not isinstance(op, Mapping) or not op.get("field") or op.get("expression") is None:
+            raise ExpressionError(f"Transform operation needs 'field' and 'expression': {op!r}")
+        expression = op["expression"]
+        if isinstance(expression, str):
+            compiled.append((op["field"], compile_expression(expression)))
+        else:
+            # Literal values (numbers, lists) are assigned as-is
+            compiled.append((op["field"], Expression(repr(expression), lambda ctx, v=expression: v, set())))
+    return Transform(compiled)
@@ -0,0 +1,332 @@
+# src/sop/triggers.py
+"""
+Inverted index of SOP triggers, built from the `triggers:` blocks in SOP
+definitions.
+
+Record triggers are keyed by (module, event_type, field) so an incoming
+event resolves to its candidate SOPs with a few dict lookups; candidates
+then pass through their compiled conditions. Webhook triggers are keyed by
+endpoint path.
+
+Supported trigger types:
+    record_create   module[, condition]                 -> (module, record_created, None)
+    field_update    module, field[, new_value, condition] -> (module, record_updated, field)
+    record_event    config: {module, event[, condition]} -> (module, event, None)
+    event           platform, event_type[, condition]   -> (platform, event_type, None)
+    webhook         endpoint, secret_env | secret[, condition]
+    scheduled       cron  (listed, not indexed)
+
+Webhook triggers authenticate callers with a per-trigger shared secret:
+`secret_env` names an environment variable holding it (`secret` gives it
+inline). A request passes with an X-Webhook-Signature header carrying the
+hex HMAC-SHA256 of the raw body (optionally prefixed "sha256="), or an
+X-Webhook-Secret header equal to the secret. Triggers without a secret
+accept no requests.
+
+manual and cross_entity triggers are invoked explicitly and are not indexed.
+"""
+
+import hashlib
+import hmac
+import os
+from collections import ChainMap
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .conditions import (
+    Condition, ConditionError, compile_condition, compile_field_conditions,
+)
+
+# Event names used by webhook sources, normalized to the index's event types
+EVENT_ALIASES = {
+    "create": "record_created",
+    "insert": "record_created",
+    "record_create": "record_created",
+    "edit": "record_updated",
+    "update": "record_updated",
+    "field_update": "record_updated",
+    "delete": "record_deleted",
+}
+
+TriggerKey = Tuple[str, str, Optional[str]]
+
+
+def normalize_event_type(event_type: str) -> str:
+    """Map source-specific event names (create/edit/delete) to index event types."""
+    event_type = (event_type or "").strip()
+    return EVENT_ALIASES.get(event_type.lower(), event_type)
+
+
+def _module_key(module: Optional[str]) -> str:
+    return (module or "").strip().lower()
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """Normalize a webhook path: leading slash, no trailing slash, lower case."""
+    return "/" + (endpoint or "").strip().strip("/").lower()
+
+
+@dataclass
+class TriggerEntry:
+    """One compiled trigger pointing at an SOP."""
+    sop_id: str
+    entity: str
+    trigger_type: str
+    key: Any
+    condition: Optional[Condition] = None
+    description: str = ""
+    config: Dict[str, Any] = field(default_factory=dict)
+
+    def matches(self, context: Mapping[str, Any]) -> bool:
+        return self.condition is None or self.condition(context)
+
+    def webhook_secret(self) -> Optional[str]:
+        """Shared secret for a webhook trigger, or None if none is configured."""
+        env_name = self.config.get("secret_env")
+        if env_name:
+            return os.environ.get(str(env_name)) or None
+        secret = self.config.get("secret")
+        return str(secret) if secret else None
+
+    def verify_webhook(
+        self,
+        body: bytes,
+        signature: Optional[str] = None,
+        secret: Optional[str] = None,
+    ) -> bool:
+        """
+        Check a webhook request against this trigger's shared secret.
+
+        Args:
+            body: Raw request body
+            signature: X-Webhook-Signature header (hex HMAC-SHA256 of body)
+            secret: X-Webhook-Secret header
+
+        Returns:
+            True if either header matches; always False without a configured secret
+        """
+        expected = self.webhook_secret()
+        if not expected:
+            return False
+        if signature:
+            digest = hmac.new(expected.encode(), body or b"", hashlib.sha256).hexdigest()
+            if signature.startswith("sha256="):
+                signature = signature[len("sha256="):]
+            if hmac.compare_digest(digest, signature.strip().lower()):
+                return True
+        if secret:
+            return hmac.compare_digest(expected.encode(), secret.encode())
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sop_id": self.sop_id,
+            "entity": self.entity,
+            "type": self.trigger_type,
+            "key": list(self.key) if isinstance(self.key, tuple) else self.key,
+            "condition": self.condition.expression if self.condition else None,
+            "description": self.description,
+        }
+
+
+def _all_of(conditions: List[Condition]) -> Optional[Condition]:
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    expression = " AND ".join(f"({c.expression})" for c in conditions)
+    fields = set().union(*(c.fields for c in conditions))
+    return Condition(expression, lambda ctx: all(c(ctx) for c in conditions), fields)
+
+
+class TriggerIndex:
+    """
+    Event -> SOP lookup compiled from SOP definitions.
+
+    Usage:
+        index = TriggerIndex.build(engine._definitions.values())
+        index.match_record_event("Customers", "edit", record)
+        index.match_endpoint("/webhooks/stripe/subscription-canceled", payload)
+    """
+
+    def __init__(self):
+        self._records: Dict[TriggerKey, List[TriggerEntry]] = {}
+        self._fields: Dict[Tuple[str, str], List[str]] = {}
+        self._endpoints: Dict[str, List[TriggerEntry]] = {}
+        self.scheduled: List[TriggerEntry] = []
+        self.errors: List[str] = []
+
+    @classmethod
+    def build(cls, definitions: Iterable[Dict[str, Any]]) -> "TriggerIndex":
+        """Compile triggers from an iterable of SOP definition dicts."""
+        index = cls()
+        for definition in definitions:
+            if isinstance(definition, dict):
+                index.add_definition(definition)
+        return index
+
+    def add_definition(self, definition: Dict[str, Any]) -> int:
+        """
+        Index the triggers of one SOP definition.
+
+        Returns:
+            Number of triggers indexed
+        """
+        sop_id = definition.get("sop_id")
+        entity = definition.get("entity", "")
+        count = 0
+        for trigger in definition.get("triggers") or []:
+            if not isinstance(trigger, dict):
+                continue
+            try:
+                entry = self._compile(sop_id, entity, trigger)
+            except ConditionError as e:
+                self.errors.append(f"{sop_id}: {e}")
+                print(f"Invalid trigger condition in {sop_id}: {e}")
+                continue
+            if entry is None:
+                continue
+
+            if entry.trigger_type == "webhook":
+                self._endpoints.setdefault(entry.key, []).append(entry)
+            elif entry.trigger_type == "scheduled":
+                self.scheduled.append(entry)
+            else:
+                self._records.setdefault(entry.key, []).append(entry)
+                module, event_type, field_name = entry.key
+                if field_name is not None:
+                    fields = self._fields.setdefault((module, event_type), [])
+                    if field_name not in fields:
+                        fields.append(field_name)
+            count += 1
+        return count
+
+    def _compile(self, sop_id: str, entity: str, trigger: Dict[str, Any]) -> Optional[TriggerEntry]:
+        trigger_type = trigger.get("type")
+        config = trigger.get("config") or {}
+        spec = {**config, **{k: v for k, v in trigger.items() if k != "config"}}
+
+        conditions = []
+        if spec.get("condition"):
+            conditions.append(compile_condition(str(spec["condition"])))
+
+        if trigger_type == "record_create":
+            key: Any = (_module_key(spec.get("module")), "record_created", None)
+        elif trigger_type == "field_update":
+            field_name = spec.get("field")
+            key = (_module_key(spec.get("module")), "record_updated", field_name)
+            if field_name and "new_value" in spec:
+                conditions.append(compile_field_conditions({field_name: spec["new_value"]}))
+        elif trigger_type == "record_event":
+            key = (_module_key(spec.get("module")),
+                   normalize_event_type(spec.get("event") or spec.get("event_type")), None)
+        elif trigger_type == "event":
+            key = (_module_key(spec.get("platform") or spec.get("module")),
+                   normalize_event_type(spec.get("event_type")), None)
+        elif trigger_type == "webhook" and spec.get("endpoint"):
+            key = normalize_endpoint(spec["endpoint"])
+        elif trigger_type == "scheduled" and spec.get("cron"):
+            key = spec["cron"]
+        else:
+            return None
+
+        return TriggerEntry(
+            sop_id=sop_id,
+            entity=entity,
+            trigger_type=trigger_type,
+            key=key,
+            condition=_all_of(conditions),
+            description=spec.get("description", ""),
+            config=spec,
+        )
+
+    # ==================== Lookup ====================
+
+    def candidates(
+        self,
+        module: str,
+        event_type: str,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[TriggerEntry]:
+        """
+        Triggers indexed for an event, before conditions are checked.
+
+        Args:
+            module: Source module (e.g. Zoho module API name)
+            event_type: Event type (aliases like "edit" are normalized)
+            fields: Changed fields; field-specific triggers fire only for these.
+                If None (changes unknown), field triggers do not fire.
+        """
+        module = _module_key(module)
+        event_type = normalize_event_type(event_type)
+        found = list(self._records.get((module, event_type, None), ()))
+
+        indexed_fields = self._fields.get((module, event_type))
+        if indexed_fields and fields is not None:
+            for f in fields:
+                found.extend(self._records.get((module, event_type, f), ()))
+        return found
+
+    def watched_fields(self, module: str, event_type: str = "record_updated") -> List[str]:
+        """Fields with field-specific triggers for a module's events."""
+        return list(self._fields.get((_module_key(module), normalize_event_type(event_type)), ()))
+
+    def match_record_event(
+        self,
+        module: str,
+        event_type: str,
+        record: Mapping[str, Any],
+        fields: Optional[Iterable[str]] = None,
+        event: Optional[Mapping[str, Any]] = None,
+    ) -> List[TriggerEntry]:
+        """
+        SOP triggers matching a record event, one per SOP.
+
+        field_update triggers fire only for fields listed in `fields`; pass
+        the changed fields when known (see ZohoWebhookHandler, which derives
+        them from the payload or from previously seen values). With
+        fields=None only record-level triggers are considered.
+        """
+        context = ChainMap(dict(record or {}), dict(event or {}))
+        matched: Dict[str, TriggerEntry] = {}
+        for entry in self.candidates(module, event_type, fields):
+            if entry.sop_id in matched:
+                continue
+            if entry.matches(context):
+                matched[entry.sop_id] = entry
+        return list(matched.values())
+
+    def match_endpoint(
+        self,
+        endpoint: str,
+        payload: Optional[Mapping[str, Any]] = None,
+    ) -> List[TriggerEntry]:
+        """SOP triggers registered for a webhook endpoint whose conditions match."""
+        context = payload if isinstance(payload, Mapping) else {}
+        matched: Dict[str, TriggerEntry] = {}
+        for entry in self._endpoints.get(normalize_endpoint(endpoint), ()):
+            if entry.sop_id not in matched and entry.matches(context):
+                matched[entry.sop_id] = entry
+        return list(matched.values())
+
+    def endpoint_triggers(self, endpoint: str) -> List[TriggerEntry]:
+        """All triggers registered for a webhook endpoint, before conditions are checked."""
+        return list(self._endpoints.get(normalize_endpoint(endpoint), ()))
+
+    def endpoints(self) -> List[str]:
+        """All indexed webhook endpoint paths."""
+        return sorted(self._endpoints)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Index contents for the dashboard API."""
+        return {
+            "record_triggers": {
+                ":".join(k if k else "*" for k in key): [e.sop_id for e in entries]
+                for key, entries in self._records.items()
+            },
+            "endpoints": {key: [e.sop_id for e in entries] for key, entries in self._endpoints.items()},
+            "scheduled": [e.to_dict() for e in self.scheduled],
+            "total": sum(len(v) for v in self._records.values())
+                     + sum(len(v) for v in self._endpoints.values()) + len(self.scheduled),
+            "errors": list(self.errors),
+        }
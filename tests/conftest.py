@@ -27,3 +27,35 @@ def sops_path(workspace_path):
 def templates_path(workspace_path):
     """Return the templates directory path."""
     return workspace_path / "src" / "dashboard" / "templates"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_data_stores(tmp_path_factory):
+    """
+    Point the global execution history, approval manager, job queue and
+    webhook deduplicator at a temporary directory, so tests never write to
+    the real data/ databases.
+
+    Session-scoped because engines built during tests (including the
+    dashboard's cached engine) keep references to these singletons.
+    """
+    import src.integrations.zoho.dedup as dedup
+    import src.sop.approval as approval
+    import src.sop.history as history
+    import src.sop.job_queue as job_queue
+
+    data_dir = tmp_path_factory.mktemp("data")
+    history._history = history.ExecutionHistory(db_path=data_dir / "history.db")
+    approval._manager = approval.ApprovalManager(
+        db_path=data_dir / "approvals.db",
+        legacy_path=data_dir / "approvals.json",
+    )
+    job_queue._queue = job_queue.JobQueue(db_path=data_dir / "jobs.db")
+    dedup._deduplicator = dedup.WebhookDeduplicator(db_path=data_dir / "webhooks.db")
+    yield data_dir
+
+    stores = ((history, "_history"), (approval, "_manager"), (job_queue, "_queue"),
+              (dedup, "_deduplicator"))
+    for module, name in stores:
+        getattr(module, name).close()
+        setattr(module, name, None)
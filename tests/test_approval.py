@@ -0,0 +1,188 @@
+"""
+Pytest tests for the SOP approval manager.
+
+Tests cover:
+- SQLite persistence and incremental updates
+- Migration from the legacy JSON file
+- Retention / archival of resolved requests
+- Deadline heap and expiry sweeper
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.approval import ApprovalManager, ApprovalRequest, ApprovalStatus
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture
+def manager(tmp_path):
+    m = ApprovalManager(db_path=tmp_path / "approvals.db", legacy_path=tmp_path / "approvals.json")
+    yield m
+    m.close()
+
+
+def _create(manager, sop_id="sop_a", entity="dsaic", **kwargs):
+    return manager.create_request(
+        sop_id=sop_id,
+        sop_name="SOP A",
+        step_id="approve",
+        step_name="Approve",
+        entity=entity,
+        approvers=["ops"],
+        **kwargs,
+    )
+
+
+# =============================================================================
+# STORAGE
+# =============================================================================
+
+class TestApprovalStorage:
+    """Tests for SQLite-backed approval storage."""
+
+    def test_requests_persist_across_instances(self, tmp_path, manager):
+        pending = _create(manager, execution_state={"event": {"record_id": "1"}})
+        approved = _create(manager)
+        manager.approve(approved.id, "alice", "ok")
+
+        reopened = ApprovalManager(db_path=tmp_path / "approvals.db",
+                                   legacy_path=tmp_path / "approvals.json")
+        assert [r.id for r in reopened.get_pending()] == [pending.id]
+        assert reopened.get_request(pending.id).execution_state == {"event": {"record_id": "1"}}
+        assert reopened.get_request(approved.id).status == ApprovalStatus.APPROVED
+        assert reopened.get_request(approved.id).resolved_by == "alice"
+        reopened.close()
+
+    def test_resolving_twice_raises(self, manager):
+        request = _create(manager)
+        manager.reject(request.id, "bob", "no")
+        with pytest.raises(ValueError, match="not pending"):
+            manager.approve(request.id, "alice")
+        with pytest.raises(ValueError, match="not found"):
+            manager.approve("missing", "alice")
+
+    def test_queries_and_stats(self, manager):
+        a = _create(manager, sop_id="sop_a", entity="dsaic")
+        _create(manager, sop_id="sop_b", entity="computer_store")
+        manager.approve(a.id, "alice")
+
+        assert [r.id for r in manager.get_by_sop("sop_a")] == [a.id]
+        assert [r.entity for r in manager.get_pending("computer_store")] == ["computer_store"]
+
+        stats = manager.get_stats()
+        assert stats["total"] == 2
+        assert stats["pending"] == 1
+        assert stats["by_status"] == {"approved": 1, "pending": 1}
+
+
+# =============================================================================
+# MIGRATION AND RETENTION
+# =============================================================================
+
+class TestApprovalMigration:
+    """Tests for JSON migration and retention."""
+
+    def test_legacy_json_is_imported_once(self, tmp_path):
+        legacy = ApprovalRequest(
+            id="abc12345", sop_id="sop_a", sop_name="", step_id="s", step_name="",
+            entity="dsaic", requester="system", approvers=["ops"],
+        )
+        json_path = tmp_path / "approvals.json"
+        json_path.write_text(json.dumps({"requests": [legacy.to_dict()]}))
+
+        m = ApprovalManager(db_path=tmp_path / "approvals.db", legacy_path=json_path)
+        assert [r.id for r in m.get_pending()] == ["abc12345"]
+        m.approve("abc12345", "alice")
+        m.close()
+
+        # Re-opening must not re-import the stale pending copy from JSON
+        m = ApprovalManager(db_path=tmp_path / "approvals.db", legacy_path=json_path)
+        assert m.get_pending() == []
+        assert m.get_request("abc12345").status == ApprovalStatus.APPROVED
+        m.close()
+
+    def test_retention_archives_old_resolved_requests(self, manager):
+        old = _create(manager)
+        manager.approve(old.id, "alice")
+        old.resolved_at = datetime.now() - timedelta(days=120)
+        manager._save(old)
+        recent = _create(manager)
+        manager.approve(recent.id, "alice")
+        still_pending = _create(manager)
+
+        assert manager.apply_retention() == 1
+        assert manager.get_request(old.id) is None
+        assert manager.get_request(recent.id) is not None
+        assert manager.get_request(still_pending.id) is not None
+        assert manager.get_stats()["archived"] == 1
+
+
+# =============================================================================
+# EXPIRY
+# =============================================================================
+
+class TestApprovalExpiry:
+    """Tests for the deadline heap and expiry sweeper."""
+
+    def test_get_pending_is_read_only(self, manager):
+        request = _create(manager, expires_in_hours=0.01 / 3600)
+        time.sleep(0.02)
+
+        assert manager.get_pending() == []
+        # Still pending in storage until the sweeper runs
+        assert manager.get_request(request.id).status == ApprovalStatus.PENDING
+        assert [r.id for r in manager.expire_due()] == [request.id]
+
+    def test_expire_due_in_deadline_order(self, manager):
+        expired = []
+        manager.register_expiry_callback(expired.append)
+        late = _create(manager, expires_in_hours=3)
+        early = _create(manager, expires_in_hours=1)
+        never = _create(manager)
+
+        assert manager.next_expiry() == early.expires_at
+        manager.expire_due(datetime.now() + timedelta(hours=2))
+        assert [r.id for r in expired] == [early.id]
+        assert manager.get_request(early.id).status == ApprovalStatus.EXPIRED
+        assert manager.next_expiry() == late.expires_at
+        assert {r.id for r in manager.get_pending()} == {late.id, never.id}
+
+    def test_resolved_requests_do_not_expire(self, manager):
+        expired = []
+        manager.register_expiry_callback(expired.append)
+        request = _create(manager, expires_in_hours=1)
+        manager.approve(request.id, "alice")
+
+        assert manager.next_expiry() is None
+        assert manager.expire_due(datetime.now() + timedelta(hours=2)) == []
+        assert expired == []
+
+    def test_sweeper_expires_when_due(self, manager):
+        expired = []
+        manager.register_expiry_callback(expired.append)
+        manager.start_sweeper()
+        try:
+            _create(manager, expires_in_hours=1)
+            # Earlier deadline must wake the sweeper from its 1h wait
+            request = _create(manager, expires_in_hours=0.05 / 3600)
+
+            deadline = time.time() + 2
+            while not expired and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            manager.stop_sweeper()
+
+        assert [r.id for r in expired] == [request.id]
+        assert manager.get_request(request.id).status == ApprovalStatus.EXPIRED
@@ -0,0 +1,88 @@
+"""
+Pytest tests for the SOP engine benchmark harness.
+
+Tests cover:
+- Synthetic definition shape (step mix, conditions, loops)
+- A tiny scenario run producing the report fields
+- Report comparison
+"""
+
+import json
+import sys
+from pathlib import Path
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.benchmark import (
+    MIXED_TYPES, Scenario, StubAIClient, build_definition, compare, main,
+    make_engine, percentile, run_scenario,
+)
+
+
+# =============================================================================
+# DEFINITIONS
+# =============================================================================
+
+class TestSyntheticDefinitions:
+    """Tests for build_definition."""
+
+    def test_step_mix_conditions_and_loops(self):
+        definition = build_definition(Scenario(
+            "shape", steps=12, step_types=["transform", "condition"],
+            condition_ratio=0.25, loop_size=5,
+        ))
+        steps = definition["steps"]
+
+        assert len(steps) == 12
+        assert [s["type"] for s in steps[:3]] == ["transform", "condition", "loop"]
+        assert len(steps[2]["config"]["items"]) == 5
+        assert sum("condition" in s for s in steps) == 3
+        assert "depends_on" not in steps[3] and steps[4]["depends_on"] == ["step_3"]
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 50) == 0.0
+
+
+# =============================================================================
+# RUNS
+# =============================================================================
+
+class TestBenchmarkRun:
+    """Tests for run_scenario and the CLI report."""
+
+    def test_stub_clients_replace_integrations(self):
+        engine = make_engine(latency_ms=0)
+        assert isinstance(engine.ai_client, StubAIClient)
+        assert engine.execute_step(
+            build_definition(Scenario("one", steps=1, step_types=["content_generate"]))["steps"][0],
+            {"data": {"service": "Tutoring", "location": "Downtown"}},
+            {"sop_id": "x", "entity": "dsaic"},
+        ).success
+
+    def test_scenario_metrics(self):
+        metrics = run_scenario(
+            Scenario("tiny", steps=5, step_types=MIXED_TYPES, executions=5),
+            warmup=1, memory_samples=3,
+        )
+
+        assert metrics["failures"] == 0
+        assert metrics["steps_executed"] == 25
+        assert metrics["stub_calls"] == 15
+        assert metrics["steps_per_sec"] > 0
+        assert metrics["step_overhead_us"]["p99"] >= metrics["step_overhead_us"]["p50"]
+        assert metrics["memory_per_execution_bytes"]["p50"] > 0
+        assert metrics["history_growth"]["entries"] == 3
+
+    def test_cli_writes_report_and_compares(self, tmp_path, capsys):
+        out = tmp_path / "bench.json"
+        assert main(["--executions", "3", "--only", "engine_only_10", "--out", str(out)]) == 0
+        report = json.loads(out.read_text())
+        assert set(report["meta"]) >= {"timestamp", "python", "git_revision"}
+        assert report["results"]["engine_only_10"]["executions"] == 3
+
+        changes = compare(report, report)
+        assert changes["engine_only_10"]["steps_per_sec"] == 0.0
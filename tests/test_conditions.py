@@ -0,0 +1,139 @@
+"""
+Pytest tests for compiled SOP condition expressions.
+
+Tests cover:
+- Parsing and operator semantics
+- Field paths, null/exists and type coercion
+- Malformed expressions
+- Webhook mapping conditions
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.conditions import (
+    ConditionError, compile_condition, compile_field_conditions, evaluate_condition,
+)
+from src.sop.engine import EnhancedSOPEngine
+from src.integrations.zoho.webhooks import ZohoWebhookHandler
+
+
+# =============================================================================
+# EXPRESSIONS
+# =============================================================================
+
+class TestConditionExpressions:
+    """Tests for compile_condition / evaluate_condition."""
+
+    @pytest.mark.parametrize("expression,expected", [
+        ("Severity == 'High' AND Assigned_To == null", True),
+        ("Severity == 'Low' OR Hours_Open > 4", True),
+        ("NOT (Stage in ['Closed Won', 'Closed Lost'])", True),
+        ("Stage not in ['Prospecting']", False),
+        ("Services contains 'Tutoring' and Phone exists", True),
+        ("Email not exists", True),
+        ("Hours_Open >= (SLA_Hours * 0.25) + 1", True),
+        ("By_Category.snacks.length > 0", True),
+        ("By_Category.drinks.length > 0", False),
+        ("Approved == true", True),
+        ("Missing_Field > 3", False),
+    ])
+    def test_operators(self, expression, expected):
+        context = {
+            "Severity": "High", "Assigned_To": None, "Hours_Open": "6", "SLA_Hours": 8,
+            "Stage": "Prospecting", "Services": ["Tutoring", "Repair"], "Phone": "555",
+            "Email": "", "By_Category": {"snacks": [1, 2]}, "Approved": "true",
+        }
+        assert evaluate_condition(expression, context) is expected
+
+    def test_compiled_once_and_cached(self):
+        first = compile_condition("Score >= 80")
+        assert compile_condition("Score >= 80") is first
+        assert first.fields == {"Score"}
+        assert first({"Score": 85}) and not first({"Score": "79"})
+
+    @pytest.mark.parametrize("expression", ["Score >=", "(a == 1", "a == 'x' b", "len(a) > 1", "a $ b"])
+    def test_malformed_expressions(self, expression, capsys):
+        with pytest.raises(ConditionError):
+            compile_condition(expression)
+        assert evaluate_condition(expression, {"a": 1}) is False
+        assert "Invalid condition" in capsys.readouterr().out
+
+    def test_field_conditions(self):
+        condition = compile_field_conditions({
+            "Stage": "Closed Won",
+            "Amount": {"op": "gte", "value": 1000},
+            "Tags": {"op": "contains", "value": "vip"},
+            "Owner": {"op": "exists"},
+        })
+        record = {"Stage": "Closed Won", "Amount": "1500", "Tags": ["vip"], "Owner": "ann"}
+        assert condition(record)
+        assert not condition({**record, "Amount": 10})
+
+        with pytest.raises(ConditionError):
+            compile_field_conditions({"Stage": {"op": "like", "value": "x"}})
+
+    def test_field_conditions_dict_compiled_once(self, monkeypatch):
+        import src.sop.conditions as conditions
+
+        compiled = []
+        original = conditions.compile_field_conditions
+        monkeypatch.setattr(conditions, "compile_field_conditions",
+                            lambda c: compiled.append(c) or original(c))
+        spec = {"Stage": {"op": "in", "value": ["Won", "Lost"]}, "Region": "West-cache-test"}
+
+        for _ in range(3):
+            assert evaluate_condition(dict(spec), {"Stage": "Won", "Region": "West-cache-test"})
+        assert not evaluate_condition(spec, {"Stage": "Open", "Region": "West-cache-test"})
+        assert len(compiled) == 1
+
+        # Unhashable leaf values still work, just uncached
+        assert evaluate_condition({"Tags": {"op": "contains", "value": bytearray(b"x")}}, {"Tags": []}) is False
+
+
+# =============================================================================
+# INTEGRATION
+# =============================================================================
+
+class TestConditionIntegration:
+    """Tests for engine and webhook use of compiled conditions."""
+
+    def test_engine_reads_event_data_then_event(self):
+        engine = EnhancedSOPEngine()
+        event = {"event_type": "deal_won", "data": {"Amount": 500}}
+        assert engine._evaluate_condition("Amount > 100 AND event_type == 'deal_won'", event)
+        assert not engine._evaluate_condition("Amount > 1000", event)
+
+    def test_load_reports_invalid_conditions(self, capsys):
+        definition = {"sop_id": "sop_x", "steps": [
+            {"id": "ok", "condition": "a == 1"},
+            {"id": "bad", "condition": "a ==="},
+            {"id": "branch", "type": "condition", "config": {"expression": "b > 2"}},
+        ]}
+        assert EnhancedSOPEngine._compile_conditions(definition) == 2
+        assert "step bad" in capsys.readouterr().out
+
+    def test_webhook_mapping_conditions(self):
+        handler = ZohoWebhookHandler()
+        handler.map_to_sop("deal_won", "sop_big", "dsaic", {"Amount": {"op": "gt", "value": 1000}})
+        handler.map_to_sop("deal_won", "sop_module", "dsaic", {"module": "Deals"})
+        handler.map_to_sop("deal_won", "sop_expr", "dsaic", "Stage == 'Closed Won' AND Amount > 10")
+
+        result = handler.process_webhook({
+            "operation": "won",
+            "module": {"api_name": "Deal"},
+            "data": [{"id": "1", "Stage": "Closed Won", "Amount": "250"}],
+        })
+        assert [t["sop_id"] for t in result["triggered_sops"]] == ["sop_expr"]
+
+        result = handler.process_webhook({
+            "event_type": "deal_won",
+            "module": {"api_name": "Deals"},
+            "data": {"id": "2", "Stage": "Closed Won", "Amount": 5000},
+        })
+        assert [t["sop_id"] for t in result["triggered_sops"]] == ["sop_big", "sop_module", "sop_expr"]
@@ -0,0 +1,564 @@
+"""
+Pytest tests for the Zoho CRM integration.
+
+Tests cover:
+- Bulk create/update with per-record results
+- Write batching: window and size-cap flushes, result demultiplexing
+- Merging of concurrent updates to the same record
+- Lookup cache: TTL/LRU, invalidation by our writes and by webhooks
+- Client pool: shared client, cached health state, token refresh
+- Webhook deduplication: redeliveries, TTL window, SQLite tier
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.integrations.zoho.batching import CRMBatcher
+from src.integrations.zoho.cache import RecordCache
+from src.integrations.zoho.crm_handler import CRMStepHandler, ZohoCRMHandler
+from src.integrations.zoho.dedup import WebhookDeduplicator
+from src.integrations.zoho.pool import CRMClientPool
+from src.integrations.zoho.webhooks import ZohoWebhookHandler, ZohoWebhookRouter
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+class FakeCRMClient:
+    """In-memory CRMClient with Zoho-shaped bulk responses."""
+
+    def __init__(self, reject=None):
+        self.reject = reject or set()  # Last_Name values to fail
+        self.calls = []
+        self.records = {}
+        self._lock = threading.Lock()
+
+    def _result(self, record, record_id):
+        if record.get("Last_Name") in self.reject:
+            return {"status": "error", "code": "INVALID_DATA", "message": "invalid data"}
+        return {"status": "success", "details": {"id": record_id}}
+
+    def create_records(self, module, records, trigger=None):
+        with self._lock:
+            self.calls.append(("create", module, len(records)))
+            results = []
+            for record in records:
+                record_id = str(len(self.records) + 1)
+                result = self._result(record, record_id)
+                if result["status"] == "success":
+                    self.records[record_id] = dict(record)
+                results.append(result)
+            return {"data": results}
+
+    def update_records(self, module, records, trigger=None):
+        with self._lock:
+            self.calls.append(("update", module, len(records)))
+            for record in records:
+                self.records.setdefault(record["id"], {}).update(record)
+            return {"data": [self._result(r, r["id"]) for r in records]}
+
+    def create_record(self, module, data, trigger=None):
+        return self.create_records(module, [data])["data"][0]
+
+    def update_record(self, module, record_id, data, trigger=None):
+        return self.update_records(module, [{**data, "id": record_id}])["data"][0]
+
+    def search_records(self, module, criteria, per_page=10):
+        self.calls.append(("search", module, criteria))
+        return [dict(r, id=i) for i, r in self.records.items() if criteria in str(r)][:per_page]
+
+    def get_record(self, module, record_id, fields=None):
+        self.calls.append(("get", module, record_id))
+        return dict(self.records.get(record_id, {}), id=record_id)
+
+
+class SingleRecordClient:
+    """Client without bulk endpoints."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create_record(self, module, data, trigger=None):
+        self.calls += 1
+        return {"status": "success", "details": {"id": f"r{self.calls}"}}
+
+
+def connected_handler(client, **kwargs):
+    kwargs.setdefault("cache", RecordCache())
+    handler = ZohoCRMHandler(**kwargs)
+    handler._client = client
+    handler._connected = True
+    return handler
+
+
+# =============================================================================
+# BULK OPERATIONS
+# =============================================================================
+
+class TestBulkOperations:
+    def test_create_records_chunks_at_zoho_limit(self):
+        client = FakeCRMClient()
+        handler = connected_handler(client)
+
+        results = handler.create_records("Leads", [{"Last_Name": f"L{i}"} for i in range(250)])
+
+        assert [c[2] for c in client.calls] == [100, 100, 50]
+        assert all(r["success"] for r in results)
+        assert results[0]["record_id"] == "1" and results[-1]["record_id"] == "250"
+
+    def test_per_record_failures(self):
+        handler = connected_handler(FakeCRMClient(reject={"Bad"}))
+
+        results = handler.create_records("Leads", [{"Last_Name": "Ok"}, {"Last_Name": "Bad"}])
+
+        assert results[0]["success"] is True
+        assert results[1] == {"success": False, "error": "invalid data", "code": "INVALID_DATA"}
+
+    def test_falls_back_to_single_calls(self):
+        client = SingleRecordClient()
+        handler = connected_handler(client)
+
+        results = handler.create_records("Leads", [{}, {}, {}])
+
+        assert client.calls == 3
+        assert [r["record_id"] for r in results] == ["r1", "r2", "r3"]
+
+
+# =============================================================================
+# BATCHING
+# =============================================================================
+
+class TestBatching:
+    def test_concurrent_creates_share_one_call(self):
+        client = FakeCRMClient(reject={"Bad"})
+        handler = connected_handler(client, batch_window=0.2)
+        names = [f"L{i}" for i in range(20)] + ["Bad"]
+
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            results = list(pool.map(
+                lambda name: handler.create_record("Leads", {"Last_Name": name}), names
+            ))
+
+        assert client.calls == [("create", "Leads", 21)]
+        assert all(r["success"] for r in results[:-1])
+        assert results[-1]["success"] is False
+        # Each caller gets its own record's ID back
+        ids = {r["record_id"] for r in results[:-1]}
+        assert len(ids) == 20
+        assert {client.records[i]["Last_Name"] for i in ids} == set(names[:-1])
+
+    def test_full_buffer_flushes_without_waiting(self):
+        client = FakeCRMClient()
+        batcher = CRMBatcher(connected_handler(client), window=60, max_batch=5)
+
+        futures = [batcher.submit_create("Leads", {"Last_Name": str(i)}) for i in range(7)]
+
+        assert [f.done() for f in futures] == [True] * 5 + [False] * 2
+        batcher.close()
+        assert all(f.result()["success"] for f in futures)
+        assert client.calls == [("create", "Leads", 5), ("create", "Leads", 2)]
+
+    def test_updates_to_same_record_are_merged(self):
+        client = FakeCRMClient()
+        batcher = CRMBatcher(connected_handler(client), window=60)
+
+        first = batcher.submit_update("Deals", "42", {"Stage": "Qualification", "Amount": 100})
+        second = batcher.submit_update("Deals", "42", {"Stage": "Negotiation"})
+        other = batcher.submit_update("Deals", "7", {"Stage": "Closed Won"})
+        batcher.flush()
+
+        assert client.calls == [("update", "Deals", 2)]
+        assert client.records["42"] == {"id": "42", "Stage": "Negotiation", "Amount": 100}
+        assert first.result()["record_id"] == second.result()["record_id"] == "42"
+        assert other.result()["success"] is True
+        stats = batcher.get_stats()
+        assert stats["merged"] == 1
+        assert stats["calls_saved"] == 2
+
+    def test_modules_are_batched_separately(self):
+        client = FakeCRMClient()
+        batcher = CRMBatcher(connected_handler(client), window=60)
+
+        batcher.submit_create("Leads", {"Last_Name": "A"})
+        batcher.submit_create("Tasks", {"Subject": "Call"})
+        batcher.flush()
+
+        assert sorted(client.calls) == [("create", "Leads", 1), ("create", "Tasks", 1)]
+
+    def test_step_handler_batches_by_default(self):
+        client = FakeCRMClient()
+        step_handler = CRMStepHandler()
+        step_handler.crm._client = client
+        step_handler.crm._connected = True
+        step_handler._connected = True
+        context = {"variables": {"name": "Ada"}}
+
+        result = step_handler.handle_step(
+            "crm_create", {"module": "Leads", "data": {"Last_Name": "{{name}}"}}, context
+        )
+
+        assert result["success"] is True
+        assert context["variables"]["crm_leads_id"] == result["record_id"]
+        assert step_handler.crm.batcher.get_stats()["batches"] == 1
+
+
+# =============================================================================
+# LOOKUP CACHE
+# =============================================================================
+
+class TestLookupCache:
+    def _lookups(self, client):
+        return [c for c in client.calls if c[0] in ("search", "get")]
+
+    def test_repeated_search_is_served_from_cache(self):
+        client = FakeCRMClient()
+        client.records["1"] = {"Email": "ada@example.com"}
+        handler = connected_handler(client)
+
+        first = handler.search_records("Contacts", "ada@example.com")
+        first["records"].append({"mutated": True})
+        second = handler.search_records("Contacts", "ada@example.com")
+
+        assert len(self._lookups(client)) == 1
+        assert second["count"] == 1 and len(second["records"]) == 1
+        assert handler.cache.get_stats()["hit_rate"] == 0.5
+
+    def test_keys_include_limit_and_fields(self):
+        client = FakeCRMClient()
+        handler = connected_handler(client)
+
+        handler.search_records("Contacts", "x", limit=1)
+        handler.search_records("Contacts", "x", limit=5)
+        handler.get_record("Contacts", "1", ["Email"])
+        handler.get_record("Contacts", "1")
+        handler.get_record("Contacts", "1", use_cache=False)
+
+        assert len(self._lookups(client)) == 5
+
+    def test_own_update_invalidates_record_and_searches(self):
+        client = FakeCRMClient()
+        handler = connected_handler(client)
+        handler.create_record("Contacts", {"Last_Name": "Ada"})
+        handler.get_record("Contacts", "2")  # Other record, unaffected
+        handler.get_record("Contacts", "1")
+        handler.search_records("Contacts", "Lovelace")
+
+        handler.update_record("Contacts", "1", {"Last_Name": "Lovelace"})
+
+        assert handler.get_record("Contacts", "1")["record"]["Last_Name"] == "Lovelace"
+        assert handler.search_records("Contacts", "Lovelace")["count"] == 1
+        handler.get_record("Contacts", "2")
+        assert len(self._lookups(client)) == 5
+
+    def test_batched_writes_invalidate(self):
+        client = FakeCRMClient()
+        handler = connected_handler(client, batch_window=0.01)
+        handler.search_records("Leads", "Ada")
+
+        handler.create_record("Leads", {"Last_Name": "Ada"})
+
+        assert handler.search_records("Leads", "Ada")["count"] == 1
+
+    def test_webhook_event_invalidates(self):
+        client = FakeCRMClient()
+        client.records["7"] = {"Stage": "Qualification"}
+        handler = connected_handler(client)
+        webhooks = ZohoWebhookHandler(record_cache=handler.cache)
+        handler.get_record("Deals", "7")
+        client.records["7"]["Stage"] = "Closed Won"  # Edited in Zoho
+
+        webhooks.process_webhook({
+            "operation": "edit",
+            "module": {"api_name": "Deals"},
+            "data": [{"id": "7", "Stage": "Closed Won"}],
+        })
+
+        assert handler.get_record("Deals", "7")["record"]["Stage"] == "Closed Won"
+
+    def test_stale_lookup_is_not_stored(self):
+        cache = RecordCache()
+        key = RecordCache.record_key("Deals", "7")
+        generation = cache.generation("Deals")
+        cache.invalidate("Deals", "7")  # Write lands while the lookup is in flight
+
+        cache.put(key, {"success": True}, generation)
+
+        assert cache.get(key) is None
+
+    def test_ttl_and_lru_eviction(self):
+        cache = RecordCache(ttl=0.05, max_entries=2)
+        keys = [RecordCache.search_key("Leads", str(i), 10) for i in range(3)]
+        cache.put(keys[0], 0)
+        cache.put(keys[1], 1)
+        cache.get(keys[0])
+        cache.put(keys[2], 2)
+
+        assert cache.get(keys[1]) is None  # Least recently used
+        assert cache.get(keys[0]) == 0
+        time.sleep(0.06)
+        assert cache.get(keys[2]) is None
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1 and stats["expired"] == 1
+
+
+# =============================================================================
+# CLIENT POOL
+# =============================================================================
+
+class PooledClient(FakeCRMClient):
+    """Client with a connection check and an expiring OAuth token."""
+
+    healthy = True
+
+    def __init__(self, token_lifetime=3600):
+        super().__init__()
+        self.token_lifetime = token_lifetime
+        self.token_expires_at = time.time() + token_lifetime
+        self.checks = 0
+        self.refreshes = 0
+
+    def test_crm_connection(self):
+        self.checks += 1
+        return {"success": True} if self.healthy else {"success": False, "error": "invalid_token"}
+
+    def refresh_access_token(self):
+        self.refreshes += 1
+        self.token_expires_at = time.time() + 3600
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestClientPool:
+    def test_handlers_share_one_client_without_handshakes(self):
+        created = []
+        pool = CRMClientPool(lambda: created.append(PooledClient()) or created[-1])
+        try:
+            handlers = [ZohoCRMHandler(pool=pool, cache=RecordCache()) for _ in range(5)]
+
+            assert all(h.connect() for h in handlers)
+            assert len(created) == 1
+            assert {id(h._client) for h in handlers} == {id(created[0])}
+            assert wait_for(lambda: pool.status()["checks"] == 1)
+            for _ in range(10):
+                assert pool.status()["connected"] is True
+            assert created[0].checks == 1
+        finally:
+            pool.stop()
+
+    def test_failed_check_is_reported_from_last_state(self):
+        client = PooledClient()
+        client.healthy = False
+        pool = CRMClientPool(lambda: client)
+
+        pool.maintain()  # Background thread's work, run inline
+        handler = ZohoCRMHandler(pool=pool, cache=RecordCache())
+
+        assert handler.connect() is False
+        assert handler._last_error == "invalid_token"
+        assert pool.status()["failed_checks"] == 1
+        pool.stop()
+
+        client.healthy = True
+        pool.check_health()
+        assert handler.connect() is True
+        pool.stop()
+
+    def test_token_refreshed_before_expiry(self):
+        client = PooledClient(token_lifetime=60)
+        pool = CRMClientPool(lambda: client, refresh_margin=300)
+
+        pool.maintain()
+
+        assert client.refreshes == 1
+        assert pool.status()["token_expires_in"] > 3000
+        pool.maintain()
+        assert client.refreshes == 1
+        pool.stop()
+
+    def test_failed_refresh_backs_off(self):
+        class BrokenAuthClient(PooledClient):
+            def refresh_access_token(self):
+                self.refreshes += 1
+                raise RuntimeError("invalid_grant")
+
+        class StaleTokenClient(PooledClient):
+            def refresh_access_token(self):
+                self.refreshes += 1  # Succeeds but keeps reporting the old expiry
+
+        for client in (BrokenAuthClient(token_lifetime=60), StaleTokenClient(token_lifetime=60)):
+            pool = CRMClientPool(lambda: client, retry_interval=0.05, refresh_margin=300)
+            pool.start()
+            time.sleep(0.5)
+            pool.stop()
+
+            # Retries at ~0, 0.05, 0.15 and 0.35s rather than continuously
+            assert 2 <= client.refreshes <= 5
+
+    def test_unavailable_without_client_factory(self):
+        pool = CRMClientPool(None)
+        handler = ZohoCRMHandler(pool=pool, cache=RecordCache())
+
+        assert handler.connect() is False
+        assert pool.status() == {
+            "available": False, "connected": False, "error": "Zoho API system not available"
+        }
+
+
+# =============================================================================
+# WEBHOOK DEDUPLICATION
+# =============================================================================
+
+def deal_webhook(stage="Closed Won", modified="2026-10-18T10:00:00+00:00"):
+    record = {"id": "9", "Stage": stage}
+    if modified:
+        record["Modified_Time"] = modified
+    return {"operation": "edit", "module": {"api_name": "Deals"}, "data": [record]}
+
+
+class TestWebhookDeduplication:
+    def _handler(self, **kwargs):
+        handler = ZohoWebhookHandler(record_cache=RecordCache(), **kwargs)
+        handler.map_to_sop("edit", "sop_deal", "dsaic")
+        return handler
+
+    def test_redelivery_is_acknowledged_without_dispatch(self):
+        handler = self._handler()
+        calls = []
+        handler.register_callback("edit", calls.append)
+
+        first = handler.process_webhook(deal_webhook())
+        retry = handler.process_webhook(deal_webhook())
+
+        assert first["duplicate"] is False and len(first["triggered_sops"]) == 1
+        assert retry["success"] is True and retry["duplicate"] is True
+        assert retry["triggered_sops"] == [] and len(calls) == 1
+        stats = handler.get_mappings_summary()["deduplication"]
+        assert stats["duplicates"] == 1 and stats["duplicate_rate"] == 0.5
+
+    def test_new_modified_time_or_payload_is_not_a_duplicate(self):
+        handler = self._handler()
+
+        handler.process_webhook(deal_webhook())
+        later_edit = handler.process_webhook(deal_webhook(modified="2026-10-18T10:05:00+00:00"))
+        handler.process_webhook(deal_webhook(modified=None))
+        other_payload = handler.process_webhook(deal_webhook(stage="Closed Lost", modified=None))
+
+        assert later_edit["duplicate"] is False
+        assert other_payload["duplicate"] is False
+
+    def test_concurrent_redeliveries_dispatch_once(self):
+        handler = self._handler()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: handler.process_webhook(deal_webhook()), range(8)))
+
+        assert sum(not r["duplicate"] for r in results) == 1
+
+    def test_keys_expire_and_are_bounded(self):
+        dedup = WebhookDeduplicator(ttl=0.05, max_entries=2)
+
+        assert dedup.check_and_record("a") is False
+        assert dedup.check_and_record("a") is True
+        time.sleep(0.06)
+        assert dedup.check_and_record("a") is False
+        dedup.check_and_record("b")
+        dedup.check_and_record("c")
+        assert dedup.get_stats()["memory_entries"] == 2
+
+    def test_sqlite_tier_survives_restart(self, tmp_path):
+        db_path = tmp_path / "webhooks.db"
+        first = self._handler(deduplicator=WebhookDeduplicator(db_path=db_path))
+        first.process_webhook(deal_webhook())
+        first.deduplicator.close()
+
+        restarted = self._handler(deduplicator=WebhookDeduplicator(db_path=db_path))
+        result = restarted.process_webhook(deal_webhook())
+
+        assert result["duplicate"] is True
+        assert restarted.deduplicator.get_stats()["db_hits"] == 1
+        restarted.deduplicator.forget(result["delivery_key"])
+        assert restarted.process_webhook(deal_webhook())["duplicate"] is False
+
+    def test_failed_dispatch_lets_retry_through(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        class FlakyQueue:
+            def __init__(self):
+                self.jobs = []
+
+            def enqueue(self, sop_id, entity, event, **kwargs):
+                if not self.jobs:
+                    self.jobs.append(None)
+                    raise RuntimeError("database is locked")
+                self.jobs.append(sop_id)
+                return f"job-{len(self.jobs)}"
+
+        handler = self._handler()
+        queue = FlakyQueue()
+        app = FastAPI()
+        app.include_router(ZohoWebhookRouter(handler, job_queue=queue).router, prefix="/webhooks")
+        client = TestClient(app)
+
+        failed = client.post("/webhooks/zoho", json=deal_webhook())
+        retry = client.post("/webhooks/zoho", json=deal_webhook())
+        again = client.post("/webhooks/zoho", json=deal_webhook())
+
+        assert failed.status_code == 500
+        assert retry.json()["duplicate"] is False and retry.json()["job_ids"] == ["job-2"]
+        assert again.json()["duplicate"] is True and queue.jobs == [None, "sop_deal"]
+
+    def test_partial_dispatch_failure_keeps_key(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        class HalfBrokenQueue:
+            def __init__(self):
+                self.jobs = []
+
+            def enqueue(self, sop_id, entity, event, **kwargs):
+                if sop_id == "sop_broken":
+                    raise RuntimeError("database is locked")
+                self.jobs.append(sop_id)
+                return f"job-{len(self.jobs)}"
+
+        handler = self._handler()
+        handler.map_to_sop("edit", "sop_broken", "dsaic")
+        queue = HalfBrokenQueue()
+        app = FastAPI()
+        app.include_router(ZohoWebhookRouter(handler, job_queue=queue).router, prefix="/webhooks")
+        client = TestClient(app)
+
+        first = client.post("/webhooks/zoho", json=deal_webhook())
+        retry = client.post("/webhooks/zoho", json=deal_webhook())
+
+        assert first.status_code == 200
+        assert first.json()["sops_triggered"] == [
+            {"sop_id": "sop_deal", "job_id": "job-1", "queued": True},
+            {"sop_id": "sop_broken", "error": "database is locked"},
+        ]
+        # The SOP that was queued is not queued again by Zoho's retry
+        assert retry.json()["duplicate"] is True and queue.jobs == ["sop_deal"]
+
+    def test_invalid_signature_is_a_client_error(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        app = FastAPI()
+        app.include_router(ZohoWebhookRouter(self._handler(webhook_secret="s")).router, prefix="/webhooks")
+        response = TestClient(app).post(
+            "/webhooks/zoho", json=deal_webhook(), headers={"X-Zoho-Signature": "bad"}
+        )
+        assert response.status_code == 400
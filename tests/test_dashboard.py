@@ -344,6 +344,104 @@ class TestTriggerEndpoints:
                     
         pytest.skip("No SOPs available for trigger testing")
 
+    @pytest.fixture
+    def hook_engine(self):
+        from unittest.mock import AsyncMock
+        from src.sop.triggers import TriggerIndex
+
+        engine = MagicMock()
+        engine.trigger_index = TriggerIndex.build([{
+            "sop_id": "hook_sop", "entity": "dsaic",
+            "triggers": [{"type": "webhook", "endpoint": "/webhooks/test/ping", "secret": "s3cret"}],
+        }])
+        engine.execute_sop_async = AsyncMock(return_value={"success": True})
+        with patch("src.dashboard.app.get_sop_engine", return_value=engine), \
+                patch("src.dashboard.app.JOB_QUEUE_AVAILABLE", False):
+            yield engine
+
+    def test_sop_webhook_without_queue_runs_async(self, client, hook_engine):
+        """Without a job queue, SOP webhooks await the async engine path."""
+        response = client.post("/webhooks/test/ping", json={"x": 1},
+                               headers={"X-Webhook-Secret": "s3cret"})
+
+        assert response.json()["sops_triggered"] == [{"sop_id": "hook_sop", "success": True}]
+        hook_engine.execute_sop_async.assert_awaited_once()
+        hook_engine.execute_sop.assert_not_called()
+
+    def test_sop_webhook_requires_trigger_secret(self, client, hook_engine):
+        """Unsigned or wrongly signed SOP webhooks are rejected before anything runs."""
+        assert client.post("/webhooks/test/ping", json={"x": 2}).status_code == 401
+        response = client.post("/webhooks/test/ping", json={"x": 2},
+                               headers={"X-Webhook-Signature": "0" * 64})
+        assert response.status_code == 401
+        hook_engine.execute_sop_async.assert_not_awaited()
+
+    def test_sop_webhook_redelivery_is_deduplicated(self, client, hook_engine):
+        """A signed delivery retried by the sender runs its SOPs once."""
+        import hashlib
+        import hmac
+
+        body = b'{"order": "redelivered"}'
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Signature": hmac.new(b"s3cret", body, hashlib.sha256).hexdigest(),
+        }
+        first = client.post("/webhooks/test/ping", content=body, headers=headers)
+        retry = client.post("/webhooks/test/ping", content=body, headers=headers)
+
+        assert first.json()["duplicate"] is False
+        assert retry.json()["duplicate"] is True
+        hook_engine.execute_sop_async.assert_awaited_once()
+
+    def test_cron_triggers_synced_into_scheduler(self, tmp_path):
+        """SOP `scheduled` triggers become scheduler entries at startup."""
+        from src.dashboard import app as app_module
+        from src.sop.scheduler import SOPScheduler
+
+        scheduler = SOPScheduler(storage_path=tmp_path / "schedules.json")
+        with patch("src.dashboard.app.get_scheduler", return_value=scheduler):
+            app_module.sync_trigger_schedules()
+            app_module.sync_trigger_schedules()
+
+        assert "dsaic_churn_prevention" in [s.sop_id for s in scheduler.list_schedules()]
+        assert len(scheduler.list_schedules()) == len(app_module.get_sop_engine().trigger_index.scheduled)
+
+    def test_webhook_deduplicator_opened_at_startup(self, workspace_path):
+        """Importing the app does not open data/webhooks.db; startup attaches the shared store."""
+        import asyncio
+        from src.dashboard import app as app_module
+        from src.integrations.zoho.dedup import get_webhook_deduplicator
+
+        handler = app_module._zoho_handler
+        assert handler.deduplicator.db_path is None
+        with patch.object(handler, "deduplicator", handler.deduplicator):
+            asyncio.run(app_module.open_webhook_deduplicator())
+            assert handler.deduplicator is get_webhook_deduplicator()
+            assert workspace_path / "data" not in handler.deduplicator.db_path.parents
+
+    def test_zoho_webhook_without_queue_runs_async(self, client):
+        """Without a job queue, matched Zoho SOPs run inline instead of being dropped."""
+        from unittest.mock import AsyncMock
+        from src.integrations.zoho.webhooks import ZohoWebhookHandler
+        from src.sop.triggers import TriggerIndex
+
+        handler = ZohoWebhookHandler()
+        handler.map_to_sop("edit", "deal_sop", "dsaic")
+        engine = MagicMock()
+        engine.trigger_index = TriggerIndex.build([])
+        engine.execute_sop_async = AsyncMock(return_value={"success": True})
+        webhook = {"operation": "edit", "module": {"api_name": "Deals"},
+                   "data": [{"id": "9", "Stage": "Closed Won"}]}
+
+        with patch("src.dashboard.app.ZOHO_AVAILABLE", True), \
+                patch("src.dashboard.app._zoho_handler", handler), \
+                patch("src.dashboard.app.get_sop_engine", return_value=engine), \
+                patch("src.dashboard.app.JOB_QUEUE_AVAILABLE", False):
+            response = client.post("/webhooks/zoho", json=webhook)
+
+        assert response.json()["sops_triggered"] == [{"sop_id": "deal_sop", "success": True}]
+        engine.execute_sop_async.assert_awaited_once()
+
 
 # =============================================================================
 # CONTENT GENERATION TESTS
@@ -0,0 +1,144 @@
+"""
+Pytest tests for the persistent SOP execution history.
+
+Tests cover:
+- Append, paged and filtered queries
+- Retention by row count and age
+- In-memory tail and persistence across reopen
+- Engine and /history integration
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.engine import EnhancedSOPEngine
+from src.sop.history import ExecutionHistory
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+def _result(sop_id="sop_a", entity="dsaic", success=True, steps=(True,), started=None):
+    started = started or datetime.now()
+    return {
+        "success": success,
+        "sop_id": sop_id,
+        "sop_name": sop_id.title(),
+        "entity": entity,
+        "dry_run": False,
+        "parallel": False,
+        "step_results": [{"step_id": f"s{i}", "success": ok} for i, ok in enumerate(steps)],
+        "started_at": started.isoformat(),
+        "completed_at": (started + timedelta(milliseconds=250)).isoformat(),
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = ExecutionHistory(tmp_path / "history.db", tail_size=5)
+    yield store
+    store.close()
+
+
+# =============================================================================
+# STORE
+# =============================================================================
+
+class TestExecutionHistory:
+    """Tests for ExecutionHistory."""
+
+    def test_paged_and_filtered_queries(self, history):
+        base = datetime(2026, 3, 1, 12, 0)
+        for i in range(12):
+            history.append(_result(
+                sop_id="sop_a" if i % 2 else "sop_b",
+                entity="dsaic" if i < 6 else "computer_store",
+                success=i % 3 != 0,
+                steps=(True, i % 4 != 1),
+                started=base + timedelta(hours=i),
+            ))
+
+        page = history.query(per_page=5, page=3)
+        assert (page["total"], page["total_pages"], len(page["items"])) == (12, 3, 2)
+        assert page["items"][0]["started_at"] == (base + timedelta(hours=1)).isoformat()
+        assert page["items"][0]["duration_ms"] == 250
+
+        assert history.query(entity="dsaic", sop_id="sop_a")["total"] == 3
+        assert history.query(status="failed")["total"] == 4
+        assert history.query(status="partial")["total"] == 2
+        assert history.query(since=(base + timedelta(hours=10)).isoformat())["total"] == 2
+
+        first = history.query(per_page=1)["items"][0]
+        assert history.get(first["id"])["step_results"][1]["step_id"] == "s1"
+
+    def test_retention_by_rows_and_age(self, tmp_path):
+        store = ExecutionHistory(tmp_path / "h.db", max_rows=10, prune_every=5)
+        store.append(_result(started=datetime.now() - timedelta(days=400)))
+        for _ in range(14):
+            store.append(_result())
+        assert store.count() == 10
+        assert store.get_stats()["pruned"] == 5
+
+        store.retention_days = 0.5
+        store.append(_result(started=datetime.now() - timedelta(days=1)))
+        assert store.prune() == 1
+        assert store.query(since=(datetime.now() - timedelta(hours=1)).isoformat())["total"] == 10
+        store.compact()
+        store.close()
+
+    def test_tail_is_bounded_and_store_survives_reopen(self, tmp_path, history):
+        for i in range(8):
+            history.append(_result(sop_id=f"sop_{i}"))
+        assert [r["sop_id"] for r in history.recent(3)] == ["sop_5", "sop_6", "sop_7"]
+        assert len(history.recent(8)) == 8  # falls through to the database
+        assert history.get_stats()["tail"] == 5
+
+        reopened = ExecutionHistory(tmp_path / "history.db")
+        assert reopened.count() == 8
+        assert reopened.recent(1)[0]["sop_id"] == "sop_7"
+        reopened.close()
+
+
+# =============================================================================
+# INTEGRATION
+# =============================================================================
+
+class TestEngineHistory:
+    """Tests for the engine and dashboard using the history store."""
+
+    def test_engine_records_into_store(self, history):
+        engine = EnhancedSOPEngine(history=history)
+        engine._definitions["sop_h"] = {
+            "sop_id": "sop_h", "name": "History", "entity": "dsaic",
+            "steps": [{"id": "a", "name": "A", "type": "data_sync", "config": {}}],
+        }
+        result = engine.execute_sop("sop_h")
+
+        assert engine.get_history(1)[0]["id"] == result["id"]
+        assert history.query(sop_id="sop_h")["items"][0]["steps_passed"] == 1
+        assert engine.get_stats()["executions"] == 1
+
+    def test_history_page_filters(self, history, monkeypatch):
+        from fastapi.testclient import TestClient
+        from src.dashboard import app as dashboard
+
+        for i in range(60):
+            history.append(_result(entity="dsaic" if i % 2 else "computer_store"))
+        engine = EnhancedSOPEngine(history=history)
+        monkeypatch.setattr(dashboard, "get_sop_engine", lambda: engine)
+
+        client = TestClient(dashboard.app)
+        page = client.get("/history?entity=dsaic&page=1")
+        assert page.status_code == 200
+        assert page.text.count("View Details") == 30
+        assert "page=2" not in page.text
+
+        page = client.get("/history?page=2")
+        assert page.text.count("View Details") == 10
@@ -0,0 +1,208 @@
+"""
+Pytest tests for the SOP job queue.
+
+Tests cover:
+- Enqueue / claim / complete lifecycle
+- Retries with backoff and visibility timeouts
+- Lease tokens (a worker that lost its lease cannot finish the job)
+- Per-entity concurrency limits
+- Worker pool draining through an engine
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.job_queue import JobQueue, JobStatus, JobWorkerPool, enqueue_sop_run
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(db_path=tmp_path / "jobs.db", retry_backoff=0.0)
+    yield q
+    q.close()
+
+
+class FakeEngine:
+    """Records execute_sop calls; SOPs listed in `failing` return failure."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def execute_sop(self, sop_id, event=None):
+        self.calls.append((sop_id, event))
+        if sop_id in self.failing:
+            return {"success": False, "error": "boom"}
+        return {"success": True}
+
+    def get_definition(self, sop_id):
+        return {"config": {"retry_policy": {"max_attempts": 5, "backoff_seconds": 0}}}
+
+
+# =============================================================================
+# QUEUE
+# =============================================================================
+
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    def test_enqueue_claim_complete(self, queue):
+        job_id = queue.enqueue("sop_a", "dsaic", {"record_id": "1"})
+        job = queue.claim()
+
+        assert job.id == job_id
+        assert job.status == JobStatus.RUNNING
+        assert job.attempts == 1
+        assert job.event == {"record_id": "1"}
+        assert queue.claim() is None
+
+        queue.complete(job_id)
+        assert queue.get_job(job_id).status == JobStatus.SUCCEEDED
+
+    def test_jobs_survive_reopen(self, tmp_path):
+        q = JobQueue(db_path=tmp_path / "jobs.db")
+        job_id = q.enqueue("sop_a", "dsaic")
+        q.close()
+
+        reopened = JobQueue(db_path=tmp_path / "jobs.db")
+        assert reopened.claim().id == job_id
+        reopened.close()
+
+    def test_fail_retries_then_gives_up(self, queue):
+        job_id = queue.enqueue("sop_a", "dsaic", max_attempts=2)
+
+        queue.claim()
+        assert queue.fail(job_id, "first") == JobStatus.QUEUED
+        queue.claim()
+        assert queue.fail(job_id, "second") == JobStatus.FAILED
+
+        job = queue.get_job(job_id)
+        assert job.attempts == 2
+        assert job.last_error == "second"
+
+    def test_retry_backoff_delays_job(self, queue):
+        job_id = queue.enqueue("sop_a", "dsaic", backoff_seconds=60)
+        queue.claim()
+        queue.fail(job_id, "transient")
+        assert queue.claim() is None
+        assert queue.get_stats()["depth"] == 1
+
+    def test_expired_lease_is_redelivered(self, tmp_path):
+        q = JobQueue(db_path=tmp_path / "jobs.db", visibility_timeout=0.05)
+        job_id = q.enqueue("sop_a", "dsaic")
+        q.claim()
+        assert q.claim() is None
+
+        time.sleep(0.1)
+        job = q.claim()
+        assert job.id == job_id
+        assert job.attempts == 2
+        q.close()
+
+    def test_stale_lease_cannot_finish_job(self, tmp_path):
+        q = JobQueue(db_path=tmp_path / "jobs.db", visibility_timeout=0.05)
+        job_id = q.enqueue("sop_a", "dsaic")
+        stale = q.claim()
+        time.sleep(0.1)
+        current = q.claim()
+        assert current.lease_token != stale.lease_token
+
+        assert q.complete(job_id, stale.lease_token) is False
+        assert q.fail(job_id, "late failure", stale.lease_token) is None
+        assert q.heartbeat(job_id, stale.lease_token) is False
+        assert q.get_job(job_id).status == JobStatus.RUNNING
+
+        assert q.complete(job_id, current.lease_token) is True
+        assert q.get_job(job_id).status == JobStatus.SUCCEEDED
+        q.close()
+
+    def test_expired_final_attempt_is_dead_lettered(self, tmp_path):
+        q = JobQueue(db_path=tmp_path / "jobs.db", visibility_timeout=0.05, max_attempts=1)
+        job_id = q.enqueue("sop_a", "dsaic")
+        q.claim()
+        time.sleep(0.1)
+
+        assert q.claim() is None
+        job = q.get_job(job_id)
+        assert job.status == JobStatus.FAILED
+        assert job.attempts == 1
+        assert "Lease expired" in job.last_error
+        q.close()
+
+    def test_entity_limit(self, queue):
+        queue.enqueue("a1", "dsaic")
+        queue.enqueue("a2", "dsaic")
+        queue.enqueue("b1", "computer_store")
+
+        first = queue.claim(default_entity_limit=1)
+        second = queue.claim(default_entity_limit=1)
+        assert (first.entity, second.entity) == ("dsaic", "computer_store")
+        assert queue.claim(default_entity_limit=1) is None
+        assert queue.claim(entity_limits={"dsaic": 2}, default_entity_limit=1).sop_id == "a2"
+
+    def test_stats(self, queue):
+        queue.enqueue("a", "dsaic")
+        queue.enqueue("b", "dsaic")
+        queue.claim()
+
+        stats = queue.get_stats()
+        assert stats["depth"] == 1
+        assert stats["ready"] == 1
+        assert stats["running"] == 1
+        assert stats["lag_seconds"] >= 0
+        assert stats["active_by_entity"] == {"dsaic": 2}
+
+
+# =============================================================================
+# WORKERS
+# =============================================================================
+
+class TestJobWorkerPool:
+    """Tests for JobWorkerPool."""
+
+    def test_run_once_completes_job(self, queue):
+        engine = FakeEngine()
+        job_id = queue.enqueue("sop_a", "dsaic", {"x": 1})
+        pool = JobWorkerPool(queue, engine)
+
+        assert pool.run_once() is True
+        assert engine.calls == [("sop_a", {"x": 1})]
+        assert queue.get_job(job_id).status == JobStatus.SUCCEEDED
+        assert pool.run_once() is False
+
+    def test_failed_sop_uses_retry_policy(self, queue):
+        engine = FakeEngine(failing={"sop_a"})
+        job_id = enqueue_sop_run(queue, "sop_a", "dsaic", engine=engine)
+        pool = JobWorkerPool(queue, engine)
+
+        while pool.run_once():
+            pass
+        job = queue.get_job(job_id)
+        assert job.status == JobStatus.FAILED
+        assert job.attempts == 5
+        assert job.last_error == "boom"
+
+    def test_threads_drain_queue(self, queue):
+        engine = FakeEngine()
+        for i in range(10):
+            queue.enqueue(f"sop_{i}", "dsaic")
+
+        pool = JobWorkerPool(queue, engine, workers=3, poll_interval=0.01)
+        pool.start()
+        deadline = time.time() + 5
+        while queue.get_stats()["succeeded"] < 10 and time.time() < deadline:
+            time.sleep(0.02)
+        pool.stop()
+
+        assert queue.get_stats()["succeeded"] == 10
+        assert len(engine.calls) == 10
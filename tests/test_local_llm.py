@@ -0,0 +1,370 @@
+"""
+Pytest tests for the llamafile server client.
+
+Tests cover:
+- Keep-alive connection reuse across prompts
+- Recovery when the server closes an idle connection
+- Token streaming via ask_stream
+- Managed llamafile server child (start, crash restart, idle shutdown)
+- Two-tier response cache
+- Concurrent, packed AIContentGenerator.bulk_generate
+- Stable voice prefixes with prompt caching and slot affinity
+"""
+
+import json
+import os
+import re
+import sys
+import textwrap
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from local_llm import LlamafileDelegate, ResponseCache
+from src.content.ai_generator import AIContentGenerator
+from src.sop.social_handler import ContentGenerateHandler
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+class FakeLlamafileServer:
+    """OpenAI-compatible chat endpoint answering with a fixed list of tokens."""
+
+    def __init__(self, tokens=("Hello", ", ", "world")):
+        self.tokens = list(tokens)
+        self.connections = set()
+        self.requests = []
+        self.drop_idle = False
+        self.respond = None  # optional prompt -> content
+        self.delay = 0.0
+        self.slots = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                payload = json.dumps({"total_slots": server.slots} if server.slots else {}).encode()
+                self.send_response(200 if server.slots else 404)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append(body)
+                server.connections.add(self.client_address)
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    for token in server.tokens:
+                        chunk = {"choices": [{"delta": {"content": token}}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.close_connection = True
+                    return
+                time.sleep(server.delay)
+                prompt = body["messages"][0]["content"]
+                content = server.respond(prompt) if server.respond else "".join(server.tokens)
+                payload = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                # Close without announcing it, like a server whose keep-alive timed out
+                self.close_connection = server.drop_idle
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+FAKE_LLAMAFILE = textwrap.dedent("""\
+    import json, sys
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    args = sys.argv[1:]
+    assert "--server" in args
+    port = int(args[args.index("--port") + 1])
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def _send(self, body):
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._send({"status": "ok"})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self._send({"choices": [{"message": {"content": "managed ok"}}]})
+
+    HTTPServer(("127.0.0.1", port), Handler).serve_forever()
+""")
+
+
+@pytest.fixture
+def fake_llamafile(tmp_path):
+    script = tmp_path / "llamafile"
+    script.write_text(f"#!{sys.executable}\n" + FAKE_LLAMAFILE)
+    os.chmod(script, 0o755)
+    return script
+
+
+@pytest.fixture
+def server():
+    fake = FakeLlamafileServer()
+    yield fake
+    fake.close()
+
+
+# =============================================================================
+# SERVER CLIENT
+# =============================================================================
+
+class TestLlamafileServerClient:
+    """Tests for the pooled, streaming server client."""
+
+    def test_prompts_reuse_one_connection(self, server):
+        llm = LlamafileDelegate(server_url=server.url, timeout=5)
+        for _ in range(3):
+            assert llm.ask("hi", max_tokens=10) == "Hello, world"
+        assert len(server.connections) == 1
+        assert server.requests[0]["stream"] is False
+
+    def test_stale_connection_is_replaced(self, server):
+        server.drop_idle = True
+        llm = LlamafileDelegate(server_url=server.url, timeout=5)
+        for _ in range(3):
+            assert llm.ask("hi") == "Hello, world"
+        assert len(server.connections) == 3
+
+    def test_ask_stream_yields_tokens(self, server):
+        llm = LlamafileDelegate(server_url=server.url, timeout=5)
+        assert list(llm.ask_stream("hi")) == ["Hello", ", ", "world"]
+        assert server.requests[-1]["stream"] is True
+        # The client still works after a stream the server closed
+        assert llm.ask("hi") == "Hello, world"
+
+    def test_connection_error_is_reported(self):
+        llm = LlamafileDelegate(server_url="http://127.0.0.1:9", timeout=1)
+        assert llm.ask("hi").startswith("[error: server connection failed")
+        assert next(llm.ask_stream("hi")).startswith("[error: server connection failed")
+
+
+class TestManagedServer:
+    """Tests for the supervised llamafile server child used instead of per-prompt CLI runs."""
+
+    def test_starts_once_and_serves_prompts(self, fake_llamafile):
+        llm = LlamafileDelegate(llamafile_path=fake_llamafile, model_path="m.gguf", managed=True)
+        try:
+            assert llm.mode == "managed"
+            assert llm.ask("hi") == "managed ok"
+            assert llm.summarize("some text") == "managed ok"
+            stats = llm.get_server_stats()["managed"]
+            assert stats["running"] and stats["starts"] == 1
+        finally:
+            llm.close()
+        assert not llm.get_server_stats()["managed"]["running"]
+
+    def test_restarts_after_crash(self, fake_llamafile):
+        llm = LlamafileDelegate(llamafile_path=fake_llamafile, managed=True)
+        try:
+            assert llm.ask("hi") == "managed ok"
+            llm._managed._proc.kill()
+            llm._managed._proc.wait()
+            assert llm.ask("hi again") == "managed ok"
+            stats = llm.get_server_stats()["managed"]
+            assert stats["crashes"] == 1 and stats["starts"] == 2
+        finally:
+            llm.close()
+
+    def test_idle_shutdown(self, fake_llamafile):
+        llm = LlamafileDelegate(llamafile_path=fake_llamafile, managed=True, idle_timeout=0.3)
+        try:
+            assert llm.ask("hi") == "managed ok"
+            deadline = time.monotonic() + 5
+            while llm._managed.alive() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert llm.get_server_stats()["managed"]["idle_shutdowns"] == 1
+            assert llm.ask("hi") == "managed ok"  # started again on demand
+        finally:
+            llm.close()
+
+
+# =============================================================================
+# RESPONSE CACHE
+# =============================================================================
+
+class TestResponseCache:
+    """Tests for the memory + SQLite response cache."""
+
+    def test_memory_and_disk_tiers(self, tmp_path):
+        path = tmp_path / "cache.db"
+        cache = ResponseCache(path, max_entries=1)
+        key_a = ResponseCache.make_key("a", "m", 0, 10)
+        key_b = ResponseCache.make_key("b", "m", 0, 10)
+        cache.set(key_a, "A")
+        cache.set(key_b, "B")  # evicts A from memory
+
+        assert cache.get(key_b) == "B"
+        assert cache.get(key_a) == "A"  # served from disk
+        assert ResponseCache(path).get(key_b) == "B"  # survives a new process
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["disk_hits"], stats["evictions"]) == (1, 1, 2)
+
+    def test_entries_expire(self, tmp_path):
+        cache = ResponseCache(tmp_path / "cache.db")
+        key = ResponseCache.make_key("p", "m", 0, 10)
+        cache.set(key, "old", ttl=0.05)
+        time.sleep(0.1)
+        assert cache.get(key) is None
+        assert cache.get_stats()["expired"] == 1
+
+    def test_key_covers_generation_settings(self):
+        key = ResponseCache.make_key("p", "m", 0, 10)
+        assert key == ResponseCache.make_key("p", "m", 0.0, 10)
+        assert key != ResponseCache.make_key("p", "m", 0.7, 10)
+        assert key != ResponseCache.make_key("p", "m", 0, 20)
+        assert key != ResponseCache.make_key("p", "other", 0, 10)
+
+    def test_delegate_caches_deterministic_calls_only(self, server, tmp_path):
+        llm = LlamafileDelegate(server_url=server.url, cache=ResponseCache(tmp_path / "c.db"))
+        for _ in range(3):
+            assert llm.ask("hi", temperature=0) == "Hello, world"
+            assert llm.generate_json("a user") == {"error": "Failed to parse JSON", "raw": "Hello, world"}
+        assert len(server.requests) == 2
+
+        llm.ask("hi")
+        llm.ask("hi")
+        llm.ask("hi", temperature=0, cache=False)
+        assert len(server.requests) == 5
+
+        assert llm.ask("creative", cache=True) == llm.ask("creative", cache=True)
+        assert list(llm.ask_stream("hi", temperature=0)) == ["Hello, world"]
+        assert len(server.requests) == 6
+        assert llm.get_cache_stats()["hits"] == 6
+
+
+# =============================================================================
+# BULK GENERATION
+# =============================================================================
+
+def _adapt(prompt):
+    """Fake model: upper-cases each <<<n>>> section, or the single text."""
+    sections = re.split(r"(<<<\d+>>>)", prompt)
+    if len(sections) > 1:
+        return "\n".join(
+            f"{marker}\n{text.strip().upper()}"
+            for marker, text in zip(sections[1::2], sections[2::2])
+            if "FAIL" not in text
+        )
+    text = prompt.split("Text: ", 1)[1].rsplit("\n\nOutput only", 1)[0]
+    return "[error: model failed]" if "FAIL" in text else text.upper()
+
+
+class TestBulkGenerate:
+    """Tests for AIContentGenerator.bulk_generate."""
+
+    def test_concurrent_packed_and_ordered(self, server):
+        server.respond, server.delay, server.slots = _adapt, 0.2, 4
+        gen = AIContentGenerator(LlamafileDelegate(server_url=server.url, cache=False))
+        variable_sets = [{"agency": f"Agency {i}", "contract_description": "x"} for i in range(8)]
+        platforms = ["twitter", "linkedin", "discord", "facebook"]
+
+        started = time.monotonic()
+        results = gen.bulk_generate("mhi_contract_win", variable_sets, platforms)
+        elapsed = time.monotonic() - started
+
+        assert [(r["variables"]["agency"], r["platform"]) for r in results] == [
+            (v["agency"], p) for v in variable_sets for p in platforms
+        ]
+        assert all(r["error"] is None for r in results)
+        assert "AGENCY 3" in results[13]["content"]
+        assert len(server.requests) == 8  # 32 items packed 4 per request
+        assert elapsed < 0.2 * 8 / 2  # two waves of 4 concurrent requests
+
+    def test_partial_failures_reported_per_item(self, server):
+        server.respond = _adapt
+        gen = AIContentGenerator(LlamafileDelegate(server_url=server.url, cache=False))
+        variable_sets = [{"agency": "A"}, {"agency": "FAIL"}, {"agency": "C"}]
+
+        results = gen.bulk_generate("mhi_contract_win", variable_sets, ["twitter"])
+        assert [r["error"] is None for r in results] == [True, False, True]
+        assert results[1]["error"] == "[error: model failed]"
+        assert "C" in results[2]["content"]
+
+        missing = gen.bulk_generate("no_such_template", [{}], ["twitter", "discord"])
+        assert all(r["error"].startswith("Template render failed") for r in missing)
+
+
+# =============================================================================
+# PROMPT PREFIX REUSE
+# =============================================================================
+
+class _Step:
+    id = name = "gen"
+
+    def __init__(self, **config):
+        self.config = {"prompt_template": "Announce {{title}}", **config}
+
+
+class _Sop:
+    entity = "dsaic"
+
+
+class TestPromptPrefix:
+    """Tests for stable per-entity prefixes and llama.cpp prompt-cache options."""
+
+    def test_server_gets_system_prefix_cache_prompt_and_slot(self, server):
+        server.slots = 4
+        llm = LlamafileDelegate(server_url=server.url, cache=False)
+        llm.ask("first", system="voice A")
+        llm.ask("second", system="voice A")
+        llm.ask("plain")
+
+        first, second, plain = server.requests
+        assert first["messages"][0] == {"role": "system", "content": "voice A"}
+        assert all(r["cache_prompt"] for r in server.requests)
+        assert first["id_slot"] == second["id_slot"] in range(4)
+        assert "id_slot" not in plain
+
+    def test_content_step_sends_entity_voice_as_system_prompt(self, server):
+        handler = ContentGenerateHandler(LlamafileDelegate(server_url=server.url, cache=False))
+        for title in ("v1.0", "v2.0"):
+            result = handler.handle(_Step(tone="casual"), {"data": {"title": title}}, _Sop())
+            assert result.success, result.error
+
+        systems = [r["messages"][0]["content"] for r in server.requests]
+        assert systems[0] == systems[1]
+        assert "Developer-friendly language" in systems[0]
+        task = server.requests[1]["messages"][1]["content"]
+        assert task.startswith("Tone: casual") and task.endswith("Task: Announce v2.0")
@@ -0,0 +1,313 @@
+"""
+Pytest tests for the Mixpost integration.
+
+Tests cover:
+- Cached provider -> account index
+- Idempotent, concurrent calendar sync
+- Transport retries, rate limiting and circuit breaker (local fake server)
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.integrations.client import MixpostClient
+from src.integrations.scheduler import ContentCalendarEntry, SocialScheduler
+from src.integrations.transport import CircuitOpenError, MixpostAPIError, TokenBucket
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+class InMemoryMixpost(MixpostClient):
+    """MixpostClient whose API calls are served from memory and counted."""
+
+    def __init__(self, fail_content=None, **kwargs):
+        super().__init__(base_url="http://mixpost.test", api_token="t", **kwargs)
+        self.calls = Counter()
+        self.posts = []
+        self.fail_content = fail_content
+        self._posts_lock = threading.Lock()
+
+    def _request(self, method, endpoint, **kwargs):
+        self.calls[(method, endpoint.split("/")[-1])] += 1
+        if endpoint.endswith("accounts"):
+            return {"data": [
+                {"id": "tw1", "provider": "twitter"},
+                {"id": "li1", "provider": "LinkedIn"},
+                {"id": "ig1", "provider": "instagram"},
+            ]}
+        if method == "GET" and endpoint.endswith("posts"):
+            return {"data": list(self.posts)}
+        if method == "POST" and endpoint.endswith("posts"):
+            body = kwargs["json"]
+            if self.fail_content and self.fail_content in body["content"]:
+                raise RuntimeError("Mixpost API error: 500")
+            with self._posts_lock:
+                post = {"id": f"p{len(self.posts) + 1}", "status": "scheduled", **body}
+                self.posts.append(post)
+            return {"data": post}
+        raise AssertionError(f"Unexpected call {method} {endpoint}")
+
+
+def _entries(count, platforms=("twitter", "linkedin")):
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=1)
+    return [
+        ContentCalendarEntry(
+            title=f"Post {i}", content=f"Update number {i}", platforms=list(platforms),
+            scheduled_at=start + timedelta(hours=i), entity="DSAIC", campaign_type="promotion",
+        )
+        for i in range(count)
+    ]
+
+
+# =============================================================================
+# ACCOUNT CACHE
+# =============================================================================
+
+class TestAccountCache:
+    """Tests for MixpostClient account caching."""
+
+    def test_accounts_fetched_once_within_ttl(self):
+        client = InMemoryMixpost()
+        assert client.get_account_ids(["Twitter", "linkedin"], "ws") == ["tw1", "li1"]
+        assert client.get_account_by_provider("instagram", "ws").id == "ig1"
+        assert len(client.get_accounts("ws")) == 3
+        assert client.calls[("GET", "accounts")] == 1
+
+        client.invalidate_accounts("ws")
+        client.get_accounts("ws")
+        assert client.calls[("GET", "accounts")] == 2
+
+    def test_ttl_zero_disables_cache(self):
+        client = InMemoryMixpost(account_cache_ttl=0)
+        client.get_accounts()
+        client.get_accounts()
+        assert client.calls[("GET", "accounts")] == 2
+
+
+# =============================================================================
+# CALENDAR SYNC
+# =============================================================================
+
+class TestCalendarSync:
+    """Tests for SocialScheduler.bulk_sync."""
+
+    def test_sync_is_idempotent_and_fetches_accounts_once(self):
+        client = InMemoryMixpost()
+        scheduler = SocialScheduler(client, max_workers=4)
+        for entry in _entries(30):
+            scheduler.add_to_calendar(entry)
+
+        created = scheduler.sync_calendar_to_mixpost("ws")
+        assert len(created) == 30
+        assert client.calls[("GET", "accounts")] == 1
+        assert client.posts[0]["accounts"] == ["tw1", "li1"]
+
+        # A second sync (even from a fresh scheduler) finds the posts already in Mixpost
+        again = SocialScheduler(client)
+        for entry in _entries(30):
+            again.add_to_calendar(entry)
+        assert {r.status for r in again.bulk_sync("ws")} == {"duplicate"}
+        assert len(client.posts) == 30
+
+    def test_per_entry_results(self):
+        client = InMemoryMixpost(fail_content="number 1")
+        scheduler = SocialScheduler(client)
+        entries = _entries(3) + _entries(1, platforms=["tiktok"])
+        entries[3].content = "No account for this one"
+        past = _entries(1)[0]
+        past.scheduled_at = datetime.now() - timedelta(days=1)
+
+        results = scheduler.bulk_sync("ws", entries=entries + [past])
+        assert [r.status for r in results] == ["created", "failed", "created", "no_accounts", "past"]
+        assert "500" in results[1].error
+        assert results[0].to_dict()["post_id"] == results[0].post.id
+
+
+# =============================================================================
+# TRANSPORT
+# =============================================================================
+
+class FakeMixpostServer:
+    """
+    Local HTTP server standing in for Mixpost.
+
+    `script` maps "METHOD /path" to a list of responses consumed in order
+    (the last one repeats): (status, body, headers) or ("sleep", seconds).
+    """
+
+    def __init__(self):
+        self.script = {}
+        self.hits = Counter()
+        self.hit_times = []
+        self.bodies = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                server.bodies.append(self.rfile.read(length) if length else b"")
+                key = f"{self.command} {self.path.split('?')[0]}"
+                server.hits[key] += 1
+                server.hit_times.append(time.monotonic())
+                steps = server.script.get(key) or [(404, {"message": "not found"}, {})]
+                step = steps.pop(0) if len(steps) > 1 else steps[0]
+                if step[0] == "sleep":
+                    time.sleep(step[1])
+                    step = (200, {"data": []}, {})
+                status, body, headers = step
+                payload = json.dumps(body).encode() if not isinstance(body, str) else body.encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                try:
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except OSError:
+                    pass  # Client gave up (timeout test)
+
+            do_GET = do_POST = do_DELETE = _handle
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    fake = FakeMixpostServer()
+    yield fake
+    fake.close()
+
+
+def _client(server, **kwargs):
+    options = dict(backoff_base=0.01, timeout=(1.0, 0.5), rate_limit=100.0)
+    options.update(kwargs)
+    return MixpostClient(base_url=server.url, api_token="t", **options)
+
+
+class TestMixpostTransport:
+    """Tests for retries, throttling and circuit breaking against a fake server."""
+
+    def test_idempotent_get_retries_until_success(self, server):
+        server.script["GET /api/workspaces"] = [
+            (503, {"message": "down"}, {}),
+            (502, "bad gateway", {}),
+            (200, {"data": [{"id": "w1"}]}, {}),
+        ]
+        client = _client(server)
+        assert client.get_workspaces() == [{"id": "w1"}]
+        assert server.hits["GET /api/workspaces"] == 3
+        assert client.get_transport_stats()["retries"] == 2
+
+    def test_post_is_not_retried_on_server_error(self, server):
+        server.script["POST /api/posts"] = [(500, "x" * 5000, {})]
+        client = _client(server)
+        with pytest.raises(MixpostAPIError) as excinfo:
+            client.create_post("hello", ["tw1"])
+        assert server.hits["POST /api/posts"] == 1
+        assert excinfo.value.status_code == 500
+        assert len(str(excinfo.value)) < 300
+
+    def test_post_retried_after_429_honouring_retry_after(self, server):
+        server.script["POST /api/posts"] = [
+            (429, {"message": "Too Many Attempts."}, {"Retry-After": "0.3"}),
+            (201, {"data": {"id": "p1"}}, {}),
+        ]
+        client = _client(server)
+        assert client.create_post("hello", ["tw1"]).id == "p1"
+        assert server.hits["POST /api/posts"] == 2
+        assert server.hit_times[1] - server.hit_times[0] >= 0.3
+
+    def test_media_upload_retry_resends_file(self, server, tmp_path):
+        server.script["POST /api/media"] = [
+            (429, {"message": "Too Many Attempts."}, {"Retry-After": "0"}),
+            (201, {"data": {"id": "m1"}}, {}),
+        ]
+        image = tmp_path / "photo.png"
+        image.write_bytes(b"PNG-BYTES-" * 50)
+        client = _client(server)
+        assert client.upload_media(str(image)) == "m1"
+        assert server.hits["POST /api/media"] == 2
+        assert all(b"PNG-BYTES-" * 50 in body for body in server.bodies)
+
+    def test_long_retry_after_is_capped(self, server):
+        server.script["GET /api/workspaces"] = [
+            (429, {"message": "Too Many Attempts."}, {"Retry-After": "3600"}),
+            (200, {"data": []}, {}),
+        ]
+        client = _client(server, backoff_max=0.2)
+        started = time.monotonic()
+        assert client.get_workspaces() == []
+        assert time.monotonic() - started < 2
+
+    def test_throttle_wait_times_out_with_retryable_error(self, server):
+        server.script["GET /api/workspaces/w1/accounts"] = [(
+            200, {"data": []}, {"X-RateLimit-Remaining": "0", "Retry-After": "10"},
+        )]
+        client = _client(server, account_cache_ttl=0, backoff_max=10.0, throttle_timeout=0.2)
+        client.get_accounts("w1")
+
+        started = time.monotonic()
+        with pytest.raises(MixpostAPIError) as excinfo:
+            client.get_accounts("w1")
+        assert excinfo.value.status_code == 429
+        assert time.monotonic() - started < 1
+        assert server.hits["GET /api/workspaces/w1/accounts"] == 1
+
+    def test_rate_limit_headers_throttle_workspace(self, server):
+        server.script["GET /api/workspaces/w1/accounts"] = [(
+            200, {"data": []},
+            {"X-RateLimit-Limit": "600", "X-RateLimit-Remaining": "0", "Retry-After": "0.3"},
+        ), (200, {"data": []}, {})]
+        client = _client(server, account_cache_ttl=0)
+        client.get_accounts("w1")
+        client.get_accounts("w1")
+        assert server.hit_times[1] - server.hit_times[0] >= 0.3
+
+    def test_circuit_opens_on_timeouts_and_recovers(self, server):
+        server.script["GET /api/workspaces"] = [("sleep", 0.8), ("sleep", 0.8), (200, {"data": []}, {})]
+        client = _client(server, max_retries=0, failure_threshold=2, reset_timeout=0.5)
+
+        for _ in range(2):
+            with pytest.raises(requests.Timeout):
+                client.get_workspaces()
+        started = time.monotonic()
+        with pytest.raises(CircuitOpenError):
+            client.get_workspaces()
+        assert time.monotonic() - started < 0.1
+        assert client.get_transport_stats()["circuit"] == "open"
+
+        time.sleep(0.6)
+        assert client.get_workspaces() == []
+        assert client.get_transport_stats()["circuit"] == "closed"
+
+    def test_token_bucket_rate(self):
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        assert time.monotonic() - started >= 0.09
+        assert bucket.acquire(timeout=0) is False
@@ -0,0 +1,115 @@
+"""
+Pytest tests for the shared SOP definition registry.
+
+Tests cover:
+- Incremental refresh (only changed files are parsed)
+- Generation counter and removed files
+- Engine sync with the registry
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.engine import EnhancedSOPEngine
+from src.sop.registry import DefinitionRegistry
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture
+def sops_dir(tmp_path):
+    for entity, sop_id in (("dsaic", "sop_a"), ("dsaic", "sop_b"), ("computer-store", "sop_c")):
+        _write(tmp_path / entity / f"{sop_id}.yaml", sop_id)
+    (tmp_path / "schema").mkdir()
+    (tmp_path / "schema" / "sop-schema.yaml").write_text("sop_id: schema\n")
+    return tmp_path
+
+
+def _write(path, sop_id, name="First", bump_mtime=True):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    existed = path.exists()
+    before = path.stat().st_mtime_ns if existed else 0
+    path.write_text(f"sop_id: {sop_id}\nname: {name}\nentity: dsaic\n")
+    if existed and bump_mtime:
+        # Guarantee a visible mtime change on coarse-grained filesystems
+        os.utime(path, ns=(before + 10**9, before + 10**9))
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+class TestDefinitionRegistry:
+    """Tests for DefinitionRegistry."""
+
+    def test_initial_load(self, sops_dir):
+        registry = DefinitionRegistry(sops_dir, poll_interval=0)
+        definitions = registry.get_definitions()
+
+        assert sorted(definitions) == ["sop_a", "sop_b", "sop_c"]
+        assert definitions["sop_c"]["_dir"] == "computer-store"
+        assert sorted(registry.by_directory()) == ["computer-store", "dsaic"]
+        assert registry.generation == 1
+
+    def test_only_changed_files_are_parsed(self, sops_dir):
+        registry = DefinitionRegistry(sops_dir, poll_interval=0)
+        registry.refresh()
+        parsed = registry.get_stats()["parsed"]
+        unchanged_b = registry.get_definitions()["sop_b"]
+
+        assert registry.refresh() == 0
+        assert registry.generation == 1
+
+        _write(sops_dir / "dsaic" / "sop_a.yaml", "sop_a", name="Second")
+        assert registry.refresh() == 1
+        assert registry.get_stats()["parsed"] == parsed + 1
+        assert registry.generation == 2
+        assert registry.get_definitions()["sop_a"]["name"] == "Second"
+        assert registry.get_definitions()["sop_b"] is unchanged_b
+
+    def test_touched_file_with_same_content_is_not_reparsed(self, sops_dir):
+        registry = DefinitionRegistry(sops_dir, poll_interval=0)
+        registry.refresh()
+        _write(sops_dir / "dsaic" / "sop_a.yaml", "sop_a")
+
+        assert registry.refresh() == 0
+        assert registry.get_stats()["unchanged"] == 1
+        assert registry.generation == 1
+
+    def test_added_and_removed_files(self, sops_dir):
+        registry = DefinitionRegistry(sops_dir, poll_interval=0)
+        registry.refresh()
+        (sops_dir / "dsaic" / "sop_b.yaml").unlink()
+        _write(sops_dir / "dsaic" / "sop_d.yaml", "sop_d")
+
+        assert registry.refresh() == 2
+        assert sorted(registry.get_definitions()) == ["sop_a", "sop_c", "sop_d"]
+
+    def test_poll_interval_throttles_scans(self, sops_dir):
+        registry = DefinitionRegistry(sops_dir, poll_interval=3600)
+        registry.refresh()
+        _write(sops_dir / "dsaic" / "sop_a.yaml", "sop_a", name="Second")
+
+        assert registry.refresh() == 0
+        assert registry.refresh(force=True) == 1
+
+    def test_engine_follows_registry_generation(self, sops_dir):
+        engine = EnhancedSOPEngine()
+        assert engine.load_definitions(sops_dir) == 3
+        engine._registry.poll_interval = 0
+        index = engine.trigger_index
+
+        assert engine.get_definition("sop_a")["name"] == "First"
+        assert engine.trigger_index is index  # nothing changed, nothing rebuilt
+
+        _write(sops_dir / "dsaic" / "sop_a.yaml", "sop_a", name="Second")
+        assert engine.get_definition("sop_a")["name"] == "Second"
+        assert engine.trigger_index is not index
@@ -0,0 +1,318 @@
+"""
+Pytest tests for the SOP scheduler.
+
+Tests cover:
+- Cron expression parsing and next fire times
+- DST transitions for timezone-aware schedules
+- Next-run heap in SOPScheduler
+- Scheduler daemon catch-up policies and run-state journal
+- CRON schedules synced from SOP `scheduled` triggers
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.cron import CronExpression, get_timezone
+from src.sop.scheduler import (
+    CatchUpPolicy, Schedule, ScheduleType, SchedulerDaemon, SOPScheduler,
+)
+from src.sop.triggers import TriggerIndex
+
+NEW_YORK = get_timezone("America/New_York")
+
+
+# =============================================================================
+# CRON PARSING
+# =============================================================================
+
+class TestCronExpression:
+    """Tests for CronExpression."""
+
+    def test_weekly_monday(self):
+        # 2026-10-14 is a Wednesday
+        cron = CronExpression("0 8 * * 1")
+        assert cron.next_after(datetime(2026, 10, 14, 12, 0)) == datetime(2026, 10, 19, 8, 0)
+
+    def test_quarterly(self):
+        cron = CronExpression("0 6 1 1,4,7,10 *")
+        assert cron.next_after(datetime(2026, 4, 1, 6, 0)) == datetime(2026, 7, 1, 6, 0)
+
+    def test_step_and_range(self):
+        cron = CronExpression("*/15 9-17 * * MON-FRI")
+        assert cron.next_after(datetime(2026, 10, 16, 17, 50)) == datetime(2026, 10, 19, 9, 0)
+        assert cron.next_after(datetime(2026, 10, 19, 9, 0)) == datetime(2026, 10, 19, 9, 15)
+
+    def test_day_of_month_or_day_of_week(self):
+        # Vixie semantics: the 13th OR any Friday
+        cron = CronExpression("0 0 13 * FRI")
+        assert cron.next_after(datetime(2026, 10, 10)) == datetime(2026, 10, 13)
+        assert cron.next_after(datetime(2026, 10, 13)) == datetime(2026, 10, 16)
+
+    def test_six_fields_and_macros(self):
+        assert CronExpression("30 */5 * * * *").next_after(
+            datetime(2026, 1, 1, 0, 0, 31)) == datetime(2026, 1, 1, 0, 5, 30)
+        assert CronExpression("@monthly").next_after(
+            datetime(2026, 1, 15)) == datetime(2026, 2, 1)
+        assert CronExpression("0 0 * * 7").next_after(
+            datetime(2026, 10, 14)) == datetime(2026, 10, 18)
+
+    def test_impossible_date_returns_none(self):
+        assert CronExpression("0 0 30 2 *").next_after(datetime(2026, 1, 1)) is None
+
+    @pytest.mark.parametrize("expression", ["* * *", "60 * * * *", "* * * 13 *", "*/0 * * * *", "x * * * *"])
+    def test_invalid_expressions_raise(self, expression):
+        with pytest.raises(ValueError):
+            CronExpression(expression)
+
+
+# =============================================================================
+# DST
+# =============================================================================
+
+class TestCronDST:
+    """DST transitions (America/New_York: 2026-03-08 spring forward, 2026-11-01 fall back)."""
+
+    def test_spring_forward_skipped_time_runs_after_gap(self):
+        cron = CronExpression("30 2 * * *")
+        start = datetime(2026, 3, 7, 12, 0, tzinfo=NEW_YORK)
+        first = cron.next_after(start)
+        second = cron.next_after(first)
+
+        assert first == datetime(2026, 3, 8, 3, 30, tzinfo=NEW_YORK)
+        assert first.utcoffset() == timedelta(hours=-4)
+        assert second == datetime(2026, 3, 9, 2, 30, tzinfo=NEW_YORK)
+
+    def test_fall_back_ambiguous_time_runs_once(self):
+        cron = CronExpression("30 1 * * *")
+        start = datetime(2026, 10, 31, 12, 0, tzinfo=NEW_YORK)
+        first = cron.next_after(start)
+        second = cron.next_after(first)
+
+        assert first.replace(tzinfo=None) == datetime(2026, 11, 1, 1, 30)
+        assert first.utcoffset() == timedelta(hours=-4)  # First (EDT) occurrence
+        assert second.replace(tzinfo=None) == datetime(2026, 11, 2, 1, 30)
+
+    def test_hourly_across_fall_back(self):
+        cron = CronExpression("0 * * * *")
+        start = datetime(2026, 11, 1, 0, 30, tzinfo=NEW_YORK)
+        times = cron.fire_times(start, start + timedelta(hours=4))
+
+        assert [t.strftime("%H:%M%z") for t in times] == [
+            "01:00-0400", "02:00-0500", "03:00-0500", "04:00-0500",
+        ]
+
+    def test_daily_time_keeps_wall_clock_across_transition(self):
+        cron = CronExpression("0 8 * * *")
+        before = cron.next_after(datetime(2026, 3, 7, 7, 0, tzinfo=NEW_YORK))
+        after = cron.next_after(before)
+
+        assert before.hour == after.hour == 8
+        assert after.timestamp() - before.timestamp() == 23 * 3600
+
+
+# =============================================================================
+# SCHEDULER
+# =============================================================================
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return SOPScheduler(storage_path=tmp_path / "schedules.json")
+
+
+def _schedule(sid, schedule_type=ScheduleType.CRON, expression="0 8 * * 1", **kwargs):
+    return Schedule(id=sid, sop_id=f"sop_{sid}", entity="dsaic",
+                    schedule_type=schedule_type, expression=expression, **kwargs)
+
+
+class TestSOPScheduler:
+    """Tests for SOPScheduler next-run calculation and due lookup."""
+
+    def test_cron_next_run_uses_timezone(self, scheduler):
+        scheduler.add_schedule(_schedule("a", timezone="America/Denver"))
+        next_run = datetime.fromisoformat(scheduler.get_schedule("a").next_run)
+
+        assert next_run.tzinfo is not None
+        assert (next_run.weekday(), next_run.hour, next_run.minute) == (0, 8, 0)
+        assert next_run > datetime.now(next_run.tzinfo)
+
+    def test_daily_and_weekly_use_cron(self, scheduler):
+        scheduler.add_schedule(_schedule("d", ScheduleType.DAILY, "07:45"))
+        scheduler.add_schedule(_schedule("w", ScheduleType.WEEKLY, "FRI 16:00"))
+
+        daily = datetime.fromisoformat(scheduler.get_schedule("d").next_run)
+        weekly = datetime.fromisoformat(scheduler.get_schedule("w").next_run)
+        assert (daily.hour, daily.minute) == (7, 45)
+        assert (weekly.weekday(), weekly.hour) == (4, 16)
+
+    def test_due_schedules_in_fire_order(self, scheduler):
+        for sid, hours in (("late", 3), ("early", 1), ("future", 48)):
+            scheduler.add_schedule(_schedule(sid, ScheduleType.INTERVAL, f"{hours}h"))
+
+        now = datetime.now() + timedelta(hours=4)
+        assert [s.id for s in scheduler.get_due_schedules(now)] == ["early", "late"]
+        # Querying does not consume schedules
+        assert [s.id for s in scheduler.get_due_schedules(now)] == ["early", "late"]
+
+    def test_mark_run_and_disable_reindex(self, scheduler):
+        scheduler.add_schedule(_schedule("a", ScheduleType.INTERVAL, "1h", max_runs=1))
+        scheduler.add_schedule(_schedule("b", ScheduleType.INTERVAL, "1h"))
+        now = datetime.now() + timedelta(hours=2)
+
+        scheduler.mark_run("a")
+        scheduler.update_schedule("b", {"enabled": False})
+        assert scheduler.get_due_schedules(now) == []
+        assert scheduler.next_due_time() is None
+
+    def test_heap_rebuilt_on_load(self, tmp_path, scheduler):
+        scheduler.add_schedule(_schedule("a", ScheduleType.INTERVAL, "1h"))
+        reloaded = SOPScheduler(storage_path=tmp_path / "schedules.json")
+
+        due = reloaded.get_due_schedules(datetime.now() + timedelta(hours=2))
+        assert [s.id for s in due] == ["a"]
+
+    def test_sop_cron_triggers_become_due(self, scheduler):
+        from src.sop.engine import EnhancedSOPEngine
+
+        engine = EnhancedSOPEngine()
+        engine.load_definitions()
+        entries = [e for e in engine.trigger_index.scheduled if e.sop_id == "dsaic_churn_prevention"]
+        assert [e.key for e in entries] == ["0 8 * * 1"]
+
+        assert scheduler.sync_triggers(entries)["added"] == 1
+        # Idempotent: syncing again keeps the same schedule and its run state
+        schedule_id = SOPScheduler.trigger_schedule_id("dsaic_churn_prevention", "0 8 * * 1")
+        scheduler.mark_run(schedule_id)
+        assert scheduler.sync_triggers(entries) == {"added": 0, "removed": 0, "total": 1}
+        assert scheduler.get_schedule(schedule_id).run_count == 1
+
+        next_run = datetime.fromisoformat(scheduler.get_schedule(schedule_id).next_run)
+        assert (next_run.weekday(), next_run.hour, next_run.minute) == (0, 8, 0)
+        due = scheduler.get_due_schedules(next_run + timedelta(minutes=1))
+        assert [(s.sop_id, s.schedule_type) for s in due] == [
+            ("dsaic_churn_prevention", ScheduleType.CRON)]
+
+    def test_removed_cron_trigger_drops_schedule(self, scheduler):
+        index = TriggerIndex.build([{"sop_id": "weekly", "entity": "dsaic",
+                                     "triggers": [{"type": "scheduled", "cron": "0 9 * * 5"}]}])
+        scheduler.add_schedule(_schedule("manual"))
+        scheduler.sync_triggers(index.scheduled)
+        assert scheduler.sync_triggers([]) == {"added": 0, "removed": 1, "total": 0}
+        assert [s.id for s in scheduler.list_schedules()] == ["manual"]
+
+
+# =============================================================================
+# DAEMON
+# =============================================================================
+
+class TestSchedulerDaemon:
+    """Tests for SchedulerDaemon and incremental run-state persistence."""
+
+    @staticmethod
+    def _daemon(scheduler, **kwargs):
+        dispatched = []
+        daemon = SchedulerDaemon(scheduler, lambda s, e: dispatched.append(e), **kwargs)
+        return daemon, dispatched
+
+    def _overdue(self, scheduler, sid="a", hours_late=5, **kwargs):
+        """Hourly cron schedule whose next run was `hours_late` hours ago."""
+        scheduler.add_schedule(_schedule(sid, expression="0 * * * *", **kwargs))
+        top_of_hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+        missed = top_of_hour - timedelta(hours=hours_late)
+        scheduler.get_schedule(sid).next_run = missed.isoformat()
+        scheduler._index(scheduler.get_schedule(sid))
+
+    def test_on_time_run_is_dispatched(self, scheduler):
+        scheduler.add_schedule(_schedule("a", ScheduleType.INTERVAL, "1h", variables={"k": 1}))
+        daemon, dispatched = self._daemon(scheduler)
+
+        now = datetime.fromisoformat(scheduler.get_schedule("a").next_run) + timedelta(seconds=5)
+        assert len(daemon.tick(now)) == 1
+        assert dispatched[0]["schedule_id"] == "a"
+        assert dispatched[0]["data"] == {"k": 1}
+        assert scheduler.get_schedule("a").run_count == 1
+        assert daemon.tick(now) == []
+
+    @pytest.mark.parametrize("policy,expected", [
+        (CatchUpPolicy.SKIP, 0),
+        (CatchUpPolicy.ONCE, 1),
+        (CatchUpPolicy.ALL, 3),
+    ])
+    def test_catch_up_policies(self, scheduler, policy, expected):
+        self._overdue(scheduler, hours_late=5)
+        daemon, dispatched = self._daemon(scheduler, catch_up=policy, max_catch_up=3)
+
+        daemon.tick()
+        assert len(dispatched) == expected
+        assert scheduler.get_schedule("a").run_count == expected
+        assert datetime.fromisoformat(scheduler.get_schedule("a").next_run) > datetime.now()
+
+    def test_schedule_policy_overrides_default(self, scheduler):
+        self._overdue(scheduler, hours_late=2, catch_up="all")
+        daemon, dispatched = self._daemon(scheduler, catch_up=CatchUpPolicy.SKIP)
+
+        daemon.tick()
+        assert len(dispatched) == 3
+
+    def test_max_runs_caps_catch_up(self, scheduler):
+        self._overdue(scheduler, hours_late=5, max_runs=2)
+        daemon, dispatched = self._daemon(scheduler, catch_up=CatchUpPolicy.ALL)
+
+        daemon.tick()
+        assert len(dispatched) == 2
+        assert scheduler.next_due_time() is None
+
+    def test_runs_outside_time_window_are_skipped(self, scheduler):
+        now = datetime.now()
+        blocked_day = (now.weekday() + 1) % 7
+        scheduler.add_schedule(_schedule("a", ScheduleType.INTERVAL, "1s", days_of_week=[blocked_day]))
+        daemon, dispatched = self._daemon(scheduler)
+
+        daemon.tick(now + timedelta(seconds=2))
+        assert dispatched == []
+        assert scheduler.get_schedule("a").run_count == 0
+
+    def test_runs_are_journaled_not_snapshotted(self, tmp_path, scheduler):
+        scheduler.add_schedule(_schedule("a", ScheduleType.INTERVAL, "1h"))
+        snapshot = scheduler.storage_path.read_text()
+
+        scheduler.mark_run("a")
+        scheduler.mark_run("a")
+        assert scheduler.storage_path.read_text() == snapshot
+        assert len(scheduler.journal_path.read_text().splitlines()) == 2
+
+        reloaded = SOPScheduler(storage_path=tmp_path / "schedules.json")
+        assert reloaded.get_schedule("a").run_count == 2
+        assert reloaded.get_schedule("a").next_run == scheduler.get_schedule("a").next_run
+
+    def test_thread_dispatches_when_due(self, scheduler):
+        scheduler.add_schedule(_schedule("a", ScheduleType.INTERVAL, "1s"))
+        daemon, dispatched = self._daemon(scheduler)
+        daemon.start()
+        try:
+            deadline = time.time() + 5
+            while not dispatched and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            daemon.stop()
+        assert dispatched and dispatched[0]["schedule_id"] == "a"
+
+    def test_wake_picks_up_new_schedule(self, scheduler):
+        daemon, dispatched = self._daemon(scheduler, max_sleep=30.0)
+        daemon.start()
+        try:
+            time.sleep(0.1)  # Daemon is now asleep with nothing scheduled
+            scheduler.add_schedule(_schedule("a", ScheduleType.ONCE, datetime.now().isoformat()))
+            daemon.wake()
+            deadline = time.time() + 2
+            while not dispatched and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            daemon.stop()
+        assert dispatched and dispatched[0]["schedule_id"] == "a"
@@ -0,0 +1,520 @@
+"""
+Pytest tests for the SOP engine.
+
+Tests cover:
+- Step dependency graph construction
+- Parallel (DAG) step execution
+- Async execution path
+- Loop step fan-out
+- Trigger index built from SOP definitions
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.engine import EnhancedSOPEngine
+from src.sop.social_handler import StepResult
+from src.sop.step_graph import build_dependency_graph
+from src.sop.step_types import StepType
+from src.sop.triggers import TriggerIndex
+from src.integrations.zoho.webhooks import ZohoWebhookHandler
+
+
+# =============================================================================
+# FIXTURES
+# =============================================================================
+
+@pytest.fixture
+def engine():
+    """Engine with a sleeping data_sync handler and no loaded definitions."""
+    eng = EnhancedSOPEngine(max_workers=4)
+    eng.calls = []
+
+    def slow_step(step, event, sop):
+        config = getattr(step, "config", {}) or {}
+        time.sleep(config.get("sleep", 0.2))
+        eng.calls.append(step.id)
+        return StepResult(
+            step_id=step.id,
+            step_name=step.name,
+            success=not config.get("fail", False),
+            error="boom" if config.get("fail") else None,
+        )
+
+    eng._extended_handlers[StepType.DATA_SYNC] = slow_step
+    return eng
+
+
+def _step(step_id, **extra):
+    step = {"id": step_id, "name": step_id, "type": "data_sync", "config": {}}
+    step.update(extra)
+    return step
+
+
+# =============================================================================
+# DEPENDENCY GRAPH
+# =============================================================================
+
+class TestStepGraph:
+    """Tests for build_dependency_graph."""
+
+    def test_independent_steps_have_no_edges(self):
+        deps = build_dependency_graph([_step("a"), _step("b"), _step("c")])
+        assert deps == [set(), set(), set()]
+
+    def test_read_after_write_creates_edge(self):
+        steps = [
+            {"id": "gen", "type": "content_generate", "config": {"output_variable": "post"}},
+            {"id": "pub", "type": "social_post", "config": {"content": "{{post}}"}},
+            _step("other"),
+        ]
+        assert build_dependency_graph(steps) == [set(), {0}, set()]
+
+    def test_condition_reads_transform_output(self):
+        steps = [
+            {"id": "score", "type": "transform",
+             "config": {"operations": [{"field": "Risk_Level", "expression": "'High'"}]}},
+            {"id": "alert", "type": "notification", "condition": "Risk_Level == 'Critical'"},
+        ]
+        assert build_dependency_graph(steps)[1] == {0}
+
+    def test_step_output_references_create_edges(self):
+        steps = [
+            _step("find"),
+            {"id": "each", "type": "loop",
+             "config": {"items": "outputs.find.records",
+                        "steps": [_step("sync", config={"owner": "{{outputs.owner.id}}",
+                                                        "lead": "{{item.id}}"})]}},
+            _step("owner"),
+            {"id": "check", "type": "condition", "config": {"expression": "outputs.each.failed == 0"}},
+        ]
+        deps = build_dependency_graph(steps)
+        assert deps[1] == {0}
+        assert deps[2] == {1}  # Nested loop step reads outputs.owner
+        assert deps[3] == {1}
+
+    def test_transform_batch_records_and_output(self):
+        steps = [
+            {"id": "load", "type": "crm_search", "config": {"store_as": "leads"}},
+            {"id": "score", "type": "transform",
+             "config": {"records": "leads", "output": "scored",
+                        "operations": [{"field": "Score", "expression": "1"}]}},
+            {"id": "report", "type": "social_post", "config": {"content": "{{scored}}"}},
+        ]
+        deps = build_dependency_graph(steps)
+        assert deps[1] == {0}
+        assert deps[2] == {1}
+
+    def test_generated_content_references(self):
+        steps = [
+            {"id": "gen", "type": "content_generate", "config": {"output_variable": "post"}},
+            {"id": "other", "type": "content_generate", "config": {"output_variable": "tweet"}},
+            {"id": "pub", "type": "social_post", "config": {"content": "{{generated.post}}"}},
+        ]
+        assert build_dependency_graph(steps) == [set(), set(), {0}]
+
+    def test_unmodeled_step_types_are_barriers(self):
+        steps = [
+            _step("a"),
+            {"id": "fetch", "type": "api_call", "config": {"endpoint": "https://example.test"}},
+            {"id": "parse", "type": "transform",
+             "config": {"operations": [{"field": "Title", "expression": "stream_data.title"}]}},
+            {"id": "hook", "type": "webhook_send", "config": {"url": "https://example.test"}},
+            _step("b"),
+        ]
+        deps = build_dependency_graph(steps)
+        assert deps[1] == {0}
+        assert deps[2] == {1}
+        assert deps[3] == {0, 1, 2}
+        assert deps[4] == {3}
+
+    def test_shipped_sop_graphs(self):
+        engine = EnhancedSOPEngine()
+        engine.load_definitions()
+        definitions = engine.list_definitions()
+        assert definitions
+        for definition in definitions:
+            build_dependency_graph(definition.get("steps") or [])
+
+        steps = engine.get_definition("cs_stream_notification")["steps"]
+        deps = build_dependency_graph(steps)
+        index = {step["id"]: i for i, step in enumerate(steps)}
+        assert index["get_stream_info"] in deps[index["parse_stream_data"]]
+        assert deps[index["handle_stream_end"]] == set(range(index["handle_stream_end"]))
+
+    def test_explicit_depends_on(self):
+        steps = [_step("a"), _step("b", depends_on="a"), _step("c", depends_on=["a", "b"])]
+        assert build_dependency_graph(steps) == [set(), {0}, {0, 1}]
+
+    def test_approval_is_barrier(self):
+        steps = [_step("a"), _step("b"), {"id": "ok", "type": "approval"}, _step("c")]
+        deps = build_dependency_graph(steps)
+        assert deps[2] == {0, 1}
+        assert deps[3] == {2}
+
+    def test_unknown_dependency_raises(self):
+        with pytest.raises(ValueError):
+            build_dependency_graph([_step("a", depends_on="missing")])
+
+    def test_cycle_raises(self):
+        steps = [_step("a", depends_on="b"), _step("b", depends_on="a")]
+        with pytest.raises(ValueError):
+            build_dependency_graph(steps)
+
+
+# =============================================================================
+# PARALLEL EXECUTION
+# =============================================================================
+
+class TestParallelExecution:
+    """Tests for execute_sop(parallel=True)."""
+
+    def test_independent_steps_run_concurrently(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [_step("s1"), _step("s2"), _step("s3"), _step("s4")],
+        }
+        started = time.perf_counter()
+        result = engine.execute_sop("p", parallel=True)
+        elapsed = time.perf_counter() - started
+
+        assert result["success"] is True
+        assert elapsed < 0.6
+        assert [r["step_id"] for r in result["step_results"]] == ["s1", "s2", "s3", "s4"]
+
+    def test_sop_config_enables_parallel(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "config": {"parallel": True},
+            "steps": [_step("s1", config={"sleep": 0.01})],
+        }
+        assert engine.execute_sop("p")["parallel"] is True
+
+    def test_stop_on_failure_skips_dependents(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [
+                _step("fails", config={"fail": True, "sleep": 0.01}),
+                _step("after", depends_on="fails", config={"sleep": 0.01}),
+            ],
+        }
+        result = engine.execute_sop("p", parallel=True)
+
+        assert result["success"] is False
+        assert result["error"] == "boom"
+        assert [r["step_id"] for r in result["step_results"]] == ["fails"]
+        assert "after" not in engine.calls
+
+    def test_continue_on_failure_runs_dependents(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [
+                _step("fails", on_failure="continue", config={"fail": True, "sleep": 0.01}),
+                _step("after", depends_on="fails", config={"sleep": 0.01}),
+            ],
+        }
+        result = engine.execute_sop("p", parallel=True)
+
+        assert result["success"] is True
+        assert [r["step_id"] for r in result["step_results"]] == ["fails", "after"]
+
+    def test_step_waits_for_output_it_references(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [
+                _step("find", config={"sleep": 0.2}),
+                _step("use", config={"sleep": 0.01, "found": "{{outputs.find.success}}"}),
+            ],
+        }
+        result = engine.execute_sop("p", parallel=True)
+
+        assert result["success"] is True
+        assert engine.calls == ["find", "use"]
+
+    def test_sequential_matches_parallel_results(self, engine):
+        steps = [_step("a", config={"sleep": 0.01}), _step("b", config={"sleep": 0.01})]
+        engine._definitions["p"] = {"sop_id": "p", "steps": steps}
+
+        sequential = engine.execute_sop("p", dry_run=True)
+        parallel = engine.execute_sop("p", dry_run=True, parallel=True)
+        assert sequential["step_results"] == parallel["step_results"]
+
+    def test_cycle_reports_error(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [_step("a", depends_on="b"), _step("b", depends_on="a")],
+        }
+        result = engine.execute_sop("p", parallel=True)
+        assert result["success"] is False
+        assert "cycle" in result["error"]
+
+
+# =============================================================================
+# ASYNC EXECUTION
+# =============================================================================
+
+class TestAsyncExecution:
+    """Tests for execute_sop_async."""
+
+    def test_sync_handlers_are_offloaded(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [_step("s1"), _step("s2"), _step("s3")],
+        }
+
+        async def run():
+            # The event loop must stay responsive while the SOP runs
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tick_task = asyncio.ensure_future(ticker())
+            result = await engine.execute_sop_async("p")
+            tick_task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(run())
+        assert result["success"] is True
+        assert [r["step_id"] for r in result["step_results"]] == ["s1", "s2", "s3"]
+        assert ticks > 10
+
+    def test_parallel_async_runs_concurrently(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [_step("s1"), _step("s2"), _step("s3"), _step("s4")],
+        }
+        started = time.perf_counter()
+        result = asyncio.run(engine.execute_sop_async("p", parallel=True))
+        elapsed = time.perf_counter() - started
+
+        assert result["success"] is True
+        assert elapsed < 0.6
+        assert [r["step_id"] for r in result["step_results"]] == ["s1", "s2", "s3", "s4"]
+
+    def test_native_async_handler_is_awaited(self, engine):
+        async def async_step(step, event, sop):
+            await asyncio.sleep(0)
+            return StepResult(step_id=step.id, step_name=step.name, success=True,
+                              data={"async": True})
+
+        engine._async_handlers[StepType.DATA_SYNC] = async_step
+        engine._definitions["p"] = {"sop_id": "p", "steps": [_step("s1")]}
+
+        result = asyncio.run(engine.execute_sop_async("p"))
+        assert result["step_results"][0]["data"] == {"async": True}
+
+    def test_async_stop_on_failure(self, engine):
+        engine._definitions["p"] = {
+            "sop_id": "p",
+            "steps": [
+                _step("fails", config={"fail": True, "sleep": 0.01}),
+                _step("after", config={"sleep": 0.01}),
+            ],
+        }
+        result = asyncio.run(engine.execute_sop_async("p"))
+        assert result["success"] is False
+        assert [r["step_id"] for r in result["step_results"]] == ["fails"]
+
+
+# =============================================================================
+# LOOP STEP
+# =============================================================================
+
+class TestLoopStep:
+    """Tests for the loop step."""
+
+    @pytest.fixture
+    def loop_engine(self):
+        eng = EnhancedSOPEngine()
+        eng.seen = []
+
+        def record(step, event, sop):
+            item = event["data"]["lead"]
+            time.sleep(item.get("sleep", 0))
+            eng.seen.append(item["id"])
+            return StepResult(step_id=step.id, step_name=step.name,
+                              success=item.get("ok", True), error=None if item.get("ok", True) else "bad",
+                              data={"lead": item["id"], "index": event["data"]["n"]})
+
+        eng._extended_handlers[StepType.DATA_SYNC] = record
+        return eng
+
+    def _run(self, engine, config, event=None, parallel=False):
+        engine._definitions["loop"] = {
+            "sop_id": "loop", "name": "Loop", "entity": "dsaic",
+            "steps": [
+                {"id": "find", "name": "find", "type": "schedule_content",
+                 "config": {"content": "x", "platforms": ["twitter"]}},
+                {"id": "each", "name": "each", "type": "loop", "on_failure": "continue",
+                 "config": {"item_variable": "lead", "index_variable": "n",
+                            "steps": [_step("sync", condition="lead.skip != true")], **config}},
+            ],
+        }
+        result = engine.execute_sop("loop", event or {"data": {}}, parallel=parallel)
+        return result["step_results"][1]
+
+    def test_items_from_event_with_error_isolation(self, loop_engine):
+        leads = [{"id": i, "ok": i != 2, "skip": i == 3} for i in range(5)]
+        step = self._run(loop_engine, {"items": "leads"}, {"data": {"leads": leads}})
+
+        assert step["success"] is False
+        assert step["error"] == "1 of 5 loop items failed"
+        assert {k: step["data"][k] for k in ("total", "succeeded", "failed")} == {
+            "total": 5, "succeeded": 4, "failed": 1}
+        assert step["data"]["errors"] == [{"index": 2, "error": "bad"}]
+        assert loop_engine.seen == [0, 1, 2, 4]
+        assert step["data"]["results"][1]["outputs"]["sync"] == {"lead": 1, "index": 1}
+
+    def test_items_from_previous_step_output(self, loop_engine):
+        step = self._run(loop_engine, {"items": "outputs.find.entry.platforms"})
+        assert step["success"] is False  # "twitter" has no lead fields
+        step = self._run(loop_engine, {"items": "outputs.missing"})
+        assert "not found" in step["error"]
+
+    def test_parallel_loop_waits_for_item_source(self, loop_engine):
+        step = self._run(loop_engine, {"items": "outputs.find.entry.platforms"}, parallel=True)
+        assert step["data"]["total"] == 1  # find finished before the loop resolved its items
+
+    def test_concurrency_chunks_and_streaming(self, loop_engine):
+        pulled = []
+
+        def leads(n, **fields):
+            for i in range(n):
+                pulled.append(i)
+                yield {"id": i, **fields}
+
+        started = time.monotonic()
+        step = self._run(loop_engine, {"items": leads(12, sleep=0.05), "concurrency": 4, "chunk_size": 4,
+                                       "max_results": 5})
+        assert time.monotonic() - started < 0.4  # 3 chunks of 4 concurrent items
+        assert step["data"]["chunks"] == 3 and step["data"]["total"] == 12
+        assert len(step["data"]["results"]) == 5 and step["data"]["truncated"]
+
+        # A failure stops the loop after its chunk; the rest is never pulled
+        pulled.clear()
+        step = self._run(loop_engine, {"items": leads(100, ok=False), "chunk_size": 10,
+                                       "on_item_failure": "stop"})
+        assert step["data"]["total"] == 10 and step["data"]["chunks"] == 1
+        assert len(pulled) == 10
+
+
+# =============================================================================
+# TRIGGER INDEX
+# =============================================================================
+
+CHURN_SOP = {
+    "sop_id": "churn", "entity": "dsaic",
+    "triggers": [
+        {"type": "field_update", "module": "Customers", "field": "Health_Score",
+         "condition": "Health_Score < 50"},
+        {"type": "webhook", "endpoint": "/webhooks/stripe/subscription-canceled"},
+        {"type": "scheduled", "cron": "0 8 * * 1"},
+        {"type": "manual"},
+    ],
+}
+ONBOARD_SOP = {
+    "sop_id": "onboard", "entity": "dsaic",
+    "triggers": [
+        {"type": "record_create", "module": "Customers", "condition": "Status == 'Active'"},
+        {"type": "field_update", "module": "Customers", "field": "Status", "new_value": "Active"},
+    ],
+}
+
+
+class TestTriggerIndex:
+    """Tests for TriggerIndex and its use in webhook routing."""
+
+    @pytest.fixture
+    def index(self):
+        return TriggerIndex.build([CHURN_SOP, ONBOARD_SOP])
+
+    def test_record_events_resolve_by_module_event_and_field(self, index):
+        def matched(event_type, record, fields=None):
+            return [e.sop_id for e in index.match_record_event("customers", event_type, record, fields)]
+
+        assert matched("create", {"Status": "Active"}) == ["onboard"]
+        assert matched("create", {"Status": "Trial"}) == []
+        # Field triggers fire only for fields known to have changed
+        assert matched("edit", {"Health_Score": 30, "Status": "Active"}) == []
+        assert matched("edit", {"Health_Score": 30, "Status": "Active"}, ["Health_Score", "Status"]) == [
+            "churn", "onboard"]
+        assert matched("record_updated", {"Health_Score": 30, "Status": "Active"}, ["Status"]) == ["onboard"]
+        assert matched("edit", {"Health_Score": 80}, ["Health_Score"]) == []
+
+    def test_endpoints_and_schedules(self, index):
+        assert [e.sop_id for e in index.match_endpoint("/webhooks/stripe/subscription-canceled/")] == ["churn"]
+        assert index.match_endpoint("/webhooks/unknown") == []
+        assert [(e.sop_id, e.key) for e in index.scheduled] == [("churn", "0 8 * * 1")]
+
+    def test_webhook_secret_verification(self, monkeypatch):
+        import hashlib
+        import hmac
+
+        index = TriggerIndex.build([{"sop_id": "hook", "entity": "dsaic", "triggers": [
+            {"type": "webhook", "endpoint": "/webhooks/a", "secret_env": "TEST_HOOK_SECRET"},
+            {"type": "webhook", "endpoint": "/webhooks/b"},
+        ]}])
+        [entry] = index.endpoint_triggers("/webhooks/a")
+        body = b'{"x": 1}'
+        signed = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+
+        # Secret unset in the environment: nothing passes
+        monkeypatch.delenv("TEST_HOOK_SECRET", raising=False)
+        assert not entry.verify_webhook(body, signed)
+        monkeypatch.setenv("TEST_HOOK_SECRET", "s3cret")
+        assert entry.verify_webhook(body, signed)
+        assert entry.verify_webhook(body, "sha256=" + signed)
+        assert entry.verify_webhook(body, secret="s3cret")
+        assert not entry.verify_webhook(b'{"x": 2}', signed)
+        assert not entry.verify_webhook(body, secret="wrong")
+        assert not entry.verify_webhook(body)
+        # A trigger without a secret accepts nothing
+        [open_entry] = index.endpoint_triggers("/webhooks/b")
+        assert not open_entry.verify_webhook(body, secret="")
+
+    def test_engine_builds_index_from_sop_files(self):
+        engine = EnhancedSOPEngine()
+        engine.load_definitions()
+        summary = engine.trigger_index.get_summary()
+        assert summary["errors"] == []
+        assert "dsaic_churn_prevention" in summary["endpoints"]["/webhooks/stripe/subscription-canceled"]
+
+    def test_webhook_handler_uses_index(self, index):
+        handler = ZohoWebhookHandler(trigger_index=index)
+        result = handler.process_webhook({
+            "operation": "create",
+            "module": {"api_name": "Customers"},
+            "data": [{"id": "1", "Status": "Active"}],
+        })
+        assert [(t["sop_id"], t["entity"]) for t in result["triggered_sops"]] == [("onboard", "dsaic")]
+
+    def test_webhook_field_triggers_need_a_change(self, index):
+        handler = ZohoWebhookHandler(trigger_index=index)
+
+        def edit(record, **extra):
+            result = handler.process_webhook({
+                "operation": "edit",
+                "module": {"api_name": "Customers"},
+                "data": [{"id": "7", **record}],
+                **extra,
+            })
+            return [t["sop_id"] for t in result["triggered_sops"]]
+
+        # First sighting: no previous value, so no change can be shown
+        assert edit({"Health_Score": 60, "Phone": "1"}) == []
+        assert edit({"Health_Score": 30, "Phone": "1"}) == ["churn"]
+        # Unrelated edits of a low-health customer do not re-run the SOP
+        assert edit({"Health_Score": 30, "Phone": "2"}) == []
+        # A changed-field list in the payload is used when present
+        assert edit({"Health_Score": 30, "Phone": "3"}, changed_fields=["Health_Score"]) == ["churn"]
@@ -0,0 +1,136 @@
+"""
+Pytest tests for compiled transform expressions.
+
+Tests cover:
+- Ternaries, if/elif/else chains, functions, string methods and templates
+- Sandbox: unknown functions and methods are rejected at compile time
+- Transform steps in the engine, single-event and batch mode
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+WORKSPACE = Path(__file__).parent.parent
+sys.path.insert(0, str(WORKSPACE))
+
+from src.sop.engine import EnhancedSOPEngine
+from src.sop.transforms import ExpressionError, compile_expression, compile_transform
+
+CHURN_OPERATIONS = [
+    {"field": "Churn_Risk_Score", "expression": (
+        "(100 - Health_Score) * 0.3 +\n(Days_Since_Login > 14 ? 30 : 0) +\n"
+        "(Support_Tickets_Open > 3 ? 20 : 0) +\n(Feature_Usage_Decline ? 20 : 0)\n"
+    )},
+    {"field": "Risk_Level", "expression": (
+        'if Churn_Risk_Score >= 70: "Critical"\nelif Churn_Risk_Score >= 50: "High"\n'
+        'elif Churn_Risk_Score >= 30: "Medium"\nelse: "Low"\n'
+    )},
+]
+
+
+# =============================================================================
+# EXPRESSIONS
+# =============================================================================
+
+class TestTransformExpressions:
+    """Tests for compile_expression."""
+
+    @pytest.mark.parametrize("expression,expected", [
+        ("(100 - Health) * 0.5 + (Days > 14 ? 30 : 0)", 52.5),
+        ("Flag ? 'yes' : 'no'", "no"),
+        ('if Health >= 70: "Good" elif Health >= 40: "Fair" else: "Poor"', "Fair"),
+        ('"down" in Issue.lower() or "outage" in Issue.lower()', True),
+        ("Url.replace('{w}', '440').replace('{h}', '248')", "x/440/248"),
+        ("filter(items, qty <= reorder AND qty > 0)", [{"qty": 2, "reorder": 3, "cat": "b"}]),
+        ("group_by(items, cat).a.length", 2),
+        ("map(items, qty * 2)", [0, 4, 18]),
+        ("weighted_average([80, 40], [1, 3])", 50.0),
+        ("date_diff('2026-03-11', '2026-03-01')", 10),
+        ("date_format(date_subtract('2026-03-11T09:00:00', 2, 'days'), 'YYMMDD')", "260309"),
+        ("round(Health / 3, 1)", 18.3),
+        ("Missing_Field + 1", None),
+    ])
+    def test_values(self, expression, expected):
+        context = {
+            "Health": 55, "Days": "20", "Flag": "false", "Issue": "Site is DOWN",
+            "Url": "x/{w}/{h}",
+            "items": [{"qty": 0, "reorder": 3, "cat": "a"}, {"qty": 2, "reorder": 3, "cat": "b"},
+                      {"qty": 9, "reorder": 3, "cat": "a"}],
+        }
+        assert compile_expression(expression)(context) == expected
+
+    def test_template_and_cache(self):
+        template = compile_expression("CS-{{date_format('2026-03-01', 'YYMMDD')}}-{{Name.upper()}}")
+        assert template({"Name": "ab"}) == "CS-260301-AB"
+        assert compile_expression("A + B") is compile_expression("A + B")
+        assert compile_expression("A + B").fields == {"A", "B"}
+
+    @pytest.mark.parametrize("expression", [
+        "__import__('os')", "open('x')", "Name.__class__()", "Name.format(1)", "A ? 1", "if A: 1 else 2",
+    ])
+    def test_sandbox_and_malformed(self, expression):
+        with pytest.raises(ExpressionError):
+            compile_expression(expression)
+
+    def test_operations_see_earlier_results(self):
+        record = {"Health_Score": 20, "Days_Since_Login": 30, "Support_Tickets_Open": 0,
+                  "Feature_Usage_Decline": True}
+        values, errors = compile_transform(CHURN_OPERATIONS).apply(record)
+        assert values == {"Churn_Risk_Score": 74, "Risk_Level": "Critical"}
+        assert record["Risk_Level"] == "Critical" and errors == []
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class TestTransformStep:
+    """Tests for the engine's transform step."""
+
+    def _engine(self, config, follow_up=None):
+        engine = EnhancedSOPEngine()
+        steps = [{"id": "score", "name": "Score", "type": "transform", "config": config}]
+        if follow_up:
+            steps.append(follow_up)
+        engine._definitions["t"] = {"sop_id": "t", "name": "T", "entity": "dsaic", "steps": steps}
+        return engine
+
+    def test_fields_written_to_event_data(self):
+        engine = self._engine({"operations": CHURN_OPERATIONS}, {
+            "id": "branch", "name": "Branch", "type": "condition",
+            "config": {"expression": "Risk_Level == 'Medium'"},
+        })
+        event = {"data": {"Health_Score": 50, "Days_Since_Login": 20, "Support_Tickets_Open": 0}}
+        result = engine.execute_sop("t", event)
+
+        assert result["success"]
+        assert result["step_results"][0]["data"]["fields"] == {"Churn_Risk_Score": 45, "Risk_Level": "Medium"}
+        assert result["step_results"][1]["data"]["result"] is True
+
+    def test_batch_mode_scores_all_records(self):
+        customers = [{"Health_Score": h, "Days_Since_Login": d, "Support_Tickets_Open": 5}
+                     for h, d in ((90, 1), (10, 30), (50, 20))]
+        engine = self._engine({"operations": CHURN_OPERATIONS, "records": "customers",
+                               "output": "scored"})
+        event = {"data": {"customers": customers}}
+        result = engine.execute_sop("t", event)
+
+        assert result["step_results"][0]["data"] == {"records": 3, "output": "scored"}
+        assert [r["Risk_Level"] for r in event["data"]["scored"]] == ["Low", "Critical", "High"]
+        assert "Risk_Level" not in customers[0]
+
+    def test_invalid_operations_fail_the_step(self, capsys):
+        definition = {"sop_id": "bad", "steps": [{"id": "t", "type": "transform", "config": {
+            "operations": [{"field": "X", "expression": "exec('1')"}]}}]}
+        assert EnhancedSOPEngine._compile_conditions(definition) == 0
+        assert "Invalid transform" in capsys.readouterr().out
+
+        engine = self._engine(definition["steps"][0]["config"])
+        assert "Unknown function" in engine.execute_sop("t")["error"]
+
+    def test_repository_sops_compile(self, capsys):
+        engine = EnhancedSOPEngine()
+        engine.load_definitions()
+        assert "Invalid transform" not in capsys.readouterr().out